@@ -0,0 +1,189 @@
+"""Conditional, ranged and compressed responses for result downloads."""
+import os
+import zlib
+from email.utils import formatdate
+from typing import AsyncIterator, Optional, Tuple
+import aiofiles
+from fastapi import Request
+from fastapi.responses import FileResponse, Response, StreamingResponse
+from ..services.io_executor import io_executor
+from ..services.metrics import BYTES_TOTAL
+from ..config.settings import settings
+
+# JSON files smaller than this are not worth compressing
+GZIP_MIN_BYTES = 1024
+# gzip container for zlib.compressobj
+GZIP_WBITS = 31
+
+
+def file_etag(stat_result: os.stat_result) -> str:
+    """Strong validator from a file's size and modification time."""
+    return f'"{stat_result.st_size:x}-{stat_result.st_mtime_ns:x}"'
+
+
+def etag_matches(header: Optional[str], etag: str) -> bool:
+    """Weak comparison of ``If-None-Match`` against ``etag`` (RFC 9110 13.1.2)."""
+    if not header:
+        return False
+    if header.strip() == '*':
+        return True
+    opaque = etag[2:] if etag.startswith('W/') else etag
+    for candidate in header.split(','):
+        candidate = candidate.strip()
+        if candidate.startswith('W/'):
+            candidate = candidate[2:]
+        if candidate == opaque:
+            return True
+    return False
+
+
+class RangeNotSatisfiable(Exception):
+    """The requested byte range lies outside the file."""
+
+
+def parse_range(header: Optional[str], size: int) -> Optional[Tuple[int, int]]:
+    """Parse a single ``bytes=`` range into inclusive ``(start, end)``.
+
+    Returns None when the header is absent, malformed or asks for several
+    ranges (the full file is sent instead). Raises RangeNotSatisfiable when
+    the range lies outside the file.
+    """
+    if not header or not header.startswith('bytes='):
+        return None
+    spec = header[len('bytes='):].strip()
+    if ',' in spec or '-' not in spec:
+        return None
+    first, last = (part.strip() for part in spec.split('-', 1))
+    try:
+        if first:
+            start = int(first)
+            end = int(last) if last else size - 1
+        elif last:
+            # Suffix range: the last N bytes
+            length = int(last)
+            if length == 0:
+                raise RangeNotSatisfiable("Empty suffix range")
+            start, end = max(size - length, 0), size - 1
+        else:
+            return None
+    except ValueError:
+        return None
+    if start < 0 or (last and end < start):
+        return None
+    if start >= size:
+        raise RangeNotSatisfiable(f"Range start {start} beyond file size {size}")
+    return start, min(end, size - 1)
+
+
+def accepts_gzip(request: Request) -> bool:
+    for coding in request.headers.get('accept-encoding', '').split(','):
+        name, _, params = coding.partition(';')
+        if name.strip().lower() == 'gzip':
+            return params.replace(' ', '') not in ('q=0', 'q=0.0', 'q=0.00', 'q=0.000')
+    return False
+
+
+def file_response(
+    request: Request,
+    path: str,
+    stat_result: os.stat_result,
+    filename: str,
+    media_type: str = 'application/octet-stream',
+    etag: str = None
+) -> Response:
+    """Serve a file with ETag/If-None-Match, Range/If-Range and optional gzip for JSON."""
+    etag = etag or file_etag(stat_result)
+    size = stat_result.st_size
+    headers = {
+        'ETag': etag,
+        'Last-Modified': formatdate(stat_result.st_mtime, usegmt=True),
+        'Accept-Ranges': 'bytes',
+        'Cache-Control': 'no-cache'
+    }
+
+    gzip = (
+        settings.download_gzip_json
+        and filename.endswith('.json')
+        and size >= GZIP_MIN_BYTES
+        and 'range' not in request.headers
+        and accepts_gzip(request)
+    )
+    if filename.endswith('.json'):
+        headers['Vary'] = 'Accept-Encoding'
+    if gzip:
+        # Each representation needs its own strong validator
+        headers['ETag'] = etag = f'{etag[:-1]}-gzip"'
+
+    if etag_matches(request.headers.get('if-none-match'), etag):
+        return Response(status_code=304, headers=headers)
+
+    if gzip:
+        headers['Content-Encoding'] = 'gzip'
+        headers['Content-Disposition'] = f'attachment; filename="{filename}"'
+        return StreamingResponse(_gzip_file(path), media_type='application/json', headers=headers)
+
+    if_range = request.headers.get('if-range')
+    if not if_range or if_range == etag:
+        try:
+            byte_range = parse_range(request.headers.get('range'), size)
+        except RangeNotSatisfiable:
+            headers['Content-Range'] = f'bytes */{size}'
+            return Response(status_code=416, headers=headers)
+        if byte_range is not None:
+            start, end = byte_range
+            headers['Content-Range'] = f'bytes {start}-{end}/{size}'
+            headers['Content-Length'] = str(end - start + 1)
+            headers['Content-Disposition'] = f'attachment; filename="{filename}"'
+            return StreamingResponse(
+                _read_range(path, start, end),
+                status_code=206,
+                media_type=media_type,
+                headers=headers
+            )
+
+    if request.method != 'HEAD':
+        BYTES_TOTAL.inc(size, direction='download')
+    return FileResponse(
+        path=path,
+        filename=filename,
+        media_type=media_type,
+        stat_result=stat_result,
+        headers=headers,
+        method=request.method
+    )
+
+
+def not_modified(request: Request, etag: str) -> Optional[Response]:
+    """A 304 response when the client already holds ``etag``."""
+    if etag_matches(request.headers.get('if-none-match'), etag):
+        return Response(status_code=304, headers={'ETag': etag, 'Cache-Control': 'no-cache'})
+    return None
+
+
+async def _read_range(path: str, start: int, end: int) -> AsyncIterator[bytes]:
+    remaining = end - start + 1
+    async with aiofiles.open(path, 'rb') as f:
+        await f.seek(start)
+        while remaining > 0:
+            chunk = await f.read(min(settings.upload_chunk_size, remaining))
+            if not chunk:
+                break
+            remaining -= len(chunk)
+            BYTES_TOTAL.inc(len(chunk), direction='download')
+            yield chunk
+
+
+async def _gzip_file(path: str) -> AsyncIterator[bytes]:
+    compressor = zlib.compressobj(6, zlib.DEFLATED, GZIP_WBITS)
+    async with aiofiles.open(path, 'rb') as f:
+        while True:
+            chunk = await f.read(settings.upload_chunk_size)
+            if not chunk:
+                break
+            compressed = await io_executor.run(compressor.compress, chunk)
+            if compressed:
+                BYTES_TOTAL.inc(len(compressed), direction='download')
+                yield compressed
+    tail = compressor.flush()
+    BYTES_TOTAL.inc(len(tail), direction='download')
+    yield tail
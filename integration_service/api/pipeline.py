@@ -1,14 +1,66 @@
 """Pipeline API endpoints."""  
+import asyncio
+import json
 import os  
 import tempfile  
 from typing import List  
-from fastapi import APIRouter, UploadFile, File, Form, HTTPException  
-from fastapi.responses import FileResponse
+from fastapi import APIRouter, UploadFile, File, Form, HTTPException, Query, Request
+from fastapi.responses import StreamingResponse
+from .downloads import file_response, not_modified
 from ..services.orchestration_service import OrchestrationService  
+from ..services.multipart_stream import save_upload
+from ..services.io_executor import io_executor
+from ..services.metrics import BYTES_TOTAL, CANCELLATIONS, timed
+from ..services.job_registry import JobCancelledError
+from ..services.mining_queue import MiningFailedError, QueueFullError
+from ..services.mining_sweep import expand_sweep
+from ..services.progress_hub import read_progress
+from ..services.graph_csr import CSR_DIRNAME
+from ..services import result_index
 from ..config.settings import settings  
   
 router = APIRouter()  
 orchestration_service = OrchestrationService()  
+
+# /mine-patterns defaults, the starting point of every sweep config
+SWEEP_DEFAULTS = {
+    'min_pattern_size': 3,
+    'max_pattern_size': 5,
+    'min_neighborhood_size': 3,
+    'max_neighborhood_size': 5,
+    'n_neighborhoods': 500,
+    'n_trials': 100,
+    'graph_type': None,
+    'search_strategy': 'greedy',
+    'sample_method': 'tree',
+    'graph_output_format': 'representative'
+}
+  
+def _check_job_id(job_id: str):
+    """Reject job ids that would resolve outside the output directories."""
+    if os.path.basename(job_id) != job_id or job_id.startswith('.'):
+        raise HTTPException(status_code=400, detail=f"Invalid job_id: {job_id}")
+
+async def _unless_disconnected(request: Request, operation):
+    """Await ``operation``, cancelling it when the client disconnects first.
+
+    A mining run that other requests are waiting on keeps going for them.
+    """
+    task = asyncio.ensure_future(operation)
+    try:
+        while True:
+            done, _ = await asyncio.wait({task}, timeout=settings.disconnect_poll_interval)
+            if done:
+                return task.result()
+            if await request.is_disconnected():
+                print("DEBUG: Client disconnected, cancelling its mining request")
+                CANCELLATIONS.inc(source='disconnect')
+                task.cancel()
+                await asyncio.gather(task, return_exceptions=True)
+                raise HTTPException(status_code=499, detail="Client closed the request")
+    except asyncio.CancelledError:
+        task.cancel()
+        raise
   
 @router.post("/generate-graph")  
 async def generate_graph(  
@@ -25,17 +77,24 @@ async def generate_graph(
         if not file.filename.endswith('.csv'):  
             raise HTTPException(status_code=400, detail="Only CSV files are allowed")  
       
-    # Save uploaded files to temporary directory  
-    temp_dir = tempfile.mkdtemp()  
+    # Save uploaded files to a workspace next to the CSV cache
+    csv_cache = orchestration_service.csv_cache
+    temp_dir = await io_executor.run(csv_cache.workspace)
     csv_file_paths = []  
+    file_digests = {}
       
     try:  
-        for file in files:  
-            file_path = os.path.join(temp_dir, file.filename)  
-            with open(file_path, "wb") as f:  
-                content = await file.read()  
-                f.write(content)  
-            csv_file_paths.append(file_path)  
+        with timed('upload', files=len(files)) as timing:
+            timing.update(bytes=0, deduplicated=0)
+            for file in files:  
+                # Copy in chunks so large CSVs never sit in memory as a whole
+                filename = os.path.basename(file.filename)
+                file_path = os.path.join(temp_dir, filename)  
+                size, file_digests[filename] = await save_upload(file, file_path)
+                if await io_executor.run(csv_cache.adopt, file_path, file_digests[filename], size):
+                    timing['deduplicated'] += 1
+                timing['bytes'] += size
+                csv_file_paths.append(file_path)  
           
         result = await orchestration_service.generate_networkx(
             csv_files=csv_file_paths,
@@ -44,7 +103,8 @@ async def generate_graph(
             writer_type=writer_type,
             graph_type=graph_type,
             tenant_id="default",
-            cleanup_dir=temp_dir
+            cleanup_dir=temp_dir,
+            file_digests=file_digests
         )
         print(f"DEBUG: generate_networkx completed. Result: {result}")
           
@@ -52,13 +112,67 @@ async def generate_graph(
           
     except Exception as e:
         print(f"DEBUG: Error in generate-graph endpoint: {e}")
-        import shutil
-        if os.path.exists(temp_dir):
-            shutil.rmtree(temp_dir)
+        await io_executor.remove_tree(temp_dir)
         raise e
 
+@router.post("/update-graph")
+async def update_graph(
+    job_id: str = Form(...),
+    added_files: List[UploadFile] = File(None),
+    removed_files: List[UploadFile] = File(None),
+    config: str = Form(...),
+    schema_json: str = Form(...),
+    graph_type: str = Form(None),
+    retire_base: bool = Form(False)
+):
+    """Create a new version of a graph from added and/or removed CSV rows.
+
+    Only the delta rows are sent to the builder. The response carries the
+    new ``job_id``; ``lineage.json`` in its output records the parent.
+    """
+    _check_job_id(job_id)
+    added_files = added_files or []
+    removed_files = removed_files or []
+    for file in added_files + removed_files:
+        if not file.filename.endswith('.csv'):
+            raise HTTPException(status_code=400, detail="Only CSV files are allowed")
+    if not added_files and not removed_files:
+        raise HTTPException(status_code=400, detail="Provide added_files and/or removed_files")
+    
+    if graph_type is None:
+        graph_type = await orchestration_service.get_graph_type_from_metadata(job_id)
+    
+    temp_dir = await io_executor.run(tempfile.mkdtemp)
+    try:
+        paths = {}
+        for name, files in (("added", added_files), ("removed", removed_files)):
+            # Separate folders so an added and a removed file may share a name
+            await io_executor.run(os.makedirs, os.path.join(temp_dir, name))
+            paths[name] = []
+            for file in files:
+                file_path = os.path.join(temp_dir, name, os.path.basename(file.filename))
+                await save_upload(file, file_path)
+                paths[name].append(file_path)
+        
+        return await orchestration_service.update_networkx(
+            base_job_id=job_id,
+            added_csvs=paths["added"],
+            removed_csvs=paths["removed"],
+            config=config,
+            schema_json=schema_json,
+            graph_type=graph_type,
+            retire_base=retire_base
+        )
+    except FileNotFoundError as e:
+        raise HTTPException(status_code=404, detail=str(e))
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    finally:
+        await io_executor.remove_tree(temp_dir)
+
 @router.post("/mine-patterns")
 async def mine_patterns(
+    request: Request,
     job_id: str = Form(...),
     min_pattern_size: int = Form(3),
     max_pattern_size: int = Form(5),
@@ -69,9 +183,28 @@ async def mine_patterns(
     graph_type: str = Form(None),
     search_strategy: str = Form("greedy"),
     sample_method: str = Form("tree"),
-    graph_output_format: str = Form("representative")
+    graph_output_format: str = Form("representative"),
+    use_cache: bool = Form(True),
+    async_mode: bool = Form(False),
+    priority: int = Form(0),
+    n_shards: int = Form(1),
+    seed: int = Form(None),
+    auto_tune: bool = Form(False),
+    time_budget: float = Form(None)
 ):
-    """ Mine patterns from NetworkX graph with custom configuration."""
+    """ Mine patterns from NetworkX graph with custom configuration.
+
+    With ``async_mode`` the run is queued and a mining job handle is returned
+    immediately; poll ``/api/mining-jobs/{mining_id}`` or ``/api/mining-status/{job_id}``.
+    With ``n_shards`` > 1 the neighborhood budget is split across concurrent
+    miner runs whose motif counts are merged.
+    With ``auto_tune`` the neighborhood count, trials and sizes are derived from
+    the graph's profile so the run fits ``time_budget`` seconds
+    (default ``MINING_TIME_BUDGET``); the given values act as upper bounds on sizes.
+    A synchronous run also goes through the queue and waits for its result.
+    It is cancelled when the client disconnects, and answers 409 when
+    ``/api/jobs/{job_id}/cancel`` stopped it.
+    """
     
     # Auto-detect graph_type from metadata if not provided
     if graph_type is None:
@@ -87,34 +220,367 @@ async def mine_patterns(
         'graph_type': graph_type,
         'search_strategy': search_strategy,
         'sample_method': sample_method,
-        'graph_output_format': graph_output_format
+        'graph_output_format': graph_output_format,
+        'n_shards': n_shards
     }
+    if seed is not None:
+        mining_config['seed'] = seed
     
-    result = await orchestration_service.mine_patterns(
-        job_id=job_id,
-        mining_config=mining_config
-    )
+    tuning = None
+    if auto_tune:
+        try:
+            mining_config, tuning = await orchestration_service.auto_tune_mining_config(
+                job_id, mining_config, time_budget
+            )
+        except FileNotFoundError as e:
+            raise HTTPException(status_code=404, detail=str(e))
+        except ValueError as e:
+            raise HTTPException(status_code=400, detail=str(e))
+    
+    if async_mode:
+        entry = await _submit_mining(job_id, mining_config, use_cache, priority)
+        response = {
+            "job_id": job_id,
+            "mining_id": entry["mining_id"],
+            "status": entry["status"],
+            "queue_position": entry["queue_position"],
+            "status_url": f"/api/mining-jobs/{entry['mining_id']}"
+        }
+        if tuning:
+            response["auto_tune"] = {**tuning, "mining_config": mining_config}
+        return response
+    
+    result = await _mine_queued(request, job_id, mining_config, use_cache, priority)
+    if tuning:
+        result = {**result, "auto_tune": {**tuning, "mining_config": mining_config}}
     
     return result
 
+@router.post("/mine-sweep")
+async def mine_sweep(
+    request: Request,
+    job_id: str = Form(...),
+    grid: str = Form(None),
+    configs: str = Form(None),
+    base_config: str = Form(None),
+    use_cache: bool = Form(True),
+    async_mode: bool = Form(False),
+    priority: int = Form(0)
+):
+    """ Mine one graph with many parameter combinations as a single unit.
+
+    ``grid`` is a JSON object mapping mining parameters to lists of values
+    (their cartesian product is mined), ``configs`` a JSON list of explicit
+    parameter sets. Both override ``base_config`` and the ``/mine-patterns``
+    defaults. Each config's output lands in ``sweeps/<sweep_id>/<config_id>/``
+    next to a ``summary.json``.
+    """
+    try:
+        overrides = json.loads(base_config) if base_config else {}
+        if not isinstance(overrides, dict):
+            raise ValueError("base_config must be an object")
+        base = {**SWEEP_DEFAULTS, **overrides}
+        if base.get('graph_type') is None:
+            base['graph_type'] = await orchestration_service.get_graph_type_from_metadata(job_id)
+        sweep_configs = expand_sweep(
+            base,
+            grid=json.loads(grid) if grid else None,
+            configs=json.loads(configs) if configs else None,
+            max_configs=settings.mining_sweep_max_configs
+        )
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=f"Invalid sweep: {e}")
+    
+    if async_mode:
+        entry = await _submit_mining(job_id, {'sweep': sweep_configs}, use_cache, priority)
+        return {
+            "job_id": job_id,
+            "mining_id": entry["mining_id"],
+            "status": entry["status"],
+            "configs": len(sweep_configs),
+            "queue_position": entry["queue_position"],
+            "status_url": f"/api/mining-jobs/{entry['mining_id']}"
+        }
+    
+    return await _mine_queued(request, job_id, {'sweep': sweep_configs}, use_cache, priority)
+
+def _queue_full(error: QueueFullError) -> HTTPException:
+    return HTTPException(
+        status_code=429,
+        detail=str(error),
+        headers={"Retry-After": str(settings.mining_queue_retry_after)}
+    )
+
+async def _submit_mining(job_id: str, mining_config: dict, use_cache: bool, priority: int) -> dict:
+    """Queue a mining run, answering 429 when the queue is full."""
+    try:
+        return await io_executor.run(
+            orchestration_service.mining_queue.submit, job_id, mining_config, use_cache, priority
+        )
+    except QueueFullError as e:
+        raise _queue_full(e)
+
+async def _mine_queued(request: Request, job_id: str, mining_config: dict, use_cache: bool, priority: int) -> dict:
+    """Run a synchronous mining request through the queue and wait for its result.
+
+    It waits for a slot like queued runs do, so the queue's limits hold for
+    both kinds of request.
+    """
+    try:
+        return await _unless_disconnected(request, orchestration_service.mining_queue.submit_and_wait(
+            job_id=job_id,
+            mining_config=mining_config,
+            use_cache=use_cache,
+            priority=priority
+        ))
+    except QueueFullError as e:
+        raise _queue_full(e)
+    except JobCancelledError as e:
+        raise HTTPException(status_code=409, detail=str(e))
+    except MiningFailedError as e:
+        raise HTTPException(status_code=500, detail=str(e))
+
+@router.get("/mining-jobs/{mining_id}")
+async def get_mining_job(mining_id: str):
+    """Get a queued mining job: status, queue position and, once finished, its result."""
+    entry = await io_executor.run(orchestration_service.mining_queue.get, mining_id)
+    if entry is None:
+        raise HTTPException(status_code=404, detail=f"Mining job not found: {mining_id}")
+    return entry
+
+@router.post("/mining-jobs/{mining_id}/cancel")
+async def cancel_mining_job(mining_id: str):
+    """Cancel a queued or running mining job; a running one also stops on the miner."""
+    entry = await orchestration_service.mining_queue.cancel(mining_id)
+    if entry is None:
+        raise HTTPException(status_code=404, detail=f"Mining job not found: {mining_id}")
+    if entry["status"] != "cancelled":
+        raise HTTPException(status_code=409, detail=f"Mining job already {entry['status']}: {mining_id}")
+    return entry
+
+@router.get("/jobs/{job_id}")
+async def get_job(job_id: str):
+    """State of a graph job and its background subtasks (Mork generation, merge, CSR)."""
+    job = await io_executor.run(orchestration_service.job_registry.get_job, job_id)
+    if job is None:
+        raise HTTPException(status_code=404, detail=f"Job not found: {job_id}")
+    return job
+
+@router.get("/job-registry/stats")
+async def get_job_registry_stats():
+    """Subtask counts by state and this worker's lease identity."""
+    return await io_executor.run(orchestration_service.job_registry.stats)
+
+@router.get("/coalescing/stats")
+async def get_coalescing_stats():
+    """How many duplicate graph-generation and mining runs were avoided."""
+    return {
+        "generate_graph": orchestration_service.graph_flight.stats(),
+        "mine_patterns": orchestration_service.mining_flight.stats()
+    }
+
+@router.get("/miners")
+async def get_miners():
+    """In-flight load and health of each neural-miner replica."""
+    return {"miners": orchestration_service.miner_service.pool.stats()}
+
+@router.get("/csv-cache/stats")
+async def get_csv_cache_stats():
+    """Stored CSV blobs, deduplicated bytes and dataset hit rate of the CSV cache."""
+    return await io_executor.run(orchestration_service.csv_cache.stats)
+
+@router.get("/mining-cache/stats")
+async def get_mining_cache_stats():
+    """Hit/miss counters and size of the mining result cache."""
+    return orchestration_service.result_cache.stats()
+
+@router.post("/jobs/{job_id}/cancel")
+async def cancel_job(job_id: str):
+    """Stop all work on a job: queued and running mining, Mork generation and merge, indexing.
+
+    Partial mining results and unmerged uploads are removed; the graph itself is kept.
+    """
+    _check_job_id(job_id)
+    known = (
+        await io_executor.run(orchestration_service.job_registry.get_job, job_id) is not None
+        or await io_executor.run(orchestration_service.mining_queue.latest_for_job, job_id) is not None
+        or await io_executor.run(orchestration_service.retention.has_artifacts, job_id)
+    )
+    if not known:
+        raise HTTPException(status_code=404, detail=f"Job not found: {job_id}")
+    return await orchestration_service.cancel_job(job_id)
+
+@router.put("/jobs/{job_id}/pin")
+async def pin_job(job_id: str, reason: str = None):
+    """Keep a job's graph, results and archive regardless of retention TTLs and quotas."""
+    retention = orchestration_service.retention
+    if not await io_executor.run(retention.has_artifacts, job_id):
+        raise HTTPException(status_code=404, detail=f"No artifacts found for job: {job_id}")
+    pin = await io_executor.run(retention.pin, job_id, reason)
+    return {**pin, "pinned": True}
+
+@router.delete("/jobs/{job_id}/pin")
+async def unpin_job(job_id: str):
+    """Make a pinned job subject to retention again."""
+    if not await io_executor.run(orchestration_service.retention.unpin, job_id):
+        raise HTTPException(status_code=404, detail=f"Job is not pinned: {job_id}")
+    return {"job_id": job_id, "pinned": False}
+
+@router.get("/retention/stats")
+async def get_retention_stats():
+    """Retention limits, pinned jobs and the report of this worker's last sweep."""
+    return await io_executor.run(orchestration_service.retention.stats)
+
+@router.post("/retention/sweep")
+async def run_retention_sweep(dry_run: bool = True):
+    """Sweep now. By default only reports what would be deleted; ``dry_run=false`` deletes it."""
+    with timed('retention_sweep', dry_run=dry_run):
+        return await io_executor.run(orchestration_service.retention.sweep, dry_run)
+
+@router.get("/graph-csr/{job_id}")
+async def get_graph_csr(job_id: str):
+    """Metadata and file URLs of the job's memory-mappable CSR graph.
+
+    Built on first request if graph generation did not already write it.
+    Each ``.npy`` file can be opened with ``numpy.load(path, mmap_mode='r')``.
+    """
+    _check_job_id(job_id)
+    try:
+        meta = await orchestration_service.ensure_graph_csr(job_id)
+    except FileNotFoundError as e:
+        raise HTTPException(status_code=404, detail=str(e))
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Could not build CSR graph: {e}")
+    
+    files = [f"{name}.npy" for name in meta["arrays"]] + ["meta.json"]
+    return {
+        "job_id": job_id,
+        "meta": meta,
+        "files": {
+            name: f"/api/download-result?job_id={job_id}&filename={CSR_DIRNAME}/{name}"
+            for name in files
+        }
+    }
+
+@router.get("/graph-profile/{job_id}")
+async def get_graph_profile(job_id: str, time_budget: float = None):
+    """Statistics of the job's graph and the mining parameters auto-tuning would pick.
+
+    Computed on first request if graph generation did not already write it.
+    """
+    _check_job_id(job_id)
+    try:
+        profile = await orchestration_service.ensure_graph_profile(job_id)
+    except FileNotFoundError as e:
+        raise HTTPException(status_code=404, detail=str(e))
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Could not profile graph: {e}")
+    
+    try:
+        suggested, tuning = await orchestration_service.auto_tune_mining_config(
+            job_id, {**SWEEP_DEFAULTS, 'graph_type': 'directed' if profile['directed'] else 'undirected'}, time_budget
+        )
+    except ValueError as e:
+        suggested, tuning = None, {"error": str(e)}
+    return {
+        "job_id": job_id,
+        "profile": profile,
+        "suggested_mining_config": suggested,
+        "tuning": tuning
+    }
+
+async def _indexed_results(job_id: str) -> str:
+    """The job directory, once its motif index is up to date."""
+    _check_job_id(job_id)
+    try:
+        await orchestration_service.ensure_result_index(job_id)
+    except FileNotFoundError as e:
+        raise HTTPException(status_code=404, detail=str(e))
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Could not index mining results: {e}")
+    return os.path.join(orchestration_service.shared_output_dir, job_id)
+
+@router.get("/results/{job_id}/motifs")
+async def query_motifs(
+    job_id: str,
+    file: str = None,
+    min_size: int = None,
+    max_size: int = None,
+    min_frequency: float = None,
+    min_score: float = None,
+    node_label: List[str] = Query(None),
+    edge_label: List[str] = Query(None),
+    sort: str = "frequency",
+    order: str = "desc",
+    limit: int = 20,
+    offset: int = 0
+):
+    """A page of the job's motifs, filtered and sorted, without downloading the result files.
+
+    ``node_label``/``edge_label`` may repeat; a motif must have all of them.
+    Sort by ``frequency``, ``score``, ``size``, ``edges`` or ``id``. The
+    instances of a motif are left out, see ``/motifs/{motif_id}/instances``.
+    """
+    job_dir = await _indexed_results(job_id)
+    try:
+        page = await io_executor.run(
+            result_index.query_motifs, job_dir,
+            file=file, min_size=min_size, max_size=max_size, min_frequency=min_frequency,
+            min_score=min_score, node_labels=node_label, edge_labels=edge_label,
+            sort=sort, order=order, limit=limit, offset=offset
+        )
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    return {"job_id": job_id, **page}
+
+@router.get("/results/{job_id}/motifs/{motif_id}")
+async def get_motif(job_id: str, motif_id: int):
+    """One motif record with its indexed fields."""
+    job_dir = await _indexed_results(job_id)
+    motif = await io_executor.run(result_index.get_motif, job_dir, motif_id)
+    if motif is None:
+        raise HTTPException(status_code=404, detail=f"Motif {motif_id} not found in job {job_id}")
+    return {"job_id": job_id, **motif}
+
+@router.get("/results/{job_id}/motifs/{motif_id}/instances")
+async def get_motif_instances(job_id: str, motif_id: int, limit: int = 50, offset: int = 0):
+    """A page of the instances the miner found for one motif."""
+    job_dir = await _indexed_results(job_id)
+    try:
+        page = await io_executor.run(result_index.get_instances, job_dir, motif_id, limit, offset)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    if page is None:
+        raise HTTPException(status_code=404, detail=f"Motif {motif_id} not found in job {job_id}")
+    return {"job_id": job_id, **page}
+
 @router.get("/download-result")
-async def download_result(job_id: str, filename: str = None):
+async def download_result(request: Request, job_id: str, filename: str = None):
     try:
         if filename:
             # Download specific file
-            file_path = orchestration_service.get_result_file_path(job_id, filename)
-            return FileResponse(
-                path=file_path,
-                filename=os.path.basename(file_path),
-                media_type='application/octet-stream'
-            )
+            file_path, stat_result = await io_executor.run(orchestration_service.resolve_result_file, job_id, filename)
+            return file_response(request, file_path, stat_result, os.path.basename(file_path))
         else:
             # Download entire job as ZIP
-            zip_path = orchestration_service.create_job_archive(job_id)
-            return FileResponse(
-                path=zip_path,
-                filename=f"{job_id}.zip",
-                media_type='application/zip'
+            archive = await orchestration_service.open_job_archive(job_id)
+            cached = not_modified(request, archive.etag)
+            if cached:
+                return cached
+            if archive.path:
+                stat_result = await io_executor.run(os.stat, archive.path)
+                return file_response(
+                    request, archive.path, stat_result, archive.filename,
+                    media_type='application/zip', etag=archive.etag
+                )
+            return StreamingResponse(
+                _timed_stream(archive.stream, 'archive', job_id=job_id),
+                media_type='application/zip',
+                headers={
+                    'Content-Disposition': f'attachment; filename="{archive.filename}"',
+                    'ETag': archive.etag,
+                    'Cache-Control': 'no-cache'
+                }
             )
             
     except PermissionError as e:
@@ -124,27 +590,30 @@ async def download_result(job_id: str, filename: str = None):
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
+async def _timed_stream(stream, stage: str, **fields):
+    """Pass a download stream through, timing it and counting the bytes sent."""
+    with timed(stage, **fields) as timing:
+        timing['bytes'] = 0
+        async for chunk in stream:
+            timing['bytes'] += len(chunk)
+            BYTES_TOTAL.inc(len(chunk), direction='download')
+            yield chunk
+
 @router.get("/mining-status/{job_id}")
 async def get_mining_status(job_id: str):
     """Get the current progress of a mining job."""
     try:
+        # Clients streaming this job keep a watcher with the current status
+        status_data = orchestration_service.progress_hub.latest(job_id)
+        if status_data is not None:
+            return status_data
+        
         # Define path to progress file in shared volume
         # Note: We access it via the shared volume path
-        progress_path = f"/shared/output/{job_id}/progress.json"
-        
-        if not os.path.exists(progress_path):
-            # If no progress file yet, return pending status
-            return {
-                "status": "pending", 
-                "progress": 0, 
-                "message": "Waiting for miner to start..."
-            }
-            
-        import json
-        with open(progress_path, 'r') as f:
-            status_data = json.load(f)
+        progress_path = f"{orchestration_service.shared_output_dir}/{job_id}/progress.json"
+        progress, updated_at = await io_executor.run(read_progress, progress_path)
             
-        return status_data
+        return await orchestration_service.mining_status(job_id, progress, updated_at)
         
     except Exception as e:
         # Don't fail the request, just return error status
@@ -152,4 +621,40 @@ async def get_mining_status(job_id: str):
             "status": "error", 
             "progress": 0, 
             "message": f"Error checking status: {str(e)}"
-        }
\ No newline at end of file
+        }
+
+@router.get("/mining-status/{job_id}/stream")
+async def stream_mining_status(job_id: str):
+    """Server-Sent Events stream of a mining job's status.
+
+    Sends an event whenever the status changes and ends after a terminal
+    state (completed, error, ...). All clients of one job share a single
+    watcher on its progress.json.
+    """
+    _check_job_id(job_id)
+    async def events():
+        updates = orchestration_service.progress_hub.updates(job_id)
+        next_update = asyncio.ensure_future(updates.__anext__())
+        try:
+            while True:
+                done, _ = await asyncio.wait({next_update}, timeout=settings.progress_keepalive)
+                if not done:
+                    # Comment line keeps proxies from closing an idle stream
+                    yield ": keepalive\n\n"
+                    continue
+                try:
+                    status = next_update.result()
+                except StopAsyncIteration:
+                    return
+                yield f"data: {json.dumps(status)}\n\n"
+                next_update = asyncio.ensure_future(updates.__anext__())
+        finally:
+            next_update.cancel()
+            await asyncio.gather(next_update, return_exceptions=True)
+            await updates.aclose()
+    
+    return StreamingResponse(
+        events(),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+    )
@@ -0,0 +1 @@
+"""Load tests of the integration service against local builder and miner stubs."""
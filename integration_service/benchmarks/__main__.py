@@ -0,0 +1,188 @@
+"""Benchmark the integration service end to end against local builder and miner stubs.
+
+    python -m integration_service.benchmarks --sizes small,medium --concurrency 1,4,16
+    python -m integration_service.benchmarks --save-baseline benchmarks/baseline.json
+    python -m integration_service.benchmarks --baseline benchmarks/baseline.json
+
+Without ``--target`` the stubs and the service are started as local
+processes on free ports, with all state in a temporary directory. With
+``--target`` an already running deployment is driven instead (pass
+``--service-pid`` to sample its memory). The exit status is 1 when
+``--baseline`` is given and a regression beyond ``--tolerance`` is found.
+"""
+import argparse
+import asyncio
+import os
+import shutil
+import socket
+import subprocess
+import sys
+import tempfile
+import time
+from contextlib import ExitStack
+from typing import Dict, List
+import httpx
+from .harness import LoadTest, compare, load_report, save_report
+
+# The service package: "app" inside the container, "integration_service" in a checkout
+SERVICE_PACKAGE = __package__.rsplit('.', 1)[0]
+PACKAGE_ROOT = os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+
+def _free_port() -> int:
+    with socket.socket() as sock:
+        sock.bind(('127.0.0.1', 0))
+        return sock.getsockname()[1]
+
+
+def _wait_healthy(url: str, process: subprocess.Popen, timeout: float = 30.0):
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        if process.poll() is not None:
+            raise RuntimeError(f"Process serving {url} exited with {process.returncode}")
+        try:
+            if httpx.get(f"{url}/health", timeout=1.0).status_code == 200:
+                return
+        except httpx.HTTPError:
+            pass
+        time.sleep(0.2)
+    raise RuntimeError(f"{url} did not become healthy within {timeout}s")
+
+
+def _start(args: List[str], log_path: str, env: Dict[str, str] = None) -> subprocess.Popen:
+    log = open(log_path, 'ab')
+    try:
+        return subprocess.Popen(
+            [sys.executable, *args],
+            cwd=PACKAGE_ROOT,
+            env={**os.environ, 'PYTHONPATH': PACKAGE_ROOT, **(env or {})},
+            stdout=log,
+            stderr=subprocess.STDOUT
+        )
+    finally:
+        log.close()
+
+
+def _stop(process: subprocess.Popen):
+    if process.poll() is None:
+        process.terminate()
+        try:
+            process.wait(timeout=10)
+        except subprocess.TimeoutExpired:
+            process.kill()
+
+
+def start_local_stack(options, work_dir: str, stack: ExitStack) -> Dict[str, object]:
+    """Start builder and miner stubs plus the service; returns its URL and PID."""
+    shared_dir = os.path.join(work_dir, 'shared')
+    os.makedirs(shared_dir, exist_ok=True)
+    stub_module = f'{__package__}.stubs'
+    urls = {}
+    for role, latency, failure_rate in (
+        ('builder', options.builder_latency, options.builder_failure_rate),
+        ('miner', options.miner_latency, options.miner_failure_rate),
+    ):
+        port = _free_port()
+        process = _start([
+            '-m', stub_module, role,
+            '--port', str(port),
+            '--shared-dir', shared_dir,
+            '--latency', str(latency),
+            '--failure-rate', str(failure_rate),
+            '--result-bytes', str(options.result_bytes),
+            '--seed', str(options.seed)
+        ], os.path.join(work_dir, f'{role}.log'))
+        stack.callback(_stop, process)
+        urls[role] = f'http://127.0.0.1:{port}'
+        _wait_healthy(urls[role], process)
+
+    port = _free_port()
+    service = _start([
+        '-m', 'uvicorn', f'{SERVICE_PACKAGE}.main:app',
+        '--host', '127.0.0.1', '--port', str(port),
+        '--workers', str(options.workers), '--log-level', 'warning'
+    ], os.path.join(work_dir, 'service.log'), env={
+        'ATOMSPACE_API_URL': urls['builder'],
+        'NEURAL_MINER_URL': urls['miner'],
+        'SHARED_VOLUME_PATH': shared_dir,
+        'MINER_SHARED_VOLUME_PATH': shared_dir,
+        'STATE_DIR': os.path.join(work_dir, 'state'),
+        'CSV_CACHE_DIR': os.path.join(work_dir, 'cache'),
+        'LOCAL_OUTPUT_DIR': os.path.join(work_dir, 'output'),
+        'HTTP2_ENABLED': 'false'
+    })
+    stack.callback(_stop, service)
+    url = f'http://127.0.0.1:{port}'
+    _wait_healthy(url, service)
+    return {'url': url, 'pid': service.pid}
+
+
+def parse_args(argv: List[str] = None):
+    parser = argparse.ArgumentParser(
+        description=__doc__.splitlines()[0], formatter_class=argparse.RawDescriptionHelpFormatter
+    )
+    parser.add_argument('--sizes', default='small', help='comma-separated: small, medium, large or NODESxEDGES')
+    parser.add_argument('--concurrency', default='1,4', help='comma-separated concurrency levels')
+    parser.add_argument('--iterations', type=int, default=3, help='pipeline runs per virtual user')
+    parser.add_argument('--reuse-datasets', action='store_true', help='upload the same dataset every time')
+    parser.add_argument('--auto-tune', action='store_true', help='let the service derive mining parameters')
+    parser.add_argument('--target', help='benchmark a running service at this URL instead of a local stack')
+    parser.add_argument('--service-pid', type=int, help='PID of the --target service, for RSS sampling')
+    parser.add_argument('--workers', type=int, default=1, help='uvicorn workers of the local service')
+    parser.add_argument('--builder-latency', type=float, default=0.05)
+    parser.add_argument('--builder-failure-rate', type=float, default=0.0)
+    parser.add_argument('--miner-latency', type=float, default=0.5)
+    parser.add_argument('--miner-failure-rate', type=float, default=0.0)
+    parser.add_argument('--result-bytes', type=int, default=256 * 1024, help='size of each stub mining result')
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--output', help='write the JSON report here')
+    parser.add_argument('--baseline', help='compare against this report and fail on regressions')
+    parser.add_argument('--save-baseline', help='write the report here as the new baseline')
+    parser.add_argument('--tolerance', type=float, default=0.2, help='allowed relative slowdown (0.2 = 20%%)')
+    parser.add_argument('--keep', action='store_true', help='keep the work directory (logs, outputs)')
+    return parser.parse_args(argv)
+
+
+def main(argv: List[str] = None) -> int:
+    options = parse_args(argv)
+    sizes = [size.strip() for size in options.sizes.split(',') if size.strip()]
+    concurrency = [int(level) for level in options.concurrency.split(',')]
+    work_dir = tempfile.mkdtemp(prefix='integration-bench-')
+
+    with ExitStack() as stack:
+        if not options.keep:
+            stack.callback(shutil.rmtree, work_dir, True)
+        if options.target:
+            url, pid = options.target, options.service_pid
+        else:
+            service = start_local_stack(options, work_dir, stack)
+            url, pid = service['url'], service['pid']
+        print(f"Benchmarking {url} (work dir {work_dir})")
+
+        load_test = LoadTest(
+            url, work_dir,
+            service_pid=pid,
+            iterations=options.iterations,
+            distinct_datasets=not options.reuse_datasets,
+            mining_config={'auto_tune': 'true'} if options.auto_tune else None
+        )
+        report = asyncio.run(load_test.run(sizes, concurrency))
+
+    if options.output:
+        save_report(options.output, report)
+    if options.save_baseline:
+        save_report(options.save_baseline, report)
+        print(f"Saved baseline to {options.save_baseline}")
+    if options.baseline:
+        regressions = compare(report, load_report(options.baseline), options.tolerance)
+        if regressions:
+            print(f"{len(regressions)} regression(s) against {options.baseline}:")
+            for line in regressions:
+                print(f"  {line}")
+            return 1
+        print(f"No regressions against {options.baseline}")
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,388 @@
+"""End-to-end load test of the integration service.
+
+Each virtual user repeatedly runs the whole pipeline against the service:
+``generate-graph`` with a synthetic CSV dataset, ``mine-patterns`` while
+polling ``mining-status``, then ``download-result`` of the zip and of one
+result file. Scenarios cross dataset sizes with concurrency levels; every
+scenario reports latency percentiles per endpoint, throughput and the peak
+RSS of the service process. Reports can be saved as baselines and later runs
+compared against them.
+"""
+import asyncio
+import csv
+import json
+import math
+import os
+import random
+import time
+from typing import Any, Dict, List, Optional, Sequence, Tuple
+import httpx
+
+# name -> (nodes, edges)
+DATASET_SIZES = {
+    'small': (1_000, 3_000),
+    'medium': (20_000, 80_000),
+    'large': (200_000, 1_000_000),
+}
+
+ENDPOINTS = ('generate-graph', 'mine-patterns', 'mining-status', 'download-zip', 'download-file')
+
+# Only compare latencies that moved by at least this much; sub-millisecond noise is not a regression
+MIN_LATENCY_DELTA_MS = 5.0
+
+
+def parse_size(spec: str) -> Tuple[str, int, int]:
+    """``small``/``medium``/``large`` or ``<nodes>x<edges>``."""
+    if spec in DATASET_SIZES:
+        return (spec, *DATASET_SIZES[spec])
+    try:
+        nodes, edges = (int(part) for part in spec.lower().split('x'))
+    except ValueError:
+        raise ValueError(f"Unknown dataset size {spec!r}, use {', '.join(DATASET_SIZES)} or NODESxEDGES")
+    return spec, nodes, edges
+
+
+def write_dataset(directory: str, nodes: int, edges: int, seed: int) -> List[str]:
+    """Write ``nodes.csv`` and ``edges.csv`` with a random graph; returns their paths."""
+    rng = random.Random(seed)
+    os.makedirs(directory, exist_ok=True)
+    nodes_path = os.path.join(directory, 'nodes.csv')
+    edges_path = os.path.join(directory, 'edges.csv')
+    types = ('Gene', 'Protein', 'Pathway', 'Disease')
+    labels = ('interacts', 'regulates', 'part_of')
+    with open(nodes_path, 'w', newline='') as f:
+        writer = csv.writer(f)
+        writer.writerow(('id', 'name', 'type'))
+        for i in range(nodes):
+            writer.writerow((f'n{i}', f'node-{seed}-{i}', rng.choice(types)))
+    with open(edges_path, 'w', newline='') as f:
+        writer = csv.writer(f)
+        writer.writerow(('source', 'target', 'label'))
+        for _ in range(edges):
+            writer.writerow((f'n{rng.randrange(nodes)}', f'n{rng.randrange(nodes)}', rng.choice(labels)))
+    return [nodes_path, edges_path]
+
+
+def percentile(values: Sequence[float], q: float) -> Optional[float]:
+    """``q``-th percentile (0-100) with linear interpolation between ranks."""
+    if not values:
+        return None
+    ordered = sorted(values)
+    rank = (len(ordered) - 1) * q / 100
+    low, high = math.floor(rank), math.ceil(rank)
+    return ordered[low] + (ordered[high] - ordered[low]) * (rank - low)
+
+
+def summarize(latencies: Sequence[float], errors: int) -> Dict[str, Any]:
+    """Count, error rate and latency percentiles (milliseconds) of one endpoint."""
+    total = len(latencies) + errors
+    summary = {'count': len(latencies), 'errors': errors, 'error_rate': errors / total if total else 0.0}
+    for name, q in (('p50_ms', 50), ('p90_ms', 90), ('p99_ms', 99), ('max_ms', 100)):
+        value = percentile(latencies, q)
+        summary[name] = round(value * 1000, 3) if value is not None else None
+    return summary
+
+
+def process_rss(pid: int) -> Optional[int]:
+    """Resident bytes of ``pid`` and its descendants (uvicorn workers), from /proc."""
+    total = 0
+    pending = [pid]
+    seen = set()
+    while pending:
+        current = pending.pop()
+        if current in seen:
+            continue
+        seen.add(current)
+        try:
+            with open(f'/proc/{current}/status') as f:
+                for line in f:
+                    if line.startswith('VmRSS:'):
+                        total += int(line.split()[1]) * 1024
+            for tid in os.listdir(f'/proc/{current}/task'):
+                with open(f'/proc/{current}/task/{tid}/children') as f:
+                    pending.extend(int(child) for child in f.read().split())
+        except (FileNotFoundError, ProcessLookupError, PermissionError):
+            if current == pid:
+                return None
+    return total
+
+
+class RssSampler:
+    """Samples the service's RSS in the background and keeps the peak."""
+
+    def __init__(self, pid: Optional[int], interval: float = 0.05):
+        self.pid = pid
+        self.interval = interval
+        self.peak: Optional[int] = None
+        self._task: Optional[asyncio.Task] = None
+
+    def _sample(self):
+        rss = process_rss(self.pid)
+        if rss is not None:
+            self.peak = max(self.peak or 0, rss)
+
+    async def _run(self):
+        while True:
+            self._sample()
+            await asyncio.sleep(self.interval)
+
+    def __enter__(self):
+        if self.pid is not None:
+            self._task = asyncio.get_running_loop().create_task(self._run())
+        return self
+
+    def __exit__(self, *exc_info):
+        if self._task is not None:
+            self._task.cancel()
+            self._sample()
+
+
+class Recorder:
+    """Latencies and errors per endpoint for one scenario."""
+
+    def __init__(self):
+        self.latencies: Dict[str, List[float]] = {name: [] for name in ENDPOINTS}
+        self.errors: Dict[str, int] = {name: 0 for name in ENDPOINTS}
+        self.error_samples: List[str] = []
+        self.bytes_downloaded = 0
+
+    async def call(self, endpoint: str, request) -> Optional[httpx.Response]:
+        """Await ``request``, reading the whole body, and record the outcome."""
+        start = time.perf_counter()
+        try:
+            response = await request
+            await response.aread()
+        except httpx.HTTPError as e:
+            self.error(endpoint, f'{type(e).__name__}: {e}')
+            return None
+        elapsed = time.perf_counter() - start
+        if response.status_code >= 400:
+            self.error(endpoint, f'{response.status_code}: {response.text[:200]}')
+            return None
+        self.latencies[endpoint].append(elapsed)
+        return response
+
+    def error(self, endpoint: str, message: str):
+        self.errors[endpoint] += 1
+        if len(self.error_samples) < 10:
+            self.error_samples.append(f'{endpoint} {message}')
+
+
+class LoadTest:
+    """Drives a running integration service at ``base_url``.
+
+    ``service_pid`` enables RSS sampling. Datasets are written below
+    ``work_dir``; with ``distinct_datasets`` every flow uploads different
+    rows, otherwise repeated uploads exercise the CSV and graph caches.
+    """
+
+    def __init__(
+        self,
+        base_url: str,
+        work_dir: str,
+        service_pid: int = None,
+        iterations: int = 3,
+        distinct_datasets: bool = True,
+        mining_config: Dict[str, Any] = None,
+        poll_interval: float = 0.25,
+        timeout: float = 600.0
+    ):
+        self.base_url = base_url.rstrip('/')
+        self.work_dir = work_dir
+        self.service_pid = service_pid
+        self.iterations = iterations
+        self.distinct_datasets = distinct_datasets
+        self.mining_config = {
+            'min_pattern_size': 3,
+            'max_pattern_size': 4,
+            'n_neighborhoods': 50,
+            'n_trials': 10,
+            'use_cache': 'false',
+            **(mining_config or {})
+        }
+        self.poll_interval = poll_interval
+        self.timeout = timeout
+
+    async def run(self, sizes: Sequence[str], concurrency_levels: Sequence[int]) -> Dict[str, Any]:
+        scenarios = []
+        limits = httpx.Limits(max_connections=max(concurrency_levels) * 2 + 4)
+        async with httpx.AsyncClient(base_url=self.base_url, timeout=self.timeout, limits=limits) as client:
+            for spec in sizes:
+                name, nodes, edges = parse_size(spec)
+                for concurrency in concurrency_levels:
+                    print(f"Scenario {name} ({nodes} nodes, {edges} edges) at concurrency {concurrency}...")
+                    scenario = await self.run_scenario(client, name, nodes, edges, concurrency)
+                    scenarios.append(scenario)
+                    print(format_scenario(scenario))
+        return {
+            'created': time.time(),
+            'base_url': self.base_url,
+            'iterations': self.iterations,
+            'distinct_datasets': self.distinct_datasets,
+            'mining_config': self.mining_config,
+            'scenarios': scenarios
+        }
+
+    async def run_scenario(
+        self,
+        client: httpx.AsyncClient,
+        name: str,
+        nodes: int,
+        edges: int,
+        concurrency: int
+    ) -> Dict[str, Any]:
+        flows = concurrency * self.iterations
+        datasets = await asyncio.to_thread(self._prepare_datasets, name, nodes, edges, flows)
+        recorder = Recorder()
+        queue: asyncio.Queue = asyncio.Queue()
+        for dataset in datasets:
+            queue.put_nowait(dataset)
+        completed = 0
+
+        async def user():
+            nonlocal completed
+            while not queue.empty():
+                if await self._flow(client, recorder, queue.get_nowait()):
+                    completed += 1
+
+        with RssSampler(self.service_pid) as rss:
+            start = time.perf_counter()
+            await asyncio.gather(*[user() for _ in range(concurrency)])
+            elapsed = time.perf_counter() - start
+
+        requests = sum(len(values) for values in recorder.latencies.values())
+        return {
+            'name': f'{name}-c{concurrency}',
+            'dataset': name,
+            'nodes': nodes,
+            'edges': edges,
+            'concurrency': concurrency,
+            'flows': flows,
+            'completed_flows': completed,
+            'duration_s': round(elapsed, 3),
+            'flows_per_s': round(completed / elapsed, 3) if elapsed else 0.0,
+            'requests_per_s': round(requests / elapsed, 3) if elapsed else 0.0,
+            'download_mb_per_s': round(recorder.bytes_downloaded / elapsed / 1e6, 3) if elapsed else 0.0,
+            'peak_rss_bytes': rss.peak,
+            'endpoints': {
+                endpoint: summarize(recorder.latencies[endpoint], recorder.errors[endpoint])
+                for endpoint in ENDPOINTS
+            },
+            'error_samples': recorder.error_samples
+        }
+
+    def _prepare_datasets(self, name: str, nodes: int, edges: int, flows: int) -> List[List[str]]:
+        count = flows if self.distinct_datasets else 1
+        datasets = [
+            write_dataset(os.path.join(self.work_dir, 'datasets', f'{name}-{seed}'), nodes, edges, seed)
+            for seed in range(count)
+        ]
+        return [datasets[i % count] for i in range(flows)]
+
+    async def _flow(self, client: httpx.AsyncClient, recorder: Recorder, csv_paths: List[str]) -> bool:
+        """One pass through the pipeline; False if any step failed."""
+        handles = [open(path, 'rb') for path in csv_paths]
+        try:
+            response = await recorder.call('generate-graph', client.post(
+                '/api/generate-graph',
+                data={'config': '{}', 'schema_json': '{}', 'writer_type': 'networkx'},
+                files=[('files', (os.path.basename(path), handle, 'text/csv')) for path, handle in zip(csv_paths, handles)]
+            ))
+        finally:
+            for handle in handles:
+                handle.close()
+        if response is None:
+            return False
+        result = response.json()
+        if result.get('status') != 'success':
+            recorder.error('generate-graph', f"status {result.get('status')}: {result.get('error')}")
+            return False
+        job_id = result['job_id']
+
+        mining = asyncio.ensure_future(recorder.call('mine-patterns', client.post(
+            '/api/mine-patterns', data={'job_id': job_id, **self.mining_config}
+        )))
+        while not mining.done():
+            await recorder.call('mining-status', client.get(f'/api/mining-status/{job_id}'))
+            await asyncio.wait([mining], timeout=self.poll_interval)
+        if mining.result() is None:
+            return False
+
+        archive = await recorder.call('download-zip', client.get('/api/download-result', params={'job_id': job_id}))
+        single = await recorder.call('download-file', client.get(
+            '/api/download-result', params={'job_id': job_id, 'filename': 'results/patterns.json'}
+        ))
+        for download in (archive, single):
+            if download is not None:
+                recorder.bytes_downloaded += len(download.content)
+        return archive is not None and single is not None
+
+
+def format_scenario(scenario: Dict[str, Any]) -> str:
+    rss = scenario['peak_rss_bytes']
+    lines = [
+        f"  {scenario['name']}: {scenario['completed_flows']}/{scenario['flows']} flows in {scenario['duration_s']}s, "
+        f"{scenario['flows_per_s']} flows/s, {scenario['requests_per_s']} req/s, "
+        f"peak RSS {f'{rss / 2 ** 20:.1f} MiB' if rss else 'n/a'}"
+    ]
+    for endpoint, stats in scenario['endpoints'].items():
+        if stats['count'] or stats['errors']:
+            lines.append(
+                f"    {endpoint:<14} n={stats['count']:<5} err={stats['errors']:<3} "
+                f"p50={stats['p50_ms']}ms p99={stats['p99_ms']}ms max={stats['max_ms']}ms"
+            )
+    for sample in scenario['error_samples'][:3]:
+        lines.append(f"    ! {sample}")
+    return '\n'.join(lines)
+
+
+def compare(report: Dict[str, Any], baseline: Dict[str, Any], tolerance: float = 0.2) -> List[str]:
+    """Regressions of ``report`` against ``baseline``, as readable lines.
+
+    Latency percentiles and peak RSS may grow and throughput may drop by
+    ``tolerance`` (a fraction); error rates may grow by at most one point.
+    Scenarios missing from either side are skipped.
+    """
+    regressions = []
+    previous = {scenario['name']: scenario for scenario in baseline.get('scenarios', [])}
+    for scenario in report['scenarios']:
+        old = previous.get(scenario['name'])
+        if old is None:
+            continue
+        name = scenario['name']
+        if old['flows_per_s'] and scenario['flows_per_s'] < old['flows_per_s'] * (1 - tolerance):
+            regressions.append(f"{name}: throughput {scenario['flows_per_s']} flows/s (baseline {old['flows_per_s']})")
+        if old.get('peak_rss_bytes') and scenario.get('peak_rss_bytes') \
+                and scenario['peak_rss_bytes'] > old['peak_rss_bytes'] * (1 + tolerance):
+            regressions.append(
+                f"{name}: peak RSS {scenario['peak_rss_bytes'] / 2 ** 20:.1f} MiB "
+                f"(baseline {old['peak_rss_bytes'] / 2 ** 20:.1f} MiB)"
+            )
+        for endpoint, stats in scenario['endpoints'].items():
+            old_stats = old['endpoints'].get(endpoint)
+            if not old_stats:
+                continue
+            for key in ('p50_ms', 'p99_ms'):
+                current, before = stats[key], old_stats[key]
+                if current is None or before is None:
+                    continue
+                if current > before * (1 + tolerance) and current - before >= MIN_LATENCY_DELTA_MS:
+                    regressions.append(f"{name} {endpoint}: {key} {current} (baseline {before})")
+            if stats['error_rate'] > old_stats['error_rate'] + 0.01:
+                regressions.append(
+                    f"{name} {endpoint}: error rate {stats['error_rate']:.1%} (baseline {old_stats['error_rate']:.1%})"
+                )
+    return regressions
+
+
+def load_report(path: str) -> Dict[str, Any]:
+    with open(path, 'r') as f:
+        return json.load(f)
+
+
+def save_report(path: str, report: Dict[str, Any]):
+    directory = os.path.dirname(path)
+    if directory:
+        os.makedirs(directory, exist_ok=True)
+    with open(path, 'w') as f:
+        json.dump(report, f, indent=2)
@@ -0,0 +1,270 @@
+"""Local stand-ins for the AtomSpace builder and the neural miner.
+
+Both stubs write to a shared output directory the way the real services do,
+so the integration service runs its normal code paths against them:
+
+* builder: ``/api/upload`` stages CSVs, ``/api/load`` builds a NetworkX graph
+  from node/edge CSVs and writes ``networkx_graph.pkl`` plus metadata (or a
+  small Mork file for ``writer_type=mork``).
+* miner: ``/mine`` takes a graph by reference or upload, writes
+  ``progress.json`` while it "mines", then ``results/`` and ``plots/``;
+  ``/cancel`` stops a run in progress.
+
+Latency (with jitter), result payload size and failure rate are configurable.
+Run one with ``python -m <package>.benchmarks.stubs builder --port 8001``.
+"""
+import argparse
+import asyncio
+import csv
+import io
+import json
+import os
+import pickle
+import random
+import shutil
+import tempfile
+import uuid
+from typing import Dict, List, Optional
+import networkx as nx
+from fastapi import FastAPI, File, Form, UploadFile
+from fastapi.responses import JSONResponse
+
+
+class StubBehaviour:
+    """How a stub responds: base latency, relative jitter and failure rate."""
+
+    def __init__(self, latency: float = 0.0, jitter: float = 0.2, failure_rate: float = 0.0, seed: int = None):
+        self.latency = latency
+        self.jitter = jitter
+        self.failure_rate = failure_rate
+        self._random = random.Random(seed)
+
+    def delay(self, scale: float = 1.0) -> float:
+        spread = self.latency * self.jitter
+        return max(0.0, (self.latency + self._random.uniform(-spread, spread)) * scale)
+
+    def fails(self) -> bool:
+        return self._random.random() < self.failure_rate
+
+
+def _write_json(path: str, payload):
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    tmp_path = f"{path}.{uuid.uuid4().hex}.tmp"
+    with open(tmp_path, 'w') as f:
+        json.dump(payload, f)
+    os.replace(tmp_path, path)
+
+
+def build_graph(csv_paths: List[str], graph_type: str = 'directed'):
+    """Graph from node CSVs (``id`` column) and edge CSVs (``source``/``target`` columns)."""
+    graph = nx.DiGraph() if graph_type == 'directed' else nx.Graph()
+    for path in csv_paths:
+        with open(path, newline='') as f:
+            reader = csv.DictReader(f)
+            fields = reader.fieldnames or []
+            if 'source' in fields and 'target' in fields:
+                for row in reader:
+                    graph.add_edge(row.pop('source'), row.pop('target'), **row)
+            elif 'id' in fields:
+                for row in reader:
+                    graph.add_node(row.pop('id'), **row)
+    return graph
+
+
+def create_builder_app(shared_dir: str, behaviour: StubBehaviour = None) -> FastAPI:
+    """Stub AtomSpace builder writing graphs into ``shared_dir``."""
+    behaviour = behaviour or StubBehaviour()
+    app = FastAPI(title="AtomSpace builder stub")
+    # Staged uploads live next to the shared directory, so they go away with it
+    staging_dir = os.path.join(os.path.dirname(os.path.abspath(shared_dir)), 'builder-staging')
+    os.makedirs(staging_dir, exist_ok=True)
+    sessions: Dict[str, List[str]] = {}
+
+    async def _save(files: List[UploadFile]) -> List[str]:
+        target = tempfile.mkdtemp(dir=staging_dir)
+        paths = []
+        for upload in files:
+            path = os.path.join(target, os.path.basename(upload.filename))
+            with open(path, 'wb') as f:
+                await asyncio.to_thread(shutil.copyfileobj, upload.file, f)
+            paths.append(path)
+        return paths
+
+    @app.get("/health")
+    async def health():
+        return {"status": "healthy"}
+
+    @app.post("/api/upload")
+    async def upload(files: List[UploadFile] = File(...), tenant_id: str = Form("default")):
+        session_id = uuid.uuid4().hex
+        sessions[session_id] = await _save(files)
+        return {"session_id": session_id}
+
+    @app.post("/api/load")
+    async def load(
+        files: List[UploadFile] = File(None),
+        session_id: Optional[str] = Form(None),
+        writer_type: str = Form("networkx"),
+        graph_type: str = Form("directed"),
+        config: str = Form("{}"),
+        schema_json: str = Form("{}"),
+        tenant_id: str = Form("default")
+    ):
+        if session_id:
+            if session_id not in sessions:
+                return JSONResponse(status_code=404, content={"detail": "Upload session not found"})
+            csv_paths = sessions[session_id]
+        else:
+            csv_paths = await _save(files or [])
+        # Mork runs are the cheaper background writer
+        await asyncio.sleep(behaviour.delay(0.5 if writer_type == 'mork' else 1.0))
+        if behaviour.fails():
+            return JSONResponse(status_code=500, content={"detail": "Simulated builder failure"})
+
+        job_id = str(uuid.uuid4())
+        job_dir = os.path.join(shared_dir, job_id)
+        if writer_type == 'mork':
+            await asyncio.to_thread(_write_mork, job_dir, csv_paths)
+        else:
+            stats = await asyncio.to_thread(_write_networkx, job_dir, csv_paths, graph_type)
+            _write_json(os.path.join(job_dir, 'networkx_metadata.json'), {
+                'job_id': job_id, 'graph_type': graph_type, **stats
+            })
+        return {"job_id": job_id, "status": "success"}
+
+    return app
+
+
+def _write_networkx(job_dir: str, csv_paths: List[str], graph_type: str) -> Dict[str, int]:
+    graph = build_graph(csv_paths, graph_type)
+    os.makedirs(job_dir, exist_ok=True)
+    with open(os.path.join(job_dir, 'networkx_graph.pkl'), 'wb') as f:
+        pickle.dump(graph, f, protocol=pickle.HIGHEST_PROTOCOL)
+    return {'num_nodes': graph.number_of_nodes(), 'num_edges': graph.number_of_edges()}
+
+
+def _write_mork(job_dir: str, csv_paths: List[str]):
+    os.makedirs(job_dir, exist_ok=True)
+    with open(os.path.join(job_dir, 'data.metta'), 'w') as out:
+        for path in csv_paths:
+            with open(path, newline='') as f:
+                for row in csv.reader(f):
+                    out.write(f"({' '.join(row)})\n")
+
+
+def create_miner_app(
+    shared_dir: str,
+    behaviour: StubBehaviour = None,
+    result_bytes: int = 64 * 1024,
+    progress_steps: int = 5
+) -> FastAPI:
+    """Stub neural miner writing ``result_bytes`` of patterns per run into ``shared_dir``."""
+    behaviour = behaviour or StubBehaviour()
+    app = FastAPI(title="Neural miner stub")
+    # Stop signals of the runs in progress, by job id
+    running: Dict[str, asyncio.Event] = {}
+
+    @app.get("/health")
+    async def health():
+        return {"status": "healthy"}
+
+    @app.post("/mine")
+    async def mine(
+        job_id: str = Form(...),
+        graph_path: Optional[str] = Form(None),
+        graph_file: UploadFile = File(None),
+        n_neighborhoods: int = Form(2000),
+        seed: Optional[int] = Form(None)
+    ):
+        if graph_file is not None:
+            # Drain the upload like the real miner does before loading it
+            await asyncio.to_thread(shutil.copyfileobj, graph_file.file, io.BytesIO())
+        elif not graph_path or not os.path.exists(graph_path):
+            return JSONResponse(status_code=404, content={"detail": f"Graph not found: {graph_path}"})
+
+        job_dir = os.path.join(shared_dir, job_id)
+        progress_path = os.path.join(job_dir, 'progress.json')
+        total = behaviour.delay()
+        stop = running[job_id] = asyncio.Event()
+        try:
+            for step in range(progress_steps):
+                _write_json(progress_path, {
+                    'status': 'running',
+                    'progress': int(100 * step / progress_steps),
+                    'message': f'Mining step {step + 1}/{progress_steps}'
+                })
+                try:
+                    await asyncio.wait_for(stop.wait(), timeout=total / progress_steps)
+                except asyncio.TimeoutError:
+                    continue
+                _write_json(progress_path, {'status': 'cancelled', 'progress': 0, 'message': 'Mining cancelled'})
+                return JSONResponse(status_code=409, content={"detail": f"Run {job_id} was cancelled"})
+        finally:
+            if running.get(job_id) is stop:
+                del running[job_id]
+        if behaviour.fails():
+            _write_json(progress_path, {'status': 'error', 'progress': 0, 'message': 'Simulated miner failure'})
+            return JSONResponse(status_code=503, content={"detail": "Simulated miner failure"})
+
+        results_dir = os.path.join(job_dir, 'results')
+        plots_dir = os.path.join(job_dir, 'plots')
+        await asyncio.to_thread(_write_results, results_dir, plots_dir, result_bytes, n_neighborhoods, seed)
+        _write_json(progress_path, {'status': 'completed', 'progress': 100, 'message': 'Mining completed'})
+        return {"status": "success", "results_path": results_dir, "plots_path": plots_dir}
+
+    @app.post("/cancel")
+    async def cancel(job_id: str = Form(...)):
+        stop = running.get(job_id)
+        if stop is None:
+            return JSONResponse(status_code=404, content={"detail": f"No run in progress for {job_id}"})
+        stop.set()
+        return {"status": "cancelled", "job_id": job_id}
+
+    return app
+
+
+def _write_results(results_dir: str, plots_dir: str, result_bytes: int, n_neighborhoods: int, seed: Optional[int]):
+    """Write roughly ``result_bytes`` of pattern JSON and a plot."""
+    rng = random.Random(seed)
+    os.makedirs(results_dir, exist_ok=True)
+    os.makedirs(plots_dir, exist_ok=True)
+    patterns, size = [], 0
+    while size < result_bytes:
+        pattern = {
+            'canonical_hash': uuid.UUID(int=rng.getrandbits(128)).hex,
+            'count': rng.randint(1, max(1, n_neighborhoods)),
+            'nodes': [rng.randint(0, 10 ** 6) for _ in range(5)]
+        }
+        patterns.append(pattern)
+        size += len(json.dumps(pattern)) + 2
+    with open(os.path.join(results_dir, 'patterns.json'), 'w') as f:
+        json.dump(patterns, f)
+    with open(os.path.join(plots_dir, 'pattern_0.png'), 'wb') as f:
+        f.write(rng.randbytes(min(result_bytes, 256 * 1024)))
+
+
+def main(argv: List[str] = None):
+    import uvicorn
+
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('role', choices=['builder', 'miner'])
+    parser.add_argument('--port', type=int, required=True)
+    parser.add_argument('--host', default='127.0.0.1')
+    parser.add_argument('--shared-dir', required=True)
+    parser.add_argument('--latency', type=float, default=0.0, help='seconds per request')
+    parser.add_argument('--jitter', type=float, default=0.2, help='relative latency spread')
+    parser.add_argument('--failure-rate', type=float, default=0.0)
+    parser.add_argument('--result-bytes', type=int, default=64 * 1024, help='miner result size')
+    parser.add_argument('--seed', type=int, default=None)
+    args = parser.parse_args(argv)
+
+    behaviour = StubBehaviour(args.latency, args.jitter, args.failure_rate, args.seed)
+    if args.role == 'builder':
+        app = create_builder_app(args.shared_dir, behaviour)
+    else:
+        app = create_miner_app(args.shared_dir, behaviour, result_bytes=args.result_bytes)
+    uvicorn.run(app, host=args.host, port=args.port, log_level='warning')
+
+
+if __name__ == '__main__':
+    main()
@@ -10,16 +10,135 @@ class Settings:
     def __init__(self):  
         # Service URLs  
         self.atomspace_url = os.getenv('ATOMSPACE_API_URL', 'http://atomspace-api-dev:8000') 
-        self.miner_url = os.getenv('NEURAL_MINER_URL', 'http://neural-miner:5000')  
+        # NEURAL_MINER_URL may list several comma-separated miner replicas
+        self.miner_urls = [
+            url.strip() for url in os.getenv('NEURAL_MINER_URL', 'http://neural-miner:5000').split(',')
+            if url.strip()
+        ]
+        self.miner_url = self.miner_urls[0]  
+        self.miner_health_path = os.getenv('MINER_HEALTH_PATH', '/health')
+        self.miner_health_interval = float(os.getenv('MINER_HEALTH_INTERVAL', '15'))
+        self.miner_health_timeout = float(os.getenv('MINER_HEALTH_TIMEOUT', '5'))
           
         # Timeouts 
         self.atomspace_timeout = int(os.getenv('ATOMSPACE_TIMEOUT', '600'))  
         self.miner_timeout = int(os.getenv('MINER_TIMEOUT', '1800'))  
+        # How long to wait for a miner to acknowledge a cancelled run
+        self.miner_cancel_timeout = float(os.getenv('MINER_CANCEL_TIMEOUT', '5'))
+        # How often a synchronous mining request checks whether its client went away
+        self.disconnect_poll_interval = float(os.getenv('DISCONNECT_POLL_INTERVAL', '1'))
+
+        # HTTP connection pools (per upstream)
+        self.http2_enabled = os.getenv('HTTP2_ENABLED', 'true').lower() == 'true'
+        self.upstream_limits = {
+            'atomspace': {
+                'timeout': self.atomspace_timeout,
+                'max_connections': int(os.getenv('ATOMSPACE_MAX_CONNECTIONS', '20')),
+                'max_keepalive_connections': int(os.getenv('ATOMSPACE_MAX_KEEPALIVE', '10')),
+                'keepalive_expiry': float(os.getenv('ATOMSPACE_KEEPALIVE_EXPIRY', '30')),
+            },
+            'miner': {
+                'timeout': self.miner_timeout,
+                'max_connections': int(os.getenv('MINER_MAX_CONNECTIONS', '10')),
+                'max_keepalive_connections': int(os.getenv('MINER_MAX_KEEPALIVE', '5')),
+                'keepalive_expiry': float(os.getenv('MINER_KEEPALIVE_EXPIRY', '60')),
+            },
+        }
+
+        # Upload CSVs to the builder once and run every writer against that upload
+        self.atomspace_staged_uploads = os.getenv('ATOMSPACE_STAGED_UPLOADS', 'true').lower() == 'true'
           
         # CSV caching  
         self.csv_cache_dir = os.getenv('CSV_CACHE_DIR', './cache')  
+        # Deduplicate uploaded CSVs and reuse the graph built from an identical dataset
+        self.csv_cache_enabled = os.getenv('CSV_CACHE_ENABLED', 'true').lower() == 'true'
+        self.csv_cache_max_bytes = int(os.getenv('CSV_CACHE_MAX_BYTES', str(5 * 1024 ** 3)))
+
+        # Mining result cache (content-addressed, LRU bounded)
+        self.mining_cache_enabled = os.getenv('MINING_CACHE_ENABLED', 'true').lower() == 'true'
+        self.mining_cache_dir = os.getenv('MINING_CACHE_DIR', os.path.join(self.csv_cache_dir, 'mining'))
+        self.mining_cache_max_bytes = int(os.getenv('MINING_CACHE_MAX_BYTES', str(10 * 1024 ** 3)))
+
+        # Threads for blocking filesystem work (copies, JSON files, cleanup), kept off the event loop
+        self.io_executor_workers = int(os.getenv('IO_EXECUTOR_WORKERS', '8'))
+
+        # Uploads are copied to disk and streamed upstream in chunks of this size
+        self.upload_chunk_size = int(os.getenv('UPLOAD_CHUNK_SIZE', str(1024 * 1024)))
           
         # Shared volume  
         self.shared_volume_path = os.getenv('SHARED_VOLUME_PATH', '/shared/output')  
+
+        # Where mining results are published for download (mounted from the host in compose)
+        self.local_output_dir = os.getenv('LOCAL_OUTPUT_DIR', '/app/output')
+
+        # Service state (queues, registries) shared by all replicas
+        self.state_dir = os.getenv('STATE_DIR', os.path.join(self.shared_volume_path, '.integration'))
+
+        # Mining job queue
+        self.mining_queue_db = os.getenv('MINING_QUEUE_DB', os.path.join(self.state_dir, 'mining_queue.sqlite'))
+        self.mining_queue_max_size = int(os.getenv('MINING_QUEUE_MAX_SIZE', '50'))
+        self.miner_worker_concurrency = int(os.getenv('MINER_WORKER_CONCURRENCY', '1'))
+        self.mining_concurrency = self.miner_worker_concurrency * len(self.miner_urls)
+        self.mining_queue_poll_interval = float(os.getenv('MINING_QUEUE_POLL_INTERVAL', '5'))
+        self.mining_queue_retry_after = int(os.getenv('MINING_QUEUE_RETRY_AFTER', '30'))
+
+        # Registry of graph jobs and their background subtasks (Mork generation, merge, CSR),
+        # shared by all workers; a subtask whose lease runs out is resumed by another worker
+        self.job_registry_db = os.getenv('JOB_REGISTRY_DB', os.path.join(self.state_dir, 'jobs.sqlite'))
+        self.job_registry_workers = int(os.getenv('JOB_REGISTRY_WORKERS', '2'))
+        self.job_registry_poll_interval = float(os.getenv('JOB_REGISTRY_POLL_INTERVAL', '5'))
+        self.job_lease_seconds = float(os.getenv('JOB_LEASE_SECONDS', '60'))
+        self.job_max_attempts = int(os.getenv('JOB_MAX_ATTEMPTS', '3'))
+
+        # Retention of job artifacts (shared volume, local output, archives); sizes in bytes, times in seconds.
+        # A TTL or quota of 0 disables it; Mork directories and stale archives are collected either way
+        self.retention_enabled = os.getenv('RETENTION_ENABLED', 'true').lower() == 'true'
+        self.retention_db = os.getenv('RETENTION_DB', os.path.join(self.state_dir, 'retention.sqlite'))
+        self.retention_interval = float(os.getenv('RETENTION_INTERVAL', '600'))
+        self.retention_job_ttl = float(os.getenv('RETENTION_JOB_TTL', '0'))
+        self.retention_shared_max_bytes = int(os.getenv('RETENTION_SHARED_MAX_BYTES', '0'))
+        self.retention_local_max_bytes = int(os.getenv('RETENTION_LOCAL_MAX_BYTES', '0'))
+        self.retention_min_free_bytes = int(os.getenv('RETENTION_MIN_FREE_BYTES', '0'))
+        # Jobs used more recently than this are never evicted (covers builder and miner runs)
+        self.retention_min_age = float(os.getenv('RETENTION_MIN_AGE', '7200'))
+        self.retention_archive_ttl = float(os.getenv('RETENTION_ARCHIVE_TTL', '86400'))
+        # The builder's own Mork directories are kept this long after they were merged into the graph job
+        self.retention_mork_grace = float(os.getenv('RETENTION_MORK_GRACE', '86400'))
+
+        # Upper bound for n_shards in sharded mining
+        self.mining_max_shards = int(os.getenv('MINING_MAX_SHARDS', '16'))
+        # Upper bound for the number of configs in one parameter sweep
+        self.mining_sweep_max_configs = int(os.getenv('MINING_SWEEP_MAX_CONFIGS', '64'))
+
+        # How mining results reach /app/output: link (hardlink/reflink), copy or direct
+        self.result_publish_mode = os.getenv('RESULT_PUBLISH_MODE', 'link')
+
+        # Streaming mining progress: 'auto' uses inotify when available, 'poll' checks mtimes
+        self.progress_watch_mode = os.getenv('PROGRESS_WATCH_MODE', 'auto')
+        self.progress_poll_interval = float(os.getenv('PROGRESS_POLL_INTERVAL', '1'))
+        self.progress_keepalive = float(os.getenv('PROGRESS_KEEPALIVE', '15'))
+
+        # One JSON log line per pipeline stage (upload, builder load, mining, ...) with its duration
+        self.timing_logs = os.getenv('TIMING_LOGS', 'true').lower() == 'true'
+
+        # Gzip JSON result downloads for clients that accept it
+        self.download_gzip_json = os.getenv('DOWNLOAD_GZIP_JSON', 'true').lower() == 'true'
+
+        # Write a memory-mappable CSR copy (networkx_graph.csr/) of every generated graph
+        self.graph_csr_enabled = os.getenv('GRAPH_CSR_ENABLED', 'true').lower() == 'true'
+
+        # Write graph_profile.json (degrees, labels, components) for every generated graph
+        self.graph_profile_enabled = os.getenv('GRAPH_PROFILE_ENABLED', 'true').lower() == 'true'
+        # Index each job's mining results in results_index.sqlite for the /api/results queries
+        self.result_index_enabled = os.getenv('RESULT_INDEX_ENABLED', 'true').lower() == 'true'
+        # Auto-tuned mining: default time budget (seconds) and the cost model it is spent with.
+        # Calibrate the costs against integration_stage_duration_seconds{stage="mining"}.
+        self.mining_time_budget = float(os.getenv('MINING_TIME_BUDGET', '600'))
+        self.mining_cost_per_sample = float(os.getenv('MINING_COST_PER_SAMPLE', '0.01'))
+        self.mining_cost_per_trial = float(os.getenv('MINING_COST_PER_TRIAL', '0.1'))
+
+        # Send the miner a path on the shared volume instead of uploading the graph
+        self.miner_graph_by_reference = os.getenv('MINER_GRAPH_BY_REFERENCE', 'true').lower() == 'true'
+        self.miner_shared_volume_path = os.getenv('MINER_SHARED_VOLUME_PATH', self.shared_volume_path)
   
 settings = Settings()
\ No newline at end of file
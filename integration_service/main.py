@@ -1,13 +1,31 @@
 """FastAPI application for Integration Service."""  
+from contextlib import asynccontextmanager
 from fastapi import FastAPI  
+from fastapi.responses import PlainTextResponse
 from fastapi.middleware.cors import CORSMiddleware  
-from .api.pipeline import router  
+from .api.pipeline import router, orchestration_service
 from .config.settings import settings  
+from .services.http_clients import http_clients
+from .services.io_executor import io_executor
+from .services.metrics import metrics
   
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    """Open upstream connection pools and start workers on startup, stop them on shutdown."""
+    await http_clients.startup()
+    await orchestration_service.startup()
+    try:
+        yield
+    finally:
+        await orchestration_service.shutdown()
+        await http_clients.shutdown()
+        io_executor.shutdown(wait=False)
+
 app = FastAPI(  
     title="NeuroGraph Integration Service",  
     description="Orchestration service for Neural Subgraph Mining pipeline",  
-    version="1.0.0"  
+    version="1.0.0",
+    lifespan=lifespan
 )  
   
 # CORS middleware  
@@ -27,6 +45,13 @@ async def health_check():
     """Health check endpoint."""  
     return {"status": "healthy", "service": "integration-service"}  
   
+@app.get("/metrics", response_class=PlainTextResponse)
+async def get_metrics():
+    """Stage latencies, upstream calls, bytes, retries and cache hit rates in Prometheus format."""
+    # Collectors read the queue databases and cache indexes
+    body = await io_executor.run(metrics.render)
+    return PlainTextResponse(body, media_type="text/plain; version=0.0.4")
+
 if __name__ == "__main__":  
     import uvicorn  
     uvicorn.run(app, host="0.0.0.0", port=9000)
\ No newline at end of file
@@ -0,0 +1,223 @@
+"""Streaming ZIP archives of job results."""
+import asyncio
+import hashlib
+import io
+import os
+import threading
+import uuid
+import zipfile
+from typing import AsyncIterator, Dict, Optional
+from .io_executor import io_executor
+from ..config.settings import settings
+
+
+class _Aborted(Exception):
+    """Raised inside the zip writer thread when the download went away."""
+
+
+class _ChunkWriter(io.RawIOBase):
+    """Unseekable file object that hands zip output to the event loop in chunks.
+
+    Every byte is also written to ``tee`` so a finished archive can be kept
+    for later downloads. ``put`` blocks while the consumer's queue is full,
+    which keeps a slow client from buffering the whole archive in memory.
+    """
+
+    def __init__(self, loop, queue: asyncio.Queue, tee, cancelled: threading.Event, chunk_size: int):
+        self._loop = loop
+        self._queue = queue
+        self._tee = tee
+        self._cancelled = cancelled
+        self._chunk_size = chunk_size
+        self._buffer = bytearray()
+
+    def writable(self) -> bool:
+        return True
+
+    def write(self, data) -> int:
+        if self._cancelled.is_set():
+            raise _Aborted()
+        self._buffer += data
+        if len(self._buffer) >= self._chunk_size:
+            self.send_pending()
+        return len(data)
+
+    def send_pending(self):
+        if not self._buffer:
+            return
+        chunk, self._buffer = bytes(self._buffer), bytearray()
+        self._tee.write(chunk)
+        self.put(chunk)
+
+    def put(self, item):
+        asyncio.run_coroutine_threadsafe(self._queue.put(item), self._loop).result()
+
+
+class JobArchive:
+    """A job's downloadable archive: either a cached file or a live stream."""
+
+    def __init__(
+        self,
+        job_id: str,
+        version: str,
+        path: Optional[str] = None,
+        stream: Optional[AsyncIterator[bytes]] = None
+    ):
+        self.job_id = job_id
+        self.version = version
+        self.path = path
+        self.stream = stream
+
+    @property
+    def etag(self) -> str:
+        return f'"{self.version}"'
+
+    @property
+    def filename(self) -> str:
+        return f"{self.job_id}.zip"
+
+
+class ArchiveService:
+    """Builds ``{job_id}.zip`` straight from a job's output directories.
+
+    The archive is written by a worker thread and streamed to the client as
+    it is produced, with no staging copy of the results. The same bytes are
+    written next to the final archive path, and once complete the file is
+    kept with a version stamp (paths, sizes and mtimes of every source file)
+    so repeat downloads are served from disk until the results change. The
+    stamp is the archive's ZIP comment, so a reader never pairs an archive
+    with another archive's version.
+    """
+
+    ARCHIVE_DIRS = ('results', 'plots')
+    # Chunks buffered between the zip thread and the response
+    QUEUE_DEPTH = 8
+
+    def __init__(self, archive_dir: str, chunk_size: int = None):
+        self.archive_dir = archive_dir
+        self.chunk_size = chunk_size or settings.upload_chunk_size
+
+    def find_sources(self, local_job_dir: str, shared_job_dir: str) -> Dict[str, str]:
+        """Map each archive directory to where it exists, preferring the local copy."""
+        sources = {}
+        for name in self.ARCHIVE_DIRS:
+            for base in (local_job_dir, shared_job_dir):
+                path = os.path.join(base, name)
+                if os.path.isdir(path):
+                    sources[name] = path
+                    break
+        return sources
+
+    def version(self, sources: Dict[str, str]) -> str:
+        """Fingerprint of the files that would go into the archive."""
+        digest = hashlib.sha256()
+        for arcname, path in self._walk(sources):
+            stat = os.stat(path)
+            digest.update(f"{arcname}\0{stat.st_size}\0{stat.st_mtime_ns}\n".encode('utf-8'))
+        return digest.hexdigest()
+
+    def archive_path(self, job_id: str) -> str:
+        return os.path.join(self.archive_dir, f"{job_id}.zip")
+
+    def cached(self, job_id: str, version: str) -> Optional[str]:
+        """Return the stored archive for ``job_id`` if it matches ``version``."""
+        path = self.archive_path(job_id)
+        try:
+            stored = _archive_comment(path, len(version.encode('utf-8')))
+        except OSError:
+            return None
+        return path if stored == version.encode('utf-8') else None
+
+    async def open(self, local_job_dir: str, shared_job_dir: str, job_id: str) -> JobArchive:
+        """Return the cached archive or a stream that builds (and caches) a new one."""
+        sources, version, path = await io_executor.run(self._lookup, local_job_dir, shared_job_dir, job_id)
+        if path:
+            return JobArchive(job_id, version, path=path)
+        return JobArchive(job_id, version, stream=self.stream(job_id, sources, version))
+
+    def _lookup(self, local_job_dir: str, shared_job_dir: str, job_id: str):
+        sources = self.find_sources(local_job_dir, shared_job_dir)
+        if not sources:
+            raise FileNotFoundError(f"No results or plots found for job: {job_id}")
+        version = self.version(sources)
+        return sources, version, self.cached(job_id, version)
+
+    async def stream(self, job_id: str, sources: Dict[str, str], version: str) -> AsyncIterator[bytes]:
+        """Yield the archive as it is written; keep it on disk if it completes."""
+        loop = asyncio.get_running_loop()
+        queue: asyncio.Queue = asyncio.Queue(maxsize=self.QUEUE_DEPTH)
+        cancelled = threading.Event()
+        done = object()
+        future = asyncio.ensure_future(
+            io_executor.run(self._build, job_id, sources, version, loop, queue, cancelled, done)
+        )
+
+        try:
+            while True:
+                chunk = await queue.get()
+                if chunk is done:
+                    break
+                yield chunk
+            # Surfaces errors from the writer thread
+            await future
+        finally:
+            if not future.done():
+                # Client went away: stop the writer and unblock any pending put
+                cancelled.set()
+                while not future.done():
+                    while not queue.empty():
+                        queue.get_nowait()
+                    await asyncio.wait([future], timeout=0.05)
+                if not future.cancelled():
+                    future.exception()
+
+    def _build(self, job_id, sources, version, loop, queue, cancelled, done):
+        os.makedirs(self.archive_dir, exist_ok=True)
+        final_path = self.archive_path(job_id)
+        partial_path = f"{final_path}.{uuid.uuid4().hex}.partial"
+        writer = None
+        try:
+            with open(partial_path, 'wb') as tee:
+                writer = _ChunkWriter(loop, queue, tee, cancelled, self.chunk_size)
+                with zipfile.ZipFile(writer, 'w', zipfile.ZIP_DEFLATED, strict_timestamps=False) as archive:
+                    archive.comment = version.encode('utf-8')
+                    for arcname, path in self._walk(sources):
+                        archive.write(path, arcname)
+                writer.send_pending()
+            os.replace(partial_path, final_path)
+        except BaseException as e:
+            try:
+                os.unlink(partial_path)
+            except OSError:
+                pass
+            if not isinstance(e, _Aborted):
+                print(f"Failed to build archive for job {job_id}: {e}")
+            raise
+        finally:
+            if not cancelled.is_set():
+                writer = writer or _ChunkWriter(loop, queue, None, cancelled, self.chunk_size)
+                writer.put(done)
+
+    def _walk(self, sources: Dict[str, str]):
+        """Yield ``(arcname, path)`` for every file, in a stable order."""
+        for name in sorted(sources):
+            base = sources[name]
+            for root, dirs, files in os.walk(base):
+                dirs.sort()
+                for filename in sorted(files):
+                    path = os.path.join(root, filename)
+                    yield os.path.join(name, os.path.relpath(path, base)), path
+
+
+def _archive_comment(path: str, length: int) -> Optional[bytes]:
+    """The ``length``-byte comment of a ZIP file, read from its end-of-central-directory record."""
+    # The record is 22 bytes plus the comment, and always ends the file
+    with open(path, 'rb') as f:
+        f.seek(0, os.SEEK_END)
+        if f.tell() < 22 + length:
+            return None
+        f.seek(-(22 + length), os.SEEK_END)
+        record = f.read()
+    if record[:4] != b'PK\x05\x06' or int.from_bytes(record[20:22], 'little') != length:
+        return None
+    return record[22:]
@@ -0,0 +1,223 @@
+"""Content-addressed store of uploaded CSVs and the graphs built from them."""
+import errno
+import json
+import os
+import shutil
+import tempfile
+import threading
+import time
+import uuid
+from contextlib import contextmanager
+from typing import Any, Callable, Dict, Iterator, Optional
+from ..config.settings import settings
+
+try:
+    import fcntl
+except ImportError:  # pragma: no cover - not available on Windows
+    fcntl = None
+
+
+class CsvCache:
+    """Deduplicated CSV uploads plus a map from dataset to graph job.
+
+    Uploads are written into a workspace inside the cache directory and then
+    hardlinked into ``blobs/<sha256>``, so every distinct file is stored once
+    and nothing is copied. Blobs are evicted least recently used beyond
+    ``max_bytes``. A dataset (file digests plus config, schema and writer
+    options) maps to the job_id that was built from it, so re-submitting the
+    same dataset skips the builder entirely. Worker processes share the
+    store; changes to ``index.json`` happen under a lock on ``index.json.lock``.
+    """
+
+    def __init__(self, cache_dir: str = None, max_bytes: int = None, enabled: bool = None):
+        self.root = os.path.join(cache_dir or settings.csv_cache_dir, 'csv')
+        self.max_bytes = settings.csv_cache_max_bytes if max_bytes is None else max_bytes
+        self.enabled = settings.csv_cache_enabled if enabled is None else enabled
+        self.blob_dir = os.path.join(self.root, 'blobs')
+        self.work_dir = os.path.join(self.root, 'work')
+        self.index_path = os.path.join(self.root, 'index.json')
+        self.lock_path = f"{self.index_path}.lock"
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.deduplicated_bytes = 0
+        self._lock = threading.Lock()
+        self._index: Optional[Dict[str, Dict[str, Any]]] = None
+        self._index_stamp = None
+
+    def workspace(self) -> str:
+        """A fresh directory for one request's uploads (removed by the caller)."""
+        if not self.enabled:
+            return tempfile.mkdtemp()
+        os.makedirs(self.work_dir, exist_ok=True)
+        return tempfile.mkdtemp(dir=self.work_dir)
+
+    def adopt(self, path: str, digest: str, size: int) -> bool:
+        """Store the upload at ``path`` as blob ``digest``. Returns True if it was a duplicate."""
+        if not self.enabled:
+            return False
+        blob = os.path.join(self.blob_dir, digest[:2], digest)
+        with self._locked_index():
+            index = self._load_index()
+            now = time.time()
+            duplicate = digest in index['blobs'] and os.path.exists(blob)
+            if duplicate:
+                # Share the stored copy and drop the freshly written one
+                tmp_path = f"{path}.{uuid.uuid4().hex}"
+                try:
+                    os.link(blob, tmp_path)
+                    os.replace(tmp_path, path)
+                except OSError as e:
+                    if e.errno != errno.EXDEV:
+                        raise
+                self.deduplicated_bytes += size
+            else:
+                os.makedirs(os.path.dirname(blob), exist_ok=True)
+                try:
+                    os.link(path, blob)
+                except FileExistsError:
+                    pass
+                except OSError as e:
+                    if e.errno != errno.EXDEV:
+                        raise
+                    shutil.copy2(path, blob)
+            index['blobs'][digest] = {'size': size, 'last_access': now}
+            self._evict(keep=digest)
+            self._save_index()
+        return duplicate
+
+    def blob_path(self, digest: str) -> Optional[str]:
+        path = os.path.join(self.blob_dir, digest[:2], digest)
+        return path if os.path.exists(path) else None
+
+    def lookup_dataset(self, key: str, is_valid: Callable[[str], bool] = None) -> Optional[str]:
+        """Return the job_id built from dataset ``key``, if it still exists."""
+        if not self.enabled:
+            return None
+        with self._locked_index():
+            index = self._load_index()
+            entry = index['datasets'].get(key)
+            if entry is not None and is_valid is not None and not is_valid(entry['job_id']):
+                # The graph was deleted from the shared volume
+                del index['datasets'][key]
+                self._save_index()
+                entry = None
+            if entry is None:
+                self.misses += 1
+                return None
+            now = time.time()
+            entry['last_access'] = now
+            for digest in entry['files']:
+                if digest in index['blobs']:
+                    index['blobs'][digest]['last_access'] = now
+            self._save_index()
+            self.hits += 1
+            return entry['job_id']
+
+    def record_dataset(self, key: str, job_id: str, file_digests: Dict[str, str]):
+        """Remember that dataset ``key`` produced graph ``job_id``."""
+        if not self.enabled:
+            return
+        with self._locked_index():
+            index = self._load_index()
+            now = time.time()
+            index['datasets'][key] = {
+                'job_id': job_id,
+                'files': sorted(set(file_digests.values())),
+                'filenames': sorted(file_digests),
+                'created': now,
+                'last_access': now
+            }
+            self._save_index()
+
+    def forget_job(self, job_id: str) -> int:
+        """Drop the dataset entries that point at ``job_id``."""
+        with self._locked_index():
+            index = self._load_index()
+            stale = [key for key, entry in index['datasets'].items() if entry['job_id'] == job_id]
+            for key in stale:
+                del index['datasets'][key]
+            if stale:
+                self._save_index()
+        return len(stale)
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            index = self._load_index()
+            total_bytes = sum(entry['size'] for entry in index['blobs'].values())
+            blobs = len(index['blobs'])
+            datasets = len(index['datasets'])
+        lookups = self.hits + self.misses
+        return {
+            'enabled': self.enabled,
+            'blobs': blobs,
+            'datasets': datasets,
+            'total_bytes': total_bytes,
+            'max_bytes': self.max_bytes,
+            'deduplicated_bytes': self.deduplicated_bytes,
+            'hits': self.hits,
+            'misses': self.misses,
+            'hit_rate': self.hits / lookups if lookups else 0.0,
+            'evictions': self.evictions
+        }
+
+    def _evict(self, keep: str = None):
+        """Drop least recently used blobs until the store fits. Caller holds the lock."""
+        blobs = self._index['blobs']
+        total = sum(entry['size'] for entry in blobs.values())
+        for digest in sorted(blobs, key=lambda d: blobs[d]['last_access']):
+            if total <= self.max_bytes:
+                break
+            if digest == keep:
+                continue
+            total -= blobs.pop(digest)['size']
+            try:
+                os.unlink(os.path.join(self.blob_dir, digest[:2], digest))
+            except FileNotFoundError:
+                pass
+            self.evictions += 1
+            print(f"Evicted cached CSV {digest[:12]}")
+
+    @contextmanager
+    def _locked_index(self) -> Iterator[None]:
+        """Hold the index for a read-modify-write, against threads and other processes."""
+        with self._lock:
+            if fcntl is None:
+                yield
+                return
+            os.makedirs(self.root, exist_ok=True)
+            with open(self.lock_path, 'a') as lock_file:
+                fcntl.flock(lock_file, fcntl.LOCK_EX)
+                # Whatever we hold in memory may predate another process's save
+                self._index = None
+                yield
+
+    def _load_index(self) -> Dict[str, Dict[str, Any]]:
+        # Other workers replace the index file; reload when it is not the one we last saw
+        stamp = _file_stamp(self.index_path)
+        if self._index is None or stamp != self._index_stamp:
+            try:
+                with open(self.index_path, 'r') as f:
+                    self._index = json.load(f)
+            except (FileNotFoundError, json.JSONDecodeError):
+                self._index = {}
+            self._index.setdefault('blobs', {})
+            self._index.setdefault('datasets', {})
+            self._index_stamp = stamp
+        return self._index
+
+    def _save_index(self):
+        os.makedirs(self.root, exist_ok=True)
+        tmp_path = f"{self.index_path}.{uuid.uuid4().hex}"
+        with open(tmp_path, 'w') as f:
+            json.dump(self._index, f)
+        os.replace(tmp_path, self.index_path)
+        self._index_stamp = _file_stamp(self.index_path)
+
+
+def _file_stamp(path: str):
+    try:
+        stat_result = os.stat(path)
+    except FileNotFoundError:
+        return None
+    return stat_result.st_ino, stat_result.st_mtime_ns, stat_result.st_size
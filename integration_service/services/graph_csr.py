@@ -0,0 +1,269 @@
+"""Compact, memory-mappable CSR copies of pickled NetworkX graphs."""
+import json
+import os
+import pickle
+import shutil
+import uuid
+from typing import Any, Dict, List, Optional, Tuple
+import numpy as np
+
+FORMAT_VERSION = 1
+CSR_DIRNAME = 'networkx_graph.csr'
+# Attributes with more distinct values than this are not encoded
+MAX_CATEGORIES = 65536
+
+
+def csr_dir_for(graph_path: str) -> str:
+    """The CSR directory that sits next to a ``networkx_graph.pkl``."""
+    return os.path.join(os.path.dirname(graph_path), CSR_DIRNAME)
+
+
+def _source_stamp(graph_path: str) -> Dict[str, int]:
+    stat_result = os.stat(graph_path)
+    return {'size': stat_result.st_size, 'mtime_ns': stat_result.st_mtime_ns}
+
+
+def read_meta(csr_dir: str) -> Optional[Dict[str, Any]]:
+    try:
+        with open(os.path.join(csr_dir, 'meta.json'), 'r') as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return None
+
+
+def is_fresh(graph_path: str, csr_dir: str = None) -> bool:
+    """True if the CSR copy exists and was built from the current pickle."""
+    meta = read_meta(csr_dir or csr_dir_for(graph_path))
+    if not meta or meta.get('format_version') != FORMAT_VERSION:
+        return False
+    try:
+        return meta.get('source') == _source_stamp(graph_path)
+    except OSError:
+        return False
+
+
+def build_csr(graph_path: str, csr_dir: str = None) -> Dict[str, Any]:
+    """Unpickle ``graph_path`` once and write its CSR copy. Returns the metadata."""
+    csr_dir = csr_dir or csr_dir_for(graph_path)
+    # Stamp before loading: if the pickle is replaced meanwhile, the copy reads as stale
+    source = _source_stamp(graph_path)
+    with open(graph_path, 'rb') as f:
+        graph = pickle.load(f)
+    return write_csr(graph, csr_dir, source=source)
+
+
+def write_csr(graph, csr_dir: str, source: Dict[str, int] = None) -> Dict[str, Any]:
+    """Write ``graph`` as a directory of ``.npy`` arrays plus ``meta.json``.
+
+    Layout (every array can be opened with ``np.load(..., mmap_mode='r')``):
+        indptr.npy, indices.npy   out-neighbors in CSR form; undirected
+                                  edges are stored in both directions
+        node_ids.npy              integer node ids, or for any other ids
+        node_id_offsets.npy,      a UTF-8 string table (``str(node)``)
+        node_id_data.npy
+        node_attr_<n>.npy,        per-node / per-CSR-edge category codes of
+        edge_attr_<n>.npy         scalar attributes, -1 where missing; the
+                                  categories are listed in meta.json
+    The directory is built aside and renamed into place.
+    """
+    nodes = list(graph.nodes)
+    index = {node: i for i, node in enumerate(nodes)}
+    num_nodes = len(nodes)
+    directed = graph.is_directed()
+
+    sources: List[int] = []
+    targets: List[int] = []
+    edge_records: List[Dict[str, Any]] = []
+    num_edges = 0
+    for u, v, data in graph.edges(data=True):
+        num_edges += 1
+        iu, iv = index[u], index[v]
+        sources.append(iu)
+        targets.append(iv)
+        edge_records.append(data)
+        if not directed and iu != iv:
+            sources.append(iv)
+            targets.append(iu)
+            edge_records.append(data)
+
+    index_dtype = np.int32 if num_nodes < 2 ** 31 else np.int64
+    source_array = np.asarray(sources, dtype=np.int64)
+    order = np.argsort(source_array, kind='stable')
+    arrays = {
+        'indptr': np.concatenate(([0], np.cumsum(np.bincount(source_array, minlength=num_nodes)))).astype(np.int64),
+        'indices': np.asarray(targets, dtype=index_dtype)[order],
+    }
+
+    if all(isinstance(node, (int, np.integer)) and not isinstance(node, bool) for node in nodes):
+        node_id_type = 'int'
+        arrays['node_ids'] = np.asarray(nodes, dtype=np.int64)
+    else:
+        node_id_type = 'str'
+        encoded = [str(node).encode('utf-8') for node in nodes]
+        arrays['node_id_offsets'] = np.concatenate(([0], np.cumsum([len(e) for e in encoded]))).astype(np.int64)
+        arrays['node_id_data'] = np.frombuffer(b''.join(encoded), dtype=np.uint8)
+
+    node_attributes, skipped_node = _encode_attributes([graph.nodes[node] for node in nodes])
+    edge_attributes, skipped_edge = _encode_attributes([edge_records[i] for i in order])
+    meta_node_attributes = {}
+    for number, (name, (codes, categories)) in enumerate(sorted(node_attributes.items())):
+        arrays[f'node_attr_{number}'] = codes
+        meta_node_attributes[name] = {'file': f'node_attr_{number}.npy', 'categories': categories}
+    meta_edge_attributes = {}
+    for number, (name, (codes, categories)) in enumerate(sorted(edge_attributes.items())):
+        arrays[f'edge_attr_{number}'] = codes
+        meta_edge_attributes[name] = {'file': f'edge_attr_{number}.npy', 'categories': categories}
+
+    meta = {
+        'format_version': FORMAT_VERSION,
+        'directed': directed,
+        'multigraph': graph.is_multigraph(),
+        'num_nodes': num_nodes,
+        'num_edges': num_edges,
+        'num_csr_edges': len(targets),
+        'node_id_type': node_id_type,
+        'arrays': {name: {'dtype': str(array.dtype), 'shape': list(array.shape)} for name, array in arrays.items()},
+        'node_attributes': meta_node_attributes,
+        'edge_attributes': meta_edge_attributes,
+        'skipped_attributes': {'node': skipped_node, 'edge': skipped_edge},
+        'source': source
+    }
+
+    staging = f"{csr_dir}.building-{uuid.uuid4().hex}"
+    os.makedirs(staging)
+    try:
+        for name, array in arrays.items():
+            np.save(os.path.join(staging, f'{name}.npy'), array)
+        with open(os.path.join(staging, 'meta.json'), 'w') as f:
+            json.dump(meta, f, indent=2)
+        old = None
+        if os.path.exists(csr_dir):
+            old = f"{csr_dir}.old-{uuid.uuid4().hex}"
+            os.rename(csr_dir, old)
+        os.rename(staging, csr_dir)
+        if old:
+            shutil.rmtree(old, ignore_errors=True)
+    except BaseException:
+        shutil.rmtree(staging, ignore_errors=True)
+        raise
+    return meta
+
+
+def _encode_attributes(records: List[Dict[str, Any]]) -> Tuple[Dict[str, Tuple[np.ndarray, List[Any]]], List[str]]:
+    """Dictionary-encode scalar attributes. Returns ``({name: (codes, categories)}, skipped)``."""
+    names = sorted({name for record in records for name in record if isinstance(name, str)})
+    encoded = {}
+    skipped = []
+    for name in names:
+        lookup: Dict[Tuple[str, Any], int] = {}
+        categories: List[Any] = []
+        codes = np.full(len(records), -1, dtype=np.int64)
+        for position, record in enumerate(records):
+            if name not in record or record[name] is None:
+                continue
+            value = record[name]
+            if not isinstance(value, (str, int, float, bool)):
+                break
+            # bool and int compare equal, keep them apart
+            key = (type(value).__name__, value)
+            code = lookup.get(key)
+            if code is None:
+                if len(categories) >= MAX_CATEGORIES:
+                    break
+                code = lookup[key] = len(categories)
+                categories.append(value)
+            codes[position] = code
+        else:
+            encoded[name] = (codes.astype(_code_dtype(len(categories))), categories)
+            continue
+        skipped.append(name)
+    return encoded, skipped
+
+
+def _code_dtype(num_categories: int):
+    for dtype in (np.int8, np.int16, np.int32):
+        if num_categories <= np.iinfo(dtype).max:
+            return dtype
+    return np.int64
+
+
+class CSRGraph:
+    """Read-only view of a CSR graph directory, memory-mapped by default."""
+
+    def __init__(self, csr_dir: str, mmap: bool = True):
+        meta = read_meta(csr_dir)
+        if meta is None:
+            raise FileNotFoundError(f"No CSR graph in {csr_dir}")
+        if meta.get('format_version') != FORMAT_VERSION:
+            raise ValueError(f"Unsupported CSR format version {meta.get('format_version')}")
+        self.csr_dir = csr_dir
+        self.meta = meta
+        self._mmap_mode = 'r' if mmap else None
+        self.indptr = self._array('indptr')
+        self.indices = self._array('indices')
+
+    def _array(self, name: str) -> np.ndarray:
+        return np.load(os.path.join(self.csr_dir, f'{name}.npy'), mmap_mode=self._mmap_mode)
+
+    @property
+    def num_nodes(self) -> int:
+        return self.meta['num_nodes']
+
+    @property
+    def num_edges(self) -> int:
+        return self.meta['num_edges']
+
+    @property
+    def directed(self) -> bool:
+        return self.meta['directed']
+
+    def node_id(self, index: int):
+        if self.meta['node_id_type'] == 'int':
+            return int(self._array('node_ids')[index])
+        offsets = self._array('node_id_offsets')
+        data = self._array('node_id_data')
+        return bytes(data[offsets[index]:offsets[index + 1]]).decode('utf-8')
+
+    def neighbors(self, index: int) -> np.ndarray:
+        """Indices of the (out-)neighbors of node ``index``."""
+        return self.indices[self.indptr[index]:self.indptr[index + 1]]
+
+    def node_attribute(self, name: str) -> Tuple[np.ndarray, List[Any]]:
+        """``(codes, categories)`` of a node attribute; code -1 means missing."""
+        entry = self.meta['node_attributes'][name]
+        return np.load(os.path.join(self.csr_dir, entry['file']), mmap_mode=self._mmap_mode), entry['categories']
+
+    def edge_attribute(self, name: str) -> Tuple[np.ndarray, List[Any]]:
+        """``(codes, categories)`` of an edge attribute, aligned with ``indices``."""
+        entry = self.meta['edge_attributes'][name]
+        return np.load(os.path.join(self.csr_dir, entry['file']), mmap_mode=self._mmap_mode), entry['categories']
+
+    def to_networkx(self):
+        """Rebuild a NetworkX graph with the encoded attributes."""
+        import networkx as nx
+
+        if self.meta['multigraph']:
+            graph = nx.MultiDiGraph() if self.directed else nx.MultiGraph()
+        else:
+            graph = nx.DiGraph() if self.directed else nx.Graph()
+
+        node_ids = [self.node_id(i) for i in range(self.num_nodes)]
+        node_attributes = {name: self.node_attribute(name) for name in self.meta['node_attributes']}
+        for i, node in enumerate(node_ids):
+            graph.add_node(node, **{
+                name: categories[codes[i]]
+                for name, (codes, categories) in node_attributes.items() if codes[i] >= 0
+            })
+
+        edge_attributes = {name: self.edge_attribute(name) for name in self.meta['edge_attributes']}
+        for source in range(self.num_nodes):
+            for position in range(self.indptr[source], self.indptr[source + 1]):
+                target = int(self.indices[position])
+                # Undirected edges are stored twice; add each once
+                if not self.directed and target < source:
+                    continue
+                graph.add_edge(node_ids[source], node_ids[target], **{
+                    name: categories[codes[position]]
+                    for name, (codes, categories) in edge_attributes.items() if codes[position] >= 0
+                })
+        return graph
@@ -0,0 +1,247 @@
+"""Graph statistics computed once per graph job, and mining parameters derived from them."""
+import json
+import math
+import os
+import pickle
+import uuid
+from collections import Counter
+from typing import Any, Dict, Optional, Tuple
+import networkx as nx
+import numpy as np
+
+FORMAT_VERSION = 1
+PROFILE_FILENAME = 'graph_profile.json'
+# Distinct values tracked per attribute; beyond this the count is a lower bound
+MAX_TRACKED_VALUES = 100_000
+# Attributes with at most this many values count as labels (types), not identifiers
+MAX_LABEL_CARDINALITY = 1000
+TOP_VALUES = 10
+
+# Auto-tuning bounds
+MIN_NEIGHBORHOODS = 50
+MAX_NEIGHBORHOODS = 10_000
+MIN_TRIALS = 20
+MAX_TRIALS = 1000
+# Expected number of sampled neighborhoods containing any given node
+COVERAGE = 2.0
+TRIALS_PER_PATTERN_SIZE = 25
+
+
+def profile_path_for(graph_path: str) -> str:
+    """``graph_profile.json`` next to a ``networkx_graph.pkl`` (and its metadata)."""
+    return os.path.join(os.path.dirname(graph_path), PROFILE_FILENAME)
+
+
+def _source_stamp(graph_path: str) -> Dict[str, int]:
+    stat_result = os.stat(graph_path)
+    return {'size': stat_result.st_size, 'mtime_ns': stat_result.st_mtime_ns}
+
+
+def read_profile(graph_path: str) -> Optional[Dict[str, Any]]:
+    try:
+        with open(profile_path_for(graph_path), 'r') as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return None
+
+
+def is_fresh(graph_path: str) -> bool:
+    """True if the stored profile was computed from the current pickle."""
+    profile = read_profile(graph_path)
+    if not profile or profile.get('format_version') != FORMAT_VERSION:
+        return False
+    try:
+        return profile.get('source') == _source_stamp(graph_path)
+    except OSError:
+        return False
+
+
+def build_profile(graph_path: str) -> Dict[str, Any]:
+    """Unpickle ``graph_path``, profile it and write ``graph_profile.json``."""
+    # Stamp before loading: if the pickle is replaced meanwhile, the profile reads as stale
+    source = _source_stamp(graph_path)
+    with open(graph_path, 'rb') as f:
+        graph = pickle.load(f)
+    profile = {'format_version': FORMAT_VERSION, **profile_graph(graph), 'source': source}
+    path = profile_path_for(graph_path)
+    tmp_path = f"{path}.{uuid.uuid4().hex}.tmp"
+    with open(tmp_path, 'w') as f:
+        json.dump(profile, f, indent=2)
+    os.replace(tmp_path, path)
+    return profile
+
+
+def profile_graph(graph) -> Dict[str, Any]:
+    """Size, degree distribution, attribute cardinalities and components of ``graph``."""
+    num_nodes = graph.number_of_nodes()
+    num_edges = graph.number_of_edges()
+    directed = graph.is_directed()
+    possible = num_nodes * (num_nodes - 1) if directed else num_nodes * (num_nodes - 1) / 2
+
+    profile = {
+        'num_nodes': num_nodes,
+        'num_edges': num_edges,
+        'directed': directed,
+        'multigraph': graph.is_multigraph(),
+        'density': num_edges / possible if possible else 0.0,
+        'self_loops': nx.number_of_selfloops(graph),
+        'degree': _distribution(np.fromiter((d for _, d in graph.degree()), dtype=np.int64, count=num_nodes)),
+        'node_attributes': _cardinalities(data for _, data in graph.nodes(data=True)),
+        'edge_attributes': _cardinalities(data for _, _, data in graph.edges(data=True)),
+    }
+    if directed:
+        profile['in_degree'] = _distribution(np.fromiter((d for _, d in graph.in_degree()), dtype=np.int64, count=num_nodes))
+        profile['out_degree'] = _distribution(np.fromiter((d for _, d in graph.out_degree()), dtype=np.int64, count=num_nodes))
+
+    components = nx.weakly_connected_components(graph) if directed else nx.connected_components(graph)
+    sizes = np.asarray(sorted((len(c) for c in components), reverse=True), dtype=np.int64)
+    profile['components'] = {
+        'count': int(len(sizes)),
+        'largest': int(sizes[0]) if len(sizes) else 0,
+        'isolated_nodes': int((sizes == 1).sum()),
+        'largest_sizes': sizes[:TOP_VALUES].tolist(),
+        'size_histogram': _log2_histogram(sizes)
+    }
+    return profile
+
+
+def _distribution(values: np.ndarray) -> Dict[str, Any]:
+    if not len(values):
+        return {'min': 0, 'max': 0, 'mean': 0.0, 'median': 0.0, 'p90': 0.0, 'p99': 0.0, 'histogram': {}}
+    p50, p90, p99 = np.percentile(values, [50, 90, 99])
+    return {
+        'min': int(values.min()),
+        'max': int(values.max()),
+        'mean': float(values.mean()),
+        'median': float(p50),
+        'p90': float(p90),
+        'p99': float(p99),
+        'histogram': _log2_histogram(values)
+    }
+
+
+def _log2_histogram(values: np.ndarray) -> Dict[str, int]:
+    """Counts in buckets ``0``, ``1``, ``2-3``, ``4-7``, ... keyed by the bucket's lower bound."""
+    if not len(values):
+        return {}
+    buckets = np.where(values > 0, np.floor(np.log2(np.maximum(values, 1))).astype(np.int64) + 1, 0)
+    counts = np.bincount(buckets)
+    return {str(0 if b == 0 else 2 ** (b - 1)): int(c) for b, c in enumerate(counts) if c}
+
+
+def _cardinalities(records) -> Dict[str, Dict[str, Any]]:
+    """Per attribute: how many records have it, distinct values and the most common ones."""
+    counters: Dict[str, Counter] = {}
+    present: Dict[str, int] = {}
+    capped = set()
+    for data in records:
+        for name, value in data.items():
+            present[name] = present.get(name, 0) + 1
+            counter = counters.setdefault(name, Counter())
+            key = value if isinstance(value, (str, int, float, bool)) or value is None else str(value)
+            if key in counter or len(counter) < MAX_TRACKED_VALUES:
+                counter[key] += 1
+            else:
+                capped.add(name)
+    return {
+        name: {
+            'present': present[name],
+            'distinct': len(counter),
+            'distinct_capped': name in capped,
+            'top': [[value, count] for value, count in counter.most_common(TOP_VALUES)]
+        }
+        for name, counter in sorted(counters.items())
+    }
+
+
+def label_cardinality(profile: Dict[str, Any]) -> int:
+    """Number of node labels: the most varied categorical node attribute (1 if none).
+
+    Attributes where most values are unique (names, ids) are not labels.
+    """
+    labels = [
+        attribute['distinct'] for attribute in profile.get('node_attributes', {}).values()
+        if 1 < attribute['distinct'] <= min(MAX_LABEL_CARDINALITY, attribute['present'] / 2)
+    ]
+    return max(labels, default=1)
+
+
+def estimate_seconds(
+    n_neighborhoods: int,
+    n_trials: int,
+    neighborhood_size: float,
+    max_pattern_size: int,
+    cost_per_sample: float,
+    cost_per_trial: float
+) -> float:
+    """Rough mining time: sampling scales with neighborhood nodes, search with trials x pattern size."""
+    return n_neighborhoods * neighborhood_size * cost_per_sample + n_trials * max_pattern_size * cost_per_trial
+
+
+def tune_mining_config(
+    profile: Dict[str, Any],
+    mining_config: Dict[str, Any],
+    time_budget: float,
+    cost_per_sample: float,
+    cost_per_trial: float
+) -> Tuple[Dict[str, Any], Dict[str, Any]]:
+    """Derive sampling effort and sizes of ``mining_config`` from a graph profile.
+
+    Neighborhood and pattern sizes are capped by the largest component.
+    ``n_neighborhoods`` is chosen so every node in a non-trivial component
+    is expected in ``COVERAGE`` samples (more for heavy-tailed degrees),
+    ``n_trials`` grows with the range of pattern sizes and the number of
+    node labels. If the estimate exceeds ``time_budget`` seconds, trials are
+    scaled down and sampling gets the rest of the budget, never going below
+    the minimums. Returns the tuned config and how it was derived.
+    """
+    largest = profile['components']['largest']
+    if largest < 2:
+        raise ValueError("The graph has no connected nodes to mine")
+
+    max_neighborhood = max(2, min(int(mining_config['max_neighborhood_size']), largest))
+    min_neighborhood = max(2, min(int(mining_config['min_neighborhood_size']), max_neighborhood))
+    max_pattern = max(2, min(int(mining_config['max_pattern_size']), max_neighborhood))
+    min_pattern = max(2, min(int(mining_config['min_pattern_size']), max_pattern))
+    neighborhood_size = (min_neighborhood + max_neighborhood) / 2
+
+    connected_nodes = profile['num_nodes'] - profile['components']['isolated_nodes']
+    degree = profile['degree']
+    # Hubs soak up samples in heavy-tailed graphs; sample more to still reach the periphery
+    skew = 1 + math.log10(max(1.0, degree['p99'] / max(degree['median'], 1.0)))
+    n_neighborhoods = math.ceil(COVERAGE * skew * connected_nodes / neighborhood_size)
+    n_neighborhoods = min(MAX_NEIGHBORHOODS, max(MIN_NEIGHBORHOODS, n_neighborhoods))
+
+    labels = label_cardinality(profile)
+    n_trials = TRIALS_PER_PATTERN_SIZE * (max_pattern - min_pattern + 1) * (1 + math.log2(labels) / 4)
+    n_trials = min(MAX_TRIALS, max(MIN_TRIALS, math.ceil(n_trials)))
+
+    wanted = estimate_seconds(n_neighborhoods, n_trials, neighborhood_size, max_pattern, cost_per_sample, cost_per_trial)
+    if wanted > time_budget:
+        n_trials = max(MIN_TRIALS, int(n_trials * time_budget / wanted))
+        # Sampling gets whatever the (possibly floored) trials leave of the budget
+        spare = time_budget - estimate_seconds(0, n_trials, neighborhood_size, max_pattern, cost_per_sample, cost_per_trial)
+        affordable = int(spare / (neighborhood_size * cost_per_sample)) if cost_per_sample > 0 else n_neighborhoods
+        n_neighborhoods = max(MIN_NEIGHBORHOODS, min(n_neighborhoods, affordable))
+    estimated = estimate_seconds(n_neighborhoods, n_trials, neighborhood_size, max_pattern, cost_per_sample, cost_per_trial)
+
+    tuned = {
+        **mining_config,
+        'min_pattern_size': min_pattern,
+        'max_pattern_size': max_pattern,
+        'min_neighborhood_size': min_neighborhood,
+        'max_neighborhood_size': max_neighborhood,
+        'n_neighborhoods': n_neighborhoods,
+        'n_trials': n_trials
+    }
+    tuning = {
+        'time_budget': time_budget,
+        'estimated_seconds': round(estimated, 3),
+        'unconstrained_seconds': round(wanted, 3),
+        'budget_limited': wanted > time_budget,
+        'connected_nodes': connected_nodes,
+        'largest_component': largest,
+        'degree_skew': round(skew, 3),
+        'node_labels': labels
+    }
+    return tuned, tuning
@@ -0,0 +1,98 @@
+"""Application-scoped HTTP client pools for upstream services."""
+import importlib.util
+import time
+from typing import Dict, Optional
+import httpx
+from .metrics import BYTES_TOTAL, UPSTREAM_SECONDS
+from ..config.settings import settings
+
+
+async def _start_timer(request: httpx.Request):
+    request.extensions['started'] = time.perf_counter()
+    length = request.headers.get('content-length')
+    if length:
+        BYTES_TOTAL.inc(int(length), direction='upstream_sent')
+
+
+def _response_timer(upstream: str):
+    async def observe(response: httpx.Response):
+        request = response.request
+        started = request.extensions.get('started')
+        if started is not None:
+            UPSTREAM_SECONDS.observe(
+                time.perf_counter() - started,
+                upstream=upstream, endpoint=request.url.path, status=response.status_code
+            )
+        length = response.headers.get('content-length')
+        if length:
+            BYTES_TOTAL.inc(int(length), direction='upstream_received')
+    return observe
+
+
+def _http2_available() -> bool:
+    """HTTP/2 needs the optional ``h2`` package (``httpx[http2]``)."""
+    return importlib.util.find_spec('h2') is not None
+
+
+class HttpClientPool:
+    """One long-lived ``httpx.AsyncClient`` per upstream service.
+
+    Clients are created on application startup and closed on shutdown, so
+    connections are kept alive between requests and the number of sockets
+    opened to each upstream is capped by its connection limits.
+    """
+
+    UPSTREAMS = ('atomspace', 'miner')
+
+    def __init__(self):
+        self._clients: Dict[str, httpx.AsyncClient] = {}
+        self._transport: Optional[httpx.AsyncBaseTransport] = None
+        self.http2 = settings.http2_enabled and _http2_available()
+
+    def _build(self, name: str) -> httpx.AsyncClient:
+        upstream = settings.upstream_limits[name]
+        limits = httpx.Limits(
+            max_connections=upstream['max_connections'],
+            max_keepalive_connections=upstream['max_keepalive_connections'],
+            keepalive_expiry=upstream['keepalive_expiry']
+        )
+        return httpx.AsyncClient(
+            timeout=upstream['timeout'],
+            limits=limits,
+            http2=self.http2,
+            transport=self._transport,
+            event_hooks={'request': [_start_timer], 'response': [_response_timer(name)]}
+        )
+
+    def get(self, name: str) -> httpx.AsyncClient:
+        """Return the client for an upstream, creating it on first use."""
+        client = self._clients.get(name)
+        if client is None or client.is_closed:
+            client = self._build(name)
+            self._clients[name] = client
+        return client
+
+    @property
+    def atomspace(self) -> httpx.AsyncClient:
+        return self.get('atomspace')
+
+    @property
+    def miner(self) -> httpx.AsyncClient:
+        return self.get('miner')
+
+    async def startup(self, transport: Optional[httpx.AsyncBaseTransport] = None):
+        """Create all clients. ``transport`` replaces the network, e.g. in tests."""
+        await self.shutdown()
+        self._transport = transport
+        for name in self.UPSTREAMS:
+            self.get(name)
+        print(f"DEBUG: HTTP client pools started (http2={self.http2})")
+
+    async def shutdown(self):
+        """Close all clients and their pooled connections."""
+        clients, self._clients = self._clients, {}
+        for client in clients.values():
+            await client.aclose()
+
+
+http_clients = HttpClientPool()
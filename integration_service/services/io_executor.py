@@ -0,0 +1,112 @@
+"""Bounded thread pool for blocking filesystem work."""
+import asyncio
+import functools
+import json
+import os
+import shutil
+import threading
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Callable, Dict, List, Optional
+from ..config.settings import settings
+
+
+class IOExecutor:
+    """Runs blocking file operations on a dedicated, bounded thread pool.
+
+    ``asyncio.to_thread`` shares the loop's default executor with everything
+    else in the process; a burst of large copies could occupy all of it. This
+    pool has its own cap (``IO_EXECUTOR_WORKERS``), so file work queues up
+    behind itself and the event loop keeps serving health checks and status
+    polls. The pool is created on first use and after ``shutdown``.
+    """
+
+    def __init__(self, max_workers: int = None):
+        self.max_workers = max_workers or settings.io_executor_workers
+        self._executor: Optional[ThreadPoolExecutor] = None
+        self._lock = threading.Lock()
+        self.submitted = 0
+        self.in_flight = 0
+
+    def _pool(self) -> ThreadPoolExecutor:
+        with self._lock:
+            if self._executor is None:
+                self._executor = ThreadPoolExecutor(max_workers=self.max_workers, thread_name_prefix='io')
+            return self._executor
+
+    async def run(self, func: Callable[..., Any], *args, **kwargs) -> Any:
+        """Run ``func(*args, **kwargs)`` on the pool and await its result."""
+        loop = asyncio.get_running_loop()
+        self.submitted += 1
+        self.in_flight += 1
+        try:
+            return await loop.run_in_executor(self._pool(), functools.partial(func, *args, **kwargs))
+        finally:
+            self.in_flight -= 1
+
+    async def exists(self, path: str) -> bool:
+        return await self.run(os.path.exists, path)
+
+    async def listdir(self, path: str) -> List[str]:
+        return await self.run(os.listdir, path)
+
+    async def read_json(self, path: str) -> Any:
+        return await self.run(_read_json, path)
+
+    async def write_json(self, path: str, payload: Dict[str, Any]):
+        """Write JSON via a temp file so readers never see a partial file."""
+        await self.run(write_json_atomic, path, payload)
+
+    async def write_text(self, path: str, text: str):
+        await self.run(_write_text, path, text)
+
+    async def copy_file(self, src: str, dst: str) -> str:
+        return await self.run(shutil.copy2, src, dst)
+
+    async def copy_tree(self, src: str, dst: str) -> str:
+        return await self.run(shutil.copytree, src, dst, dirs_exist_ok=True)
+
+    async def remove_tree(self, path: str):
+        """Remove a directory tree, ignoring a missing path."""
+        await self.run(shutil.rmtree, path, True)
+
+    async def remove_file(self, path: str):
+        await self.run(_remove_file, path)
+
+    def shutdown(self, wait: bool = True):
+        with self._lock:
+            executor, self._executor = self._executor, None
+        if executor is not None:
+            executor.shutdown(wait=wait)
+
+    def stats(self) -> Dict[str, int]:
+        return {'max_workers': self.max_workers, 'in_flight': self.in_flight, 'submitted': self.submitted}
+
+
+def write_json_atomic(path: str, payload: Dict[str, Any]):
+    """Write JSON via a temp file so readers never see a partial file."""
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    tmp_path = f"{path}.{uuid.uuid4().hex}.tmp"
+    with open(tmp_path, 'w') as f:
+        json.dump(payload, f)
+    os.replace(tmp_path, path)
+
+
+def _read_json(path: str) -> Any:
+    with open(path, 'r') as f:
+        return json.load(f)
+
+
+def _write_text(path: str, text: str):
+    with open(path, 'w') as f:
+        f.write(text)
+
+
+def _remove_file(path: str):
+    try:
+        os.unlink(path)
+    except FileNotFoundError:
+        pass
+
+
+io_executor = IOExecutor()
@@ -0,0 +1,478 @@
+"""Durable registry of jobs and their background subtasks, shared by all workers."""
+import asyncio
+import json
+import os
+import socket
+import sqlite3
+import threading
+import time
+import uuid
+from typing import Any, Awaitable, Callable, Dict, List, Optional, Set
+from .io_executor import io_executor
+from ..config.settings import settings
+
+# Subtask states that let dependent subtasks run
+FINISHED_STATUSES = ('completed', 'failed')
+
+SubtaskHandler = Callable[[Dict[str, Any], Optional[Dict[str, Any]]], Awaitable[Optional[Dict[str, Any]]]]
+CancelHook = Callable[[Dict[str, Any]], Awaitable[None]]
+
+
+class JobCancelledError(Exception):
+    """Raised to callers of work that was stopped by a cancel request for its job."""
+
+
+def worker_identity() -> str:
+    """Identifies this process in leases, unique across hosts and restarts."""
+    return f"{socket.gethostname()}:{os.getpid()}:{uuid.uuid4().hex[:8]}"
+
+
+class JobRegistry:
+    """Jobs and their background subtasks in SQLite, shared by every worker.
+
+    A subtask is claimed with a lease that the running worker keeps renewing.
+    When a process dies its leases run out and any worker, in any uvicorn
+    process or replica, picks the subtask up again, so work like the Mork
+    merge survives restarts. A subtask with ``depends_on`` becomes runnable
+    once that subtask has finished, and its handler receives the result.
+    Cancelling a job stops its subtasks in whichever worker runs them.
+
+    The methods that touch the database block for up to the SQLite busy
+    timeout while another worker holds the write lock; async code calls
+    them through ``io_executor``.
+    """
+
+    def __init__(self, db_path: str = None, lease_seconds: float = None, max_attempts: int = None,
+                 concurrency: int = None):
+        self.db_path = db_path or settings.job_registry_db
+        self.lease_seconds = lease_seconds or settings.job_lease_seconds
+        self.max_attempts = max_attempts or settings.job_max_attempts
+        self.concurrency = concurrency or settings.job_registry_workers
+        self.poll_interval = settings.job_registry_poll_interval
+        self.owner = worker_identity()
+        self._lock = threading.Lock()
+        self._conn: Optional[sqlite3.Connection] = None
+        self._handlers: Dict[str, SubtaskHandler] = {}
+        self._cancel_hooks: Dict[str, CancelHook] = {}
+        # Handlers running in this process, by subtask id
+        self._running: Dict[str, asyncio.Task] = {}
+        self._workers: List[asyncio.Task] = []
+        self._wakeup: Optional[asyncio.Event] = None
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+
+    def _db(self) -> sqlite3.Connection:
+        if self._conn is None:
+            os.makedirs(os.path.dirname(os.path.abspath(self.db_path)), exist_ok=True)
+            conn = sqlite3.connect(self.db_path, check_same_thread=False, isolation_level=None, timeout=30)
+            conn.row_factory = sqlite3.Row
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("""
+                CREATE TABLE IF NOT EXISTS jobs (
+                    id TEXT PRIMARY KEY,
+                    kind TEXT NOT NULL,
+                    status TEXT NOT NULL,
+                    params TEXT,
+                    result TEXT,
+                    error TEXT,
+                    created_at REAL NOT NULL,
+                    updated_at REAL NOT NULL
+                )
+            """)
+            conn.execute("""
+                CREATE TABLE IF NOT EXISTS subtasks (
+                    id TEXT PRIMARY KEY,
+                    job_id TEXT NOT NULL,
+                    kind TEXT NOT NULL,
+                    status TEXT NOT NULL,
+                    params TEXT NOT NULL,
+                    depends_on TEXT,
+                    result TEXT,
+                    error TEXT,
+                    attempts INTEGER NOT NULL DEFAULT 0,
+                    lease_owner TEXT,
+                    lease_expires REAL,
+                    created_at REAL NOT NULL,
+                    updated_at REAL NOT NULL
+                )
+            """)
+            conn.execute("CREATE INDEX IF NOT EXISTS idx_subtasks_status ON subtasks (status, created_at)")
+            conn.execute("CREATE INDEX IF NOT EXISTS idx_subtasks_job ON subtasks (job_id)")
+            conn.execute("""
+                CREATE TABLE IF NOT EXISTS cancellations (
+                    job_id TEXT PRIMARY KEY,
+                    requested_at REAL NOT NULL
+                )
+            """)
+            self._conn = conn
+        return self._conn
+
+    def create_job(self, job_id: str, kind: str, params: Dict[str, Any] = None, status: str = 'running') -> Dict[str, Any]:
+        now = time.time()
+        with self._lock:
+            self._db().execute(
+                "INSERT INTO jobs (id, kind, status, params, created_at, updated_at) VALUES (?, ?, ?, ?, ?, ?) "
+                "ON CONFLICT(id) DO UPDATE SET status = excluded.status, params = excluded.params, "
+                "updated_at = excluded.updated_at",
+                (job_id, kind, status, json.dumps(params or {}), now, now)
+            )
+        return self.get_job(job_id)
+
+    def update_job(self, job_id: str, status: str, result: Dict[str, Any] = None, error: str = None):
+        with self._lock:
+            self._db().execute(
+                "UPDATE jobs SET status = ?, result = COALESCE(?, result), error = ?, updated_at = ? WHERE id = ?",
+                (status, json.dumps(result) if result is not None else None, error, time.time(), job_id)
+            )
+
+    def get_job(self, job_id: str) -> Optional[Dict[str, Any]]:
+        """Return a job with its subtasks, or None."""
+        with self._lock:
+            conn = self._db()
+            row = conn.execute("SELECT * FROM jobs WHERE id = ?", (job_id,)).fetchone()
+            if row is None:
+                return None
+            subtasks = conn.execute(
+                "SELECT * FROM subtasks WHERE job_id = ? ORDER BY created_at", (job_id,)
+            ).fetchall()
+        return {
+            'job_id': row['id'],
+            'kind': row['kind'],
+            'status': row['status'],
+            'params': json.loads(row['params']) if row['params'] else {},
+            'result': json.loads(row['result']) if row['result'] else None,
+            'error': row['error'],
+            'created_at': row['created_at'],
+            'updated_at': row['updated_at'],
+            'subtasks': [_subtask_dict(subtask) for subtask in subtasks]
+        }
+
+    def add_subtask(self, job_id: str, kind: str, params: Dict[str, Any], depends_on: str = None) -> str:
+        subtask_id = uuid.uuid4().hex
+        now = time.time()
+        with self._lock:
+            self._db().execute(
+                "INSERT INTO subtasks (id, job_id, kind, status, params, depends_on, created_at, updated_at) "
+                "VALUES (?, ?, ?, 'pending', ?, ?, ?, ?)",
+                (subtask_id, job_id, kind, json.dumps(params), depends_on, now, now)
+            )
+        self._notify()
+        return subtask_id
+
+    def get_subtask(self, subtask_id: str) -> Optional[Dict[str, Any]]:
+        with self._lock:
+            row = self._db().execute("SELECT * FROM subtasks WHERE id = ?", (subtask_id,)).fetchone()
+        return _subtask_dict(row) if row else None
+
+    def claim(self, job_id: str = None) -> Optional[Dict[str, Any]]:
+        """Lease the next runnable subtask (of ``job_id`` if given) to this worker.
+
+        Runnable means pending with its dependency finished, or running under
+        an expired lease. Subtasks that already used up ``max_attempts`` are
+        failed instead of being handed out again.
+        """
+        now = time.time()
+        job_filter = "AND s.job_id = ?" if job_id else ""
+        with self._lock:
+            conn = self._db()
+            conn.execute("BEGIN IMMEDIATE")
+            try:
+                while True:
+                    row = conn.execute(
+                        "SELECT s.* FROM subtasks s LEFT JOIN subtasks d ON d.id = s.depends_on "
+                        "WHERE ((s.status = 'pending' AND (s.depends_on IS NULL OR d.status IN (?, ?))) "
+                        "OR (s.status = 'running' AND s.lease_expires < ?)) "
+                        f"{job_filter} ORDER BY s.created_at LIMIT 1",
+                        (*FINISHED_STATUSES, now, *([job_id] if job_id else []))
+                    ).fetchone()
+                    if row is None:
+                        conn.execute("COMMIT")
+                        return None
+                    if row['attempts'] >= self.max_attempts:
+                        conn.execute(
+                            "UPDATE subtasks SET status = 'failed', error = ?, lease_owner = NULL, updated_at = ? "
+                            "WHERE id = ?",
+                            (f"Gave up after {row['attempts']} attempts", now, row['id'])
+                        )
+                        continue
+                    conn.execute(
+                        "UPDATE subtasks SET status = 'running', attempts = attempts + 1, lease_owner = ?, "
+                        "lease_expires = ?, updated_at = ? WHERE id = ?",
+                        (self.owner, now + self.lease_seconds, now, row['id'])
+                    )
+                    conn.execute("COMMIT")
+                    break
+            except Exception:
+                conn.execute("ROLLBACK")
+                raise
+        subtask = _subtask_dict(row)
+        subtask['attempts'] += 1
+        if row['status'] == 'running':
+            print(f"Resuming {subtask['kind']} subtask {subtask['subtask_id']} of job {subtask['job_id']} "
+                  f"(lease of {row['lease_owner']} expired)")
+        return subtask
+
+    def renew(self, subtask_id: str) -> bool:
+        """Extend this worker's lease. False if the lease was lost to another worker."""
+        with self._lock:
+            cursor = self._db().execute(
+                "UPDATE subtasks SET lease_expires = ? WHERE id = ? AND lease_owner = ? AND status = 'running'",
+                (time.time() + self.lease_seconds, subtask_id, self.owner)
+            )
+            return cursor.rowcount == 1
+
+    def release(self, subtask_id: str):
+        """Give up this worker's lease without counting the attempt."""
+        with self._lock:
+            self._db().execute(
+                "UPDATE subtasks SET status = 'pending', attempts = MAX(attempts - 1, 0), lease_owner = NULL, "
+                "lease_expires = NULL, updated_at = ? WHERE id = ? AND lease_owner = ?",
+                (time.time(), subtask_id, self.owner)
+            )
+
+    def finish(self, subtask_id: str, status: str, result: Dict[str, Any] = None, error: str = None) -> bool:
+        """Record a subtask's outcome if this worker still holds its lease."""
+        now = time.time()
+        with self._lock:
+            conn = self._db()
+            cursor = conn.execute(
+                "UPDATE subtasks SET status = ?, result = ?, error = ?, lease_owner = NULL, lease_expires = NULL, "
+                "updated_at = ? WHERE id = ? AND lease_owner = ?",
+                (status, json.dumps(result) if result is not None else None, error, now, subtask_id, self.owner)
+            )
+            if cursor.rowcount != 1:
+                return False
+            # The job is done once none of its subtasks are left
+            job_id = conn.execute("SELECT job_id FROM subtasks WHERE id = ?", (subtask_id,)).fetchone()[0]
+            statuses = [row[0] for row in conn.execute("SELECT status FROM subtasks WHERE job_id = ?", (job_id,))]
+            if all(value in FINISHED_STATUSES for value in statuses):
+                conn.execute(
+                    "UPDATE jobs SET status = ?, updated_at = ? WHERE id = ? AND status = 'running'",
+                    ('failed' if 'failed' in statuses else 'completed', now, job_id)
+                )
+        # Dependents of this subtask may be runnable now
+        self._notify()
+        return True
+
+    async def cancel_job(self, job_id: str) -> List[Dict[str, Any]]:
+        """Cancel the unfinished subtasks of a job and return them.
+
+        Pending subtasks are dropped here. Running ones lose their lease, so
+        the worker holding them stops the handler: at once in this process,
+        at its next lease renewal elsewhere. The request is also recorded for
+        ``cancel_requested``, which lets other long-running work on the job
+        (mining) notice it from any worker.
+        """
+        cancelled = await io_executor.run(self._cancel_subtasks, job_id)
+        for subtask in cancelled:
+            task = self._running.get(subtask['subtask_id'])
+            if task is not None:
+                task.cancel()
+            elif subtask['status'] == 'pending':
+                # Never started, so nobody else will clean up after it
+                await self._after_cancel(subtask)
+        return cancelled
+
+    def _cancel_subtasks(self, job_id: str) -> List[Dict[str, Any]]:
+        now = time.time()
+        with self._lock:
+            conn = self._db()
+            conn.execute("BEGIN IMMEDIATE")
+            try:
+                rows = conn.execute(
+                    "SELECT * FROM subtasks WHERE job_id = ? AND status IN ('pending', 'running') ORDER BY created_at",
+                    (job_id,)
+                ).fetchall()
+                conn.execute(
+                    "UPDATE subtasks SET status = 'cancelled', error = 'Cancelled', lease_owner = NULL, "
+                    "lease_expires = NULL, updated_at = ? WHERE job_id = ? AND status IN ('pending', 'running')",
+                    (now, job_id)
+                )
+                conn.execute(
+                    "UPDATE jobs SET status = 'cancelled', updated_at = ? WHERE id = ? AND status = 'running'",
+                    (now, job_id)
+                )
+                conn.execute(
+                    "INSERT INTO cancellations (job_id, requested_at) VALUES (?, ?) "
+                    "ON CONFLICT(job_id) DO UPDATE SET requested_at = excluded.requested_at",
+                    (job_id, now)
+                )
+                conn.execute("COMMIT")
+            except Exception:
+                conn.execute("ROLLBACK")
+                raise
+        return [_subtask_dict(row) for row in rows]
+
+    def cancel_requested(self, job_id: str, since: float) -> bool:
+        """True if the job was cancelled at or after ``since``."""
+        with self._lock:
+            row = self._db().execute(
+                "SELECT requested_at FROM cancellations WHERE job_id = ?", (job_id,)
+            ).fetchone()
+        return row is not None and row['requested_at'] >= since
+
+    async def _after_cancel(self, subtask: Dict[str, Any]):
+        hook = self._cancel_hooks.get(subtask['kind'])
+        if hook is None:
+            return
+        try:
+            await hook(subtask['params'])
+        except Exception as e:
+            print(f"Cleanup of cancelled {subtask['kind']} subtask {subtask['subtask_id']} failed: {e}")
+
+    def active_job_ids(self) -> Set[str]:
+        """Jobs with subtasks that are still pending or running."""
+        with self._lock:
+            rows = self._db().execute(
+                "SELECT DISTINCT job_id FROM subtasks WHERE status IN ('pending', 'running')"
+            ).fetchall()
+        return {row['job_id'] for row in rows}
+
+    def mork_outputs(self) -> Dict[str, str]:
+        """Map the builder's Mork job directories to the graph job they were merged into.
+
+        Only Mork output whose ``merge`` subtask completed and copied it is
+        listed; until then the builder's directory is the only copy.
+        """
+        with self._lock:
+            rows = self._db().execute(
+                "SELECT mork.job_id, mork.result, merge.result AS merge_result "
+                "FROM subtasks AS mork JOIN subtasks AS merge ON merge.depends_on = mork.id "
+                "WHERE mork.kind = 'mork' AND mork.result IS NOT NULL "
+                "AND merge.kind = 'merge' AND merge.status = 'completed' AND merge.result IS NOT NULL"
+            ).fetchall()
+        outputs = {}
+        for row in rows:
+            mork_job_id = json.loads(row['result']).get('mork_job_id')
+            if mork_job_id and json.loads(row['merge_result']).get('merged') is True:
+                outputs[mork_job_id] = row['job_id']
+        return outputs
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            rows = self._db().execute("SELECT status, COUNT(*) FROM subtasks GROUP BY status").fetchall()
+        counts = {status: count for status, count in rows}
+        return {
+            'pending': counts.get('pending', 0),
+            'running': counts.get('running', 0),
+            'completed': counts.get('completed', 0),
+            'failed': counts.get('failed', 0),
+            'cancelled': counts.get('cancelled', 0),
+            'owner': self.owner,
+            'workers': len(self._workers)
+        }
+
+    def register(self, kind: str, handler: SubtaskHandler, on_cancel: CancelHook = None):
+        """``handler(params, dependency)`` runs subtasks of ``kind``; ``dependency``
+        is the finished subtask it depends on, if any. Its return value is stored
+        as the subtask result. ``on_cancel(params)`` cleans up after a cancelled
+        subtask, whether or not it had started."""
+        self._handlers[kind] = handler
+        if on_cancel is not None:
+            self._cancel_hooks[kind] = on_cancel
+
+    async def run(self, subtask: Dict[str, Any]):
+        """Run a claimed subtask, renewing its lease until it finishes."""
+        handler = self._handlers.get(subtask['kind'])
+        subtask_id = subtask['subtask_id']
+        if handler is None:
+            await io_executor.run(
+                self.finish, subtask_id, 'failed', error=f"No handler for subtask kind '{subtask['kind']}'"
+            )
+            return
+        dependency = await io_executor.run(self.get_subtask, subtask['depends_on']) if subtask['depends_on'] else None
+        task = asyncio.ensure_future(handler(subtask['params'], dependency))
+        self._running[subtask_id] = task
+        heartbeat = asyncio.create_task(self._heartbeat(subtask_id, task))
+        try:
+            result = await task
+            await io_executor.run(self.finish, subtask_id, 'completed', result=result)
+        except asyncio.CancelledError:
+            if asyncio.current_task().cancelling():
+                # Shutting down: hand the subtask back so the next worker resumes it at once
+                await io_executor.run(self.release, subtask_id)
+                raise
+            # The lease is gone: the job was cancelled or another worker took over
+            current = await io_executor.run(self.get_subtask, subtask_id)
+            if current is not None and current['status'] == 'cancelled':
+                print(f"{subtask['kind']} subtask {subtask_id} of job {subtask['job_id']} was cancelled")
+                await self._after_cancel(subtask)
+        except Exception as e:
+            print(f"{subtask['kind']} subtask {subtask_id} of job {subtask['job_id']} failed: {e}")
+            await io_executor.run(self.finish, subtask_id, 'failed', error=str(e))
+        finally:
+            heartbeat.cancel()
+            self._running.pop(subtask_id, None)
+
+    async def run_job(self, job_id: str, concurrency: int = 1):
+        """Run the runnable subtasks of one job in this process, in order.
+
+        With ``concurrency`` > 1 independent subtasks run side by side.
+        Subtasks still waiting on a dependency when a runner runs out of work
+        are left to whichever runner finishes that dependency.
+        """
+        async def runner():
+            while True:
+                subtask = await io_executor.run(self.claim, job_id)
+                if subtask is None:
+                    return
+                await self.run(subtask)
+
+        await asyncio.gather(*[runner() for _ in range(concurrency)])
+
+    async def _heartbeat(self, subtask_id: str, task: asyncio.Task):
+        while True:
+            await asyncio.sleep(self.lease_seconds / 3)
+            if not await io_executor.run(self.renew, subtask_id):
+                print(f"Lost the lease on subtask {subtask_id}, stopping it")
+                task.cancel()
+                return
+
+    async def start(self):
+        """Start workers that pick up pending subtasks and those of dead workers."""
+        await self.stop()
+        self._loop = asyncio.get_running_loop()
+        self._wakeup = asyncio.Event()
+        self._workers = [asyncio.create_task(self._worker()) for _ in range(self.concurrency)]
+
+    async def stop(self):
+        workers, self._workers = self._workers, []
+        for worker in workers:
+            worker.cancel()
+        await asyncio.gather(*workers, return_exceptions=True)
+        self._wakeup = None
+
+    def _notify(self):
+        """Wake the workers; safe to call from ``io_executor`` threads."""
+        if self._wakeup is not None:
+            self._loop.call_soon_threadsafe(self._wakeup.set)
+
+    async def _worker(self):
+        while True:
+            self._wakeup.clear()
+            subtask = await io_executor.run(self.claim)
+            if subtask is None:
+                # Other processes' work and expired leases are found by polling
+                # Not wait_for: it drops a cancellation that arrives as the event is set
+                try:
+                    async with asyncio.timeout(self.poll_interval):
+                        await self._wakeup.wait()
+                except TimeoutError:
+                    pass
+                continue
+            await self.run(subtask)
+
+
+def _subtask_dict(row: sqlite3.Row) -> Dict[str, Any]:
+    return {
+        'subtask_id': row['id'],
+        'job_id': row['job_id'],
+        'kind': row['kind'],
+        'status': row['status'],
+        'params': json.loads(row['params']),
+        'depends_on': row['depends_on'],
+        'result': json.loads(row['result']) if row['result'] else None,
+        'error': row['error'],
+        'attempts': row['attempts'],
+        'lease_owner': row['lease_owner'],
+        'updated_at': row['updated_at']
+    }
@@ -0,0 +1,274 @@
+"""In-process metrics in the Prometheus text format, plus structured timing logs."""
+import asyncio
+import json
+import math
+import threading
+import time
+from contextlib import contextmanager
+from typing import Any, Callable, Dict, Iterable, Iterator, List, Tuple
+from ..config.settings import settings
+
+# Seconds; covers quick cache hits up to half-hour mining runs
+DEFAULT_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60, 120, 300, 600, 1800)
+
+Sample = Tuple[Dict[str, str], float]
+Collector = Callable[[], Iterable[Tuple[str, str, str, List[Sample]]]]
+
+
+def _escape(value: str) -> str:
+    return str(value).replace('\\', '\\\\').replace('\n', '\\n').replace('"', '\\"')
+
+
+def _format_labels(labels: Dict[str, str]) -> str:
+    if not labels:
+        return ''
+    return '{' + ','.join(f'{name}="{_escape(value)}"' for name, value in labels.items()) + '}'
+
+
+def _format_value(value: float) -> str:
+    if math.isinf(value):
+        return '+Inf' if value > 0 else '-Inf'
+    if float(value).is_integer():
+        return str(int(value))
+    return repr(float(value))
+
+
+class _Metric:
+    kind = ''
+
+    def __init__(self, name: str, documentation: str, labelnames: Tuple[str, ...] = ()):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self._values: Dict[Tuple[str, ...], Any] = {}
+        self._lock = threading.Lock()
+
+    def _key(self, labels: Dict[str, Any]) -> Tuple[str, ...]:
+        if set(labels) != set(self.labelnames):
+            raise ValueError(f"{self.name} takes labels {self.labelnames}, got {tuple(labels)}")
+        return tuple(str(labels[name]) for name in self.labelnames)
+
+    def _labels(self, key: Tuple[str, ...]) -> Dict[str, str]:
+        return dict(zip(self.labelnames, key))
+
+    def samples(self) -> List[Tuple[str, Dict[str, str], float]]:
+        with self._lock:
+            return [(self.name, self._labels(key), value) for key, value in sorted(self._values.items())]
+
+    def value(self, **labels) -> float:
+        with self._lock:
+            return self._values.get(self._key(labels), 0)
+
+
+class Counter(_Metric):
+    kind = 'counter'
+
+    def inc(self, amount: float = 1, **labels):
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0) + amount
+
+
+class Gauge(_Metric):
+    kind = 'gauge'
+
+    def set(self, value: float, **labels):
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = value
+
+    def inc(self, amount: float = 1, **labels):
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0) + amount
+
+    def dec(self, amount: float = 1, **labels):
+        self.inc(-amount, **labels)
+
+
+class Histogram(_Metric):
+    kind = 'histogram'
+
+    def __init__(self, name: str, documentation: str, labelnames: Tuple[str, ...] = (), buckets=DEFAULT_BUCKETS):
+        super().__init__(name, documentation, labelnames)
+        self.buckets = tuple(sorted(buckets)) + (math.inf,)
+
+    def observe(self, value: float, **labels):
+        key = self._key(labels)
+        with self._lock:
+            state = self._values.get(key)
+            if state is None:
+                state = self._values[key] = {'counts': [0] * len(self.buckets), 'sum': 0.0, 'count': 0}
+            for i, bound in enumerate(self.buckets):
+                if value <= bound:
+                    state['counts'][i] += 1
+                    break
+            state['sum'] += value
+            state['count'] += 1
+
+    def value(self, **labels) -> Dict[str, Any]:
+        """``{'count', 'sum'}`` of one label set."""
+        with self._lock:
+            state = self._values.get(self._key(labels))
+            return {'count': state['count'], 'sum': state['sum']} if state else {'count': 0, 'sum': 0.0}
+
+    def samples(self) -> List[Tuple[str, Dict[str, str], float]]:
+        samples = []
+        with self._lock:
+            for key, state in sorted(self._values.items()):
+                labels = self._labels(key)
+                cumulative = 0
+                for bound, count in zip(self.buckets, state['counts']):
+                    cumulative += count
+                    samples.append((f'{self.name}_bucket', {**labels, 'le': _format_value(bound)}, cumulative))
+                samples.append((f'{self.name}_sum', labels, state['sum']))
+                samples.append((f'{self.name}_count', labels, state['count']))
+        return samples
+
+
+class MetricsRegistry:
+    """Metrics of this process, rendered for Prometheus at ``/metrics``.
+
+    Metrics are per process: with several uvicorn workers each scrape sees
+    the worker that served it. Collectors add values that are computed at
+    scrape time, such as cache statistics.
+    """
+
+    def __init__(self):
+        self._metrics: Dict[str, _Metric] = {}
+        self._collectors: Dict[str, Collector] = {}
+        self._lock = threading.Lock()
+
+    def _get_or_create(self, cls, name: str, documentation: str, labelnames, **kwargs) -> _Metric:
+        with self._lock:
+            metric = self._metrics.get(name)
+            if metric is None:
+                metric = self._metrics[name] = cls(name, documentation, tuple(labelnames), **kwargs)
+            elif not isinstance(metric, cls) or metric.labelnames != tuple(labelnames):
+                raise ValueError(f"Metric {name} is already registered with another type or labels")
+            return metric
+
+    def counter(self, name: str, documentation: str, labelnames=()) -> Counter:
+        return self._get_or_create(Counter, name, documentation, labelnames)
+
+    def gauge(self, name: str, documentation: str, labelnames=()) -> Gauge:
+        return self._get_or_create(Gauge, name, documentation, labelnames)
+
+    def histogram(self, name: str, documentation: str, labelnames=(), buckets=DEFAULT_BUCKETS) -> Histogram:
+        return self._get_or_create(Histogram, name, documentation, labelnames, buckets=buckets)
+
+    def add_collector(self, name: str, collector: Collector):
+        """``collector()`` yields ``(metric_name, kind, help, [(labels, value), ...])``.
+        Registering under an existing name replaces the old collector."""
+        with self._lock:
+            self._collectors[name] = collector
+
+    def render(self) -> str:
+        lines = []
+        with self._lock:
+            metrics = list(self._metrics.values())
+            collectors = list(self._collectors.items())
+        for metric in metrics:
+            lines.append(f'# HELP {metric.name} {metric.documentation}')
+            lines.append(f'# TYPE {metric.name} {metric.kind}')
+            for name, labels, value in metric.samples():
+                lines.append(f'{name}{_format_labels(labels)} {_format_value(value)}')
+        # Collectors may report the same metric with different labels; one header per metric
+        families: Dict[str, Tuple[str, str, List[Sample]]] = {}
+        for collector_name, collector in collectors:
+            try:
+                for name, kind, documentation, samples in collector():
+                    families.setdefault(name, (kind, documentation, []))[2].extend(samples)
+            except Exception as e:
+                # One broken source must not take the whole scrape down
+                print(f"Metrics collector {collector_name} failed: {e}")
+        for name, (kind, documentation, samples) in families.items():
+            lines.append(f'# HELP {name} {documentation}')
+            lines.append(f'# TYPE {name} {kind}')
+            for labels, value in samples:
+                lines.append(f'{name}{_format_labels(labels)} {_format_value(value)}')
+        return '\n'.join(lines) + '\n'
+
+
+metrics = MetricsRegistry()
+
+STAGE_SECONDS = metrics.histogram(
+    'integration_stage_duration_seconds', 'Duration of pipeline stages', ('stage', 'outcome')
+)
+STAGE_IN_FLIGHT = metrics.gauge(
+    'integration_stage_in_flight', 'Pipeline stages currently running', ('stage',)
+)
+UPSTREAM_SECONDS = metrics.histogram(
+    'integration_upstream_request_duration_seconds',
+    'Time from sending an upstream request to its response headers', ('upstream', 'endpoint', 'status')
+)
+BYTES_TOTAL = metrics.counter(
+    'integration_bytes_total', 'Bytes transferred, by direction', ('direction',)
+)
+MINER_RETRIES = metrics.counter(
+    'integration_miner_retries_total', 'Miner requests retried on another replica or after backoff', ('reason',)
+)
+RETENTION_EVICTIONS = metrics.counter(
+    'integration_retention_evictions_total', 'Job artifacts deleted by the retention engine', ('kind', 'reason')
+)
+RETENTION_BYTES_FREED = metrics.counter(
+    'integration_retention_bytes_freed_total', 'Bytes deleted by the retention engine', ('reason',)
+)
+CANCELLATIONS = metrics.counter(
+    'integration_cancellations_total', 'Jobs and requests whose work was cancelled', ('source',)
+)
+
+
+def log_timing(stage: str, duration: float, outcome: str, **fields):
+    """One JSON line per finished stage, for log pipelines."""
+    if settings.timing_logs:
+        print(json.dumps({
+            'event': 'timing',
+            'stage': stage,
+            'outcome': outcome,
+            'duration_ms': round(duration * 1000, 3),
+            'ts': time.time(),
+            **fields
+        }, default=str), flush=True)
+
+
+@contextmanager
+def timed(stage: str, **fields) -> Iterator[Dict[str, Any]]:
+    """Time a pipeline stage: histogram, in-flight gauge and a timing log line.
+
+    Yields a dict; keys added to it while the stage runs (sizes, cache hits)
+    end up in the log line.
+    """
+    extra: Dict[str, Any] = dict(fields)
+    outcome = 'ok'
+    STAGE_IN_FLIGHT.inc(stage=stage)
+    start = time.perf_counter()
+    try:
+        yield extra
+    except (asyncio.CancelledError, GeneratorExit):
+        # GeneratorExit: a streamed response was closed by the client
+        outcome = 'cancelled'
+        raise
+    except BaseException:
+        outcome = 'error'
+        raise
+    finally:
+        duration = time.perf_counter() - start
+        STAGE_IN_FLIGHT.dec(stage=stage)
+        STAGE_SECONDS.observe(duration, stage=stage, outcome=outcome)
+        log_timing(stage, duration, outcome, **extra)
+
+
+def cache_collector(name: str, stats: Callable[[], Dict[str, Any]]) -> Collector:
+    """Expose a cache's ``stats()`` hit/miss/eviction counters and size."""
+    def collect():
+        values = stats()
+        labels = {'cache': name}
+        yield ('integration_cache_hits_total', 'counter', 'Cache hits', [(labels, values.get('hits', 0))])
+        yield ('integration_cache_misses_total', 'counter', 'Cache misses', [(labels, values.get('misses', 0))])
+        yield ('integration_cache_evictions_total', 'counter', 'Cache evictions',
+               [(labels, values.get('evictions', 0))])
+        yield ('integration_cache_hit_ratio', 'gauge', 'Cache hits per lookup', [(labels, values.get('hit_rate', 0))])
+        yield ('integration_cache_bytes', 'gauge', 'Bytes stored in the cache', [(labels, values.get('total_bytes', 0))])
+    return collect
+
@@ -0,0 +1,124 @@
+"""Load-aware routing across neural-miner replicas."""
+import asyncio
+import itertools
+from contextlib import asynccontextmanager
+from typing import AsyncIterator, Dict, Iterable, List, Optional
+import httpx
+from .http_clients import http_clients
+from ..config.settings import settings
+
+
+class MinerEndpoint:
+    """One neural-miner replica and what we know about it."""
+
+    def __init__(self, url: str):
+        self.url = url.rstrip('/')
+        self.in_flight = 0
+        self.healthy = True
+        self.consecutive_failures = 0
+        self.total_requests = 0
+        # Cleared when this replica turns out to predate graph_path requests
+        self.supports_reference = True
+        # Cleared when this replica has no /mine-batch endpoint
+        self.supports_batch = True
+
+    def to_dict(self) -> Dict[str, object]:
+        return {
+            'url': self.url,
+            'in_flight': self.in_flight,
+            'healthy': self.healthy,
+            'consecutive_failures': self.consecutive_failures,
+            'total_requests': self.total_requests,
+            'supports_reference': self.supports_reference,
+            'supports_batch': self.supports_batch
+        }
+
+
+class MinerPool:
+    """Routes each mining request to the least-loaded healthy miner replica.
+
+    Replicas come from the comma-separated ``NEURAL_MINER_URL``. Load is the
+    number of requests this service has in flight to a replica. A background
+    task probes ``/health`` on every replica so failed ones leave and
+    recovered ones rejoin the rotation.
+    """
+
+    def __init__(self, urls: Iterable[str] = None):
+        self.endpoints: List[MinerEndpoint] = [MinerEndpoint(url) for url in (urls or settings.miner_urls)]
+        self.health_path = settings.miner_health_path
+        self.health_interval = settings.miner_health_interval
+        self._tiebreak = itertools.count()
+        self._probe_task: Optional[asyncio.Task] = None
+
+    def pick(self, exclude: Iterable[MinerEndpoint] = ()) -> MinerEndpoint:
+        """Return the least-loaded endpoint, preferring healthy ones not in ``exclude``."""
+        excluded = set(id(endpoint) for endpoint in exclude)
+        candidates = [e for e in self.endpoints if e.healthy and id(e) not in excluded]
+        if not candidates:
+            # Health data may be stale; try anything we have not just failed on
+            candidates = [e for e in self.endpoints if id(e) not in excluded] or self.endpoints
+        lowest = min(endpoint.in_flight for endpoint in candidates)
+        least_loaded = [endpoint for endpoint in candidates if endpoint.in_flight == lowest]
+        return least_loaded[next(self._tiebreak) % len(least_loaded)]
+
+    @asynccontextmanager
+    async def acquire(self, exclude: Iterable[MinerEndpoint] = ()) -> AsyncIterator[MinerEndpoint]:
+        """Reserve an endpoint for one request, counting it as in flight."""
+        endpoint = self.pick(exclude)
+        endpoint.in_flight += 1
+        endpoint.total_requests += 1
+        try:
+            yield endpoint
+        finally:
+            endpoint.in_flight -= 1
+
+    def mark_failed(self, endpoint: MinerEndpoint):
+        endpoint.consecutive_failures += 1
+        if endpoint.healthy:
+            print(f"Miner replica {endpoint.url} marked unhealthy")
+        endpoint.healthy = False
+
+    def mark_ok(self, endpoint: MinerEndpoint):
+        if not endpoint.healthy:
+            print(f"Miner replica {endpoint.url} is healthy again")
+        endpoint.healthy = True
+        endpoint.consecutive_failures = 0
+
+    async def probe(self, endpoint: MinerEndpoint) -> bool:
+        """Check one replica's health endpoint."""
+        try:
+            response = await http_clients.miner.get(
+                f"{endpoint.url}{self.health_path}",
+                timeout=settings.miner_health_timeout
+            )
+            healthy = response.status_code == 200
+        except httpx.HTTPError:
+            healthy = False
+
+        if healthy:
+            self.mark_ok(endpoint)
+        else:
+            self.mark_failed(endpoint)
+        return healthy
+
+    async def probe_all(self):
+        await asyncio.gather(*[self.probe(endpoint) for endpoint in self.endpoints])
+
+    async def _probe_loop(self):
+        while True:
+            await self.probe_all()
+            await asyncio.sleep(self.health_interval)
+
+    async def start(self):
+        await self.stop()
+        if self.health_interval > 0:
+            self._probe_task = asyncio.create_task(self._probe_loop())
+
+    async def stop(self):
+        task, self._probe_task = self._probe_task, None
+        if task is not None:
+            task.cancel()
+            await asyncio.gather(task, return_exceptions=True)
+
+    def stats(self) -> List[Dict[str, object]]:
+        return [endpoint.to_dict() for endpoint in self.endpoints]
@@ -1,16 +1,31 @@
 """Neural Miner communication service."""  
 import httpx  
-import os  
+import json
 import asyncio  
-from typing import Dict, Any  
+from typing import Dict, Any, List, Optional, Tuple  
+from .http_clients import http_clients
+from .multipart_stream import AsyncMultipartStream
+from .io_executor import io_executor
+from .miner_pool import MinerPool, MinerEndpoint
+from . import graph_csr
+from .metrics import MINER_RETRIES
 from ..config.settings import settings  
   
 class MinerService:  
     """Service for communicating with Neural Subgraph Miner."""  
+    
+    # Responses to a by-reference request that mean "send me the file instead";
+    # a 400 is a bad request and would fail the same way uploaded
+    REFERENCE_FALLBACK_STATUSES = (404, 422)
+    # Responses to /mine-batch that mean "this miner only does single runs"
+    BATCH_UNSUPPORTED_STATUSES = (404, 405, 422)
       
     def __init__(self):  
         self.miner_url = settings.miner_url  
         self.timeout = settings.miner_timeout  
+        self.cancel_timeout = settings.miner_cancel_timeout
+        self.graph_by_reference = settings.miner_graph_by_reference
+        self.pool = MinerPool()
       
     async def mine_motifs(
         self, 
@@ -20,7 +35,7 @@ class MinerService:
         max_retries: int = 3
     ) -> Dict[str, Any]:  
         """Send NetworkX file to miner with config and return discovered motifs."""  
-        if not os.path.exists(networkx_file_path):  
+        if not await io_executor.exists(networkx_file_path):
             raise FileNotFoundError(f"NetworkX file not found: {networkx_file_path}")  
           
         if job_id is None:
@@ -31,50 +46,212 @@ class MinerService:
         if mining_config is None:
             mining_config = {}
     
+        data = self.build_form_data(job_id, mining_config)
+    
+        failed_endpoints = []
         for attempt in range(max_retries):  
-            try:  
-                # Read NetworkX file  
-                with open(networkx_file_path, 'rb') as f:  
-                    networkx_data = f.read()  
-                  
-                data = {}
-                if job_id:
-                    data['job_id'] = job_id
-                
-                data['min_pattern_size'] = mining_config.get('min_pattern_size', 5)
-                data['max_pattern_size'] = mining_config.get('max_pattern_size', 10)
-                data['min_neighborhood_size'] = mining_config.get('min_neighborhood_size', 5)
-                data['max_neighborhood_size'] = mining_config.get('max_neighborhood_size', 10)
-                data['n_neighborhoods'] = mining_config.get('n_neighborhoods', 2000)
-                data['n_trials'] = mining_config.get('n_trials', 100)
-                data['radius'] = mining_config.get('radius', 3)
-                data['graph_type'] = mining_config.get('graph_type', 'directed')
-                data['search_strategy'] = mining_config.get('search_strategy', 'greedy')
-                data['sample_method'] = mining_config.get('sample_method', 'tree')
-                data['visualize_instances'] = mining_config.get('visualize_instances', False)
-                
-                # Send to miner using HTTP client  
-                async with httpx.AsyncClient(timeout=self.timeout) as client:  
-                    files = {'graph_file': ('graph.gpickle', networkx_data, 'application/octet-stream')}
-                    
-                    response = await client.post(f"{self.miner_url}/mine", files=files, data=data)  
+            async with self.pool.acquire(exclude=failed_endpoints) as endpoint:
+                try:  
+                    try:
+                        response = await self._post_mine(endpoint, networkx_file_path, data)
+                    except asyncio.CancelledError:
+                        await self.cancel_runs(endpoint, [job_id])
+                        raise
+                    self.pool.mark_ok(endpoint)
                       
                     if response.status_code != 200:  
                         raise RuntimeError(f"Miner returned {response.status_code}: {response.text}")  
                       
                     result = response.json()  
-                  
-                # Validate response structure  
-                if not self.validate_motif_output(result):  
-                    raise ValueError("Invalid motif output structure from miner")  
                       
-                return result  
-                  
-            except (httpx.RequestError, httpx.ConnectError, httpx.ConnectTimeout) as e:  
-                if attempt == max_retries - 1:  
-                    raise Exception(f"Miner request failed after {max_retries} attempts: {str(e)}")  
+                    # Validate response structure  
+                    if not self.validate_motif_output(result):  
+                        raise ValueError("Invalid motif output structure from miner")  
+                          
+                    return result  
+                      
+                except (httpx.RequestError, httpx.ConnectError, httpx.ConnectTimeout) as e:  
+                    print(f"Miner request to {endpoint.url} failed (attempt {attempt + 1}/{max_retries}): {e}")
+                    self.pool.mark_failed(endpoint)
+                    failed_endpoints.append(endpoint)
+                    if attempt == max_retries - 1:  
+                        raise Exception(f"Miner request failed after {max_retries} attempts: {str(e)}")  
+                    MINER_RETRIES.inc(reason='request_error')
+            
+            if len(failed_endpoints) >= len(self.pool.endpoints):
+                # Every replica failed, back off before going around again
+                MINER_RETRIES.inc(reason='backoff')
+                failed_endpoints = []
                 wait_time = 2 ** attempt  # Exponential backoff  
                 await asyncio.sleep(wait_time)  
+    
+    async def mine_batch(
+        self,
+        networkx_file_path: str,
+        runs: List[Tuple[str, Dict[str, Any]]]
+    ) -> Optional[List[Dict[str, Any]]]:
+        """Mine several configurations of one graph in a single miner request.
+
+        ``runs`` pairs the output job id of each run with its mining config.
+        The miner loads the graph once and may reuse sampled neighborhoods
+        between runs with the same ``sample_group``. Returns one result per
+        run, or None when no replica can take a batch (callers then fall back
+        to single runs).
+        """
+        if not self.graph_by_reference:
+            return None
+        
+        failed_endpoints = []
+        while True:
+            candidates = [
+                e for e in self.pool.endpoints
+                if e.supports_batch and e.supports_reference and e not in failed_endpoints
+            ]
+            if not candidates:
+                return None
+            
+            excluded = [e for e in self.pool.endpoints if e not in candidates]
+            async with self.pool.acquire(exclude=excluded) as endpoint:
+                payload = [
+                    {**self.build_form_data(run_id, config), 'sample_group': config.get('sample_group')}
+                    for run_id, config in runs
+                ]
+                try:
+                    response = await http_clients.miner.post(
+                        f"{endpoint.url}/mine-batch",
+                        data={
+                            **await self._graph_reference(networkx_file_path),
+                            'runs': json.dumps(payload)
+                        }
+                    )
+                except asyncio.CancelledError:
+                    await self.cancel_runs(endpoint, [run_id for run_id, _ in runs])
+                    raise
+                except httpx.RequestError as e:
+                    print(f"Batch mining request to {endpoint.url} failed: {e}")
+                    MINER_RETRIES.inc(reason='batch_request_error')
+                    self.pool.mark_failed(endpoint)
+                    failed_endpoints.append(endpoint)
+                    continue
+                self.pool.mark_ok(endpoint)
+                
+                if response.status_code in self.BATCH_UNSUPPORTED_STATUSES:
+                    print(f"DEBUG: Miner {endpoint.url} has no batch support ({response.status_code})")
+                    endpoint.supports_batch = False
+                    continue
+                if response.status_code != 200:
+                    raise RuntimeError(f"Miner returned {response.status_code}: {response.text}")
+                
+                results = response.json().get('results')
+                if not isinstance(results, list) or len(results) != len(runs):
+                    raise ValueError("Invalid batch output structure from miner")
+                # Runs fail individually; only successful ones must carry output paths
+                for result in results:
+                    if not isinstance(result, dict):
+                        raise ValueError("Invalid batch output structure from miner")
+                    if result.get('status') != 'error' and not self.validate_motif_output(result):
+                        raise ValueError("Invalid batch output structure from miner")
+                return results
+    
+    async def cancel_runs(self, endpoint: MinerEndpoint, job_ids: List[Optional[str]]) -> int:
+        """Ask a replica to stop runs whose request was cancelled; returns how many it stopped.
+
+        Dropping the connection alone leaves the miner computing until it
+        finishes. Miners without ``/cancel`` (or that no longer run the job)
+        answer 404, which is ignored.
+        """
+        stopped = 0
+        for job_id in job_ids:
+            if not job_id:
+                continue
+            try:
+                response = await http_clients.miner.post(
+                    f"{endpoint.url}/cancel", data={'job_id': job_id}, timeout=self.cancel_timeout
+                )
+            except httpx.HTTPError as e:
+                print(f"Could not cancel run {job_id} on miner {endpoint.url}: {e}")
+                continue
+            if response.status_code == 200:
+                print(f"DEBUG: Miner {endpoint.url} stopped run {job_id}")
+                stopped += 1
+            elif response.status_code not in (404, 405):
+                print(f"Miner {endpoint.url} refused to cancel run {job_id}: {response.status_code}")
+        return stopped
+    
+    async def _post_mine(self, endpoint: MinerEndpoint, networkx_file_path: str, data: Dict[str, Any]) -> httpx.Response:
+        """Send one mining request to a replica, by reference when it supports it."""
+        client = http_clients.miner
+        
+        if self.graph_by_reference and endpoint.supports_reference:
+            # The miner mounts the same volume, so only the path is sent
+            response = await client.post(
+                f"{endpoint.url}/mine",
+                data={**data, **await self._graph_reference(networkx_file_path)}
+            )
+            if response.status_code not in self.REFERENCE_FALLBACK_STATUSES:
+                return response
+            print(f"DEBUG: Miner {endpoint.url} cannot mine {networkx_file_path} by reference "
+                  f"({response.status_code}), uploading the graph instead")
+            if response.status_code == 422:
+                # Miner predates graph_path and requires graph_file
+                endpoint.supports_reference = False
+            MINER_RETRIES.inc(reason='reference_fallback')
+        
+        return await self._upload_graph(client, endpoint.url, networkx_file_path, data)
+    
+    def build_form_data(self, job_id: Optional[str], mining_config: Dict[str, Any]) -> Dict[str, Any]:
+        """Build the miner form fields, filling in the miner defaults."""
+        data = {}
+        if job_id:
+            data['job_id'] = job_id
+        
+        data['min_pattern_size'] = mining_config.get('min_pattern_size', 5)
+        data['max_pattern_size'] = mining_config.get('max_pattern_size', 10)
+        data['min_neighborhood_size'] = mining_config.get('min_neighborhood_size', 5)
+        data['max_neighborhood_size'] = mining_config.get('max_neighborhood_size', 10)
+        data['n_neighborhoods'] = mining_config.get('n_neighborhoods', 2000)
+        data['n_trials'] = mining_config.get('n_trials', 100)
+        data['radius'] = mining_config.get('radius', 3)
+        data['graph_type'] = mining_config.get('graph_type', 'directed')
+        data['search_strategy'] = mining_config.get('search_strategy', 'greedy')
+        data['sample_method'] = mining_config.get('sample_method', 'tree')
+        data['visualize_instances'] = mining_config.get('visualize_instances', False)
+        if mining_config.get('seed') is not None:
+            data['seed'] = mining_config['seed']
+        return data
+    
+    async def _graph_reference(self, networkx_file_path: str) -> Dict[str, str]:
+        """Form fields pointing the miner at the graph on the shared volume.
+
+        ``graph_csr_path`` is only sent when the memory-mappable copy is
+        current; miners that do not know it keep using ``graph_path``.
+        """
+        fields = {'graph_path': self._miner_graph_path(networkx_file_path)}
+        csr_dir = graph_csr.csr_dir_for(networkx_file_path)
+        if await io_executor.run(graph_csr.is_fresh, networkx_file_path, csr_dir):
+            fields['graph_csr_path'] = self._miner_graph_path(csr_dir)
+        return fields
+    
+    def _miner_graph_path(self, networkx_file_path: str) -> str:
+        """Translate a local shared-volume path to the miner's mount point."""
+        local_root = settings.shared_volume_path.rstrip('/')
+        if networkx_file_path.startswith(local_root + '/'):
+            return settings.miner_shared_volume_path.rstrip('/') + networkx_file_path[len(local_root):]
+        return networkx_file_path
+    
+    async def _upload_graph(
+        self,
+        client: httpx.AsyncClient,
+        miner_url: str,
+        networkx_file_path: str,
+        data: Dict[str, Any]
+    ) -> httpx.Response:
+        """Stream the pickled graph to the miner as a multipart upload."""
+        body = AsyncMultipartStream(
+            data=data,
+            files=[('graph_file', networkx_file_path, 'application/octet-stream', 'graph.gpickle')]
+        )
+        return await client.post(f"{miner_url}/mine", content=body, headers=await body.headers())
       
     def validate_motif_output(self, output: Dict[str, Any]) -> bool:  
         """Validate miner output structure."""  
@@ -0,0 +1,438 @@
+"""Persistent mining job queue with bounded worker concurrency."""
+import asyncio
+import json
+import os
+import sqlite3
+import threading
+import time
+import uuid
+from typing import Any, Awaitable, Callable, Dict, List, Optional, Set
+from .io_executor import io_executor
+from .job_registry import JobCancelledError, worker_identity
+from ..config.settings import settings
+
+
+class QueueFullError(Exception):
+    """Raised when the mining queue cannot admit another job."""
+
+
+class MiningFailedError(Exception):
+    """Raised to callers waiting on a queued mining run that failed."""
+
+
+MiningRunner = Callable[[str, Dict[str, Any], bool], Awaitable[Dict[str, Any]]]
+
+
+class MiningQueue:
+    """Priority queue of mining requests backed by SQLite.
+
+    Submissions are stored on disk and picked up by worker tasks, so queued
+    work survives a restart. Higher ``priority`` runs first, ties run in
+    submission order. Several processes may share the database: a running
+    job holds a lease that its worker renews, and only jobs whose lease ran
+    out (their process died) are put back in the queue. A job is only
+    claimed while the jobs holding a live lease leave room for it, so the
+    ``concurrency`` limit applies to all processes together, not to each of
+    them. A sharded job takes one slot per shard, since each shard is a
+    miner run of its own. A cancelled job loses its lease, which stops it in
+    whichever worker runs it.
+
+    The database methods block; async code calls them through ``io_executor``.
+    """
+
+    def __init__(self, db_path: str = None, max_size: int = None, concurrency: int = None):
+        self.db_path = db_path or settings.mining_queue_db
+        self.max_size = settings.mining_queue_max_size if max_size is None else max_size
+        self.concurrency = concurrency or settings.mining_concurrency
+        self.poll_interval = settings.mining_queue_poll_interval
+        self.lease_seconds = settings.job_lease_seconds
+        self.owner = worker_identity()
+        self._lock = threading.Lock()
+        self._conn: Optional[sqlite3.Connection] = None
+        self._workers: List[asyncio.Task] = []
+        self._wakeup: Optional[asyncio.Event] = None
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        # Runs in progress in this process, by mining id
+        self._running: Dict[str, asyncio.Task] = {}
+        # Callers of ``submit_and_wait`` in this process, woken when their run ends here
+        self._waiters: Dict[str, asyncio.Event] = {}
+
+    def _db(self) -> sqlite3.Connection:
+        if self._conn is None:
+            os.makedirs(os.path.dirname(os.path.abspath(self.db_path)), exist_ok=True)
+            conn = sqlite3.connect(self.db_path, check_same_thread=False, isolation_level=None, timeout=30)
+            conn.row_factory = sqlite3.Row
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("""
+                CREATE TABLE IF NOT EXISTS mining_jobs (
+                    id TEXT PRIMARY KEY,
+                    job_id TEXT NOT NULL,
+                    config TEXT NOT NULL,
+                    use_cache INTEGER NOT NULL,
+                    priority INTEGER NOT NULL,
+                    status TEXT NOT NULL,
+                    submitted_at REAL NOT NULL,
+                    started_at REAL,
+                    finished_at REAL,
+                    result TEXT,
+                    error TEXT
+                )
+            """)
+            columns = {row['name'] for row in conn.execute("PRAGMA table_info(mining_jobs)")}
+            for column, column_type in (
+                ('lease_owner', 'TEXT'),
+                ('lease_expires', 'REAL'),
+                ('slots', 'INTEGER NOT NULL DEFAULT 1')
+            ):
+                if column not in columns:
+                    conn.execute(f"ALTER TABLE mining_jobs ADD COLUMN {column} {column_type}")
+            conn.execute(
+                "CREATE INDEX IF NOT EXISTS idx_mining_jobs_queue ON mining_jobs (status, priority, submitted_at)"
+            )
+            self._conn = conn
+        return self._conn
+
+    def submit(
+        self,
+        job_id: str,
+        mining_config: Dict[str, Any],
+        use_cache: bool = True,
+        priority: int = 0
+    ) -> Dict[str, Any]:
+        """Queue a mining run. Raises QueueFullError when the queue is at capacity."""
+        mining_id = uuid.uuid4().hex
+        with self._lock:
+            conn = self._db()
+            conn.execute("BEGIN IMMEDIATE")
+            try:
+                queued = conn.execute(
+                    "SELECT COUNT(*) FROM mining_jobs WHERE status = 'queued'"
+                ).fetchone()[0]
+                if queued >= self.max_size:
+                    raise QueueFullError(f"Mining queue is full ({queued} jobs waiting)")
+                conn.execute(
+                    "INSERT INTO mining_jobs (id, job_id, config, use_cache, priority, status, submitted_at, slots) "
+                    "VALUES (?, ?, ?, ?, ?, 'queued', ?, ?)",
+                    (mining_id, job_id, json.dumps(mining_config), int(use_cache), priority, time.time(),
+                     _slots(mining_config))
+                )
+                conn.execute("COMMIT")
+            except Exception:
+                conn.execute("ROLLBACK")
+                raise
+
+        self._notify()
+        return self.get(mining_id)
+
+    async def submit_and_wait(
+        self,
+        job_id: str,
+        mining_config: Dict[str, Any],
+        use_cache: bool = True,
+        priority: int = 0
+    ) -> Dict[str, Any]:
+        """Queue a mining run and return its result once a worker finished it.
+
+        Raises QueueFullError like ``submit``, JobCancelledError when the run
+        was cancelled and MiningFailedError when it failed. Cancelling the
+        caller cancels the run.
+        """
+        submission = asyncio.ensure_future(
+            io_executor.run(self.submit, job_id, mining_config, use_cache, priority)
+        )
+        try:
+            entry = await asyncio.shield(submission)
+            entry = await self.wait(entry['mining_id'])
+        except asyncio.CancelledError:
+            # The submission may have landed while the caller was leaving
+            entry = (await asyncio.gather(submission, return_exceptions=True))[0]
+            if isinstance(entry, dict):
+                await asyncio.shield(self.cancel(entry['mining_id']))
+            raise
+        if entry['status'] == 'cancelled':
+            raise JobCancelledError(f"Mining job {entry['mining_id']} was cancelled")
+        if entry['status'] == 'failed':
+            raise MiningFailedError(entry['error'])
+        return entry['result']
+
+    async def wait(self, mining_id: str) -> Optional[Dict[str, Any]]:
+        """Wait until a mining job is finished and return its entry.
+
+        Runs finished in this process end the wait at once, runs in other
+        processes are noticed by polling.
+        """
+        event = self._waiters.setdefault(mining_id, asyncio.Event())
+        try:
+            while True:
+                event.clear()
+                entry = await io_executor.run(self.get, mining_id)
+                if entry is None or entry['status'] not in ('queued', 'running'):
+                    return entry
+                try:
+                    async with asyncio.timeout(self.poll_interval):
+                        await event.wait()
+                except TimeoutError:
+                    pass
+        finally:
+            if self._waiters.get(mining_id) is event:
+                del self._waiters[mining_id]
+
+    def get(self, mining_id: str) -> Optional[Dict[str, Any]]:
+        """Return a queue entry with its current queue position."""
+        with self._lock:
+            row = self._db().execute("SELECT * FROM mining_jobs WHERE id = ?", (mining_id,)).fetchone()
+            return self._to_dict(row) if row else None
+
+    def latest_for_job(self, job_id: str) -> Optional[Dict[str, Any]]:
+        """Return the most recent queue entry for a graph job."""
+        with self._lock:
+            row = self._db().execute(
+                "SELECT * FROM mining_jobs WHERE job_id = ? ORDER BY submitted_at DESC LIMIT 1",
+                (job_id,)
+            ).fetchone()
+            return self._to_dict(row) if row else None
+
+    async def cancel(self, mining_id: str) -> Optional[Dict[str, Any]]:
+        """Cancel a queued or running mining job; returns its entry, or None if unknown.
+
+        A run in this process is stopped at once, one in another process at
+        its next lease renewal. Finished jobs are left as they are.
+        """
+        await self._cancel("id = ?", (mining_id,))
+        return await io_executor.run(self.get, mining_id)
+
+    async def cancel_job(self, job_id: str) -> List[str]:
+        """Cancel every queued or running mining job of a graph job; returns their ids."""
+        return await self._cancel("job_id = ?", (job_id,))
+
+    async def _cancel(self, condition: str, params: tuple) -> List[str]:
+        ids = await io_executor.run(self._cancel_entries, condition, params)
+        for mining_id in ids:
+            task = self._running.get(mining_id)
+            if task is not None:
+                task.cancel()
+            self._wake_waiter(mining_id)
+        return ids
+
+    def _cancel_entries(self, condition: str, params: tuple) -> List[str]:
+        with self._lock:
+            conn = self._db()
+            conn.execute("BEGIN IMMEDIATE")
+            try:
+                ids = [row['id'] for row in conn.execute(
+                    f"SELECT id FROM mining_jobs WHERE {condition} AND status IN ('queued', 'running')", params
+                )]
+                conn.execute(
+                    "UPDATE mining_jobs SET status = 'cancelled', finished_at = ?, error = 'Cancelled', "
+                    f"lease_owner = NULL, lease_expires = NULL WHERE {condition} AND status IN ('queued', 'running')",
+                    (time.time(), *params)
+                )
+                conn.execute("COMMIT")
+            except Exception:
+                conn.execute("ROLLBACK")
+                raise
+        return ids
+
+    def active_job_ids(self) -> Set[str]:
+        """Graph jobs with a mining run waiting or in progress."""
+        with self._lock:
+            rows = self._db().execute(
+                "SELECT DISTINCT job_id FROM mining_jobs WHERE status IN ('queued', 'running')"
+            ).fetchall()
+        return {row['job_id'] for row in rows}
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            rows = self._db().execute(
+                "SELECT status, COUNT(*) FROM mining_jobs GROUP BY status"
+            ).fetchall()
+        counts = {status: count for status, count in rows}
+        return {
+            'queued': counts.get('queued', 0),
+            'running': counts.get('running', 0),
+            'max_size': self.max_size,
+            'concurrency': self.concurrency
+        }
+
+    def _to_dict(self, row: sqlite3.Row) -> Dict[str, Any]:
+        """Convert a row to an API dict. Caller holds the lock."""
+        entry = {
+            'mining_id': row['id'],
+            'job_id': row['job_id'],
+            'status': row['status'],
+            'priority': row['priority'],
+            'submitted_at': row['submitted_at'],
+            'started_at': row['started_at'],
+            'finished_at': row['finished_at'],
+            'queue_position': None,
+            'result': json.loads(row['result']) if row['result'] else None,
+            'error': row['error']
+        }
+        if row['status'] == 'queued':
+            ahead = self._db().execute(
+                "SELECT COUNT(*) FROM mining_jobs WHERE status = 'queued' AND "
+                "(priority > ? OR (priority = ? AND submitted_at < ?))",
+                (row['priority'], row['priority'], row['submitted_at'])
+            ).fetchone()[0]
+            entry['queue_position'] = ahead + 1
+        return entry
+
+    def _claim(self) -> Optional[sqlite3.Row]:
+        """Atomically move the next queued job to 'running' if its slots are free.
+
+        The next job waits for room rather than being overtaken, so sharded
+        jobs are not starved by smaller ones.
+        """
+        with self._lock:
+            conn = self._db()
+            conn.execute("BEGIN IMMEDIATE")
+            try:
+                # Jobs whose lease ran out belong to dead workers and are about to be re-queued
+                used = conn.execute(
+                    "SELECT COALESCE(SUM(slots), 0) FROM mining_jobs WHERE status = 'running' AND lease_expires >= ?",
+                    (time.time(),)
+                ).fetchone()[0]
+                row = conn.execute(
+                    "SELECT * FROM mining_jobs WHERE status = 'queued' "
+                    "ORDER BY priority DESC, submitted_at ASC LIMIT 1"
+                ).fetchone()
+                if row is not None and used + min(row['slots'], self.concurrency) > self.concurrency:
+                    row = None
+                if row is not None:
+                    now = time.time()
+                    conn.execute(
+                        "UPDATE mining_jobs SET status = 'running', started_at = ?, lease_owner = ?, "
+                        "lease_expires = ? WHERE id = ?",
+                        (now, self.owner, now + self.lease_seconds, row['id'])
+                    )
+                conn.execute("COMMIT")
+                return row
+            except Exception:
+                conn.execute("ROLLBACK")
+                raise
+
+    def _finish(self, mining_id: str, status: str, result: Dict[str, Any] = None, error: str = None):
+        with self._lock:
+            self._db().execute(
+                "UPDATE mining_jobs SET status = ?, finished_at = ?, result = ?, error = ?, lease_owner = NULL, "
+                "lease_expires = NULL WHERE id = ? AND lease_owner = ?",
+                (status, time.time(), json.dumps(result) if result is not None else None, error, mining_id, self.owner)
+            )
+
+    def _renew(self, mining_id: str) -> bool:
+        with self._lock:
+            cursor = self._db().execute(
+                "UPDATE mining_jobs SET lease_expires = ? WHERE id = ? AND lease_owner = ? AND status = 'running'",
+                (time.time() + self.lease_seconds, mining_id, self.owner)
+            )
+            return cursor.rowcount == 1
+
+    def _release(self, mining_id: str):
+        with self._lock:
+            self._db().execute(
+                "UPDATE mining_jobs SET status = 'queued', started_at = NULL, lease_owner = NULL, "
+                "lease_expires = NULL WHERE id = ? AND lease_owner = ?",
+                (mining_id, self.owner)
+            )
+
+    def _requeue_expired(self) -> int:
+        """Put running jobs whose worker stopped renewing its lease back in the queue."""
+        with self._lock:
+            cursor = self._db().execute(
+                "UPDATE mining_jobs SET status = 'queued', started_at = NULL, lease_owner = NULL, "
+                "lease_expires = NULL WHERE status = 'running' AND (lease_expires IS NULL OR lease_expires < ?)",
+                (time.time(),)
+            )
+            return cursor.rowcount
+
+    async def start(self, runner: MiningRunner):
+        """Start the worker tasks. ``runner(job_id, mining_config, use_cache)`` does the mining."""
+        await self.stop()
+        requeued = await io_executor.run(self._requeue_expired)
+        if requeued:
+            print(f"Re-queued {requeued} mining jobs interrupted by a restart")
+        self._loop = asyncio.get_running_loop()
+        self._wakeup = asyncio.Event()
+        self._workers = [
+            asyncio.create_task(self._worker(runner))
+            for _ in range(self.concurrency)
+        ]
+
+    async def stop(self):
+        workers, self._workers = self._workers, []
+        for worker in workers:
+            worker.cancel()
+        await asyncio.gather(*workers, return_exceptions=True)
+        self._wakeup = None
+
+    def _notify(self):
+        """Wake the workers; safe to call from ``io_executor`` threads."""
+        if self._wakeup is not None:
+            self._loop.call_soon_threadsafe(self._wakeup.set)
+
+    def _wake_waiter(self, mining_id: str):
+        event = self._waiters.get(mining_id)
+        if event is not None:
+            event.set()
+
+    async def _worker(self, runner: MiningRunner):
+        while True:
+            self._wakeup.clear()
+            row = await io_executor.run(self._claim)
+            if row is None:
+                # Submissions and finished runs in this process wake us up,
+                # other processes are picked up by polling
+                # Not wait_for: it drops a cancellation that arrives as the event is set
+                try:
+                    async with asyncio.timeout(self.poll_interval):
+                        await self._wakeup.wait()
+                except TimeoutError:
+                    requeued = await io_executor.run(self._requeue_expired)
+                    if requeued:
+                        print(f"Re-queued {requeued} mining jobs whose worker stopped")
+                continue
+
+            mining_id = row['id']
+            print(f"DEBUG: Starting queued mining run {mining_id} for job {row['job_id']}")
+            task = asyncio.ensure_future(
+                runner(row['job_id'], json.loads(row['config']), bool(row['use_cache']))
+            )
+            self._running[mining_id] = task
+            heartbeat = asyncio.create_task(self._heartbeat(mining_id, task))
+            try:
+                result = await task
+                await io_executor.run(self._finish, mining_id, 'completed', result=result)
+            except asyncio.CancelledError:
+                if asyncio.current_task().cancelling():
+                    # Shutting down: hand the job back so the next worker starts it at once
+                    await io_executor.run(self._release, mining_id)
+                    raise
+                print(f"Queued mining run {mining_id} was stopped")
+            except JobCancelledError as e:
+                print(f"Queued mining run {mining_id} was cancelled")
+                await io_executor.run(self._finish, mining_id, 'cancelled', error=str(e))
+            except Exception as e:
+                print(f"Queued mining run {mining_id} failed: {e}")
+                await io_executor.run(self._finish, mining_id, 'failed', error=str(e))
+            finally:
+                heartbeat.cancel()
+                self._running.pop(mining_id, None)
+                self._wake_waiter(mining_id)
+                # The finished run's slot is free for a waiting job
+                self._notify()
+
+    async def _heartbeat(self, mining_id: str, task: asyncio.Task):
+        while True:
+            await asyncio.sleep(self.lease_seconds / 3)
+            if not await io_executor.run(self._renew, mining_id):
+                print(f"Lost the lease on mining run {mining_id}, stopping it")
+                task.cancel()
+                return
+
+
+def _slots(mining_config: Dict[str, Any]) -> int:
+    """Concurrent miner runs a job makes: one per shard (as clamped by the orchestrator)."""
+    n_shards = max(1, min(int(mining_config.get('n_shards') or 1), settings.mining_max_shards))
+    if mining_config.get('n_neighborhoods'):
+        n_shards = min(n_shards, int(mining_config['n_neighborhoods']))
+    return n_shards
@@ -0,0 +1,90 @@
+"""Expanding, grouping and summarizing mining parameter sweeps."""
+import hashlib
+import itertools
+import json
+import math
+import os
+from typing import Any, Dict, List, Optional
+from .motif_merge import load_motif_records
+
+# Mining parameters a sweep may vary
+SWEEP_PARAMS = (
+    'min_pattern_size', 'max_pattern_size', 'min_neighborhood_size', 'max_neighborhood_size',
+    'n_neighborhoods', 'n_trials', 'radius', 'graph_type', 'search_strategy', 'sample_method',
+    'graph_output_format', 'seed'
+)
+# Parameters that decide which neighborhoods the miner samples. Configs that
+# agree on all of them can share one sampling pass.
+SAMPLING_PARAMS = (
+    'min_neighborhood_size', 'max_neighborhood_size', 'n_neighborhoods', 'radius',
+    'graph_type', 'sample_method', 'seed'
+)
+
+
+def expand_sweep(
+    base_config: Dict[str, Any],
+    grid: Optional[Dict[str, List[Any]]] = None,
+    configs: Optional[List[Dict[str, Any]]] = None,
+    max_configs: int = None
+) -> List[Dict[str, Any]]:
+    """Build the list of mining configs of a sweep.
+
+    ``grid`` maps parameters to candidate values and contributes their
+    cartesian product, ``configs`` adds explicit overrides. Both are applied
+    on top of ``base_config``. Duplicates are dropped, order is kept.
+    """
+    if grid is not None and not isinstance(grid, dict):
+        raise ValueError("The sweep grid must be an object of parameter -> values")
+    if configs is not None and not isinstance(configs, list):
+        raise ValueError("Sweep configs must be a list")
+    overrides: List[Dict[str, Any]] = []
+    if grid:
+        for key, values in grid.items():
+            if not isinstance(values, list) or not values:
+                raise ValueError(f"Grid values for '{key}' must be a non-empty list")
+        combinations = math.prod(len(values) for values in grid.values())
+        if max_configs is not None and combinations > max_configs:
+            raise ValueError(f"Sweep grid has {combinations} combinations, the limit is {max_configs}")
+        keys = list(grid)
+        overrides.extend(dict(zip(keys, combination)) for combination in itertools.product(*grid.values()))
+    for override in configs or []:
+        if not isinstance(override, dict):
+            raise ValueError("Each sweep config must be an object")
+        overrides.append(override)
+    if not overrides:
+        raise ValueError("A sweep needs a grid or a list of configs")
+
+    expanded, seen = [], set()
+    for override in overrides:
+        unknown = set(override) - set(SWEEP_PARAMS)
+        if unknown:
+            raise ValueError(f"Unknown sweep parameters: {sorted(unknown)}")
+        config = {**base_config, **override}
+        key = json.dumps(config, sort_keys=True)
+        if key not in seen:
+            seen.add(key)
+            expanded.append(config)
+
+    if max_configs is not None and len(expanded) > max_configs:
+        raise ValueError(f"Sweep has {len(expanded)} configs, the limit is {max_configs}")
+    return expanded
+
+
+def sampling_group(config: Dict[str, Any]) -> str:
+    """Identifier shared by configs that sample the same neighborhoods."""
+    sampling = {key: config.get(key) for key in SAMPLING_PARAMS}
+    return hashlib.sha256(json.dumps(sampling, sort_keys=True, default=str).encode('utf-8')).hexdigest()[:12]
+
+
+def summarize_output(config_dir: str) -> Dict[str, int]:
+    """Number of motifs in each JSON results file of one sweep config."""
+    counts = {}
+    results_dir = os.path.join(config_dir, 'results')
+    for root, _, files in os.walk(results_dir):
+        for filename in sorted(files):
+            if filename.endswith('.json'):
+                path = os.path.join(root, filename)
+                records, _, _ = load_motif_records(path)
+                if records is not None:
+                    counts[os.path.relpath(path, results_dir)] = len(records)
+    return counts
@@ -0,0 +1,184 @@
+"""Reading miner motif records and merging sharded mining output."""
+import json
+import os
+import shutil
+from typing import Any, Dict, List, Optional, Tuple
+
+# Fields that identify the same motif across independent miner runs, best first
+IDENTITY_KEYS = ('canonical_hash', 'canonical_form', 'canonical', 'wl_hash', 'pattern_hash', 'hash', 'pattern')
+# Structural fields used as an identity when no explicit hash is present
+STRUCTURE_KEYS = ('nodes', 'edges', 'node_labels', 'edge_labels')
+# Fields holding how often a motif was found; these add up across shards
+COUNT_KEYS = ('count', 'occurrences', 'n_instances')
+# Fields holding how often a motif was found relative to the sample; averaged across shards
+RATIO_KEYS = ('frequency', 'support')
+# Wrapper keys under which a results file may keep its list of motifs
+LIST_KEYS = ('motifs', 'patterns', 'results')
+
+
+def load_motif_records(path: str) -> Tuple[Optional[List[Dict[str, Any]]], Optional[Dict[str, Any]], Optional[str]]:
+    """Load motif records from a miner JSON results file.
+
+    Returns ``(records, wrapper, list_key)``. ``records`` is None when the file
+    is not a list of motif objects. ``wrapper`` is the enclosing object (or
+    None for a bare list) and ``list_key`` the key the list was found under.
+    """
+    try:
+        with open(path, 'r') as f:
+            payload = json.load(f)
+    except (OSError, ValueError):
+        return None, None, None
+
+    if isinstance(payload, list):
+        records, wrapper, list_key = payload, None, None
+    elif isinstance(payload, dict):
+        list_key = next((key for key in LIST_KEYS if isinstance(payload.get(key), list)), None)
+        if list_key is None:
+            return None, None, None
+        records, wrapper = payload[list_key], payload
+    else:
+        return None, None, None
+
+    if not records or not all(isinstance(record, dict) for record in records):
+        return None, None, None
+    return records, wrapper, list_key
+
+
+def motif_identity(record: Dict[str, Any]) -> Optional[str]:
+    """A key that is equal for the same motif found by different runs."""
+    for key in IDENTITY_KEYS:
+        if record.get(key) is not None:
+            value = record[key]
+            return value if isinstance(value, str) else json.dumps(value, sort_keys=True)
+    structure = {key: record[key] for key in STRUCTURE_KEYS if key in record}
+    if structure:
+        return json.dumps(structure, sort_keys=True, default=str)
+    return None
+
+
+def motif_count(record: Dict[str, Any]) -> Tuple[Optional[str], float]:
+    """Return the field name and value saying how often a motif was found.
+
+    Absolute counts win over ratios; both rank motifs the same way.
+    """
+    return _number(record, COUNT_KEYS + RATIO_KEYS)
+
+
+def _number(record: Dict[str, Any], keys: Tuple[str, ...]) -> Tuple[Optional[str], float]:
+    for key in keys:
+        value = record.get(key)
+        if isinstance(value, (int, float)) and not isinstance(value, bool):
+            return key, value
+    return None, 0
+
+
+def merge_motif_records(shard_records: List[List[Dict[str, Any]]]) -> List[Dict[str, Any]]:
+    """Merge motif lists from several shards.
+
+    Counts of the same motif are summed, ratios such as ``frequency`` are
+    averaged over the shards that report them, and the representative is
+    taken from the shard that found it most often. Records without an
+    identity are kept as they are. The result is sorted by count, highest
+    first.
+    """
+    merged: Dict[str, Dict[str, Any]] = {}
+    best_count: Dict[str, float] = {}
+    ratios: Dict[str, Dict[str, List[float]]] = {}
+    unmatched: List[Dict[str, Any]] = []
+
+    for records in shard_records:
+        for record in records:
+            identity = motif_identity(record)
+            if identity is None:
+                unmatched.append(dict(record))
+                continue
+            rank = motif_count(record)[1]
+            count_key, count = _number(record, COUNT_KEYS)
+            for key in RATIO_KEYS:
+                ratio_key, value = _number(record, (key,))
+                if ratio_key:
+                    ratios.setdefault(identity, {}).setdefault(key, []).append(value)
+            if identity not in merged:
+                merged[identity] = dict(record)
+                merged[identity]['shards'] = 1
+                best_count[identity] = rank
+                continue
+
+            entry = merged[identity]
+            total_key, total = _number(entry, COUNT_KEYS)
+            if rank > best_count[identity]:
+                # Keep the richest representative but carry the running total over
+                shards = entry['shards']
+                merged[identity] = entry = dict(record)
+                entry['shards'] = shards
+                best_count[identity] = rank
+            entry['shards'] += 1
+            if count_key or total_key:
+                entry[count_key or total_key] = total + count
+
+    for identity, values in ratios.items():
+        for key, found in values.items():
+            merged[identity][key] = sum(found) / len(found)
+
+    combined = list(merged.values()) + unmatched
+    combined.sort(key=lambda record: motif_count(record)[1], reverse=True)
+    return combined
+
+
+def merge_shard_outputs(shard_dirs: List[str], job_dir: str) -> Dict[str, Any]:
+    """Merge the ``results/`` and ``plots/`` of shard runs into ``job_dir``.
+
+    JSON motif lists that appear in several shards are merged record by
+    record. Every other file is kept per shard under ``shards/<n>/`` so
+    nothing the miner produced is lost.
+    """
+    results_dir = os.path.join(job_dir, 'results')
+    plots_dir = os.path.join(job_dir, 'plots')
+    for path in (results_dir, plots_dir):
+        if os.path.exists(path):
+            shutil.rmtree(path)
+        os.makedirs(path)
+
+    # filename -> [(records, wrapper, list_key), ...] across shards
+    motif_files: Dict[str, List[Tuple[List[Dict[str, Any]], Optional[Dict[str, Any]], Optional[str]]]] = {}
+    for index, shard_dir in enumerate(shard_dirs):
+        shard_results = os.path.join(shard_dir, 'results')
+        if os.path.isdir(shard_results):
+            for root, _, files in os.walk(shard_results):
+                for filename in files:
+                    src = os.path.join(root, filename)
+                    relative = os.path.relpath(src, shard_results)
+                    if filename.endswith('.json'):
+                        loaded = load_motif_records(src)
+                        if loaded[0] is not None:
+                            motif_files.setdefault(relative, []).append(loaded)
+                            continue
+                    _copy(src, os.path.join(results_dir, 'shards', str(index), relative))
+
+        shard_plots = os.path.join(shard_dir, 'plots')
+        if os.path.isdir(shard_plots):
+            shutil.copytree(shard_plots, os.path.join(plots_dir, f"shard_{index}"))
+
+    merged_counts = {}
+    for relative, loaded in motif_files.items():
+        records = merge_motif_records([records for records, _, _ in loaded])
+        _, wrapper, list_key = loaded[0]
+        payload = records if wrapper is None else {**wrapper, list_key: records}
+        target = os.path.join(results_dir, relative)
+        os.makedirs(os.path.dirname(target), exist_ok=True)
+        with open(target, 'w') as f:
+            json.dump(payload, f, indent=2)
+        merged_counts[relative] = len(records)
+
+    summary = {
+        'shards': len(shard_dirs),
+        'merged_files': merged_counts
+    }
+    with open(os.path.join(results_dir, 'shard_summary.json'), 'w') as f:
+        json.dump(summary, f, indent=2)
+    return summary
+
+
+def _copy(src: str, dst: str):
+    os.makedirs(os.path.dirname(dst), exist_ok=True)
+    shutil.copy2(src, dst)
@@ -0,0 +1,131 @@
+"""Streaming multipart/form-data bodies for large CSV uploads."""
+import hashlib
+import os
+import uuid
+from typing import AsyncIterator, Dict, List, Sequence, Tuple
+import aiofiles
+from .io_executor import io_executor
+from .metrics import BYTES_TOTAL
+from ..config.settings import settings
+
+
+def _to_str(value) -> str:
+    """Render a form value the way httpx does (booleans as ``true``/``false``)."""
+    if value is True:
+        return 'true'
+    if value is False:
+        return 'false'
+    return str(value)
+
+
+def _quote(value: str) -> str:
+    """Escape a header parameter value the same way browsers and httpx do."""
+    return value.replace('\\', '\\\\').replace('"', '%22').replace('\r', '%0D').replace('\n', '%0A')
+
+
+class AsyncMultipartStream:
+    """Multipart body that reads files from disk in chunks while it is sent.
+
+    Unlike passing open file objects to httpx, nothing is read on the event
+    loop and the files never have to fit in memory. The total length is known
+    up front, so the upstream request carries a Content-Length header.
+    """
+
+    def __init__(
+        self,
+        data: Dict[str, str],
+        files: List[Sequence[str]],
+        chunk_size: int = None
+    ):
+        """
+        Args:
+            data: Plain form fields.
+            files: ``(field_name, file_path, content_type[, filename])`` tuples;
+                the filename defaults to the basename of the path.
+            chunk_size: Bytes read per chunk, defaults to ``UPLOAD_CHUNK_SIZE``.
+        """
+        self.boundary = uuid.uuid4().hex
+        self.chunk_size = chunk_size or settings.upload_chunk_size
+        self._fields = [
+            (self._field_header(name), _to_str(value).encode('utf-8'))
+            for name, value in data.items()
+            if value is not None
+        ]
+        self._files = [
+            (self._file_header(name, path, content_type, *rest), path)
+            for name, path, content_type, *rest in files
+        ]
+
+    @property
+    def content_type(self) -> str:
+        return f"multipart/form-data; boundary={self.boundary}"
+
+    async def headers(self) -> Dict[str, str]:
+        return {
+            "Content-Type": self.content_type,
+            "Content-Length": str(await self.content_length())
+        }
+
+    async def content_length(self) -> int:
+        length = len(self._closing)
+        for header, value in self._fields:
+            length += len(header) + len(value) + 2
+        for header, path in self._files:
+            length += len(header) + await io_executor.run(os.path.getsize, path) + 2
+        return length
+
+    @property
+    def _closing(self) -> bytes:
+        return f"--{self.boundary}--\r\n".encode('ascii')
+
+    def _field_header(self, name: str) -> bytes:
+        return (
+            f"--{self.boundary}\r\n"
+            f"Content-Disposition: form-data; name=\"{_quote(name)}\"\r\n\r\n"
+        ).encode('utf-8')
+
+    def _file_header(self, name: str, path: str, content_type: str, filename: str = None) -> bytes:
+        filename = filename or os.path.basename(path)
+        return (
+            f"--{self.boundary}\r\n"
+            f"Content-Disposition: form-data; name=\"{_quote(name)}\"; "
+            f"filename=\"{_quote(filename)}\"\r\n"
+            f"Content-Type: {content_type}\r\n\r\n"
+        ).encode('utf-8')
+
+    async def __aiter__(self) -> AsyncIterator[bytes]:
+        for header, value in self._fields:
+            yield header + value + b"\r\n"
+
+        for header, path in self._files:
+            yield header
+            async with aiofiles.open(path, 'rb') as f:
+                while True:
+                    chunk = await f.read(self.chunk_size)
+                    if not chunk:
+                        break
+                    yield chunk
+            yield b"\r\n"
+
+        yield self._closing
+
+
+async def save_upload(upload, destination: str, chunk_size: int = None) -> Tuple[int, str]:
+    """Copy a FastAPI ``UploadFile`` to ``destination`` chunk by chunk.
+
+    Returns the number of bytes written and the SHA-256 of the content.
+    """
+    chunk_size = chunk_size or settings.upload_chunk_size
+    written = 0
+    digest = hashlib.sha256()
+    async with aiofiles.open(destination, 'wb') as out:
+        while True:
+            chunk = await upload.read(chunk_size)
+            if not chunk:
+                break
+            digest.update(chunk)
+            await out.write(chunk)
+            written += len(chunk)
+    await upload.close()
+    BYTES_TOTAL.inc(written, direction='upload')
+    return written, digest.hexdigest()
@@ -6,10 +6,70 @@ import tempfile
 import shutil
 import json
 import asyncio
-from typing import Dict, Any, List, Optional  
+import logging
+import hashlib
+import random
+import time
+import stat
+from typing import Dict, Any, List, Optional, Tuple  
 from .miner_service import MinerService  
+from .multipart_stream import AsyncMultipartStream
+from .http_clients import http_clients
+from .result_cache import MiningResultCache
+from .csv_cache import CsvCache
+from .mining_queue import MiningQueue
+from .single_flight import SingleFlight
+from .motif_merge import merge_shard_outputs
+from .mining_sweep import sampling_group, summarize_output
+from .result_publisher import ResultPublisher
+from .archive_service import ArchiveService, JobArchive
+from .progress_hub import TERMINAL_STATUSES, ProgressHub
+from .job_registry import JobCancelledError, JobRegistry
+from .retention import RetentionEngine
+from . import graph_csr
+from . import graph_profile
+from . import result_index
+from .graph_delta import apply_delta_files
+from .io_executor import io_executor, write_json_atomic
+from .metrics import CANCELLATIONS, metrics, timed, cache_collector
 from ..config.settings import settings  
+
+logger = logging.getLogger(__name__)
   
+def _request_key(payload: Dict[str, Any]) -> str:
+    """Stable hash of request parameters, used to detect identical requests."""
+    return hashlib.sha256(json.dumps(payload, sort_keys=True, default=str).encode('utf-8')).hexdigest()
+
+def _move_outputs(run_dir: str, target_dir: str):
+    """Move a miner run's results/ and plots/ into ``target_dir``."""
+    os.makedirs(target_dir, exist_ok=True)
+    for name in ("results", "plots"):
+        src = os.path.join(run_dir, name)
+        dst = os.path.join(target_dir, name)
+        if os.path.exists(dst):
+            shutil.rmtree(dst)
+        if os.path.isdir(src):
+            os.replace(src, dst)
+
+def _copy_mork_outputs(mork_dir: str, mork_subdir: str):
+    """Copy the Mork writer's files (not its schema or load report) next to the graph."""
+    os.makedirs(mork_subdir, exist_ok=True)
+    for filename in os.listdir(mork_dir):
+        if filename in ["schema.json", "neo4j_load_result.json"]:
+            continue
+        src_path = os.path.join(mork_dir, filename)
+        if os.path.isfile(src_path):
+            shutil.copy2(src_path, os.path.join(mork_subdir, filename))
+
+def _write_temp_json(text: str) -> str:
+    with tempfile.NamedTemporaryFile(mode='w', suffix='.json', delete=False) as f:
+        f.write(text)
+        return f.name
+
+def _is_inside(path: str, directory: str) -> bool:
+    """True if absolute ``path`` lies strictly below ``directory``."""
+    return path != directory and os.path.commonpath([path, directory]) == directory
+
 class OrchestrationService:  
     """Main pipeline orchestrator."""  
             
@@ -17,7 +77,59 @@ class OrchestrationService:
         self.miner_service = MinerService()  
         self.atomspace_url = settings.atomspace_url  
         self.timeout = settings.atomspace_timeout  
-        self.local_output_dir = "/app/output"
+        self.local_output_dir = settings.local_output_dir
+        self.shared_output_dir = settings.shared_volume_path
+        self.staged_uploads = settings.atomspace_staged_uploads
+        # Cleared when the builder has no /api/update endpoint for graph deltas
+        self.builder_updates = True
+        self.result_cache = MiningResultCache()
+        self.csv_cache = CsvCache()
+        self.result_publisher = ResultPublisher()
+        self.archive_service = ArchiveService(self.local_output_dir)
+        self.progress_hub = ProgressHub(self.shared_output_dir, self.mining_status)
+        self.mining_queue = MiningQueue()
+        self.graph_flight = SingleFlight('generate-graph')
+        self.mining_flight = SingleFlight('mine-patterns')
+        self.csr_flight = SingleFlight('graph-csr')
+        self.profile_flight = SingleFlight('graph-profile')
+        self.index_flight = SingleFlight('result-index')
+        # Background work of graph jobs, resumable by any worker after a restart
+        self.job_registry = JobRegistry()
+        self.job_registry.register('mork', self._run_mork_subtask)
+        self.job_registry.register('merge', self._run_merge_subtask, on_cancel=self._discard_merge)
+        self.job_registry.register('graph_csr', self._run_graph_csr_subtask)
+        self.job_registry.register('graph_profile', self._run_graph_profile_subtask)
+        self.job_registry.register('result_index', self._run_result_index_subtask)
+        # Deletes old job artifacts and garbage (Mork copies, stale archives) in the background
+        self.retention = RetentionEngine(
+            self.shared_output_dir,
+            self.local_output_dir,
+            self.archive_service,
+            self.job_registry,
+            self.mining_queue,
+            self.csv_cache
+        )
+        self._background_tasks = set()
+        # Mining runs in progress in this process, by graph job id
+        self._mining_runs: Dict[str, set] = {}
+        metrics.add_collector('mining_cache', cache_collector('mining', self.result_cache.stats))
+        metrics.add_collector('csv_cache', cache_collector('csv', self.csv_cache.stats))
+        metrics.add_collector('orchestration', self._collect_metrics)
+        metrics.add_collector('retention', self.retention.collect)
+    
+    async def startup(self):
+        """Start background workers (called from the application lifespan)."""
+        await self.miner_service.pool.start()
+        await self.mining_queue.start(self.run_queued_mining)
+        await self.job_registry.start()
+        await self.retention.start()
+    
+    async def shutdown(self):
+        await self.retention.stop()
+        await self.progress_hub.close()
+        await self.job_registry.stop()
+        await self.mining_queue.stop()
+        await self.miner_service.pool.stop()
     
     async def generate_networkx(
         self,
@@ -27,74 +139,154 @@ class OrchestrationService:
         writer_type: str,
         graph_type: str = "directed",
         tenant_id: str = "default",
-        cleanup_dir: str = None
+        cleanup_dir: str = None,
+        file_digests: Dict[str, str] = None
     ) -> Dict[str, Any]:
-        """Generate NetworkX graph from CSV files, with auxiliary Mork generation in background."""
-        import asyncio
-        
+        """Generate NetworkX graph from CSV files, with auxiliary Mork generation in background.
 
+        When ``file_digests`` (filename -> SHA-256) is given, concurrent requests
+        with identical files and parameters share a single builder run, and a
+        dataset that was built before returns its existing graph job.
+        """
+        if file_digests is None:
+            return await self._generate_networkx(
+                csv_files, config, schema_json, writer_type, graph_type, tenant_id, cleanup_dir
+            )
+        
+        key = _request_key({
+            'files': sorted(file_digests.items()),
+            'config': config,
+            'schema_json': schema_json,
+            'writer_type': writer_type,
+            'graph_type': graph_type,
+            'tenant_id': tenant_id
+        })
+        cached_job_id = await io_executor.run(self.csv_cache.lookup_dataset, key, self._graph_exists)
+        if cached_job_id is not None:
+            print(f"Dataset already built as job {cached_job_id}, skipping the builder")
+            self.retention.touch(cached_job_id)
+            if cleanup_dir:
+                await io_executor.remove_tree(cleanup_dir)
+            return {
+                "job_id": cached_job_id,
+                "status": "success",
+                "networkx_file": f"{self.shared_output_dir}/{cached_job_id}/networkx_graph.pkl",
+                "cached": True,
+                "coalesced": False
+            }
         
+        result, shared = await self.graph_flight.do(
+            key,
+            lambda: self._generate_networkx(
+                csv_files, config, schema_json, writer_type, graph_type, tenant_id, cleanup_dir
+            )
+        )
+        if shared and cleanup_dir:
+            # Our copy of the upload was never used, the leader's run owns its own
+            await io_executor.remove_tree(cleanup_dir)
+        if not shared and result.get("status") == "success":
+            await io_executor.run(self.csv_cache.record_dataset, key, result["job_id"], file_digests)
+        if result.get("status") == "success":
+            self.retention.touch(result["job_id"])
+        return {**result, "cached": False, "coalesced": shared}
+    
+    def _collect_metrics(self):
+        """Queue, registry, coalescing, miner and I/O pool state for ``/metrics``."""
+        queue = self.mining_queue.stats()
+        yield ('integration_mining_queue_jobs', 'gauge', 'Mining jobs by queue state',
+               [({'state': state}, queue[state]) for state in ('queued', 'running')])
+        registry = self.job_registry.stats()
+        yield ('integration_subtasks', 'gauge', 'Graph job subtasks in the shared registry by state',
+               [({'state': state}, registry[state])
+                for state in ('pending', 'running', 'completed', 'failed', 'cancelled')])
+        flights = {
+            'generate_graph': self.graph_flight,
+            'mine_patterns': self.mining_flight,
+            'graph_csr': self.csr_flight,
+            'graph_profile': self.profile_flight,
+            'result_index': self.index_flight
+        }
+        yield ('integration_coalesced_requests_total', 'counter', 'Duplicate requests served by an in-flight run',
+               [({'operation': name}, flight.stats()['duplicates_saved']) for name, flight in flights.items()])
+        yield ('integration_jobs_in_flight', 'gauge', 'Distinct runs in progress in this process',
+               [({'operation': name}, flight.stats()['in_flight']) for name, flight in flights.items()])
+        miners = self.miner_service.pool.stats()
+        yield ('integration_miner_in_flight', 'gauge', 'Requests in progress per miner replica',
+               [({'miner': miner['url']}, miner['in_flight']) for miner in miners])
+        yield ('integration_miner_healthy', 'gauge', 'Whether a miner replica passes health checks',
+               [({'miner': miner['url']}, int(miner['healthy'])) for miner in miners])
+        io_stats = io_executor.stats()
+        yield ('integration_io_in_flight', 'gauge', 'Filesystem operations running or waiting for an I/O thread',
+               [({}, io_stats['in_flight'])])
+    
+    def _graph_exists(self, job_id: str) -> bool:
+        return os.path.exists(os.path.join(self.shared_output_dir, job_id, "networkx_graph.pkl"))
+    
+    async def _generate_networkx(
+        self,
+        csv_files: List[str],
+        config: str,
+        schema_json: str,
+        writer_type: str,
+        graph_type: str = "directed",
+        tenant_id: str = "default",
+        cleanup_dir: str = None
+    ) -> Dict[str, Any]:
         try:
-            with tempfile.NamedTemporaryFile(mode='w', suffix='.json', delete=False) as config_file:  
-                config_file.write(config)  
-                config_path = config_file.name  
-                
-            with tempfile.NamedTemporaryFile(mode='w', suffix='.json', delete=False) as schema_file:  
-                schema_file.write(schema_json)  
-                schema_path = schema_file.name  
+            config_path = await io_executor.run(_write_temp_json, config)
+            schema_path = await io_executor.run(_write_temp_json, schema_json)
                 
             try:
                 # Main NetworkX generation
                 print("DEBUG: Starting Main NetworkX generation...")
-                async with httpx.AsyncClient(timeout=self.timeout) as client:
-                    files = []
-                    for csv_file_path in csv_files:
-                        csv_file = open(csv_file_path, 'rb')
-                        files.append(('files', (os.path.basename(csv_file_path), csv_file, 'text/csv')))
+                client = http_clients.atomspace
+                # Stage the CSVs once so the NetworkX and Mork writers share one upload
+                session_id = await self._stage_upload(client, csv_files, tenant_id)
+                
+                data = {
+                    'config': config,
+                    'schema_json': schema_json,
+                    'writer_type': writer_type,
+                    'graph_type': graph_type,
+                    'tenant_id': tenant_id
+                }
                     
-                    data = {
-                        'config': config,
-                        'schema_json': schema_json,
-                        'writer_type': writer_type,
-                        'graph_type': graph_type,
-                        'tenant_id': tenant_id
-                    }
-                        
-                    response = await client.post(
-                        f"{self.atomspace_url}/api/load",
-                        files=files,
-                        data=data
-                    )
-                        
-                    for _, (_, file_obj, _) in files:
-                        file_obj.close()
-                        
-                    if response.status_code != 200:
-                        print(f"DEBUG: AtomSpace API failed. Status: {response.status_code}, Body: {response.text}")
-                        raise RuntimeError(f"AtomSpace returned {response.status_code}: {response.text}")
-                        
-                    result = response.json()
-                    print(f"DEBUG: AtomSpace API success. Response: {result}")
-                    nx_job_id = result['job_id']
+                with timed('builder_load', writer=writer_type, staged=bool(session_id)):
+                    response = await self._post_load(client, csv_files, data, session_id)
                     
-                    # Start Mork generation sequentially AFTER NetworkX is done
-                    print(f"DEBUG: Starting sequential Mork generation for job {nx_job_id}")
-                    mork_task = asyncio.create_task(
-                        self._generate_auxiliary_mork(
-                            csv_files,
-                            config,
-                            schema_json,
-                            graph_type,
-                            tenant_id
-                        )
-                    )
+                if response.status_code != 200:
+                    print(f"DEBUG: AtomSpace API failed. Status: {response.status_code}, Body: {response.text}")
+                    raise RuntimeError(f"AtomSpace returned {response.status_code}: {response.text}")
                     
-                    # Now that we have the nx_job_id, we can start the merge task
-                    # and clean up when both are done.
-                    print("DEBUG: Creating merge task")
-                    asyncio.create_task(self._merge_mork_results(nx_job_id, mork_task, cleanup_dir))
+                result = response.json()
+                print(f"DEBUG: AtomSpace API success. Response: {result}")
+                nx_job_id = result['job_id']
+                
+                # Mork generation, then the merge into the NetworkX job folder and
+                # cleanup, run as registered subtasks so they resume after a restart
+                print(f"DEBUG: Registering Mork generation and merge for job {nx_job_id}")
+                registry = self.job_registry
+                await io_executor.run(registry.create_job, nx_job_id, 'graph', {
+                    'writer_type': writer_type,
+                    'graph_type': graph_type,
+                    'tenant_id': tenant_id
+                })
+                mork_id = await io_executor.run(registry.add_subtask, nx_job_id, 'mork', {
+                    'csv_files': csv_files,
+                    'config': config,
+                    'schema_json': schema_json,
+                    'graph_type': graph_type,
+                    'tenant_id': tenant_id,
+                    'session_id': session_id
+                })
+                await io_executor.run(
+                    registry.add_subtask,
+                    nx_job_id, 'merge', {'nx_job_id': nx_job_id, 'cleanup_dir': cleanup_dir}, depends_on=mork_id
+                )
+                await io_executor.run(self._add_graph_subtasks, nx_job_id)
+                self._spawn(registry.run_job(nx_job_id, concurrency=2))
                     
-                networkx_file = f"/shared/output/{nx_job_id}/networkx_graph.pkl"
+                networkx_file = f"{self.shared_output_dir}/{nx_job_id}/networkx_graph.pkl"
                     
                 return {
                     "job_id": nx_job_id,
@@ -102,10 +294,8 @@ class OrchestrationService:
                     "networkx_file": networkx_file
                 }
             finally:
-                if config_path and os.path.exists(config_path):
-                    os.unlink(config_path)
-                if schema_path and os.path.exists(schema_path):
-                    os.unlink(schema_path)
+                await io_executor.remove_file(config_path)
+                await io_executor.remove_file(schema_path)
                 
         except Exception as e:
             return {"status": "error", "error": str(e)}
@@ -113,104 +303,542 @@ class OrchestrationService:
         except Exception as e:
             return {"status": "error", "error": str(e)}
 
+    async def update_networkx(
+        self,
+        base_job_id: str,
+        added_csvs: List[str],
+        removed_csvs: List[str],
+        config: str,
+        schema_json: str,
+        graph_type: str = "directed",
+        tenant_id: str = "default",
+        retire_base: bool = False
+    ) -> Dict[str, Any]:
+        """Build a new graph version from an existing job plus added/removed CSV rows.
+
+        The builder applies the delta itself when it offers ``/api/update``.
+        Otherwise it loads only the delta CSVs into small graphs, which are
+        merged into a copy of the base graph here, so the builder never
+        re-reads the full dataset. The new version gets its own job_id and a
+        ``lineage.json``. Mining results are keyed on graph content, so the
+        base job's cached results stay valid for the base; ``retire_base``
+        drops them when the base will not be mined again.
+        """
+        base_dir = os.path.abspath(os.path.join(self.shared_output_dir, base_job_id))
+        if base_job_id.startswith('.') or not _is_inside(base_dir, os.path.abspath(self.shared_output_dir)):
+            raise ValueError(f"Invalid job_id: {base_job_id}")
+        base_file = os.path.join(base_dir, "networkx_graph.pkl")
+        if not await io_executor.exists(base_file):
+            raise FileNotFoundError(f"NetworkX file not found for job_id: {base_job_id}")
+        if not added_csvs and not removed_csvs:
+            raise ValueError("A graph update needs added or removed CSV files")
+        self.retention.touch(base_job_id)
+        
+        data = {
+            'config': config,
+            'schema_json': schema_json,
+            'writer_type': 'networkx',
+            'graph_type': graph_type,
+            'tenant_id': tenant_id
+        }
+        client = http_clients.atomspace
+        
+        job_id = await self._builder_update(client, base_job_id, added_csvs, removed_csvs, data)
+        if job_id is not None:
+            method = "builder"
+            stats = {}
+        else:
+            method = "merged"
+            job_id = str(uuid.uuid4())
+            delta_jobs = {}
+            try:
+                for name, csv_files in (("added", added_csvs), ("removed", removed_csvs)):
+                    if csv_files:
+                        delta_jobs[name] = await self._load_delta_graph(client, csv_files, data)
+                stats = await io_executor.run(
+                    apply_delta_files,
+                    base_file,
+                    os.path.join(self.shared_output_dir, job_id, "networkx_graph.pkl"),
+                    added_path=self._delta_graph_file(delta_jobs.get("added")),
+                    removed_path=self._delta_graph_file(delta_jobs.get("removed"))
+                )
+            except BaseException:
+                await io_executor.remove_tree(os.path.join(self.shared_output_dir, job_id))
+                raise
+            finally:
+                for delta_job_id in delta_jobs.values():
+                    await io_executor.remove_tree(os.path.join(self.shared_output_dir, delta_job_id))
+        
+        lineage = await io_executor.run(
+            self._write_lineage, base_job_id, job_id, method, stats, added_csvs, removed_csvs
+        )
+        await io_executor.run(
+            self.job_registry.create_job, job_id, 'graph_update', {'parent_job_id': base_job_id, 'method': method}
+        )
+        if await io_executor.run(self._add_graph_subtasks, job_id):
+            self._spawn(self.job_registry.run_job(job_id))
+        else:
+            await io_executor.run(self.job_registry.update_job, job_id, 'completed')
+        
+        invalidated = 0
+        if retire_base:
+            invalidated = await io_executor.run(self.result_cache.invalidate, job_id=base_job_id)
+            print(f"DEBUG: Retired graph {base_job_id}, dropped {invalidated} cached mining results")
+        
+        return {
+            "job_id": job_id,
+            "parent_job_id": base_job_id,
+            "version": lineage["version"],
+            "status": "success",
+            "method": method,
+            "delta": stats,
+            "invalidated_cache_entries": invalidated,
+            "networkx_file": f"{self.shared_output_dir}/{job_id}/networkx_graph.pkl"
+        }
+    
+    async def _builder_update(
+        self,
+        client: httpx.AsyncClient,
+        base_job_id: str,
+        added_csvs: List[str],
+        removed_csvs: List[str],
+        data: Dict[str, str]
+    ) -> Optional[str]:
+        """Ask the builder to apply the delta. Returns None if it cannot."""
+        if not self.builder_updates:
+            return None
+        
+        body = AsyncMultipartStream(
+            data={**data, 'base_job_id': base_job_id},
+            files=[('added_files', path, 'text/csv') for path in added_csvs]
+            + [('removed_files', path, 'text/csv') for path in removed_csvs]
+        )
+        response = await client.post(f"{self.atomspace_url}/api/update", content=body, headers=await body.headers())
+        if response.status_code in (404, 405):
+            print("DEBUG: AtomSpace builder has no update endpoint, merging graph deltas locally")
+            self.builder_updates = False
+            return None
+        if response.status_code != 200:
+            raise RuntimeError(f"AtomSpace update returned {response.status_code}: {response.text}")
+        return response.json()['job_id']
+    
+    async def _load_delta_graph(self, client: httpx.AsyncClient, csv_files: List[str], data: Dict[str, str]) -> str:
+        """Have the builder turn delta CSV rows into a (small) graph. Returns its job_id."""
+        response = await self._post_load(client, csv_files, data)
+        if response.status_code != 200:
+            raise RuntimeError(f"AtomSpace returned {response.status_code}: {response.text}")
+        return response.json()['job_id']
+    
+    def _delta_graph_file(self, delta_job_id: Optional[str]) -> Optional[str]:
+        if delta_job_id is None:
+            return None
+        return os.path.join(self.shared_output_dir, delta_job_id, "networkx_graph.pkl")
+    
+    def _write_lineage(
+        self,
+        base_job_id: str,
+        job_id: str,
+        method: str,
+        stats: Dict[str, Any],
+        added_csvs: List[str],
+        removed_csvs: List[str]
+    ) -> Dict[str, Any]:
+        """Record where a graph version came from and carry the base metadata over."""
+        base_dir = os.path.join(self.shared_output_dir, base_job_id)
+        job_dir = os.path.join(self.shared_output_dir, job_id)
+        
+        parent = {}
+        try:
+            with open(os.path.join(base_dir, "lineage.json"), 'r') as f:
+                parent = json.load(f)
+        except (OSError, ValueError):
+            pass
+        lineage = {
+            "job_id": job_id,
+            "parent_job_id": base_job_id,
+            "root_job_id": parent.get("root_job_id", base_job_id),
+            "version": parent.get("version", 1) + 1,
+            "method": method,
+            "created_at": time.time(),
+            "added_files": [os.path.basename(path) for path in added_csvs],
+            "removed_files": [os.path.basename(path) for path in removed_csvs],
+            "delta": stats,
+            # Merged versions only carry the NetworkX graph
+            "mork_updated": method == "builder"
+        }
+        write_json_atomic(os.path.join(job_dir, "lineage.json"), lineage)
+        
+        metadata_path = os.path.join(job_dir, "networkx_metadata.json")
+        if method == "merged" and not os.path.exists(metadata_path):
+            try:
+                with open(os.path.join(base_dir, "networkx_metadata.json"), 'r') as f:
+                    metadata = json.load(f)
+            except (OSError, ValueError):
+                metadata = {}
+            # Keep the builder's layout; only refresh counts it already reports
+            metadata.update({key: stats[key] for key in ("num_nodes", "num_edges") if key in metadata})
+            metadata["parent_job_id"] = base_job_id
+            write_json_atomic(metadata_path, metadata)
+        return lineage
+    
     async def _generate_auxiliary_mork(
         self,
         csv_files: List[str],
         config: str,
         schema_json: str,
         graph_type: str,
-        tenant_id: str
+        tenant_id: str,
+        session_id: Optional[str] = None
     ) -> Optional[str]:
         try:
-            async with httpx.AsyncClient(timeout=self.timeout) as client:
-                files = []
-                for csv_file_path in csv_files:
-                    csv_file = open(csv_file_path, 'rb')
-                    files.append(('files', (os.path.basename(csv_file_path), csv_file, 'text/csv')))
-                
-                data = {
-                    'config': config,
-                    'schema_json': schema_json,
-                    'writer_type': 'mork', 
-                    'graph_type': graph_type,
-                    'tenant_id': tenant_id
-                }
-                
-                response = await client.post(
-                    f"{self.atomspace_url}/api/load",
-                    files=files,
-                    data=data
-                )
+            client = http_clients.atomspace
+            data = {
+                'config': config,
+                'schema_json': schema_json,
+                'writer_type': 'mork', 
+                'graph_type': graph_type,
+                'tenant_id': tenant_id
+            }
+            
+            response = await self._post_load(client, csv_files, data, session_id)
+            if session_id and response.status_code == 404:
+                # Staged upload expired on the builder side, send the files again
+                print(f"Staged upload {session_id} not found, re-uploading CSVs for Mork")
+                response = await self._post_load(client, csv_files, data)
                 
-                for _, (_, file_obj, _) in files:
-                    file_obj.close()
-                    
-                if response.status_code == 200:
-                    result = response.json()
-                    mork_job_id = result.get('job_id')
-                    print(f"Background Mork generation successful. ID: {mork_job_id}")
-                    return mork_job_id
-                else:
-                    print(f"Background Mork generation failed: {response.text}")
-                    return None
+            if response.status_code == 200:
+                result = response.json()
+                mork_job_id = result.get('job_id')
+                print(f"Background Mork generation successful. ID: {mork_job_id}")
+                return mork_job_id
+            else:
+                print(f"Background Mork generation failed: {response.text}")
+                return None
                     
         except Exception as e:
             print(f"Background Mork generation error: {str(e)}")
             return None
 
-    async def _merge_mork_results(self, nx_job_id: str, mork_task: asyncio.Task, cleanup_dir: str = None):
-        """Wait for Mork generation and merge results into NetworkX job folder."""
-        try:
-            mork_job_id = await mork_task
-            
-            if not mork_job_id:
-                print(f"Skipping merge for {nx_job_id} because Mork generation failed or returned no ID.")
-                return
+    async def _stage_upload(
+        self,
+        client: httpx.AsyncClient,
+        csv_files: List[str],
+        tenant_id: str
+    ) -> Optional[str]:
+        """Upload CSVs to the builder once and return the staged upload session ID.
 
-            mork_dir = f"/shared/output/{mork_job_id}"
-            nx_dir = f"/shared/output/{nx_job_id}"
-            
-            if not os.path.exists(mork_dir):
-                print(f"Mork output directory not found: {mork_dir}")
-                return
-                
-            if not os.path.exists(nx_dir):
-                print(f"NetworkX output directory not found: {nx_dir}")
-                return
+        Returns None when staging is disabled or the builder does not offer an
+        upload endpoint, in which case every load request carries the files.
+        """
+        if not self.staged_uploads:
+            return None
 
-            mork_subdir = os.path.join(nx_dir, "mork")
-            os.makedirs(mork_subdir, exist_ok=True)
+        body = AsyncMultipartStream(
+            data={'tenant_id': tenant_id},
+            files=[('files', csv_file_path, 'text/csv') for csv_file_path in csv_files]
+        )
+        with timed('builder_upload', files=len(csv_files)):
+            response = await client.post(
+                f"{self.atomspace_url}/api/upload",
+                content=body,
+                headers=await body.headers()
+            )
 
-            for filename in os.listdir(mork_dir):
-                src_path = os.path.join(mork_dir, filename)
-                
-                if filename in ["schema.json", "neo4j_load_result.json"]:
-                    continue
-                
-                dst_path = os.path.join(mork_subdir, filename)
-                
-                if os.path.isfile(src_path):
-                    shutil.copy2(src_path, dst_path)
-            
-            # shutil.rmtree(mork_dir)
-            print(f"Successfully merged Mork files from {mork_job_id} to {mork_subdir}")
+        if response.status_code in (404, 405):
+            print("DEBUG: AtomSpace builder has no staged upload endpoint, falling back to per-writer uploads")
+            self.staged_uploads = False
+            return None
+        if response.status_code != 200:
+            raise RuntimeError(f"AtomSpace upload returned {response.status_code}: {response.text}")
+
+        session_id = response.json().get('session_id')
+        print(f"DEBUG: Staged {len(csv_files)} CSV files in upload session {session_id}")
+        return session_id
+
+    async def _post_load(
+        self,
+        client: httpx.AsyncClient,
+        csv_files: List[str],
+        data: Dict[str, str],
+        session_id: Optional[str] = None
+    ) -> httpx.Response:
+        """POST a load request to the AtomSpace builder.
+
+        With a ``session_id`` the builder reads the previously staged CSVs,
+        otherwise the files are streamed from disk with the request.
+        """
+        if session_id:
+            body = AsyncMultipartStream(data={**data, 'session_id': session_id}, files=[])
+        else:
+            body = AsyncMultipartStream(
+                data=data,
+                files=[('files', csv_file_path, 'text/csv') for csv_file_path in csv_files]
+            )
+        return await client.post(
+            f"{self.atomspace_url}/api/load",
+            content=body,
+            headers=await body.headers()
+        )
+
+    def _add_graph_subtasks(self, job_id: str) -> int:
+        """Register the derived artifacts (CSR copy, profile) of a new graph; returns how many.
+
+        Writes to the job registry, so it runs on ``io_executor``.
+        """
+        added = 0
+        if settings.graph_csr_enabled:
+            self.job_registry.add_subtask(job_id, 'graph_csr', {'job_id': job_id})
+            added += 1
+        if settings.graph_profile_enabled:
+            self.job_registry.add_subtask(job_id, 'graph_profile', {'job_id': job_id})
+            added += 1
+        return added
+    
+    async def ensure_graph_csr(self, job_id: str) -> Dict[str, Any]:
+        """Return the metadata of the job's CSR graph, (re)building it if stale."""
+        networkx_file = f"{self.shared_output_dir}/{job_id}/networkx_graph.pkl"
+        if not await io_executor.exists(networkx_file):
+            raise FileNotFoundError(f"NetworkX file not found for job_id: {job_id}")
+        csr_dir = graph_csr.csr_dir_for(networkx_file)
+        if await io_executor.run(graph_csr.is_fresh, networkx_file, csr_dir):
+            return await io_executor.run(graph_csr.read_meta, csr_dir)
+        
+        meta, _ = await self.csr_flight.do(
+            job_id, lambda: io_executor.run(graph_csr.build_csr, networkx_file, csr_dir)
+        )
+        print(f"DEBUG: Wrote CSR graph for job {job_id}: {meta['num_nodes']} nodes, {meta['num_edges']} edges")
+        return meta
+    
+    async def _run_graph_csr_subtask(self, params: Dict[str, Any], dependency=None) -> Dict[str, Any]:
+        # A failure only marks the subtask; the pickle stays authoritative and consumers fall back to it
+        with timed('graph_csr', job_id=params['job_id']):
+            meta = await self.ensure_graph_csr(params['job_id'])
+        return {'num_nodes': meta['num_nodes'], 'num_edges': meta['num_edges']}
+    
+    async def ensure_graph_profile(self, job_id: str) -> Dict[str, Any]:
+        """Return the job's graph profile, computing it if missing or stale."""
+        networkx_file = f"{self.shared_output_dir}/{job_id}/networkx_graph.pkl"
+        if not await io_executor.exists(networkx_file):
+            raise FileNotFoundError(f"NetworkX file not found for job_id: {job_id}")
+        if await io_executor.run(graph_profile.is_fresh, networkx_file):
+            return await io_executor.run(graph_profile.read_profile, networkx_file)
+        
+        profile, _ = await self.profile_flight.do(
+            job_id, lambda: io_executor.run(graph_profile.build_profile, networkx_file)
+        )
+        print(f"DEBUG: Profiled graph {job_id}: {profile['num_nodes']} nodes, "
+              f"{profile['components']['count']} components")
+        return profile
+    
+    async def _run_graph_profile_subtask(self, params: Dict[str, Any], dependency=None) -> Dict[str, Any]:
+        with timed('graph_profile', job_id=params['job_id']):
+            profile = await self.ensure_graph_profile(params['job_id'])
+        return {'num_nodes': profile['num_nodes'], 'components': profile['components']['count']}
+    
+    async def ensure_result_index(self, job_id: str) -> Dict[str, Any]:
+        """Return the metadata of the job's motif index, (re)building it if the results changed."""
+        job_dir = f"{self.shared_output_dir}/{job_id}"
+        if not await io_executor.exists(os.path.join(job_dir, "results")):
+            raise FileNotFoundError(f"No mining results found for job_id: {job_id}")
+        self.retention.touch(job_id)
+        if await io_executor.run(result_index.is_fresh, job_dir):
+            return await io_executor.run(result_index.read_meta, job_dir)
+        
+        meta, _ = await self.index_flight.do(
+            job_id, lambda: io_executor.run(result_index.build_index, job_dir)
+        )
+        print(f"DEBUG: Indexed {meta['motifs']} motifs of job {job_id}")
+        return meta
+    
+    async def _run_result_index_subtask(self, params: Dict[str, Any], dependency=None) -> Dict[str, Any]:
+        with timed('result_index', job_id=params['job_id']) as timing:
+            meta = await self.ensure_result_index(params['job_id'])
+            timing['motifs'] = meta['motifs']
+        return {'motifs': meta['motifs'], 'files': meta['files']}
+    
+    async def auto_tune_mining_config(
+        self,
+        job_id: str,
+        mining_config: Dict[str, Any],
+        time_budget: Optional[float] = None
+    ) -> Tuple[Dict[str, Any], Dict[str, Any]]:
+        """Scale ``mining_config``'s sampling effort to the graph and a time budget in seconds."""
+        profile = await self.ensure_graph_profile(job_id)
+        return graph_profile.tune_mining_config(
+            profile,
+            mining_config,
+            time_budget if time_budget is not None else settings.mining_time_budget,
+            settings.mining_cost_per_sample,
+            settings.mining_cost_per_trial
+        )
+    
+    async def _run_mork_subtask(self, params: Dict[str, Any], dependency=None) -> Dict[str, Any]:
+        with timed('mork_generation', staged=bool(params.get('session_id'))) as timing:
+            mork_job_id = await self._generate_auxiliary_mork(
+                params['csv_files'],
+                params['config'],
+                params['schema_json'],
+                params['graph_type'],
+                params['tenant_id'],
+                params.get('session_id')
+            )
+            timing['mork_job_id'] = mork_job_id
+        return {'mork_job_id': mork_job_id}
+    
+    async def _run_merge_subtask(self, params: Dict[str, Any], dependency: Optional[Dict[str, Any]]) -> Dict[str, Any]:
+        mork_result = dependency['result'] if dependency and dependency['result'] else {}
+        mork_job_id = mork_result.get('mork_job_id')
+        with timed('mork_merge', job_id=params['nx_job_id']) as timing:
+            merged = await self._merge_mork_results(params['nx_job_id'], mork_job_id, params.get('cleanup_dir'))
+            timing['merged'] = merged
+        return {'mork_job_id': mork_job_id, 'merged': merged}
+    
+    async def _discard_merge(self, params: Dict[str, Any]):
+        """Remove what a cancelled merge leaves behind: a partial ``mork/`` copy and the uploads."""
+        await io_executor.remove_tree(os.path.join(self.shared_output_dir, params['nx_job_id'], "mork"))
+        await self._remove_upload_dir(params.get('cleanup_dir'))
+    
+    def _spawn(self, coro) -> asyncio.Task:
+        """Start a background task and keep a reference until it finishes."""
+        task = asyncio.create_task(coro)
+        self._background_tasks.add(task)
+        task.add_done_callback(self._background_tasks.discard)
+        return task
+
+    async def _merge_mork_results(self, nx_job_id: str, mork_job_id: Optional[str], cleanup_dir: str = None) -> bool:
+        """Merge the Mork results into the NetworkX job folder, then remove the uploads.
+
+        Returns False when there was nothing to merge. If cancelled, the
+        uploads are kept so the merge can be resumed.
+        """
+        try:
+            merged = await self._copy_mork_results(nx_job_id, mork_job_id)
+        except asyncio.CancelledError:
+            raise
+        except Exception:
+            await self._remove_upload_dir(cleanup_dir)
+            raise
+        await self._remove_upload_dir(cleanup_dir)
+        return merged
+    
+    async def _copy_mork_results(self, nx_job_id: str, mork_job_id: Optional[str]) -> bool:
+        if not mork_job_id:
+            print(f"Skipping merge for {nx_job_id} because Mork generation failed or returned no ID.")
+            return False
+
+        mork_dir = f"{self.shared_output_dir}/{mork_job_id}"
+        nx_dir = f"{self.shared_output_dir}/{nx_job_id}"
+        
+        if not await io_executor.exists(mork_dir):
+            print(f"Mork output directory not found: {mork_dir}")
+            return False
             
-        except Exception as e:
-            print(f"Error merging Mork results: {str(e)}")
-        finally:
-            if cleanup_dir and os.path.exists(cleanup_dir):
-                shutil.rmtree(cleanup_dir)
-                print(f"Cleaned up temporary directory: {cleanup_dir}")
+        if not await io_executor.exists(nx_dir):
+            print(f"NetworkX output directory not found: {nx_dir}")
+            return False
+
+        mork_subdir = os.path.join(nx_dir, "mork")
+        await io_executor.run(_copy_mork_outputs, mork_dir, mork_subdir)
+        
+        # shutil.rmtree(mork_dir)
+        print(f"Successfully merged Mork files from {mork_job_id} to {mork_subdir}")
+        return True
+    
+    async def _remove_upload_dir(self, cleanup_dir: Optional[str]):
+        if cleanup_dir and await io_executor.exists(cleanup_dir):
+            await io_executor.remove_tree(cleanup_dir)
+            print(f"Cleaned up temporary directory: {cleanup_dir}")
 
     async def mine_patterns(
         self,
         job_id: str,
-        mining_config: Dict[str, Any]
+        mining_config: Dict[str, Any],
+        use_cache: bool = True
+    ) -> Dict[str, Any]:
+        """Mine a graph job; identical concurrent requests share one miner run."""
+        self.retention.touch(job_id)
+        key = _request_key({'job_id': job_id, 'config': mining_config, 'use_cache': use_cache})
+        result, shared = await self.mining_flight.do(
+            key,
+            lambda: self._cancellable(job_id, self._mine_patterns(job_id, mining_config, use_cache))
+        )
+        return {**result, "coalesced": shared}
+    
+    async def cancel_job(self, job_id: str) -> Dict[str, Any]:
+        """Stop all work on a job: queued and running mining, and background subtasks.
+
+        Runs in this process stop at once; other workers notice the request
+        within a poll interval or lease renewal. Cancelled miner requests ask
+        the miner to stop too, and partial results are removed.
+        """
+        mining_ids = await self.mining_queue.cancel_job(job_id)
+        subtasks = await self.job_registry.cancel_job(job_id)
+        runs = set(self._mining_runs.get(job_id, ()))
+        for task in runs:
+            task.cancel()
+        if runs:
+            # Let the runs tell the miner and remove their partial output before answering
+            await asyncio.wait(runs)
+        CANCELLATIONS.inc(source='request')
+        print(f"Cancelled job {job_id}: {len(mining_ids)} queued mining jobs, "
+              f"{len(runs)} local mining runs, {len(subtasks)} subtasks")
+        return {
+            "job_id": job_id,
+            "mining_jobs": mining_ids,
+            "mining_runs": len(runs),
+            "subtasks": [
+                {"subtask_id": subtask["subtask_id"], "kind": subtask["kind"], "status": subtask["status"]}
+                for subtask in subtasks
+            ]
+        }
+    
+    async def _cancellable(self, job_id: str, operation) -> Dict[str, Any]:
+        """Run a mining coroutine that ``cancel_job`` can stop from any worker.
+
+        Raises JobCancelledError when it was stopped that way.
+        """
+        started = time.time()
+        task = asyncio.ensure_future(operation)
+        runs = self._mining_runs.setdefault(job_id, set())
+        runs.add(task)
+        watcher = asyncio.create_task(self._watch_cancellation(job_id, started, task))
+        try:
+            return await task
+        except asyncio.CancelledError:
+            if asyncio.current_task().cancelling():
+                raise
+            raise JobCancelledError(f"Mining of job {job_id} was cancelled")
+        finally:
+            watcher.cancel()
+            runs.discard(task)
+            if not runs:
+                self._mining_runs.pop(job_id, None)
+    
+    async def _watch_cancellation(self, job_id: str, started: float, task: asyncio.Task):
+        """Cancel ``task`` once another worker records a cancel request for the job."""
+        while True:
+            await asyncio.sleep(settings.job_registry_poll_interval)
+            if await io_executor.run(self.job_registry.cancel_requested, job_id, started):
+                task.cancel()
+                return
+    
+    async def _mark_cancelled(self, job_id: str):
+        await io_executor.write_json(os.path.join(self.shared_output_dir, job_id, "progress.json"), {
+            "status": "cancelled",
+            "progress": 0,
+            "message": "Mining was cancelled"
+        })
+    
+    async def _mine_patterns(
+        self,
+        job_id: str,
+        mining_config: Dict[str, Any],
+        use_cache: bool = True
     ) -> Dict[str, Any]:
         try:
             # Verify NetworkX file exists
-            networkx_file = f"/shared/output/{job_id}/networkx_graph.pkl"
-            if not os.path.exists(networkx_file):
+            networkx_file = f"{self.shared_output_dir}/{job_id}/networkx_graph.pkl"
+            if not await io_executor.exists(networkx_file):
                 raise FileNotFoundError(f"NetworkX file not found for job_id: {job_id}")
             
             graph_output_format = mining_config.get('graph_output_format', 'representative')
@@ -219,26 +847,63 @@ class OrchestrationService:
             miner_config = mining_config.copy()
             miner_config['visualize_instances'] = visualize_instances
             
-            result = await self.miner_service.mine_motifs(
-                networkx_file,
-                job_id=job_id,
-                mining_config=miner_config
-            )
+            n_shards = max(1, min(int(mining_config.get('n_shards') or 1), settings.mining_max_shards))
             
-            # Check if miner service result indicates failure (though mine_motifs usually raises exception)
-            # If we reached here, it should be success, but let's be safe
-            if isinstance(result, dict) and result.get('status') == 'error':
-                 raise RuntimeError(f"Mining failed: {result.get('error', 'Unknown error')}")
+            # Same graph content + same mining parameters -> reuse the earlier result
+            shared_job_dir = f"{self.shared_output_dir}/{job_id}"
+            cache_key = None
+            cached = False
+            if use_cache and self.result_cache.enabled:
+                graph_digest = await io_executor.run(self.result_cache.graph_digest, networkx_file)
+                cache_form = self.miner_service.build_form_data(job_id, miner_config)
+                if n_shards > 1:
+                    cache_form['n_shards'] = n_shards
+                cache_key = self.result_cache.make_key(graph_digest, cache_form)
+                cached = await io_executor.run(self.result_cache.materialize, cache_key, shared_job_dir)
+                if cached:
+                    print(f"DEBUG: Mining cache hit for job {job_id} (key {cache_key})")
             
-            local_paths = self._copy_to_local_output(job_id)
+            if not cached:
+                try:
+                    with timed('mining', job_id=job_id, shards=n_shards):
+                        if n_shards > 1:
+                            result = await self._mine_sharded(job_id, networkx_file, miner_config, n_shards)
+                        else:
+                            result = await self.miner_service.mine_motifs(
+                                networkx_file,
+                                job_id=job_id,
+                                mining_config=miner_config
+                            )
+                except asyncio.CancelledError:
+                    # Whatever the miner wrote so far is an incomplete result set
+                    for name in ("results", "plots"):
+                        await io_executor.remove_tree(os.path.join(shared_job_dir, name))
+                    await self._mark_cancelled(job_id)
+                    raise
+                
+                # Check if miner service result indicates failure (though mine_motifs usually raises exception)
+                # If we reached here, it should be success, but let's be safe
+                if isinstance(result, dict) and result.get('status') == 'error':
+                     raise RuntimeError(f"Mining failed: {result.get('error', 'Unknown error')}")
+                
+                if cache_key:
+                    await io_executor.run(self.result_cache.store, cache_key, shared_job_dir, job_id, graph_digest)
+            
+            local_paths = await self._publish_to_local_output(job_id)
+            if settings.result_index_enabled:
+                # Queries index the results on demand too; this just has it ready for the first one
+                await io_executor.run(self.job_registry.add_subtask, job_id, 'result_index', {'job_id': job_id})
+                self._spawn(self.job_registry.run_job(job_id))
             
             download_url = f"http://localhost:9000/api/download-result?job_id={job_id}"
             
             return {
                 "job_id": job_id,
                 "status": "success",
+                "cached": cached,
                 "output_paths": local_paths,
-                "download_url": download_url
+                "download_url": download_url,
+                "results_url": f"/api/results/{job_id}/motifs"
             }
         except Exception as e:
             # Re-raise the exception so it propagates as HTTP 500 (or handled by caller)
@@ -246,22 +911,352 @@ class OrchestrationService:
             print(f"Error in mine_patterns: {e}")
             raise e
     
+    async def _mine_sharded(
+        self,
+        job_id: str,
+        networkx_file: str,
+        miner_config: Dict[str, Any],
+        n_shards: int
+    ) -> Dict[str, Any]:
+        """Split the neighborhood budget into shards mined concurrently, then merge them.
+
+        Each shard is an ordinary miner run over the same graph with its share
+        of ``n_neighborhoods`` and its own seed, written to ``{job_id}_shard{n}``.
+        """
+        total_neighborhoods = int(miner_config.get('n_neighborhoods', 2000))
+        n_shards = min(n_shards, total_neighborhoods)
+        base_seed = miner_config.get('seed')
+        if base_seed is None:
+            base_seed = random.randrange(2 ** 31)
+        
+        shard_ids = []
+        shard_configs = []
+        for index in range(n_shards):
+            shard_config = dict(miner_config)
+            shard_config['n_neighborhoods'] = (
+                total_neighborhoods // n_shards + (1 if index < total_neighborhoods % n_shards else 0)
+            )
+            shard_config['seed'] = base_seed + index
+            shard_ids.append(f"{job_id}_shard{index}")
+            shard_configs.append(shard_config)
+        shard_dirs = [os.path.join(self.shared_output_dir, shard_id) for shard_id in shard_ids]
+        job_dir = os.path.join(self.shared_output_dir, job_id)
+        
+        logger.debug("Mining job %s as %d shards of ~%d neighborhoods", job_id, n_shards, total_neighborhoods // n_shards)
+        progress_task = self._spawn(self._aggregate_shard_progress(job_id, shard_dirs))
+        shard_tasks = [
+            asyncio.create_task(
+                self.miner_service.mine_motifs(networkx_file, job_id=shard_id, mining_config=shard_config)
+            )
+            for shard_id, shard_config in zip(shard_ids, shard_configs)
+        ]
+        try:
+            await asyncio.gather(*shard_tasks)
+            summary = await io_executor.run(merge_shard_outputs, shard_dirs, job_dir)
+        except BaseException:
+            for task in shard_tasks:
+                task.cancel()
+            # Wait for the shards to tell their miners to stop before removing their output
+            await asyncio.gather(*shard_tasks, return_exceptions=True)
+            raise
+        finally:
+            progress_task.cancel()
+            await asyncio.gather(progress_task, return_exceptions=True)
+            for shard_dir in shard_dirs:
+                await io_executor.remove_tree(shard_dir)
+        
+        await io_executor.write_json(os.path.join(job_dir, "progress.json"), {
+            "status": "completed",
+            "progress": 100,
+            "message": f"Merged results of {n_shards} mining shards"
+        })
+        return {
+            "status": "success",
+            "results_path": os.path.join(job_dir, "results"),
+            "plots_path": os.path.join(job_dir, "plots"),
+            "shards": summary
+        }
+    
+    async def _aggregate_shard_progress(self, job_id: str, shard_dirs: List[str], interval: float = 2.0):
+        """Publish the mean progress of all shards as the job's progress.json."""
+        progress_path = os.path.join(self.shared_output_dir, job_id, "progress.json")
+        while True:
+            shard_progress = []
+            for shard_dir in shard_dirs:
+                try:
+                    progress = await io_executor.read_json(os.path.join(shard_dir, "progress.json"))
+                    shard_progress.append(float(progress.get('progress', 0)))
+                except (OSError, ValueError, TypeError, AttributeError):
+                    shard_progress.append(0.0)
+            done = sum(1 for value in shard_progress if value >= 100)
+            await io_executor.write_json(progress_path, {
+                "status": "running",
+                "progress": sum(shard_progress) / len(shard_progress),
+                "message": f"Mining {len(shard_dirs)} shards ({done} complete)",
+                "shards": shard_progress
+            })
+            await asyncio.sleep(interval)
+    
+    async def run_queued_mining(self, job_id: str, mining_config: Dict[str, Any], use_cache: bool = True) -> Dict[str, Any]:
+        """Mining queue runner: a single mining run or a whole parameter sweep."""
+        if 'sweep' in mining_config:
+            return await self.mine_sweep(job_id, mining_config['sweep'], use_cache)
+        return await self.mine_patterns(job_id, mining_config, use_cache)
+    
+    async def mine_sweep(
+        self,
+        job_id: str,
+        configs: List[Dict[str, Any]],
+        use_cache: bool = True
+    ) -> Dict[str, Any]:
+        """Mine one graph with every config of a parameter sweep.
+
+        Identical concurrent sweeps share a single run.
+        """
+        self.retention.touch(job_id)
+        key = _request_key({'job_id': job_id, 'sweep': configs, 'use_cache': use_cache})
+        result, shared = await self.mining_flight.do(
+            key, lambda: self._cancellable(job_id, self._timed_sweep(job_id, configs, use_cache))
+        )
+        return {**result, "coalesced": shared}
+    
+    async def _timed_sweep(self, job_id: str, configs: List[Dict[str, Any]], use_cache: bool) -> Dict[str, Any]:
+        with timed('mining_sweep', job_id=job_id, configs=len(configs)) as timing:
+            result = await self._mine_sweep(job_id, configs, use_cache)
+            timing.update(cached=result['cached'], batched=result['batched'], failed=result['failed'])
+        return result
+    
+    async def _mine_sweep(
+        self,
+        job_id: str,
+        configs: List[Dict[str, Any]],
+        use_cache: bool = True
+    ) -> Dict[str, Any]:
+        """Run a sweep as one unit and write per-config results plus ``summary.json``.
+
+        Configs go to the miner in one ``/mine-batch`` request so the graph is
+        loaded once and configs of the same sampling group can share sampled
+        neighborhoods. Miners without batch support get ordinary runs instead.
+        Configs without a seed share one derived from the sweep, so groups
+        sample the same neighborhoods either way and a repeated sweep hits
+        the result cache. Output lands in ``sweeps/<sweep_id>/<config_id>/``.
+        """
+        networkx_file = f"{self.shared_output_dir}/{job_id}/networkx_graph.pkl"
+        if not await io_executor.exists(networkx_file):
+            raise FileNotFoundError(f"NetworkX file not found for job_id: {job_id}")
+        
+        sweep_id = _request_key({'job_id': job_id, 'configs': configs})[:12]
+        sweep_dir = os.path.join(self.shared_output_dir, job_id, "sweeps", sweep_id)
+        sweep_seed = int(sweep_id[:8], 16) % (2 ** 31)
+        
+        runs = []
+        for index, config in enumerate(configs):
+            miner_config = dict(config)
+            if miner_config.get('seed') is None:
+                miner_config['seed'] = sweep_seed
+            miner_config['visualize_instances'] = (
+                miner_config.get('graph_output_format', 'representative') == 'instance'
+            )
+            miner_config['sample_group'] = sampling_group(miner_config)
+            config_id = f"config_{index:03d}"
+            runs.append({
+                'config_id': config_id,
+                'config': miner_config,
+                'run_id': f"{job_id}_sweep{sweep_id}_{config_id}",
+                'dir': os.path.join(sweep_dir, config_id),
+                'cache_key': None,
+                'graph_digest': None,
+                'cached': False,
+                'error': None
+            })
+        
+        graph_digest = None
+        if use_cache and self.result_cache.enabled:
+            graph_digest = await io_executor.run(self.result_cache.graph_digest, networkx_file)
+        pending = []
+        for run in runs:
+            if graph_digest:
+                form = self.miner_service.build_form_data(job_id, run['config'])
+                run['cache_key'] = self.result_cache.make_key(graph_digest, form)
+                run['graph_digest'] = graph_digest
+                run['cached'] = await io_executor.run(self.result_cache.materialize, run['cache_key'], run['dir'])
+            if not run['cached']:
+                pending.append(run)
+        
+        print(f"DEBUG: Sweep {sweep_id} of job {job_id}: {len(runs)} configs, "
+              f"{len(runs) - len(pending)} cached, "
+              f"{len(set(run['config']['sample_group'] for run in pending))} sampling groups to mine")
+        batched = False
+        if pending:
+            # Same sampling group next to each other so a miner can reuse neighborhoods
+            pending.sort(key=lambda run: run['config']['sample_group'])
+            batched = await self._run_sweep(job_id, networkx_file, pending, len(runs))
+        
+        summary = {
+            'job_id': job_id,
+            'sweep_id': sweep_id,
+            'batched': batched,
+            'configs': []
+        }
+        for run in runs:
+            succeeded = run['error'] is None
+            summary['configs'].append({
+                'config_id': run['config_id'],
+                'config': {k: v for k, v in run['config'].items() if k != 'visualize_instances'},
+                'status': 'success' if succeeded else 'error',
+                'cached': run['cached'],
+                'error': run['error'],
+                'results_path': f"sweeps/{sweep_id}/{run['config_id']}/results" if succeeded else None,
+                'motif_counts': await io_executor.run(summarize_output, run['dir']) if succeeded else {}
+            })
+        await io_executor.write_json(os.path.join(sweep_dir, "summary.json"), summary)
+        
+        failed = [run for run in runs if run['error'] is not None]
+        if len(failed) == len(runs):
+            raise RuntimeError(f"Every config of sweep {sweep_id} failed: {failed[0]['error']}")
+        
+        await io_executor.write_json(os.path.join(self.shared_output_dir, job_id, "progress.json"), {
+            "status": "completed",
+            "progress": 100,
+            "message": f"Sweep {sweep_id}: {len(runs) - len(failed)} of {len(runs)} configs mined"
+        })
+        return {
+            "job_id": job_id,
+            "sweep_id": sweep_id,
+            "status": "success",
+            "configs": len(runs),
+            "failed": len(failed),
+            "cached": sum(1 for run in runs if run['cached']),
+            "batched": batched,
+            "summary_path": f"sweeps/{sweep_id}/summary.json",
+            "download_url": f"http://localhost:9000/api/download-result?job_id={job_id}&filename=sweeps/{sweep_id}/summary.json"
+        }
+    
+    async def _run_sweep(self, job_id: str, networkx_file: str, pending: List[Dict[str, Any]], total: int) -> bool:
+        """Mine the uncached sweep configs. Returns True if the miner took them as one batch."""
+        progress_path = os.path.join(self.shared_output_dir, job_id, "progress.json")
+        finished = total - len(pending)
+        
+        async def report():
+            await io_executor.write_json(progress_path, {
+                "status": "running",
+                "progress": 100 * finished / total,
+                "message": f"Mining sweep: {finished} of {total} configs complete"
+            })
+        await report()
+        
+        try:
+            results = await self.miner_service.mine_batch(
+                networkx_file, [(run['run_id'], run['config']) for run in pending]
+            )
+            batched = results is not None
+            if not batched:
+                # One run at a time: the sweep holds a single mining queue slot
+                logger.debug("No miner accepts batches, mining %d sweep configs one by one", len(pending))
+                results = []
+                for run in pending:
+                    try:
+                        results.append(await self.miner_service.mine_motifs(
+                            networkx_file, job_id=run['run_id'], mining_config=run['config']
+                        ))
+                    except Exception as e:
+                        results.append(e)
+                    finished += 1
+                    await report()
+        except asyncio.CancelledError:
+            for run in pending:
+                await io_executor.remove_tree(os.path.join(self.shared_output_dir, run['run_id']))
+            await self._mark_cancelled(job_id)
+            raise
+        
+        for run, result in zip(pending, results):
+            run_dir = os.path.join(self.shared_output_dir, run['run_id'])
+            if isinstance(result, BaseException) or result.get('status') == 'error':
+                run['error'] = str(result) if isinstance(result, BaseException) else result.get('error', 'Unknown error')
+                print(f"Sweep config {run['config_id']} of job {job_id} failed: {run['error']}")
+            else:
+                await io_executor.run(_move_outputs, run_dir, run['dir'])
+                if run['cache_key']:
+                    await io_executor.run(
+                        self.result_cache.store, run['cache_key'], run['dir'], job_id, run['graph_digest']
+                    )
+            await io_executor.remove_tree(run_dir)
+        return batched
+    
+    async def mining_status(
+        self,
+        job_id: str,
+        progress: Optional[Dict[str, Any]],
+        updated_at: Optional[float] = None
+    ) -> Dict[str, Any]:
+        """Combine the mining queue entry and the miner's progress.json into one status.
+
+        ``updated_at`` is the mtime of progress.json; a terminal state written
+        before the current run started belongs to an earlier run and is ignored.
+        """
+        queue_entry = await io_executor.run(self.mining_queue.latest_for_job, job_id)
+        
+        if (
+            progress is not None and progress.get("status") in TERMINAL_STATUSES
+            and updated_at is not None and queue_entry and queue_entry["status"] == "running"
+            and updated_at < queue_entry["started_at"]
+        ):
+            progress = None
+        
+        if queue_entry and queue_entry["status"] == "queued":
+            return {
+                "status": "queued",
+                "progress": 0,
+                "message": f"Waiting in mining queue (position {queue_entry['queue_position']})",
+                "mining_id": queue_entry["mining_id"],
+                "queue_position": queue_entry["queue_position"]
+            }
+        
+        if queue_entry and queue_entry["status"] == "failed" and progress is None:
+            return {
+                "status": "error",
+                "progress": 0,
+                "message": queue_entry["error"],
+                "mining_id": queue_entry["mining_id"]
+            }
+        
+        if queue_entry and queue_entry["status"] == "cancelled" and progress is None:
+            return {
+                "status": "cancelled",
+                "progress": 0,
+                "message": "Mining was cancelled",
+                "mining_id": queue_entry["mining_id"]
+            }
+        
+        if progress is None:
+            # If no progress file yet, return pending status
+            return {
+                "status": "pending", 
+                "progress": 0, 
+                "message": "Waiting for miner to start..."
+            }
+        
+        status_data = dict(progress)
+        if queue_entry:
+            status_data["mining_id"] = queue_entry["mining_id"]
+            status_data["queue_position"] = queue_entry["queue_position"]
+        return status_data
+    
     async def get_graph_type_from_metadata(self, job_id: str) -> str:
         """Read graph_type from networkx_metadata.json"""
-        metadata_path = f"/shared/output/{job_id}/networkx_metadata.json"
+        metadata_path = f"{self.shared_output_dir}/{job_id}/networkx_metadata.json"
         
-        if not os.path.exists(metadata_path):
-            metadata_path = f"/shared/output/{job_id}/job_metadata.json"
+        if not await io_executor.exists(metadata_path):
+            metadata_path = f"{self.shared_output_dir}/{job_id}/job_metadata.json"
             
-        if not os.path.exists(metadata_path):
+        if not await io_executor.exists(metadata_path):
             raise FileNotFoundError(
                 f"Metadata file not found for job_id: {job_id} "
                 f"(checked networkx_metadata.json and job_metadata.json)"
             )
         
         try:
-            with open(metadata_path, 'r') as f:
-                metadata = json.load(f)
+            metadata = await io_executor.read_json(metadata_path)
             
             graph_type = metadata.get('graph_type', 'directed')
             print(f"Auto-detected graph_type='{graph_type}' from metadata for job_id={job_id}")
@@ -272,97 +1267,61 @@ class OrchestrationService:
         except Exception as e:
             raise RuntimeError(f"Error reading metadata for job_id: {job_id}: {str(e)}")
     
-    def _copy_to_local_output(self, job_id: str) -> Dict[str, str]:
-        """Copy results from shared volume to local directory and return paths."""
-        shared_job_dir = f"/shared/output/{job_id}"
+    async def _publish_to_local_output(self, job_id: str) -> Dict[str, str]:
+        """Publish results from the shared volume to the local directory and return paths."""
+        shared_job_dir = f"{self.shared_output_dir}/{job_id}"
         local_job_dir = f"{self.local_output_dir}/{job_id}"
         
-        os.makedirs(local_job_dir, exist_ok=True)
-        
-        shared_results = f"{shared_job_dir}/results"
-        local_results = f"{local_job_dir}/results"
-        if os.path.exists(shared_results):
-            if os.path.exists(local_results):
-                shutil.rmtree(local_results)
-            shutil.copytree(shared_results, local_results)
-        
-        shared_plots = f"{shared_job_dir}/plots"
-        local_plots = f"{local_job_dir}/plots"
-        if os.path.exists(shared_plots):
-            if os.path.exists(local_plots):
-                shutil.rmtree(local_plots)
-            # Use copytree for recursive copy of plot subdirectories
-            shutil.copytree(shared_plots, local_plots)
+        # Hardlinks/reflinks instead of copies, and never on the event loop
+        with timed('result_publish', job_id=job_id, mode=self.result_publisher.mode) as timing:
+            counts = await io_executor.run(self.result_publisher.publish, shared_job_dir, local_job_dir)
+            timing.update(counts)
+        print(f"DEBUG: Published results for job {job_id} ({self.result_publisher.mode}): {counts}")
         
+        if self.result_publisher.mode == 'direct':
+            return {
+                "results": f"{shared_job_dir}/results",
+                "plots": f"{shared_job_dir}/plots"
+            }
         return {
             "results": f"./integration_service/output/{job_id}/results",
             "plots": f"./integration_service/output/{job_id}/plots"
         }
 
     def get_result_file_path(self, job_id: str, filename: str) -> str:
-        # First try local output (mining results)
-        job_dir = os.path.abspath(os.path.join(self.local_output_dir, job_id))
-        file_path = os.path.abspath(os.path.join(job_dir, filename))
-        
-        if not file_path.startswith(os.path.abspath(self.local_output_dir)):
-             # Potential path traversal check fix
-             pass
+        return self.resolve_result_file(job_id, filename)[0]
 
-        if os.path.exists(file_path):
-            return file_path
-            
-        # Fallback to shared output (raw graph generation results)
-        shared_job_dir = os.path.abspath(os.path.join("/shared/output", job_id))
-        shared_file_path = os.path.abspath(os.path.join(shared_job_dir, filename))
-        
-        if os.path.exists(shared_file_path):
-            return shared_file_path
+    def resolve_result_file(self, job_id: str, filename: str) -> Tuple[str, os.stat_result]:
+        """Find a result file and stat it, local output first, then shared output.
+
+        One ``stat`` per candidate both checks existence and gives the size and
+        mtime the download headers need. Paths escaping the job directory are
+        rejected with PermissionError.
+        """
+        self.retention.touch(job_id)
+        for base_dir in (self.local_output_dir, self.shared_output_dir):
+            base_dir = os.path.abspath(base_dir)
+            job_dir = os.path.abspath(os.path.join(base_dir, job_id))
+            file_path = os.path.abspath(os.path.join(job_dir, filename))
+            if not (_is_inside(job_dir, base_dir) and _is_inside(file_path, job_dir)):
+                raise PermissionError(f"Invalid path: {filename} in job {job_id}")
+            try:
+                stat_result = os.stat(file_path)
+            except (FileNotFoundError, NotADirectoryError):
+                continue
+            if stat.S_ISREG(stat_result.st_mode):
+                return file_path, stat_result
             
         raise FileNotFoundError(f"File not found: {filename} in job {job_id}")
 
-    def create_job_archive(self, job_id: str) -> str:
+    async def open_job_archive(self, job_id: str) -> JobArchive:
         """ 
-        Create a zip archive of the job results (strictly 'results' and 'plots').
+        Return the zip archive of the job results (strictly 'results' and 'plots').
+
+        A previously built archive is reused while the results are unchanged,
+        otherwise the archive is streamed straight from the result directories.
         """
+        self.retention.touch(job_id)
         local_job_dir = os.path.join(self.local_output_dir, job_id)
-        shared_job_dir = os.path.join("/shared/output", job_id)
-        
-        # Determine base source directories
-        # We prefer the shared directory for source as it's the sync point, but check local if needed
-        # Actually, for results to download, we should look for where they exist.
-        
-        source_results = None
-        source_plots = None
-        
-        # Check local first
-        if os.path.exists(os.path.join(local_job_dir, "results")):
-            source_results = os.path.join(local_job_dir, "results")
-        elif os.path.exists(os.path.join(shared_job_dir, "results")):
-            source_results = os.path.join(shared_job_dir, "results")
-            
-        if os.path.exists(os.path.join(local_job_dir, "plots")):
-            source_plots = os.path.join(local_job_dir, "plots")
-        elif os.path.exists(os.path.join(shared_job_dir, "plots")):
-            source_plots = os.path.join(shared_job_dir, "plots")
-            
-        if not source_results and not source_plots:
-             raise FileNotFoundError(f"No results or plots found for job: {job_id}")
-
-        # Create a temporary staging directory to zip from
-        with tempfile.TemporaryDirectory() as temp_stage:
-            # Copy results if they exist
-            if source_results:
-                shutil.copytree(source_results, os.path.join(temp_stage, "results"))
-            
-            # Copy plots if they exist
-            if source_plots:
-                shutil.copytree(source_plots, os.path.join(temp_stage, "plots"))
-                
-            # Create zip name
-            zip_base_name = os.path.join(self.local_output_dir, f"{job_id}")
-            zip_file_path = f"{zip_base_name}.zip"
-            
-            # Create archive from temp_stage
-            shutil.make_archive(zip_base_name, 'zip', temp_stage)
-            
-        return zip_file_path
\ No newline at end of file
+        shared_job_dir = os.path.join(self.shared_output_dir, job_id)
+        return await self.archive_service.open(local_job_dir, shared_job_dir, job_id)
@@ -0,0 +1,198 @@
+"""Shared watchers that push mining progress to streaming subscribers."""
+import asyncio
+import json
+import os
+from contextlib import asynccontextmanager
+from typing import Any, AsyncIterator, Awaitable, Callable, Dict, Optional, Set, Tuple
+from .io_executor import io_executor
+from ..config.settings import settings
+
+try:
+    import watchfiles
+except ImportError:  # pragma: no cover - installed with uvicorn[standard]
+    watchfiles = None
+
+# Progress states after which a job's stream ends
+TERMINAL_STATUSES = ('completed', 'success', 'error', 'failed', 'cancelled')
+
+# ``build_status(job_id, progress, updated_at)``, with the mtime of progress.json
+StatusBuilder = Callable[[str, Optional[Dict[str, Any]], Optional[float]], Awaitable[Dict[str, Any]]]
+
+
+class _JobWatcher:
+    """Watches one job's progress.json and fans changes out to its subscribers."""
+
+    def __init__(self, hub: 'ProgressHub', job_id: str):
+        self.hub = hub
+        self.job_id = job_id
+        self.job_dir = os.path.join(hub.base_dir, job_id)
+        self.progress_path = os.path.join(self.job_dir, 'progress.json')
+        self.subscribers: Set[asyncio.Queue] = set()
+        self.latest: Optional[Dict[str, Any]] = None
+        self._signature: Optional[Tuple[int, int, int]] = None
+        self._progress: Optional[Dict[str, Any]] = None
+        self._updated_at: Optional[float] = None
+        self._task: Optional[asyncio.Task] = None
+
+    def start(self):
+        self._task = asyncio.create_task(self._run())
+
+    async def stop(self):
+        task, self._task = self._task, None
+        if task is not None:
+            task.cancel()
+            await asyncio.gather(task, return_exceptions=True)
+
+    async def _run(self):
+        try:
+            async for _ in self._wakeups():
+                await self.check()
+        except asyncio.CancelledError:
+            raise
+        except Exception as e:
+            print(f"Progress watcher for job {self.job_id} failed: {e}")
+
+    async def _wakeups(self) -> AsyncIterator[None]:
+        """Yield whenever progress.json may have changed (and at least every interval)."""
+        yield
+        if watchfiles is not None and self.hub.mode != 'poll':
+            while not await io_executor.run(os.path.isdir, self.job_dir):
+                await asyncio.sleep(self.hub.interval)
+                yield
+            try:
+                async for _ in watchfiles.awatch(
+                    self.job_dir,
+                    recursive=False,
+                    yield_on_timeout=True,
+                    rust_timeout=int(self.hub.interval * 1000)
+                ):
+                    yield
+            except Exception as e:
+                # e.g. the job directory was removed; keep serving subscribers by polling
+                print(f"File notifications for job {self.job_id} stopped ({e}), polling instead")
+        while True:
+            await asyncio.sleep(self.hub.interval)
+            yield
+
+    async def check(self):
+        """Re-read progress.json if it changed and publish the status if it differs.
+
+        The status builder gets the file's mtime along with its content, so a
+        terminal state left by an earlier run can be told from the current run's.
+        """
+        try:
+            stat_result = await io_executor.run(os.stat, self.progress_path)
+            signature = (stat_result.st_mtime_ns, stat_result.st_size, stat_result.st_ino)
+        except OSError:
+            signature = None
+
+        if signature != self._signature:
+            if signature is None:
+                self._progress = None
+                self._updated_at = None
+            else:
+                progress = await io_executor.run(_read_json, self.progress_path)
+                if progress is None:
+                    # Caught mid-write; the next change notification retries
+                    return
+                self._progress = progress
+                self._updated_at = stat_result.st_mtime
+                self.hub.reads += 1
+            self._signature = signature
+
+        status = await self.hub.build_status(self.job_id, self._progress, self._updated_at)
+        if status != self.latest:
+            self.latest = status
+            for queue in self.subscribers:
+                _offer(queue, status)
+
+
+class ProgressHub:
+    """One watcher per job, shared by every client streaming that job's progress.
+
+    Change detection uses inotify (via ``watchfiles``) when available and
+    falls back to comparing the file's mtime, size and inode every
+    ``PROGRESS_POLL_INTERVAL`` seconds. The file is only read when it
+    changed, no matter how many clients are subscribed.
+    """
+
+    def __init__(self, base_dir: str, build_status: StatusBuilder, interval: float = None, mode: str = None):
+        self.base_dir = base_dir
+        self.build_status = build_status
+        self.interval = interval or settings.progress_poll_interval
+        self.mode = mode or settings.progress_watch_mode
+        self.reads = 0
+        self._watchers: Dict[str, _JobWatcher] = {}
+
+    @asynccontextmanager
+    async def subscribe(self, job_id: str) -> AsyncIterator[asyncio.Queue]:
+        """Queue that always holds the newest status of ``job_id``."""
+        watcher = self._watchers.get(job_id)
+        if watcher is None:
+            watcher = self._watchers[job_id] = _JobWatcher(self, job_id)
+            watcher.start()
+
+        queue: asyncio.Queue = asyncio.Queue(maxsize=1)
+        if watcher.latest is not None:
+            _offer(queue, watcher.latest)
+        watcher.subscribers.add(queue)
+        try:
+            yield queue
+        finally:
+            watcher.subscribers.discard(queue)
+            if not watcher.subscribers and self._watchers.get(job_id) is watcher:
+                del self._watchers[job_id]
+                await watcher.stop()
+
+    async def updates(self, job_id: str) -> AsyncIterator[Dict[str, Any]]:
+        """Yield each new status of ``job_id`` until it reaches a terminal state."""
+        async with self.subscribe(job_id) as queue:
+            while True:
+                status = await queue.get()
+                yield status
+                if status.get('status') in TERMINAL_STATUSES:
+                    return
+
+    def latest(self, job_id: str) -> Optional[Dict[str, Any]]:
+        """Current status kept by an active watcher, if anyone is subscribed to ``job_id``."""
+        watcher = self._watchers.get(job_id)
+        return watcher.latest if watcher else None
+
+    async def close(self):
+        watchers, self._watchers = list(self._watchers.values()), {}
+        for watcher in watchers:
+            await watcher.stop()
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            'watched_jobs': len(self._watchers),
+            'subscribers': sum(len(w.subscribers) for w in self._watchers.values()),
+            'progress_reads': self.reads,
+            'mode': 'poll' if watchfiles is None or self.mode == 'poll' else 'inotify'
+        }
+
+
+def _offer(queue: asyncio.Queue, status: Dict[str, Any]):
+    """Replace whatever the subscriber has not consumed yet with ``status``."""
+    if queue.full():
+        queue.get_nowait()
+    queue.put_nowait(status)
+
+
+def read_progress(path: str) -> Tuple[Optional[Dict[str, Any]], Optional[float]]:
+    """A progress.json and its mtime, or ``(None, None)`` when it is missing or unreadable."""
+    try:
+        updated_at = os.stat(path).st_mtime
+    except OSError:
+        return None, None
+    progress = _read_json(path)
+    return progress, updated_at if progress is not None else None
+
+
+def _read_json(path: str) -> Optional[Dict[str, Any]]:
+    try:
+        with open(path, 'r') as f:
+            payload = json.load(f)
+    except (OSError, ValueError):
+        return None
+    return payload if isinstance(payload, dict) else None
@@ -0,0 +1,244 @@
+"""Content-addressed cache of mining results."""
+import hashlib
+import json
+import os
+import shutil
+import threading
+import time
+import uuid
+from contextlib import contextmanager
+from typing import Any, Dict, Iterator, Optional, Tuple
+from ..config.settings import settings
+
+try:
+    import fcntl
+except ImportError:  # pragma: no cover - not available on Windows
+    fcntl = None
+
+
+class MiningResultCache:
+    """Stores the ``results/`` and ``plots/`` of finished mining runs.
+
+    Entries are keyed on the SHA-256 of ``networkx_graph.pkl`` plus the
+    normalized miner form data, so the same graph mined with the same
+    parameters is served from disk instead of running the miner again. The
+    cache is bounded by ``max_bytes`` and evicts least recently used entries.
+    Worker processes share the directory; changes to ``index.json`` happen
+    under an exclusive lock on ``index.json.lock``.
+    """
+
+    OUTPUT_DIRS = ('results', 'plots')
+    # Form fields that name the job rather than describe the mining run
+    IGNORED_KEYS = ('job_id',)
+
+    def __init__(self, cache_dir: str = None, max_bytes: int = None, enabled: bool = None):
+        self.cache_dir = cache_dir or settings.mining_cache_dir
+        self.max_bytes = settings.mining_cache_max_bytes if max_bytes is None else max_bytes
+        self.enabled = settings.mining_cache_enabled if enabled is None else enabled
+        self.index_path = os.path.join(self.cache_dir, 'index.json')
+        self.lock_path = f"{self.index_path}.lock"
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self._lock = threading.Lock()
+        self._digests: Dict[str, Tuple[int, int, str]] = {}
+        self._index: Optional[Dict[str, Dict[str, Any]]] = None
+        self._index_stamp = None
+
+    def graph_digest(self, graph_path: str) -> str:
+        """SHA-256 of a graph file, memoized on its size and mtime."""
+        stat = os.stat(graph_path)
+        memo = self._digests.get(graph_path)
+        if memo and memo[0] == stat.st_size and memo[1] == stat.st_mtime_ns:
+            return memo[2]
+
+        digest = hashlib.sha256()
+        with open(graph_path, 'rb') as f:
+            for chunk in iter(lambda: f.read(settings.upload_chunk_size), b''):
+                digest.update(chunk)
+        self._digests[graph_path] = (stat.st_size, stat.st_mtime_ns, digest.hexdigest())
+        return digest.hexdigest()
+
+    def make_key(self, graph_digest: str, form_data: Dict[str, Any]) -> str:
+        """Build the cache key from a graph digest and the miner form data."""
+        config = {
+            key: value for key, value in form_data.items()
+            if key not in self.IGNORED_KEYS
+        }
+        payload = json.dumps({'graph': graph_digest, 'config': config}, sort_keys=True, default=str)
+        return hashlib.sha256(payload.encode('utf-8')).hexdigest()
+
+    def materialize(self, key: str, job_dir: str) -> bool:
+        """Copy a cached result into ``job_dir``. Returns False on a miss.
+
+        The copy runs outside the index lock so other workers are not held up
+        by it. It goes into a staging directory that is only renamed into
+        place once the entry is confirmed to have survived a concurrent
+        eviction.
+        """
+        entry_dir = os.path.join(self.cache_dir, key)
+        with self._locked_index():
+            index = self._load_index()
+            entry = index.get(key)
+            if entry is None or not os.path.isdir(entry_dir):
+                index.pop(key, None)
+                self.misses += 1
+                return False
+            entry['last_access'] = time.time()
+            self._save_index()
+
+        staging = os.path.join(job_dir, f".tmp-{uuid.uuid4().hex}")
+        try:
+            for name in self.OUTPUT_DIRS:
+                src = os.path.join(entry_dir, name)
+                if os.path.isdir(src):
+                    shutil.copytree(src, os.path.join(staging, name))
+            copied = os.path.isdir(entry_dir)
+        except OSError:
+            copied = False
+        if not copied:
+            shutil.rmtree(staging, ignore_errors=True)
+            self.misses += 1
+            return False
+
+        for name in self.OUTPUT_DIRS:
+            dst = os.path.join(job_dir, name)
+            if os.path.exists(dst):
+                shutil.rmtree(dst)
+            if os.path.isdir(os.path.join(staging, name)):
+                os.rename(os.path.join(staging, name), dst)
+        shutil.rmtree(staging, ignore_errors=True)
+        self.hits += 1
+        return True
+
+    def store(self, key: str, job_dir: str, job_id: str = None, graph_digest: str = None) -> bool:
+        """Add the mining output in ``job_dir`` to the cache."""
+        sources = [
+            name for name in self.OUTPUT_DIRS
+            if os.path.isdir(os.path.join(job_dir, name))
+        ]
+        if not sources:
+            return False
+
+        os.makedirs(self.cache_dir, exist_ok=True)
+        staging = os.path.join(self.cache_dir, f".tmp-{uuid.uuid4().hex}")
+        for name in sources:
+            shutil.copytree(os.path.join(job_dir, name), os.path.join(staging, name))
+        size = _tree_size(staging)
+
+        if size > self.max_bytes:
+            print(f"Mining result for {job_id} ({size} bytes) exceeds the cache size limit, not caching")
+            shutil.rmtree(staging, ignore_errors=True)
+            return False
+
+        entry_dir = os.path.join(self.cache_dir, key)
+        with self._locked_index():
+            index = self._load_index()
+            if os.path.isdir(entry_dir):
+                shutil.rmtree(staging, ignore_errors=True)
+            else:
+                os.rename(staging, entry_dir)
+            now = time.time()
+            index[key] = {
+                'size': size, 'created': now, 'last_access': now, 'job_id': job_id, 'graph': graph_digest
+            }
+            self._evict(keep=key)
+            self._save_index()
+        return True
+
+    def invalidate(self, job_id: str = None, graph_digest: str = None) -> int:
+        """Drop the entries mined from ``job_id`` or from the graph ``graph_digest``."""
+        with self._locked_index():
+            index = self._load_index()
+            doomed = [
+                key for key, entry in index.items()
+                if (job_id is not None and entry.get('job_id') == job_id)
+                or (graph_digest is not None and entry.get('graph') == graph_digest)
+            ]
+            for key in doomed:
+                del index[key]
+                shutil.rmtree(os.path.join(self.cache_dir, key), ignore_errors=True)
+            if doomed:
+                self._save_index()
+        return len(doomed)
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            index = self._load_index()
+            total_bytes = sum(entry['size'] for entry in index.values())
+            entries = len(index)
+        lookups = self.hits + self.misses
+        return {
+            'enabled': self.enabled,
+            'entries': entries,
+            'total_bytes': total_bytes,
+            'max_bytes': self.max_bytes,
+            'hits': self.hits,
+            'misses': self.misses,
+            'hit_rate': self.hits / lookups if lookups else 0.0,
+            'evictions': self.evictions
+        }
+
+    def _evict(self, keep: str = None):
+        """Drop least recently used entries until the cache fits. Caller holds the lock."""
+        index = self._index
+        total = sum(entry['size'] for entry in index.values())
+        for key in sorted(index, key=lambda k: index[k]['last_access']):
+            if total <= self.max_bytes:
+                break
+            if key == keep:
+                continue
+            total -= index.pop(key)['size']
+            shutil.rmtree(os.path.join(self.cache_dir, key), ignore_errors=True)
+            self.evictions += 1
+            print(f"Evicted mining cache entry {key}")
+
+    @contextmanager
+    def _locked_index(self) -> Iterator[None]:
+        """Hold the index for a read-modify-write, against threads and other processes."""
+        with self._lock:
+            if fcntl is None:
+                yield
+                return
+            os.makedirs(self.cache_dir, exist_ok=True)
+            with open(self.lock_path, 'a') as lock_file:
+                fcntl.flock(lock_file, fcntl.LOCK_EX)
+                # Whatever we hold in memory may predate another process's save
+                self._index = None
+                yield
+
+    def _load_index(self) -> Dict[str, Dict[str, Any]]:
+        # Other workers replace the index file; reload when it is not the one we last saw
+        stamp = _file_stamp(self.index_path)
+        if self._index is None or stamp != self._index_stamp:
+            try:
+                with open(self.index_path, 'r') as f:
+                    self._index = json.load(f)
+            except (FileNotFoundError, json.JSONDecodeError):
+                self._index = {}
+            self._index_stamp = stamp
+        return self._index
+
+    def _save_index(self):
+        os.makedirs(self.cache_dir, exist_ok=True)
+        tmp_path = f"{self.index_path}.{uuid.uuid4().hex}"
+        with open(tmp_path, 'w') as f:
+            json.dump(self._index, f)
+        os.replace(tmp_path, self.index_path)
+        self._index_stamp = _file_stamp(self.index_path)
+
+
+def _tree_size(path: str) -> int:
+    total = 0
+    for root, _, files in os.walk(path):
+        for filename in files:
+            total += os.path.getsize(os.path.join(root, filename))
+    return total
+
+
+def _file_stamp(path: str):
+    try:
+        stat_result = os.stat(path)
+    except FileNotFoundError:
+        return None
+    return stat_result.st_ino, stat_result.st_mtime_ns, stat_result.st_size
@@ -0,0 +1,329 @@
+"""SQLite index of a job's mining results, for filtered and paginated motif queries."""
+import hashlib
+import json
+import os
+import sqlite3
+import uuid
+from typing import Any, Dict, List, Optional
+from .motif_merge import load_motif_records, motif_count, motif_identity
+
+FORMAT_VERSION = 1
+INDEX_FILENAME = 'results_index.sqlite'
+
+# Fields a motif record may keep its size, edge count, score and instances under
+SIZE_KEYS = ('size', 'num_nodes', 'n_nodes', 'pattern_size')
+EDGE_COUNT_KEYS = ('num_edges', 'n_edges')
+SCORE_KEYS = ('score', 'z_score', 'zscore', 'significance', 'log_likelihood')
+INSTANCE_KEYS = ('instances', 'examples', 'matches')
+# Keys of node/edge objects that hold their label
+LABEL_KEYS = ('label', 'type', 'labels')
+
+SORT_COLUMNS = {'id': 'id', 'size': 'size', 'edges': 'num_edges', 'frequency': 'frequency', 'score': 'score'}
+MAX_PAGE_SIZE = 500
+
+
+def index_path_for(job_dir: str) -> str:
+    """``results_index.sqlite`` next to the job's ``results/`` (so it is not archived or published)."""
+    return os.path.join(job_dir, INDEX_FILENAME)
+
+
+def _result_files(results_dir: str) -> List[str]:
+    files = []
+    for root, dirs, names in os.walk(results_dir):
+        dirs.sort()
+        files.extend(os.path.join(root, name) for name in sorted(names) if name.endswith('.json'))
+    return files
+
+
+def source_version(results_dir: str) -> str:
+    """Fingerprint (paths, sizes, mtimes) of the JSON files under ``results_dir``."""
+    digest = hashlib.sha256()
+    for path in _result_files(results_dir):
+        stat_result = os.stat(path)
+        relative = os.path.relpath(path, results_dir)
+        digest.update(f"{relative}\0{stat_result.st_size}\0{stat_result.st_mtime_ns}\n".encode('utf-8'))
+    return digest.hexdigest()
+
+
+def _connect(path: str) -> sqlite3.Connection:
+    conn = sqlite3.connect(f"file:{path}?mode=ro", uri=True, check_same_thread=False)
+    conn.row_factory = sqlite3.Row
+    return conn
+
+
+def read_meta(job_dir: str) -> Optional[Dict[str, Any]]:
+    try:
+        conn = _connect(index_path_for(job_dir))
+    except sqlite3.Error:
+        return None
+    try:
+        row = conn.execute("SELECT value FROM meta WHERE key = 'meta'").fetchone()
+        return json.loads(row['value']) if row else None
+    except sqlite3.Error:
+        return None
+    finally:
+        conn.close()
+
+
+def is_fresh(job_dir: str) -> bool:
+    """True if the index was built from the current ``results/``."""
+    meta = read_meta(job_dir)
+    if not meta or meta.get('format_version') != FORMAT_VERSION:
+        return False
+    return meta.get('source') == source_version(os.path.join(job_dir, 'results'))
+
+
+def _first_number(record: Dict[str, Any], keys) -> Optional[float]:
+    for key in keys:
+        value = record.get(key)
+        if isinstance(value, (int, float)) and not isinstance(value, bool):
+            return value
+    return None
+
+
+def _labels(record: Dict[str, Any], kind: str) -> List[str]:
+    """Labels of a motif's nodes or edges, from ``<kind>_labels`` or the ``<kind>s`` objects."""
+    value = record.get(f'{kind}_labels')
+    if isinstance(value, dict):
+        values = list(value.values())
+    elif isinstance(value, list):
+        values = value
+    else:
+        values = []
+        for item in record.get(f'{kind}s') or []:
+            if isinstance(item, dict):
+                label = next((item[key] for key in LABEL_KEYS if item.get(key) is not None), None)
+                if label is not None:
+                    values.append(label)
+    labels = []
+    for label in values:
+        labels.extend(str(part) for part in (label if isinstance(label, list) else [label]) if part is not None)
+    return labels
+
+
+def _instances(record: Dict[str, Any]) -> Optional[List[Any]]:
+    for key in INSTANCE_KEYS:
+        if isinstance(record.get(key), list):
+            return record[key]
+    return None
+
+
+def describe_motif(record: Dict[str, Any]) -> Dict[str, Any]:
+    """The indexed columns of a motif record."""
+    size = _first_number(record, SIZE_KEYS)
+    num_edges = _first_number(record, EDGE_COUNT_KEYS)
+    for key in ('nodes', 'node_labels'):
+        if size is None and isinstance(record.get(key), (list, dict)):
+            size = len(record[key])
+    for key in ('edges', 'edge_labels'):
+        if num_edges is None and isinstance(record.get(key), (list, dict)):
+            num_edges = len(record[key])
+    instances = _instances(record)
+    identity = motif_identity(record)
+    return {
+        'motif_hash': hashlib.sha1(identity.encode('utf-8')).hexdigest() if identity else None,
+        'size': int(size) if size is not None else 0,
+        'num_edges': int(num_edges) if num_edges is not None else 0,
+        'frequency': motif_count(record)[1],
+        'score': _first_number(record, SCORE_KEYS),
+        'node_labels': _labels(record, 'node'),
+        'edge_labels': _labels(record, 'edge'),
+        'instance_count': len(instances) if instances is not None else 0
+    }
+
+
+def build_index(job_dir: str) -> Dict[str, Any]:
+    """Index every motif list under ``job_dir/results`` and write ``results_index.sqlite``.
+
+    Motif ids follow file and list order, so the same results always get
+    the same ids. The index is written beside its final path and swapped
+    in, readers keep the version they opened.
+    """
+    results_dir = os.path.join(job_dir, 'results')
+    source = source_version(results_dir)
+    path = index_path_for(job_dir)
+    tmp_path = f"{path}.{uuid.uuid4().hex}.tmp"
+    conn = sqlite3.connect(tmp_path)
+    try:
+        conn.executescript("""
+            CREATE TABLE meta (key TEXT PRIMARY KEY, value TEXT NOT NULL);
+            CREATE TABLE motifs (
+                id INTEGER PRIMARY KEY,
+                file TEXT NOT NULL,
+                position INTEGER NOT NULL,
+                motif_hash TEXT,
+                size INTEGER NOT NULL,
+                num_edges INTEGER NOT NULL,
+                frequency NUMERIC NOT NULL,
+                score NUMERIC,
+                node_labels TEXT NOT NULL,
+                edge_labels TEXT NOT NULL,
+                instance_count INTEGER NOT NULL,
+                record TEXT NOT NULL
+            );
+            CREATE TABLE labels (kind TEXT NOT NULL, label TEXT NOT NULL, motif_id INTEGER NOT NULL,
+                                 PRIMARY KEY (kind, label, motif_id)) WITHOUT ROWID;
+            CREATE TABLE instances (motif_id INTEGER NOT NULL, position INTEGER NOT NULL, instance TEXT NOT NULL,
+                                    PRIMARY KEY (motif_id, position)) WITHOUT ROWID;
+        """)
+        files, motif_id = {}, 0
+        for file_path in _result_files(results_dir):
+            records, _, _ = load_motif_records(file_path)
+            if records is None:
+                continue
+            relative = os.path.relpath(file_path, results_dir)
+            files[relative] = len(records)
+            motifs, labels, instances = [], [], []
+            for position, record in enumerate(records):
+                motif_id += 1
+                described = describe_motif(record)
+                motifs.append((
+                    motif_id, relative, position, described['motif_hash'], described['size'],
+                    described['num_edges'], described['frequency'], described['score'],
+                    json.dumps(described['node_labels']), json.dumps(described['edge_labels']),
+                    described['instance_count'],
+                    json.dumps({key: value for key, value in record.items() if key not in INSTANCE_KEYS}, default=str)
+                ))
+                labels.extend(('node', label, motif_id) for label in described['node_labels'])
+                labels.extend(('edge', label, motif_id) for label in described['edge_labels'])
+                instances.extend(
+                    (motif_id, index, json.dumps(instance, default=str))
+                    for index, instance in enumerate(_instances(record) or [])
+                )
+            conn.executemany("INSERT INTO motifs VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)", motifs)
+            conn.executemany("INSERT OR IGNORE INTO labels VALUES (?, ?, ?)", labels)
+            conn.executemany("INSERT INTO instances VALUES (?, ?, ?)", instances)
+        conn.executescript("""
+            CREATE INDEX idx_motifs_frequency ON motifs (frequency, id);
+            CREATE INDEX idx_motifs_score ON motifs (score, id);
+            CREATE INDEX idx_motifs_size ON motifs (size, frequency);
+            CREATE INDEX idx_motifs_file ON motifs (file, position);
+        """)
+        meta = {'format_version': FORMAT_VERSION, 'source': source, 'motifs': motif_id, 'files': files}
+        conn.execute("INSERT INTO meta VALUES ('meta', ?)", (json.dumps(meta),))
+        conn.commit()
+    except BaseException:
+        conn.close()
+        os.unlink(tmp_path)
+        raise
+    conn.close()
+    os.replace(tmp_path, path)
+    return meta
+
+
+def _motif_dict(row: sqlite3.Row, with_record: bool = True) -> Dict[str, Any]:
+    motif = {
+        'motif_id': row['id'],
+        'file': row['file'],
+        'position': row['position'],
+        'motif_hash': row['motif_hash'],
+        'size': row['size'],
+        'num_edges': row['num_edges'],
+        'frequency': row['frequency'],
+        'score': row['score'],
+        'node_labels': json.loads(row['node_labels']),
+        'edge_labels': json.loads(row['edge_labels']),
+        'instance_count': row['instance_count']
+    }
+    if with_record:
+        motif['record'] = json.loads(row['record'])
+    return motif
+
+
+def query_motifs(
+    job_dir: str,
+    file: str = None,
+    min_size: int = None,
+    max_size: int = None,
+    min_frequency: float = None,
+    min_score: float = None,
+    node_labels: List[str] = None,
+    edge_labels: List[str] = None,
+    sort: str = 'frequency',
+    order: str = 'desc',
+    limit: int = 20,
+    offset: int = 0
+) -> Dict[str, Any]:
+    """One page of motifs matching the filters, plus the total number of matches.
+
+    Filters and sort keys are served from indexes, so no page needs a full
+    sort. The total still counts every matching motif, and OFFSET steps over
+    the skipped rows, so a page costs more the more motifs match and the
+    deeper it is. Motifs must carry all the given
+    node and edge labels; motifs without a score sort as lowest. Raises
+    ValueError for unknown sort keys or bad paging.
+    """
+    if sort not in SORT_COLUMNS:
+        raise ValueError(f"Unknown sort '{sort}', expected one of {sorted(SORT_COLUMNS)}")
+    if order not in ('asc', 'desc'):
+        raise ValueError("order must be 'asc' or 'desc'")
+    if not 1 <= limit <= MAX_PAGE_SIZE or offset < 0:
+        raise ValueError(f"limit must be between 1 and {MAX_PAGE_SIZE} and offset not negative")
+
+    conditions, params = [], []
+    for column, operator, value in (
+        ('file', '=', file), ('size', '>=', min_size), ('size', '<=', max_size),
+        ('frequency', '>=', min_frequency), ('score', '>=', min_score)
+    ):
+        if value is not None:
+            conditions.append(f"{column} {operator} ?")
+            params.append(value)
+    for kind, labels in (('node', node_labels), ('edge', edge_labels)):
+        for label in labels or []:
+            conditions.append("id IN (SELECT motif_id FROM labels WHERE kind = ? AND label = ?)")
+            params.extend((kind, label))
+    where = f"WHERE {' AND '.join(conditions)}" if conditions else ""
+    column = SORT_COLUMNS[sort]
+
+    conn = _connect(index_path_for(job_dir))
+    try:
+        total = conn.execute(f"SELECT COUNT(*) FROM motifs {where}", params).fetchone()[0]
+        rows = conn.execute(
+            # Ties in the same direction, so the (column, id) index serves the order without a sort
+            f"SELECT * FROM motifs {where} ORDER BY {column} {order.upper()}, id {order.upper()} LIMIT ? OFFSET ?",
+            (*params, limit, offset)
+        ).fetchall()
+    finally:
+        conn.close()
+    return {
+        'total': total,
+        'offset': offset,
+        'limit': limit,
+        'next_offset': offset + len(rows) if offset + len(rows) < total else None,
+        'motifs': [_motif_dict(row) for row in rows]
+    }
+
+
+def get_motif(job_dir: str, motif_id: int) -> Optional[Dict[str, Any]]:
+    conn = _connect(index_path_for(job_dir))
+    try:
+        row = conn.execute("SELECT * FROM motifs WHERE id = ?", (motif_id,)).fetchone()
+    finally:
+        conn.close()
+    return _motif_dict(row) if row else None
+
+
+def get_instances(job_dir: str, motif_id: int, limit: int = 50, offset: int = 0) -> Optional[Dict[str, Any]]:
+    """A page of one motif's instances, or None if there is no such motif."""
+    if not 1 <= limit <= MAX_PAGE_SIZE or offset < 0:
+        raise ValueError(f"limit must be between 1 and {MAX_PAGE_SIZE} and offset not negative")
+    conn = _connect(index_path_for(job_dir))
+    try:
+        row = conn.execute("SELECT instance_count FROM motifs WHERE id = ?", (motif_id,)).fetchone()
+        if row is None:
+            return None
+        instances = conn.execute(
+            "SELECT instance FROM instances WHERE motif_id = ? AND position >= ? ORDER BY position LIMIT ?",
+            (motif_id, offset, limit)
+        ).fetchall()
+    finally:
+        conn.close()
+    total = row['instance_count']
+    return {
+        'motif_id': motif_id,
+        'total': total,
+        'offset': offset,
+        'limit': limit,
+        'next_offset': offset + len(instances) if offset + len(instances) < total else None,
+        'instances': [json.loads(instance['instance']) for instance in instances]
+    }
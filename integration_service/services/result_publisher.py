@@ -0,0 +1,128 @@
+"""Publishing mining results from the shared volume to the local output directory."""
+import errno
+import os
+import shutil
+import uuid
+from typing import Dict
+from ..config.settings import settings
+
+try:
+    import fcntl
+except ImportError:  # pragma: no cover - not available on Windows
+    fcntl = None
+
+# ioctl that clones a file's extents (btrfs, XFS, overlayfs on top of those)
+FICLONE = 0x40049409
+
+# Errors that mean "hardlinks are not possible here", not "the copy failed"
+LINK_UNSUPPORTED = (errno.EXDEV, errno.EPERM, errno.EMLINK, errno.ENOTSUP, errno.EOPNOTSUPP)
+
+
+class ResultPublisher:
+    """Makes a job's ``results/`` and ``plots/`` available under ``/app/output``.
+
+    Modes (``RESULT_PUBLISH_MODE``):
+        link:   hardlink every file, reflink or copy only when the two
+                directories are on different filesystems
+        copy:   always copy (the previous behaviour)
+        direct: publish nothing and serve straight from the shared volume
+
+    A directory is built next to its destination and swapped in with a
+    rename, so readers never see a half-published result. This is blocking
+    filesystem work; call it from a worker thread.
+    """
+
+    OUTPUT_DIRS = ('results', 'plots')
+    MODES = ('link', 'copy', 'direct')
+
+    def __init__(self, mode: str = None):
+        self.mode = mode or settings.result_publish_mode
+        if self.mode not in self.MODES:
+            raise ValueError(f"Unknown RESULT_PUBLISH_MODE '{self.mode}', expected one of {self.MODES}")
+
+    def publish(self, shared_job_dir: str, local_job_dir: str) -> Dict[str, int]:
+        """Publish the job's output directories and return per-method file counts."""
+        counts = {'linked': 0, 'reflinked': 0, 'copied': 0}
+
+        for name in self.OUTPUT_DIRS:
+            src = os.path.join(shared_job_dir, name)
+            dst = os.path.join(local_job_dir, name)
+
+            if self.mode == 'direct':
+                # Stale local copies would shadow the shared volume on download
+                if os.path.exists(dst):
+                    shutil.rmtree(dst)
+                continue
+            if not os.path.isdir(src):
+                continue
+
+            os.makedirs(local_job_dir, exist_ok=True)
+            staging = f"{dst}.publishing-{uuid.uuid4().hex}"
+            try:
+                self._publish_tree(src, staging, counts)
+                _swap_in(staging, dst)
+            except BaseException:
+                shutil.rmtree(staging, ignore_errors=True)
+                raise
+
+        return counts
+
+    def _publish_tree(self, src: str, dst: str, counts: Dict[str, int]):
+        can_link = self.mode == 'link'
+        can_reflink = self.mode == 'link' and fcntl is not None
+
+        for root, _, files in os.walk(src):
+            target_root = os.path.join(dst, os.path.relpath(root, src))
+            os.makedirs(target_root, exist_ok=True)
+            shutil.copystat(root, target_root)
+
+            for filename in files:
+                src_file = os.path.join(root, filename)
+                dst_file = os.path.join(target_root, filename)
+
+                if can_link:
+                    try:
+                        os.link(src_file, dst_file)
+                        counts['linked'] += 1
+                        continue
+                    except OSError as e:
+                        if e.errno not in LINK_UNSUPPORTED:
+                            raise
+                        # Different filesystem: do not try again for the rest of the tree
+                        can_link = False
+
+                if can_reflink:
+                    if _reflink(src_file, dst_file):
+                        counts['reflinked'] += 1
+                        continue
+                    can_reflink = False
+
+                shutil.copy2(src_file, dst_file)
+                counts['copied'] += 1
+
+
+def _reflink(src: str, dst: str) -> bool:
+    """Clone ``src`` into ``dst`` without copying data. Returns False if unsupported."""
+    with open(src, 'rb') as src_file, open(dst, 'wb') as dst_file:
+        try:
+            fcntl.ioctl(dst_file.fileno(), FICLONE, src_file.fileno())
+        except OSError:
+            ok = False
+        else:
+            ok = True
+    if ok:
+        shutil.copystat(src, dst)
+    else:
+        os.unlink(dst)
+    return ok
+
+
+def _swap_in(staging: str, dst: str):
+    """Replace ``dst`` with ``staging`` using renames."""
+    old = None
+    if os.path.exists(dst):
+        old = f"{dst}.old-{uuid.uuid4().hex}"
+        os.rename(dst, old)
+    os.rename(staging, dst)
+    if old:
+        shutil.rmtree(old, ignore_errors=True)
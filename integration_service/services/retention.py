@@ -0,0 +1,516 @@
+"""Disk quotas and retention of job artifacts on the shared volume and in the local output."""
+import asyncio
+import os
+import shutil
+import sqlite3
+import threading
+import time
+from typing import Any, Dict, Iterable, List, Optional, Set
+from .io_executor import io_executor
+from .metrics import RETENTION_BYTES_FREED, RETENTION_EVICTIONS, timed
+from ..config.settings import settings
+
+# Why an artifact was deleted, as reported in metrics and logs
+TTL = 'ttl'
+QUOTA = 'quota'
+DISK_FREE = 'disk_free'
+ORPHAN_MORK = 'orphan_mork'
+STALE_ARCHIVE = 'stale_archive'
+UNUSED_ARCHIVE = 'archive_ttl'
+PARTIAL_ARCHIVE = 'partial_archive'
+
+# Access times are recorded at most this often per job and process
+TOUCH_INTERVAL = 60.0
+# How often the background loop writes recorded access times to the database
+TOUCH_FLUSH_INTERVAL = 5.0
+# Once over a quota, evict down to this fraction of it so the next job doesn't trigger another round
+QUOTA_TARGET = 0.9
+# Archives written this recently are left alone; their results may still be being published
+ARCHIVE_SETTLE_SECONDS = 60.0
+
+
+def _valid_job_id(job_id: str) -> bool:
+    return bool(job_id) and os.path.basename(job_id) == job_id and not job_id.startswith('.')
+
+
+class RetentionEngine:
+    """Deletes job artifacts by TTL, disk quota and free space, least recently used first.
+
+    A job's artifacts are its directory on the shared volume (graph, Mork
+    copy, CSR, mining results), its published directory in the local output
+    and its cached ``{job_id}.zip``. Downloads, mining and graph requests
+    record when a job was last used; jobs older than the TTL are deleted,
+    and while a volume is over its quota or short of free space the least
+    recently used jobs go first. Pinned jobs, jobs with pending subtasks or
+    queued mining, and anything used within ``min_age`` are never deleted.
+
+    Every sweep also collects garbage: the builder's Mork directories once
+    their graph job has merged them (after a grace period), archives whose
+    results changed or disappeared, archives nobody downloaded for a while,
+    and ``.partial`` archives of interrupted builds. Sweeps are coordinated
+    through SQLite so only one worker runs one per interval.
+    """
+
+    def __init__(
+        self,
+        shared_dir: str,
+        local_dir: str,
+        archive_service,
+        job_registry,
+        mining_queue,
+        csv_cache,
+        db_path: str = None
+    ):
+        self.shared_dir = os.path.abspath(shared_dir)
+        self.local_dir = os.path.abspath(local_dir)
+        self.archive_service = archive_service
+        self.job_registry = job_registry
+        self.mining_queue = mining_queue
+        self.csv_cache = csv_cache
+        self.db_path = db_path or settings.retention_db
+        self.enabled = settings.retention_enabled
+        self.interval = settings.retention_interval
+        self.job_ttl = settings.retention_job_ttl
+        self.max_bytes = {'shared': settings.retention_shared_max_bytes, 'local': settings.retention_local_max_bytes}
+        self.min_free_bytes = settings.retention_min_free_bytes
+        self.min_age = settings.retention_min_age
+        self.archive_ttl = settings.retention_archive_ttl
+        self.mork_grace = settings.retention_mork_grace
+        # Service state and caches may live on the volumes; they are never job artifacts
+        self.protected = {
+            os.path.abspath(path) for path in (settings.state_dir, settings.csv_cache_dir, settings.mining_cache_dir)
+        }
+        self.last_report: Optional[Dict[str, Any]] = None
+        self._lock = threading.Lock()
+        self._conn: Optional[sqlite3.Connection] = None
+        # Guards only the two dicts below, so ``touch`` never waits for the database
+        self._touch_lock = threading.Lock()
+        self._touched: Dict[str, float] = {}
+        self._pending_touches: Dict[str, float] = {}
+        self._task: Optional[asyncio.Task] = None
+
+    def _db(self) -> sqlite3.Connection:
+        if self._conn is None:
+            os.makedirs(os.path.dirname(os.path.abspath(self.db_path)), exist_ok=True)
+            conn = sqlite3.connect(self.db_path, check_same_thread=False, isolation_level=None, timeout=30)
+            conn.row_factory = sqlite3.Row
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("CREATE TABLE IF NOT EXISTS access (job_id TEXT PRIMARY KEY, last_access REAL NOT NULL)")
+            conn.execute("""
+                CREATE TABLE IF NOT EXISTS pins (
+                    job_id TEXT PRIMARY KEY,
+                    reason TEXT,
+                    pinned_at REAL NOT NULL
+                )
+            """)
+            conn.execute(
+                "CREATE TABLE IF NOT EXISTS sweeps (id INTEGER PRIMARY KEY CHECK (id = 1), last_sweep REAL NOT NULL)"
+            )
+            self._conn = conn
+        return self._conn
+
+    def touch(self, job_id: str, now: float = None):
+        """Record that ``job_id`` was used; cheap enough to call on every request.
+
+        The time is kept in memory and written by ``flush_touches``, which the
+        background loop runs every few seconds and every sweep runs first.
+        """
+        if not _valid_job_id(job_id):
+            return
+        now = now or time.time()
+        with self._touch_lock:
+            if now - self._touched.get(job_id, 0) < TOUCH_INTERVAL:
+                return
+            self._touched[job_id] = now
+            self._pending_touches[job_id] = max(now, self._pending_touches.get(job_id, 0))
+
+    def flush_touches(self):
+        """Write the access times recorded since the last flush in one transaction. Blocking."""
+        with self._touch_lock:
+            pending, self._pending_touches = self._pending_touches, {}
+        if not pending:
+            return
+        try:
+            with self._lock:
+                conn = self._db()
+                conn.execute("BEGIN IMMEDIATE")
+                try:
+                    conn.executemany(
+                        "INSERT INTO access (job_id, last_access) VALUES (?, ?) "
+                        "ON CONFLICT(job_id) DO UPDATE SET last_access = MAX(last_access, excluded.last_access)",
+                        pending.items()
+                    )
+                    conn.execute("COMMIT")
+                except Exception:
+                    conn.execute("ROLLBACK")
+                    raise
+        except Exception:
+            # Keep them for the next flush
+            with self._touch_lock:
+                for job_id, last_access in pending.items():
+                    self._pending_touches[job_id] = max(last_access, self._pending_touches.get(job_id, 0))
+            raise
+
+    def pin(self, job_id: str, reason: str = None) -> Dict[str, Any]:
+        with self._lock:
+            self._db().execute(
+                "INSERT INTO pins (job_id, reason, pinned_at) VALUES (?, ?, ?) "
+                "ON CONFLICT(job_id) DO UPDATE SET reason = excluded.reason",
+                (job_id, reason, time.time())
+            )
+        return self.pins()[job_id]
+
+    def unpin(self, job_id: str) -> bool:
+        with self._lock:
+            cursor = self._db().execute("DELETE FROM pins WHERE job_id = ?", (job_id,))
+        return cursor.rowcount > 0
+
+    def pins(self) -> Dict[str, Dict[str, Any]]:
+        with self._lock:
+            rows = self._db().execute("SELECT * FROM pins ORDER BY pinned_at").fetchall()
+        return {row['job_id']: {'job_id': row['job_id'], 'reason': row['reason'], 'pinned_at': row['pinned_at']}
+                for row in rows}
+
+    def has_artifacts(self, job_id: str) -> bool:
+        return _valid_job_id(job_id) and any(
+            os.path.exists(path) for path in (
+                os.path.join(self.shared_dir, job_id),
+                os.path.join(self.local_dir, job_id),
+                self.archive_service.archive_path(job_id)
+            )
+        )
+
+    def _access_times(self) -> Dict[str, float]:
+        with self._lock:
+            rows = self._db().execute("SELECT job_id, last_access FROM access").fetchall()
+        return {row['job_id']: row['last_access'] for row in rows}
+
+    def _forget(self, job_id: str):
+        with self._touch_lock:
+            self._touched.pop(job_id, None)
+            self._pending_touches.pop(job_id, None)
+        with self._lock:
+            self._db().execute("DELETE FROM access WHERE job_id = ?", (job_id,))
+
+    def _claim_sweep(self, now: float = None) -> bool:
+        """True if this worker should sweep now; at most one sweep per interval across workers."""
+        now = now or time.time()
+        with self._lock:
+            conn = self._db()
+            conn.execute("BEGIN IMMEDIATE")
+            try:
+                row = conn.execute("SELECT last_sweep FROM sweeps WHERE id = 1").fetchone()
+                due = row is None or now - row['last_sweep'] >= self.interval
+                if due:
+                    conn.execute(
+                        "INSERT INTO sweeps (id, last_sweep) VALUES (1, ?) "
+                        "ON CONFLICT(id) DO UPDATE SET last_sweep = excluded.last_sweep",
+                        (now,)
+                    )
+                conn.execute("COMMIT")
+            except Exception:
+                conn.execute("ROLLBACK")
+                raise
+        return due
+
+    def _entries(self, root: str) -> Iterable[os.DirEntry]:
+        try:
+            entries = list(os.scandir(root))
+        except FileNotFoundError:
+            return []
+        return [
+            entry for entry in entries
+            if not entry.name.startswith('.') and not any(
+                path == os.path.abspath(entry.path) or path.startswith(os.path.abspath(entry.path) + os.sep)
+                for path in self.protected
+            )
+        ]
+
+    def scan(self) -> Dict[str, Any]:
+        """Every job's artifact paths, sizes and directory mtime, plus leftover ``.partial`` archives.
+
+        Hardlinked files (published results) are counted once, on the shared volume.
+        """
+        jobs: Dict[str, Dict[str, Any]] = {}
+        partials = []
+        seen: Set[tuple] = set()
+
+        def job(job_id: str) -> Dict[str, Any]:
+            return jobs.setdefault(job_id, {'paths': {}, 'bytes': {'shared': 0, 'local': 0}, 'mtime': 0.0})
+
+        for entry in self._entries(self.shared_dir):
+            if entry.is_dir(follow_symlinks=False):
+                job(entry.name)['paths']['shared'] = entry.path
+        for entry in self._entries(self.local_dir):
+            if entry.is_dir(follow_symlinks=False):
+                job(entry.name)['paths']['local'] = entry.path
+            elif entry.name.endswith('.partial'):
+                partials.append({'path': entry.path, 'bytes': _tree_bytes(entry.path, seen),
+                                 'mtime': _mtime(entry.path)})
+            elif entry.name.endswith('.zip'):
+                job(entry.name[:-len('.zip')])['paths'].setdefault('archive', []).append(entry.path)
+
+        for job_id, info in jobs.items():
+            paths = info['paths']
+            if 'shared' in paths:
+                info['bytes']['shared'] += _tree_bytes(paths['shared'], seen)
+                info['mtime'] = max(
+                    _mtime(paths['shared']), _mtime(os.path.join(paths['shared'], 'progress.json'))
+                )
+        for job_id, info in jobs.items():
+            paths = info['paths']
+            if 'local' in paths:
+                info['mtime'] = max(info['mtime'], _mtime(paths['local']))
+            for path in ([paths['local']] if 'local' in paths else []) + paths.get('archive', []):
+                info['bytes']['local'] += _tree_bytes(path, seen)
+        return {'jobs': jobs, 'partials': partials}
+
+    def _usage(self, jobs: Dict[str, Dict[str, Any]]) -> Dict[str, Dict[str, Any]]:
+        usage = {}
+        for volume, root in (('shared', self.shared_dir), ('local', self.local_dir)):
+            try:
+                free, device = shutil.disk_usage(root).free, os.stat(root).st_dev
+            except FileNotFoundError:
+                free, device = None, None
+            usage[volume] = {
+                'bytes': sum(info['bytes'][volume] for info in jobs.values()),
+                'free': free,
+                'device': device,
+                'max_bytes': self.max_bytes[volume]
+            }
+        return usage
+
+    def _pressure(self, usage: Dict[str, Dict[str, Any]], factor: float) -> Optional[str]:
+        """The reason to keep evicting, if a volume is over ``factor`` of its quota or short of space."""
+        for volume in usage.values():
+            if volume['max_bytes'] and volume['bytes'] > volume['max_bytes'] * factor:
+                return QUOTA
+        for volume in usage.values():
+            if self.min_free_bytes and volume['free'] is not None and volume['free'] < self.min_free_bytes / factor:
+                return DISK_FREE
+        return None
+
+    def _credit(self, usage: Dict[str, Dict[str, Any]], freed: Dict[str, int]):
+        for name, volume in usage.items():
+            volume['bytes'] -= freed.get(name, 0)
+            if volume['free'] is not None:
+                volume['free'] += sum(
+                    amount for other, amount in freed.items() if usage[other]['device'] == volume['device']
+                )
+
+    def plan(self, now: float = None) -> Dict[str, Any]:
+        """Decide what a sweep deletes, without deleting anything."""
+        now = now or time.time()
+        scanned = self.scan()
+        jobs = scanned['jobs']
+        usage = self._usage(jobs)
+        access = self._access_times()
+        pinned = set(self.pins())
+        active = self.job_registry.active_job_ids() | self.mining_queue.active_job_ids()
+        mork_parents = self.job_registry.mork_outputs()
+        evictions: List[Dict[str, Any]] = []
+
+        def evict(kind: str, job_id: Optional[str], reason: str, paths: List[str], freed: Dict[str, int]):
+            evictions.append({
+                'kind': kind, 'job_id': job_id, 'reason': reason, 'paths': paths, 'bytes': sum(freed.values())
+            })
+            self._credit(usage, freed)
+
+        for partial in scanned['partials']:
+            if now - partial['mtime'] > self.min_age:
+                evict('archive', None, PARTIAL_ARCHIVE, [partial['path']], {'local': partial['bytes']})
+
+        candidates = []
+        for job_id, info in jobs.items():
+            if job_id in pinned or job_id in active:
+                continue
+            last_used = max(access.get(job_id, 0.0), info['mtime'])
+            if job_id in mork_parents:
+                # The builder's Mork output: copied into its graph job by the merge subtask
+                if mork_parents[job_id] not in active and now - last_used > self.mork_grace:
+                    evict('mork', job_id, ORPHAN_MORK, _all_paths(info), dict(info['bytes']))
+                continue
+            if now - last_used <= self.min_age:
+                continue
+            if self.job_ttl and now - last_used > self.job_ttl:
+                evict('job', job_id, TTL, _all_paths(info), dict(info['bytes']))
+                continue
+
+            archive = info['paths'].get('archive')
+            archive_mtime = max((_mtime(path) for path in archive), default=0.0) if archive else 0.0
+            if archive and now - archive_mtime > ARCHIVE_SETTLE_SECONDS:
+                reason = None
+                if not self._archive_current(job_id):
+                    reason = STALE_ARCHIVE
+                elif now - max(access.get(job_id, 0.0), archive_mtime) > self.archive_ttl:
+                    reason = UNUSED_ARCHIVE
+                if reason:
+                    archive_bytes = sum(_tree_bytes(path, set()) for path in archive)
+                    evict('archive', job_id, reason, archive, {'local': archive_bytes})
+                    info['paths'].pop('archive')
+                    info['bytes']['local'] = max(0, info['bytes']['local'] - archive_bytes)
+            candidates.append((last_used, job_id, info))
+
+        # Least recently used first, until every volume is back under its limits
+        candidates.sort(key=lambda candidate: candidate[0])
+        reason = self._pressure(usage, 1.0)
+        while reason and candidates:
+            _, job_id, info = candidates.pop(0)
+            evict('job', job_id, reason, _all_paths(info), dict(info['bytes']))
+            reason = self._pressure(usage, QUOTA_TARGET)
+        if self._pressure(usage, 1.0):
+            print(f"Retention: still over limits with nothing left to evict "
+                  f"({len(pinned)} pinned, {len(active)} active jobs)")
+
+        return {
+            'evictions': evictions,
+            'usage': {
+                name: {key: value for key, value in volume.items() if key != 'device'}
+                for name, volume in usage.items()
+            },
+            'jobs': len(jobs),
+            'pinned': len(pinned),
+            'active': len(active)
+        }
+
+    def _archive_current(self, job_id: str) -> bool:
+        """True if the stored archive still matches the job's results."""
+        sources = self.archive_service.find_sources(
+            os.path.join(self.local_dir, job_id), os.path.join(self.shared_dir, job_id)
+        )
+        if not sources:
+            return False
+        return self.archive_service.cached(job_id, self.archive_service.version(sources)) is not None
+
+    def sweep(self, dry_run: bool = False, now: float = None) -> Dict[str, Any]:
+        """Plan and (unless ``dry_run``) delete; returns the report. Blocking, run it on a worker thread."""
+        started = time.time()
+        self.flush_touches()
+        plan = self.plan(now)
+        freed = 0
+        for eviction in plan['evictions']:
+            if dry_run:
+                continue
+            try:
+                for path in eviction['paths']:
+                    _remove(path)
+            except OSError as e:
+                print(f"Retention: could not delete {eviction['kind']} {eviction['job_id']}: {e}")
+                eviction['error'] = str(e)
+                continue
+            freed += eviction['bytes']
+            RETENTION_EVICTIONS.inc(kind=eviction['kind'], reason=eviction['reason'])
+            RETENTION_BYTES_FREED.inc(eviction['bytes'], reason=eviction['reason'])
+            print(f"Retention: deleted {eviction['kind']} {eviction['job_id'] or eviction['paths'][0]} "
+                  f"({eviction['reason']}, {eviction['bytes']} bytes)")
+            if eviction['kind'] in ('job', 'mork'):
+                self.csv_cache.forget_job(eviction['job_id'])
+                self._forget(eviction['job_id'])
+
+        report = {
+            **plan,
+            'dry_run': dry_run,
+            'started_at': started,
+            'duration': round(time.time() - started, 3),
+            'bytes_freed': freed
+        }
+        if not dry_run:
+            self.last_report = report
+        return report
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            'enabled': self.enabled,
+            'interval': self.interval,
+            'job_ttl': self.job_ttl,
+            'archive_ttl': self.archive_ttl,
+            'mork_grace': self.mork_grace,
+            'min_age': self.min_age,
+            'max_bytes': self.max_bytes,
+            'min_free_bytes': self.min_free_bytes,
+            'pinned': len(self.pins()),
+            'last_sweep': self.last_report
+        }
+
+    def collect(self):
+        """Managed bytes per volume as of the last sweep, for ``/metrics``."""
+        usage = self.last_report['usage'] if self.last_report else {}
+        yield ('integration_retention_managed_bytes', 'gauge', 'Bytes of job artifacts per volume at the last sweep',
+               [({'volume': name}, volume['bytes']) for name, volume in usage.items()])
+        yield ('integration_retention_pinned_jobs', 'gauge', 'Jobs exempt from retention', [({}, len(self.pins()))])
+
+    async def start(self):
+        """Write access times and sweep every ``interval`` seconds in the background."""
+        await self.stop()
+        self._task = asyncio.create_task(self._loop())
+
+    async def stop(self):
+        task, self._task = self._task, None
+        if task is not None:
+            task.cancel()
+            await asyncio.gather(task, return_exceptions=True)
+        await io_executor.run(self.flush_touches)
+
+    async def _loop(self):
+        next_sweep = 0.0
+        while True:
+            try:
+                await io_executor.run(self.flush_touches)
+                if self.enabled and time.monotonic() >= next_sweep:
+                    next_sweep = time.monotonic() + self.interval
+                    if await io_executor.run(self._claim_sweep):
+                        with timed('retention_sweep') as timing:
+                            report = await io_executor.run(self.sweep)
+                            timing.update(evicted=len(report['evictions']), bytes_freed=report['bytes_freed'])
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                print(f"Retention sweep failed: {e}")
+            await asyncio.sleep(min(TOUCH_FLUSH_INTERVAL, self.interval))
+
+
+def _all_paths(info: Dict[str, Any]) -> List[str]:
+    paths = info['paths']
+    return [paths[name] for name in ('shared', 'local') if name in paths] + paths.get('archive', [])
+
+
+def _mtime(path: str) -> float:
+    try:
+        return os.stat(path, follow_symlinks=False).st_mtime
+    except OSError:
+        return 0.0
+
+
+def _tree_bytes(path: str, seen: Set[tuple]) -> int:
+    """Size of a file or directory tree, skipping inodes already in ``seen``."""
+    total = 0
+    for root, dirs, files in _walk(path):
+        for name in files:
+            try:
+                stat_result = os.stat(os.path.join(root, name) if root else path, follow_symlinks=False)
+            except OSError:
+                continue
+            inode = (stat_result.st_dev, stat_result.st_ino)
+            if stat_result.st_nlink > 1:
+                if inode in seen:
+                    continue
+                seen.add(inode)
+            total += stat_result.st_size
+    return total
+
+
+def _walk(path: str):
+    if os.path.isdir(path) and not os.path.islink(path):
+        yield from os.walk(path)
+    else:
+        yield None, [], [path]
+
+
+def _remove(path: str):
+    if os.path.isdir(path) and not os.path.islink(path):
+        shutil.rmtree(path)
+    else:
+        try:
+            os.unlink(path)
+        except FileNotFoundError:
+            pass
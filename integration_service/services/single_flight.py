@@ -0,0 +1,62 @@
+"""Request coalescing for identical concurrent operations."""
+import asyncio
+from typing import Any, Awaitable, Callable, Dict, Tuple
+
+
+class SingleFlight:
+    """Runs at most one operation per key at a time.
+
+    Callers that arrive while an operation with the same key is in flight
+    attach to it and receive its result (or exception) instead of starting
+    a duplicate run. A run is cancelled once every caller waiting on it has
+    been cancelled, so abandoned work does not hold upstream capacity.
+    """
+
+    def __init__(self, name: str):
+        self.name = name
+        self.executions = 0
+        self.coalesced = 0
+        self._in_flight: Dict[str, asyncio.Task] = {}
+        self._waiters: Dict[asyncio.Task, int] = {}
+
+    async def do(self, key: str, operation: Callable[[], Awaitable[Any]]) -> Tuple[Any, bool]:
+        """Run ``operation`` or join the in-flight run for ``key``.
+
+        Returns ``(result, shared)`` where ``shared`` is True when the result
+        came from another caller's run.
+        """
+        task = self._in_flight.get(key)
+        shared = task is not None
+        if shared:
+            self.coalesced += 1
+            print(f"DEBUG: Coalesced duplicate {self.name} request onto in-flight run {key[:12]}")
+        else:
+            task = asyncio.ensure_future(operation())
+            self._in_flight[key] = task
+            self.executions += 1
+            task.add_done_callback(lambda done: self._forget(key, done))
+
+        self._waiters[task] = self._waiters.get(task, 0) + 1
+        try:
+            # Shield so one caller going away does not cancel the run for the others
+            return await asyncio.shield(task), shared
+        except asyncio.CancelledError:
+            if self._waiters[task] == 1 and not task.done():
+                print(f"DEBUG: Every caller left {self.name} run {key[:12]}, cancelling it")
+                task.cancel()
+            raise
+        finally:
+            self._waiters[task] -= 1
+            if not self._waiters[task]:
+                del self._waiters[task]
+
+    def _forget(self, key: str, task: asyncio.Task):
+        if self._in_flight.get(key) is task:
+            del self._in_flight[key]
+
+    def stats(self) -> Dict[str, int]:
+        return {
+            'executions': self.executions,
+            'duplicates_saved': self.coalesced,
+            'in_flight': len(self._in_flight)
+        }
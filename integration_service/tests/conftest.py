@@ -0,0 +1,26 @@
+"""Shared test fixtures."""
+import pytest
+from ..config.settings import settings
+
+
+@pytest.fixture(autouse=True)
+def isolated_state(tmp_path, monkeypatch):
+    """Keep every store a service opens (queues, registries, caches) inside the test's directory.
+
+    Services read these paths when they are constructed, so nothing a test
+    does reaches the real shared volume or leaves rows for other runs.
+    """
+    # A directory of its own, so tests remain free to create shared/, local/ and so on
+    root = tmp_path / "settings"
+    state_dir = root / "state"
+    for name, path in (
+        ("shared_volume_path", root / "shared"),
+        ("local_output_dir", root / "local"),
+        ("state_dir", state_dir),
+        ("mining_queue_db", state_dir / "mining_queue.sqlite"),
+        ("job_registry_db", state_dir / "jobs.sqlite"),
+        ("retention_db", state_dir / "retention.sqlite"),
+        ("csv_cache_dir", root / "cache"),
+        ("mining_cache_dir", root / "cache" / "mining"),
+    ):
+        monkeypatch.setattr(settings, name, str(path))
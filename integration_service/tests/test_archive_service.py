@@ -0,0 +1,73 @@
+"""Tests for streaming job archives."""
+import io
+import os
+import zipfile
+import pytest
+from ..services.archive_service import ArchiveService
+
+
+def _make_job(job_dir):
+    os.makedirs(os.path.join(job_dir, "results"))
+    os.makedirs(os.path.join(job_dir, "plots", "instances"))
+    with open(os.path.join(job_dir, "results", "patterns.json"), "w") as f:
+        f.write("[]")
+    for i in range(20):
+        with open(os.path.join(job_dir, "plots", "instances", f"motif_{i}.html"), "wb") as f:
+            f.write(os.urandom(16 * 1024))
+
+
+async def _collect(stream):
+    return b"".join([chunk async for chunk in stream])
+
+
+@pytest.mark.asyncio
+async def test_streams_archive_and_reuses_it_until_results_change(tmp_path):
+    shared, local = str(tmp_path / "shared" / "job"), str(tmp_path / "local" / "job")
+    _make_job(shared)
+    service = ArchiveService(str(tmp_path / "local"), chunk_size=4096)
+
+    archive = await service.open(local, shared, "job")
+    assert archive.path is None
+    body = await _collect(archive.stream)
+
+    names = zipfile.ZipFile(io.BytesIO(body)).namelist()
+    assert "results/patterns.json" in names
+    assert "plots/instances/motif_19.html" in names
+    with open(service.archive_path("job"), "rb") as f:
+        assert f.read() == body
+    # The version travels inside the archive, so it cannot be paired with another one
+    assert zipfile.ZipFile(service.archive_path("job")).comment == archive.version.encode()
+    assert os.listdir(str(tmp_path / "local")) == ["job.zip"]
+
+    cached = await service.open(local, shared, "job")
+    assert cached.path == service.archive_path("job")
+
+    with open(os.path.join(shared, "results", "patterns.json"), "w") as f:
+        f.write('[{"count": 1}]')
+    later = os.stat(service.archive_path("job")).st_mtime_ns + 10 ** 9
+    os.utime(os.path.join(shared, "results", "patterns.json"), ns=(later, later))
+    rebuilt = await service.open(local, shared, "job")
+    assert rebuilt.path is None
+    body = await _collect(rebuilt.stream)
+    assert zipfile.ZipFile(io.BytesIO(body)).read("results/patterns.json") == b'[{"count": 1}]'
+
+
+@pytest.mark.asyncio
+async def test_abandoned_download_leaves_no_archive(tmp_path):
+    shared, local = str(tmp_path / "shared" / "job"), str(tmp_path / "local" / "job")
+    _make_job(shared)
+    service = ArchiveService(str(tmp_path / "local"), chunk_size=1024)
+
+    archive = await service.open(local, shared, "job")
+    stream = archive.stream
+    await stream.__anext__()
+    await stream.aclose()
+
+    assert os.listdir(str(tmp_path / "local")) == []
+
+
+@pytest.mark.asyncio
+async def test_missing_results_raise_not_found(tmp_path):
+    service = ArchiveService(str(tmp_path))
+    with pytest.raises(FileNotFoundError):
+        await service.open(str(tmp_path / "a"), str(tmp_path / "b"), "job")
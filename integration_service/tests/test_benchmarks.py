@@ -0,0 +1,67 @@
+"""Tests for the benchmark harness and its builder/miner stubs."""
+import json
+import os
+import pickle
+import httpx
+import pytest
+from ..benchmarks.harness import compare, parse_size, percentile, summarize, write_dataset
+from ..benchmarks.stubs import StubBehaviour, create_builder_app, create_miner_app
+
+
+def _scenario(flows_per_s=2.0, p99_ms=100.0, error_rate=0.0, rss=100 * 2 ** 20):
+    stats = {'count': 10, 'errors': 0, 'error_rate': error_rate, 'p50_ms': 50.0, 'p99_ms': p99_ms}
+    return {'name': 'small-c4', 'flows_per_s': flows_per_s, 'peak_rss_bytes': rss, 'endpoints': {'mine-patterns': stats}}
+
+
+def test_percentiles_and_sizes():
+    assert percentile([], 50) is None
+    assert percentile([1, 2, 3, 4], 50) == 2.5
+    assert percentile([0.1] * 99 + [1.0], 100) == 1.0
+    summary = summarize([0.010, 0.020, 0.030], errors=1)
+    assert summary['count'] == 3 and summary['error_rate'] == 0.25
+    assert summary['p50_ms'] == 20.0
+    assert parse_size('small') == ('small', 1000, 3000)
+    assert parse_size('50x200') == ('50x200', 50, 200)
+    with pytest.raises(ValueError):
+        parse_size('huge')
+
+
+def test_compare_flags_only_regressions_beyond_tolerance():
+    baseline = {'scenarios': [_scenario()]}
+
+    assert compare({'scenarios': [_scenario(flows_per_s=1.9, p99_ms=110.0)]}, baseline) == []
+    regressions = compare({'scenarios': [_scenario(flows_per_s=1.0, p99_ms=200.0, error_rate=0.1, rss=200 * 2 ** 20)]}, baseline)
+    assert len(regressions) == 4
+    assert any('p99_ms 200.0' in line for line in regressions)
+    # Scenarios the baseline does not have are not compared
+    assert compare({'scenarios': [{**_scenario(flows_per_s=0.1), 'name': 'large-c1'}]}, baseline) == []
+
+
+@pytest.mark.asyncio
+async def test_stubs_build_graph_and_write_mining_results(tmp_path):
+    shared = tmp_path / "shared"
+    csv_paths = write_dataset(str(tmp_path / "data"), nodes=20, edges=50, seed=1)
+    builder = httpx.AsyncClient(transport=httpx.ASGITransport(app=create_builder_app(str(shared))), base_url="http://builder")
+    miner = httpx.AsyncClient(
+        transport=httpx.ASGITransport(app=create_miner_app(str(shared), StubBehaviour(latency=0.01), result_bytes=4096)),
+        base_url="http://miner"
+    )
+
+    async with builder, miner:
+        files = [("files", (os.path.basename(path), open(path, "rb"), "text/csv")) for path in csv_paths]
+        session = (await builder.post("/api/upload", files=files)).json()["session_id"]
+        load = await builder.post("/api/load", data={"session_id": session, "writer_type": "networkx"})
+        job_id = load.json()["job_id"]
+        graph_path = shared / job_id / "networkx_graph.pkl"
+        mined = await miner.post("/mine", data={"job_id": job_id, "graph_path": str(graph_path)})
+        missing = await miner.post("/mine", data={"job_id": "other", "graph_path": str(tmp_path / "missing.pkl")})
+
+    with open(graph_path, "rb") as f:
+        graph = pickle.load(f)
+    assert graph.number_of_nodes() == 20 and graph.number_of_edges() > 0
+    assert json.loads((shared / job_id / "networkx_metadata.json").read_text())["graph_type"] == "directed"
+    assert mined.json()["status"] == "success"
+    patterns = (shared / job_id / "results" / "patterns.json").read_bytes()
+    assert len(patterns) >= 4096
+    assert json.loads((shared / job_id / "progress.json").read_text())["status"] == "completed"
+    assert missing.status_code == 404
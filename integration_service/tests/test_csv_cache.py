@@ -0,0 +1,69 @@
+"""Tests for the content-addressed CSV cache."""
+import hashlib
+import os
+import threading
+from ..services.csv_cache import CsvCache
+
+
+def _upload(cache, name, content: bytes):
+    path = os.path.join(cache.workspace(), name)
+    with open(path, "wb") as f:
+        f.write(content)
+    digest = hashlib.sha256(content).hexdigest()
+    return path, digest, cache.adopt(path, digest, len(content))
+
+
+def test_identical_uploads_share_one_blob(tmp_path):
+    cache = CsvCache(str(tmp_path), max_bytes=1024 * 1024, enabled=True)
+    first, digest, duplicate_first = _upload(cache, "nodes.csv", b"id,name\n1,A\n")
+    second, _, duplicate_second = _upload(cache, "nodes.csv", b"id,name\n1,A\n")
+
+    assert (duplicate_first, duplicate_second) == (False, True)
+    blob = cache.blob_path(digest)
+    assert os.path.samefile(first, blob) and os.path.samefile(second, blob)
+    # The workspace copy can be removed without losing the blob
+    os.unlink(first)
+    assert cache.blob_path(digest) == blob
+    assert cache.stats()["blobs"] == 1
+    assert cache.stats()["deduplicated_bytes"] == len(b"id,name\n1,A\n")
+
+
+def test_dataset_lookup_drops_entries_whose_graph_is_gone(tmp_path):
+    cache = CsvCache(str(tmp_path), max_bytes=1024 * 1024, enabled=True)
+    cache.record_dataset("key", "job-1", {"nodes.csv": "aaa"})
+
+    assert cache.lookup_dataset("key", lambda job_id: True) == "job-1"
+    reloaded = CsvCache(str(tmp_path), max_bytes=1024 * 1024, enabled=True)
+    assert reloaded.lookup_dataset("key", lambda job_id: False) is None
+    assert reloaded.lookup_dataset("key") is None
+    assert reloaded.stats()["datasets"] == 0
+
+
+def test_least_recently_used_blobs_are_evicted(tmp_path):
+    cache = CsvCache(str(tmp_path), max_bytes=250, enabled=True)
+    _, old, _ = _upload(cache, "a.csv", b"a" * 100)
+    _, kept, _ = _upload(cache, "b.csv", b"b" * 100)
+    cache.record_dataset("key", "job-1", {"b.csv": kept})
+    cache.lookup_dataset("key")
+    _, new, _ = _upload(cache, "c.csv", b"c" * 100)
+
+    assert cache.blob_path(old) is None
+    assert cache.blob_path(kept) and cache.blob_path(new)
+    assert cache.stats()["evictions"] == 1
+
+
+def test_workers_sharing_the_store_do_not_lose_datasets(tmp_path):
+    """Each instance stands in for a worker process; only the file lock orders their writes."""
+    workers = [CsvCache(str(tmp_path), max_bytes=1024 * 1024, enabled=True) for _ in range(4)]
+
+    def record_many(index, cache):
+        for n in range(10):
+            cache.record_dataset(f"dataset-{index}-{n}", f"job-{index}-{n}", {"nodes.csv": "digest"})
+
+    threads = [threading.Thread(target=record_many, args=(i, cache)) for i, cache in enumerate(workers)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    assert CsvCache(str(tmp_path), max_bytes=1024 * 1024, enabled=True).stats()["datasets"] == 40
@@ -0,0 +1,72 @@
+"""Tests for conditional and ranged result downloads."""
+import gzip
+import os
+import pytest
+from fastapi import FastAPI, Request
+from fastapi.testclient import TestClient
+from ..api.downloads import file_response, parse_range, RangeNotSatisfiable
+
+
+@pytest.fixture
+def client(tmp_path):
+    payload = os.urandom(10000)
+    (tmp_path / "networkx_graph.pkl").write_bytes(payload)
+    (tmp_path / "patterns.json").write_text('[{"count": 1}]' * 200)
+    app = FastAPI()
+
+    @app.get("/files/{name}")
+    async def serve(request: Request, name: str):
+        path = str(tmp_path / name)
+        return file_response(request, path, os.stat(path), name)
+
+    return TestClient(app), payload
+
+
+def test_etag_revalidation_returns_304(client):
+    client, payload = client
+    first = client.get("/files/networkx_graph.pkl")
+    assert first.status_code == 200
+    assert first.content == payload
+    etag = first.headers["etag"]
+
+    again = client.get("/files/networkx_graph.pkl", headers={"If-None-Match": etag})
+    assert again.status_code == 304
+    assert again.content == b""
+
+
+def test_range_requests(client):
+    client, payload = client
+    partial = client.get("/files/networkx_graph.pkl", headers={"Range": "bytes=100-199"})
+    assert partial.status_code == 206
+    assert partial.headers["content-range"] == "bytes 100-199/10000"
+    assert partial.content == payload[100:200]
+
+    tail = client.get("/files/networkx_graph.pkl", headers={"Range": "bytes=-10"})
+    assert tail.content == payload[-10:]
+
+    stale = client.get("/files/networkx_graph.pkl", headers={"Range": "bytes=0-9", "If-Range": '"old"'})
+    assert stale.status_code == 200
+
+    beyond = client.get("/files/networkx_graph.pkl", headers={"Range": "bytes=20000-"})
+    assert beyond.status_code == 416
+    assert beyond.headers["content-range"] == "bytes */10000"
+
+
+def test_json_is_gzipped_with_its_own_etag(client):
+    client, _ = client
+    plain = client.get("/files/patterns.json", headers={"Accept-Encoding": "identity"})
+    compressed = client.get("/files/patterns.json", headers={"Accept-Encoding": "gzip"})
+
+    assert "content-encoding" not in plain.headers
+    assert compressed.headers["content-encoding"] == "gzip"
+    assert compressed.content == plain.content  # httpx decodes transparently
+    assert compressed.headers["etag"] != plain.headers["etag"]
+
+
+def test_parse_range():
+    assert parse_range("bytes=0-", 10) == (0, 9)
+    assert parse_range("bytes=5-100", 10) == (5, 9)
+    assert parse_range("bytes=0-1,4-5", 10) is None
+    assert parse_range("items=0-1", 10) is None
+    with pytest.raises(RangeNotSatisfiable):
+        parse_range("bytes=10-", 10)
@@ -0,0 +1,58 @@
+"""Tests for the memory-mappable CSR graph format."""
+import os
+import pickle
+import networkx as nx
+import numpy as np
+from ..services import graph_csr
+from ..services.graph_csr import CSRGraph, build_csr, csr_dir_for, is_fresh
+
+
+def _pickle(graph, tmp_path):
+    path = str(tmp_path / "networkx_graph.pkl")
+    with open(path, "wb") as f:
+        pickle.dump(graph, f)
+    return path
+
+
+def test_directed_graph_round_trips_through_mmap_arrays(tmp_path):
+    graph = nx.DiGraph()
+    graph.add_node("gene:A", type="gene")
+    graph.add_node("protein:B", type="protein")
+    graph.add_node("gene:C", type="gene", weight=[1, 2])
+    graph.add_edge("gene:A", "protein:B", label="encodes")
+    graph.add_edge("gene:C", "protein:B", label="encodes")
+    graph.add_edge("protein:B", "gene:A", label="regulates")
+    path = _pickle(graph, tmp_path)
+
+    meta = build_csr(path)
+    csr = CSRGraph(csr_dir_for(path))
+
+    assert is_fresh(path)
+    assert isinstance(csr.indices, np.memmap)
+    assert (meta["num_nodes"], meta["num_edges"]) == (3, 3)
+    assert sorted(csr.node_id(i) for i in csr.neighbors(1)) == ["gene:A"]
+    codes, categories = csr.node_attribute("type")
+    assert codes.dtype == np.int8
+    assert [categories[c] for c in codes] == ["gene", "protein", "gene"]
+    assert meta["skipped_attributes"]["node"] == ["weight"]
+
+    rebuilt = csr.to_networkx()
+    assert set(rebuilt.edges(data="label")) == set(graph.edges(data="label"))
+
+    os.utime(path, ns=(1, 1))
+    assert not is_fresh(path)
+
+
+def test_undirected_edges_are_stored_both_ways(tmp_path):
+    graph = nx.Graph()
+    graph.add_edges_from([(1, 2), (2, 3), (3, 3)])
+    path = _pickle(graph, tmp_path)
+
+    meta = build_csr(path)
+    csr = CSRGraph(csr_dir_for(path), mmap=False)
+
+    assert meta["node_id_type"] == "int"
+    assert meta["num_csr_edges"] == 5
+    assert sorted(csr.neighbors(1).tolist()) == [0, 2]
+    assert nx.utils.graphs_equal(csr.to_networkx(), graph)
+    assert not any(name.startswith(graph_csr.CSR_DIRNAME + ".") for name in os.listdir(tmp_path))
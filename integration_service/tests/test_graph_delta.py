@@ -0,0 +1,43 @@
+"""Tests for applying CSV deltas to an existing graph."""
+import networkx as nx
+from ..services.graph_delta import apply_delta
+
+
+def test_removals_apply_before_additions():
+    graph = nx.DiGraph()
+    graph.add_node("a", type="gene")
+    graph.add_node("b", type="gene")
+    graph.add_node("c", type="protein")
+    graph.add_edge("a", "c", label="encodes")
+    graph.add_edge("b", "c", label="encodes")
+
+    removed = nx.DiGraph()
+    removed.add_edge("a", "c", label="encodes")  # edge row: endpoints stay
+    removed.add_node("b")  # node row: node and its edges go
+    added = nx.DiGraph()
+    added.add_node("a", type="pseudogene")
+    added.add_node("d", type="protein")
+    added.add_edge("a", "d", label="encodes")
+
+    stats = apply_delta(graph, added=added, removed=removed)
+
+    assert stats == {"nodes_added": 1, "nodes_updated": 1, "nodes_removed": 1, "edges_added": 1, "edges_removed": 1}
+    assert sorted(graph.nodes) == ["a", "c", "d"]
+    assert list(graph.edges) == [("a", "d")]
+    assert graph.nodes["a"]["type"] == "pseudogene"
+
+
+def test_multigraph_deltas_match_parallel_edges_by_attributes():
+    graph = nx.MultiDiGraph()
+    graph.add_edge("a", "b", label="binds")
+    graph.add_edge("a", "b", label="inhibits")
+
+    removed = nx.MultiDiGraph()
+    removed.add_edge("a", "b", label="binds")
+    added = nx.MultiDiGraph()
+    added.add_edge("a", "b", label="inhibits")  # already present
+
+    stats = apply_delta(graph, added=added, removed=removed)
+
+    assert (stats["edges_removed"], stats["edges_added"]) == (1, 0)
+    assert [data["label"] for _, _, data in graph.edges(data=True)] == ["inhibits"]
@@ -0,0 +1,73 @@
+"""Tests for graph profiling and mining parameter auto-tuning."""
+import os
+import pickle
+import networkx as nx
+import pytest
+from ..services.graph_profile import (
+    MIN_NEIGHBORHOODS, build_profile, is_fresh, label_cardinality, profile_graph, tune_mining_config
+)
+
+DEFAULTS = {
+    'min_pattern_size': 3,
+    'max_pattern_size': 5,
+    'min_neighborhood_size': 3,
+    'max_neighborhood_size': 5,
+    'n_neighborhoods': 500,
+    'n_trials': 100,
+    'graph_type': 'directed'
+}
+
+
+def test_profile_counts_degrees_labels_and_components(tmp_path):
+    graph = nx.DiGraph()
+    graph.add_node("a", type="gene", name="A")
+    graph.add_node("b", type="protein", name="B")
+    graph.add_node("c", type="gene", name="C")
+    graph.add_node("lonely", type="gene", name="L")
+    graph.add_edge("a", "b", label="encodes")
+    graph.add_edge("c", "b", label="encodes")
+    graph.add_edge("b", "a", label="regulates")
+    path = str(tmp_path / "networkx_graph.pkl")
+    with open(path, "wb") as f:
+        pickle.dump(graph, f)
+
+    profile = build_profile(path)
+
+    assert is_fresh(path)
+    assert os.path.exists(tmp_path / "graph_profile.json")
+    assert (profile["num_nodes"], profile["num_edges"]) == (4, 3)
+    assert profile["degree"]["max"] == 3 and profile["in_degree"]["max"] == 2
+    assert profile["degree"]["histogram"] == {"0": 1, "1": 1, "2": 2}
+    assert profile["node_attributes"]["type"]["distinct"] == 2
+    assert profile["node_attributes"]["type"]["top"][0] == ["gene", 3]
+    assert profile["edge_attributes"]["label"]["distinct"] == 2
+    assert profile["components"] == {
+        "count": 2, "largest": 3, "isolated_nodes": 1, "largest_sizes": [3, 1], "size_histogram": {"1": 1, "2": 1}
+    }
+    assert label_cardinality(profile) == 2
+
+    with open(path, "wb") as f:
+        pickle.dump(nx.DiGraph(), f)
+    assert not is_fresh(path)
+
+
+def test_sampling_effort_scales_with_graph_size():
+    small, _ = tune_mining_config(profile_graph(nx.path_graph(40)), DEFAULTS, 3600, 0.001, 0.01)
+    large, _ = tune_mining_config(profile_graph(nx.path_graph(4000)), DEFAULTS, 3600, 0.001, 0.01)
+
+    assert small["n_neighborhoods"] == MIN_NEIGHBORHOODS
+    assert large["n_neighborhoods"] == 2000  # every node covered twice by 4-node neighborhoods
+    assert large["n_trials"] == small["n_trials"]
+
+
+def test_tuning_respects_component_size_and_time_budget():
+    tiny, _ = tune_mining_config(profile_graph(nx.path_graph(4)), DEFAULTS, 600, 0.01, 0.1)
+    assert tiny["max_neighborhood_size"] == 4 and tiny["max_pattern_size"] == 4
+
+    budgeted, tuning = tune_mining_config(profile_graph(nx.path_graph(4000)), DEFAULTS, 30, 0.01, 0.1)
+    assert tuning["budget_limited"] is True and tuning["unconstrained_seconds"] == 117.5
+    assert tuning["estimated_seconds"] <= 30
+    assert (budgeted["n_neighborhoods"], budgeted["n_trials"]) == (500, 20)
+
+    with pytest.raises(ValueError):
+        tune_mining_config(profile_graph(nx.empty_graph(5)), DEFAULTS, 600, 0.01, 0.1)
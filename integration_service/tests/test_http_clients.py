@@ -0,0 +1,28 @@
+"""Tests for the upstream HTTP client pools."""
+import pytest
+import httpx
+from ..services.http_clients import HttpClientPool
+
+
+@pytest.mark.asyncio
+async def test_clients_are_reused_until_shutdown():
+    """Each upstream gets one long-lived client with its own limits."""
+    calls = []
+    transport = httpx.MockTransport(lambda request: calls.append(request.url.host) or httpx.Response(200))
+    pool = HttpClientPool()
+    await pool.startup(transport=transport)
+
+    try:
+        atomspace = pool.atomspace
+        assert pool.atomspace is atomspace
+        assert pool.miner is not atomspace
+
+        await pool.atomspace.get("http://atomspace-api:8001/health")
+        await pool.miner.get("http://neural-miner:9002/health")
+        assert calls == ["atomspace-api", "neural-miner"]
+    finally:
+        await pool.shutdown()
+
+    assert atomspace.is_closed
+    assert pool.atomspace is not atomspace
+    await pool.shutdown()
@@ -0,0 +1,82 @@
+"""Tests for the bounded filesystem executor."""
+import asyncio
+import os
+import shutil
+import threading
+import time
+import pytest
+from ..services.io_executor import IOExecutor
+from ..services.orchestration_service import OrchestrationService
+
+
+async def _max_loop_lag(work, interval: float = 0.005) -> float:
+    """Run ``work`` while a ticker measures the longest gap between its wakeups."""
+    lag = 0.0
+    stop = asyncio.Event()
+
+    async def ticker():
+        nonlocal lag
+        while not stop.is_set():
+            start = time.perf_counter()
+            await asyncio.sleep(interval)
+            lag = max(lag, time.perf_counter() - start - interval)
+
+    task = asyncio.create_task(ticker())
+    try:
+        await work
+    finally:
+        stop.set()
+        await task
+    return lag
+
+
+@pytest.mark.asyncio
+async def test_large_mork_copies_keep_the_event_loop_responsive(tmp_path, monkeypatch):
+    copy2 = shutil.copy2
+
+    def slow_copy(src, dst):
+        # Stand-in for a slow shared volume: each copy blocks its thread for a while
+        time.sleep(0.1)
+        return copy2(src, dst)
+
+    monkeypatch.setattr(shutil, "copy2", slow_copy)
+    service = OrchestrationService()
+    service.shared_output_dir = str(tmp_path)
+    (tmp_path / "nx-job").mkdir()
+    mork_dir = tmp_path / "mork-job"
+    mork_dir.mkdir()
+    block = os.urandom(1024 * 1024)
+    for i in range(4):
+        with open(mork_dir / f"part_{i}.metta", "wb") as f:
+            for _ in range(32):
+                f.write(block)
+
+    lag = await _max_loop_lag(service._merge_mork_results("nx-job", "mork-job"))
+
+    for i in range(4):
+        assert (tmp_path / "nx-job" / "mork" / f"part_{i}.metta").stat().st_size == 32 * len(block)
+    assert lag < 0.05
+
+
+@pytest.mark.asyncio
+async def test_pool_runs_at_most_max_workers_at_once():
+    executor = IOExecutor(max_workers=2)
+    lock = threading.Lock()
+    running, peak = 0, 0
+
+    def work():
+        nonlocal running, peak
+        with lock:
+            running += 1
+            peak = max(peak, running)
+        time.sleep(0.02)
+        with lock:
+            running -= 1
+
+    try:
+        await asyncio.gather(*[executor.run(work) for _ in range(6)])
+    finally:
+        executor.shutdown()
+
+    assert peak == 2
+    assert executor.stats() == {'max_workers': 2, 'in_flight': 0, 'submitted': 6}
@@ -0,0 +1,153 @@
+"""Tests for the shared job registry."""
+import asyncio
+import sqlite3
+import time
+import pytest
+from ..services.job_registry import JobRegistry
+
+
+def _registry(tmp_path, **kwargs) -> JobRegistry:
+    return JobRegistry(db_path=str(tmp_path / "jobs.sqlite"), **kwargs)
+
+
+@pytest.mark.asyncio
+async def test_dependent_subtask_runs_after_and_sees_its_result(tmp_path):
+    registry = _registry(tmp_path)
+    calls = []
+
+    async def mork(params, dependency):
+        calls.append("mork")
+        return {"mork_job_id": f"mork-{params['n']}"}
+
+    async def merge(params, dependency):
+        calls.append("merge")
+        return {"merged": dependency["result"]["mork_job_id"]}
+
+    registry.register("mork", mork)
+    registry.register("merge", merge)
+    registry.create_job("job-1", "graph")
+    mork_id = registry.add_subtask("job-1", "mork", {"n": 1})
+    registry.add_subtask("job-1", "merge", {}, depends_on=mork_id)
+
+    await registry.run_job("job-1", concurrency=2)
+
+    job = registry.get_job("job-1")
+    assert calls == ["mork", "merge"]
+    assert job["status"] == "completed"
+    assert job["subtasks"][1]["result"] == {"merged": "mork-1"}
+
+
+@pytest.mark.asyncio
+async def test_expired_lease_is_resumed_by_another_worker(tmp_path):
+    crashed = _registry(tmp_path, lease_seconds=0.05)
+    crashed.create_job("job-1", "graph")
+    subtask_id = crashed.add_subtask("job-1", "merge", {"nx_job_id": "job-1"})
+    assert crashed.claim()["subtask_id"] == subtask_id
+
+    survivor = _registry(tmp_path, lease_seconds=0.05)
+    assert survivor.claim() is None
+    time.sleep(0.1)
+    resumed = survivor.claim()
+
+    assert resumed["subtask_id"] == subtask_id
+    assert resumed["attempts"] == 2
+    # The old owner can no longer record a result
+    assert crashed.finish(subtask_id, "completed") is False
+    assert survivor.finish(subtask_id, "completed", result={"ok": True}) is True
+    assert survivor.get_job("job-1")["status"] == "completed"
+
+
+def test_subtask_fails_after_max_attempts(tmp_path):
+    registry = _registry(tmp_path, lease_seconds=0.01, max_attempts=2)
+    registry.create_job("job-1", "graph")
+    subtask_id = registry.add_subtask("job-1", "mork", {})
+    for _ in range(2):
+        assert registry.claim() is not None
+        time.sleep(0.02)
+
+    assert registry.claim() is None
+    subtask = registry.get_subtask(subtask_id)
+    assert subtask["status"] == "failed"
+    assert "2 attempts" in subtask["error"]
+
+
+@pytest.mark.asyncio
+async def test_cancelled_subtask_is_handed_back(tmp_path):
+    registry = _registry(tmp_path)
+    started = asyncio.Event()
+
+    async def slow(params, dependency):
+        started.set()
+        await asyncio.sleep(10)
+
+    registry.register("mork", slow)
+    registry.create_job("job-1", "graph")
+    subtask_id = registry.add_subtask("job-1", "mork", {})
+    task = asyncio.create_task(registry.run_job("job-1"))
+    await asyncio.wait_for(started.wait(), timeout=5)
+    task.cancel()
+    await asyncio.gather(task, return_exceptions=True)
+
+    subtask = registry.get_subtask(subtask_id)
+    assert (subtask["status"], subtask["attempts"], subtask["lease_owner"]) == ("pending", 0, None)
+
+
+@pytest.mark.asyncio
+async def test_cancel_job_stops_subtasks_in_any_worker(tmp_path):
+    worker = _registry(tmp_path, lease_seconds=0.05)
+    other = _registry(tmp_path)
+    started = asyncio.Event()
+    cleaned = []
+
+    async def slow(params, dependency):
+        started.set()
+        await asyncio.sleep(10)
+
+    async def cleanup(params):
+        cleaned.append(params["name"])
+
+    for registry in (worker, other):
+        registry.register("mork", slow, on_cancel=cleanup)
+    worker.create_job("job-1", "graph")
+    running_id = worker.add_subtask("job-1", "mork", {"name": "running"})
+    worker.add_subtask("job-1", "mork", {"name": "waiting"}, depends_on=running_id)
+    task = asyncio.create_task(worker.run_job("job-1"))
+    await asyncio.wait_for(started.wait(), timeout=5)
+
+    # Cancelled from another worker: the pending subtask is cleaned up there,
+    # the running one by its own worker once it fails to renew the lease
+    cancelled = await other.cancel_job("job-1")
+    await asyncio.wait_for(task, timeout=5)
+
+    assert [subtask["status"] for subtask in cancelled] == ["running", "pending"]
+    assert cleaned == ["waiting", "running"]
+    job = worker.get_job("job-1")
+    assert job["status"] == "cancelled"
+    assert {subtask["status"] for subtask in job["subtasks"]} == {"cancelled"}
+    assert worker.cancel_requested("job-1", since=0) and not worker.cancel_requested("job-2", since=0)
+
+
+@pytest.mark.asyncio
+async def test_waiting_for_the_write_lock_does_not_block_the_event_loop(tmp_path):
+    registry = _registry(tmp_path)
+    registry.create_job("job-1", "graph")
+    # Another worker holding the write lock
+    other = sqlite3.connect(str(tmp_path / "jobs.sqlite"), isolation_level=None)
+    other.execute("BEGIN IMMEDIATE")
+    ticks = 0
+
+    async def tick():
+        nonlocal ticks
+        while True:
+            await asyncio.sleep(0.01)
+            ticks += 1
+
+    ticker = asyncio.create_task(tick())
+    run = asyncio.create_task(registry.run_job("job-1"))
+    await asyncio.sleep(0.3)
+    other.execute("COMMIT")
+    await asyncio.wait_for(run, timeout=5)
+    ticker.cancel()
+    other.close()
+
+    assert ticks >= 10
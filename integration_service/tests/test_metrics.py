@@ -0,0 +1,66 @@
+"""Tests for the Prometheus metrics registry and stage timing."""
+import asyncio
+import pytest
+from unittest.mock import patch
+from ..config.settings import settings
+from ..services.metrics import STAGE_SECONDS, MetricsRegistry, cache_collector, timed
+
+
+def test_render_counters_gauges_and_histograms():
+    registry = MetricsRegistry()
+    requests = registry.counter('test_requests_total', 'Requests', ('path',))
+    requests.inc(path='/a')
+    requests.inc(2, path='/a')
+    registry.gauge('test_depth', 'Queue depth').set(4)
+    latency = registry.histogram('test_latency_seconds', 'Latency', buckets=(0.1, 1))
+    latency.observe(0.05)
+    latency.observe(0.5)
+    latency.observe(5)
+
+    text = registry.render()
+
+    assert '# TYPE test_requests_total counter' in text
+    assert 'test_requests_total{path="/a"} 3' in text
+    assert 'test_depth 4' in text
+    assert 'test_latency_seconds_bucket{le="0.1"} 1' in text
+    assert 'test_latency_seconds_bucket{le="1"} 2' in text
+    assert 'test_latency_seconds_bucket{le="+Inf"} 3' in text
+    assert 'test_latency_seconds_count 3' in text
+    with pytest.raises(ValueError):
+        requests.inc(method='GET')
+
+
+def test_collectors_share_one_metric_family():
+    registry = MetricsRegistry()
+    registry.add_collector('a', cache_collector('a', lambda: {'hits': 3, 'misses': 1, 'hit_rate': 0.75}))
+    registry.add_collector('b', cache_collector('b', lambda: {'hits': 1}))
+    registry.add_collector('broken', lambda: 1 / 0)
+
+    text = registry.render()
+
+    assert text.count('# TYPE integration_cache_hits_total counter') == 1
+    assert 'integration_cache_hits_total{cache="a"} 3' in text
+    assert 'integration_cache_hits_total{cache="b"} 1' in text
+    assert 'integration_cache_hit_ratio{cache="a"} 0.75' in text
+
+
+def test_timed_records_outcome_and_logs_fields(capsys):
+    before = {
+        outcome: STAGE_SECONDS.value(stage='test_stage', outcome=outcome)['count']
+        for outcome in ('ok', 'error', 'cancelled')
+    }
+
+    with patch.object(settings, 'timing_logs', True):
+        with timed('test_stage', job_id='j1') as timing:
+            timing['bytes'] = 10
+        with pytest.raises(RuntimeError):
+            with timed('test_stage'):
+                raise RuntimeError('boom')
+        with pytest.raises(asyncio.CancelledError):
+            with timed('test_stage'):
+                raise asyncio.CancelledError()
+
+    for outcome in ('ok', 'error', 'cancelled'):
+        assert STAGE_SECONDS.value(stage='test_stage', outcome=outcome)['count'] == before[outcome] + 1
+    log = capsys.readouterr().out
+    assert '"stage": "test_stage"' in log and '"job_id": "j1"' in log and '"bytes": 10' in log
@@ -0,0 +1,79 @@
+"""Tests for routing across miner replicas."""
+import asyncio
+import httpx
+import pytest
+from ..services.miner_pool import MinerPool
+from ..services.miner_service import MinerService
+from ..services.http_clients import http_clients
+
+MINER_RESULT = {"status": "success", "results_path": "results", "plots_path": "plots"}
+
+
+class StubMinerFleet:
+    """Several stub miners behind one mock transport, addressed by host."""
+
+    def __init__(self, down=()):
+        self.down = set(down)
+        self.mined = []
+
+    async def handler(self, request: httpx.Request) -> httpx.Response:
+        host = request.url.host
+        if host in self.down:
+            raise httpx.ConnectError("connection refused", request=request)
+        if request.url.path == "/health":
+            return httpx.Response(200, json={"status": "ok"})
+        self.mined.append(host)
+        await asyncio.sleep(0.02)
+        return httpx.Response(200, json=MINER_RESULT)
+
+
+def test_pick_prefers_least_loaded_healthy_replica():
+    pool = MinerPool(["http://miner-a:9002", "http://miner-b:9002", "http://miner-c:9002"])
+    a, b, c = pool.endpoints
+    a.in_flight, b.in_flight, c.in_flight = 2, 1, 0
+    assert pool.pick() is c
+
+    pool.mark_failed(c)
+    assert pool.pick() is b
+    assert pool.pick(exclude=[b]) is a
+
+
+@pytest.mark.asyncio
+async def test_concurrent_mining_spreads_over_replicas(tmp_path):
+    graph = tmp_path / "networkx_graph.pkl"
+    graph.write_bytes(b"graph")
+    fleet = StubMinerFleet()
+    service = MinerService()
+    service.pool = MinerPool(["http://miner-a:9002", "http://miner-b:9002"])
+
+    await http_clients.startup(transport=httpx.MockTransport(fleet.handler))
+    try:
+        await asyncio.gather(*[service.mine_motifs(str(graph), job_id=f"job-{i}") for i in range(4)])
+    finally:
+        await http_clients.shutdown()
+
+    assert sorted(fleet.mined) == ["miner-a", "miner-a", "miner-b", "miner-b"]
+    assert all(endpoint.in_flight == 0 for endpoint in service.pool.endpoints)
+
+
+@pytest.mark.asyncio
+async def test_failover_and_health_probing(tmp_path):
+    graph = tmp_path / "networkx_graph.pkl"
+    graph.write_bytes(b"graph")
+    fleet = StubMinerFleet(down={"miner-a"})
+    service = MinerService()
+    service.pool = MinerPool(["http://miner-a:9002", "http://miner-b:9002"])
+
+    await http_clients.startup(transport=httpx.MockTransport(fleet.handler))
+    try:
+        # First pick is miner-a, which refuses connections; the retry goes to miner-b
+        result = await service.mine_motifs(str(graph), job_id="job-1")
+        assert result == MINER_RESULT
+        assert fleet.mined == ["miner-b"]
+        assert service.pool.endpoints[0].healthy is False
+
+        fleet.down.clear()
+        await service.pool.probe_all()
+        assert all(endpoint.healthy for endpoint in service.pool.endpoints)
+    finally:
+        await http_clients.shutdown()
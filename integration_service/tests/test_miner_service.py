@@ -1,19 +1,112 @@
 """Tests for Miner Service."""  
 import pytest  
 import asyncio  
-from services.miner_service import MinerService  
+import httpx
+from ..services.miner_service import MinerService  
+from ..services.http_clients import http_clients
   
 @pytest.mark.asyncio  
 async def test_validate_motif_output():  
     """Test motif output validation."""  
     miner_service = MinerService()  
       
-    valid_output = {  
-        "motifs": [{"id": 1, "pattern": "..."}],  
-        "statistics": {"total_motifs": 5}  
-    }  
+    valid_output = {
+        "status": "success",
+        "results_path": "/shared/output/job-1/results",
+        "plots_path": "/shared/output/job-1/plots"
+    }
       
     assert miner_service.validate_motif_output(valid_output) == True  
       
-    invalid_output = {"motifs": []}  
-    assert miner_service.validate_motif_output(invalid_output) == False
\ No newline at end of file
+    invalid_output = {"status": "success", "results_path": "/shared/output/job-1/results"}
+    assert miner_service.validate_motif_output(invalid_output) == False
+
+MINER_RESULT = {"status": "success", "results_path": "/shared/output/job-1/results", "plots_path": "/shared/output/job-1/plots"}
+
+
+class StubMiner:
+    """In-process stand-in for the neural miner's /mine endpoint."""
+
+    def __init__(self, reference_status: int = 200):
+        self.reference_status = reference_status
+        self.requests = []
+
+    async def handler(self, request: httpx.Request) -> httpx.Response:
+        body = b"".join([chunk async for chunk in request.stream])
+        uploaded = request.headers["content-type"].startswith("multipart/")
+        self.requests.append({"uploaded": uploaded, "body": body})
+        if not uploaded and self.reference_status != 200:
+            return httpx.Response(self.reference_status, json={"detail": "graph not visible"})
+        return httpx.Response(200, json=MINER_RESULT)
+
+
+async def _mine(miner: StubMiner, service: MinerService, tmp_path):
+    graph = tmp_path / "networkx_graph.pkl"
+    graph.write_bytes(b"pickled-graph")
+    await http_clients.startup(transport=httpx.MockTransport(miner.handler))
+    try:
+        return await service.mine_motifs(str(graph), job_id="job-1", mining_config={"n_trials": 10})
+    finally:
+        await http_clients.shutdown()
+
+
+@pytest.mark.asyncio
+async def test_mine_motifs_sends_graph_by_reference(tmp_path):
+    """The graph path is sent instead of the graph bytes."""
+    miner = StubMiner()
+    service = MinerService()
+    service.graph_by_reference = True
+
+    result = await _mine(miner, service, tmp_path)
+
+    assert result == MINER_RESULT
+    assert len(miner.requests) == 1
+    assert not miner.requests[0]["uploaded"]
+    assert b"graph_path=" in miner.requests[0]["body"]
+    assert b"pickled-graph" not in miner.requests[0]["body"]
+
+
+@pytest.mark.asyncio
+@pytest.mark.parametrize("status, uploads, keeps_reference", [(404, True, True), (422, True, False), (400, False, True)])
+async def test_mine_motifs_uploads_when_miner_cannot_see_volume(tmp_path, status, uploads, keeps_reference):
+    """A miner that cannot resolve the path gets a streamed upload instead; a bad request does not."""
+    miner = StubMiner(reference_status=status)
+    service = MinerService()
+    service.graph_by_reference = True
+
+    if uploads:
+        assert await _mine(miner, service, tmp_path) == MINER_RESULT
+        assert [r["uploaded"] for r in miner.requests] == [False, True]
+        assert b'filename="graph.gpickle"' in miner.requests[1]["body"]
+        assert b"pickled-graph" in miner.requests[1]["body"]
+    else:
+        with pytest.raises(RuntimeError, match=str(status)):
+            await _mine(miner, service, tmp_path)
+        assert [r["uploaded"] for r in miner.requests] == [False]
+    assert service.pool.endpoints[0].supports_reference is keeps_reference
+
+
+@pytest.mark.asyncio
+async def test_mine_motifs_points_miner_at_current_csr_graph(tmp_path):
+    """A fresh CSR copy is offered next to the pickle; a stale one is not."""
+    import networkx as nx
+    from ..services import graph_csr
+
+    graph = tmp_path / "networkx_graph.pkl"
+    graph.write_bytes(b"pickled-graph")
+    graph_csr.write_csr(nx.path_graph(3), graph_csr.csr_dir_for(str(graph)),
+                        source=graph_csr._source_stamp(str(graph)))
+    miner = StubMiner()
+    service = MinerService()
+    service.graph_by_reference = True
+
+    await http_clients.startup(transport=httpx.MockTransport(miner.handler))
+    try:
+        await service.mine_motifs(str(graph), job_id="job-1")
+        graph.write_bytes(b"regenerated-graph")
+        await service.mine_motifs(str(graph), job_id="job-1")
+    finally:
+        await http_clients.shutdown()
+
+    assert b"graph_csr_path=" in miner.requests[0]["body"]
+    assert b"graph_csr_path=" not in miner.requests[1]["body"]
@@ -0,0 +1,203 @@
+"""Tests for the mining job queue."""
+import asyncio
+import time
+import pytest
+from ..services.job_registry import JobCancelledError
+from ..services.mining_queue import MiningFailedError, MiningQueue, QueueFullError
+
+
+def test_priority_order_and_positions(tmp_path):
+    queue = MiningQueue(db_path=str(tmp_path / "queue.sqlite"), max_size=10, concurrency=1)
+    low = queue.submit("job-a", {"n_trials": 1})
+    high = queue.submit("job-b", {"n_trials": 1}, priority=5)
+    later = queue.submit("job-c", {"n_trials": 1})
+
+    assert queue.get(high["mining_id"])["queue_position"] == 1
+    assert queue.get(low["mining_id"])["queue_position"] == 2
+    assert queue.get(later["mining_id"])["queue_position"] == 3
+    assert queue.latest_for_job("job-c")["mining_id"] == later["mining_id"]
+
+
+def test_admission_control_rejects_when_full(tmp_path):
+    queue = MiningQueue(db_path=str(tmp_path / "queue.sqlite"), max_size=2, concurrency=1)
+    queue.submit("job-a", {})
+    queue.submit("job-b", {})
+
+    with pytest.raises(QueueFullError):
+        queue.submit("job-c", {})
+    assert queue.stats()["queued"] == 2
+
+
+@pytest.mark.asyncio
+async def test_workers_respect_concurrency_and_survive_restart(tmp_path):
+    db_path = str(tmp_path / "queue.sqlite")
+    # Jobs submitted before the service starts are persisted and picked up later
+    first = MiningQueue(db_path=db_path, max_size=10, concurrency=2)
+    handles = [first.submit(f"job-{i}", {"n": i}) for i in range(5)]
+
+    running = 0
+    peak = 0
+
+    async def runner(job_id, mining_config, use_cache):
+        nonlocal running, peak
+        running += 1
+        peak = max(peak, running)
+        await asyncio.sleep(0.01)
+        running -= 1
+        if job_id == "job-3":
+            raise RuntimeError("miner exploded")
+        return {"job_id": job_id, "n": mining_config["n"]}
+
+    queue = MiningQueue(db_path=db_path, max_size=10, concurrency=2)
+    await queue.start(runner)
+    try:
+        for _ in range(200):
+            if queue.stats()["queued"] == 0 and queue.stats()["running"] == 0:
+                break
+            await asyncio.sleep(0.01)
+    finally:
+        await queue.stop()
+
+    assert peak == 2
+    entries = [queue.get(handle["mining_id"]) for handle in handles]
+    assert [entry["status"] for entry in entries] == ["completed"] * 3 + ["failed", "completed"]
+    assert entries[0]["result"] == {"job_id": "job-0", "n": 0}
+    assert entries[3]["error"] == "miner exploded"
+
+
+@pytest.mark.asyncio
+async def test_concurrency_limit_is_shared_by_processes(tmp_path):
+    db_path = str(tmp_path / "queue.sqlite")
+    queues = [MiningQueue(db_path=db_path, max_size=10, concurrency=2) for _ in range(3)]
+    handles = [queues[0].submit(f"job-{i}", {}) for i in range(6)]
+    running = 0
+    peak = 0
+
+    async def runner(job_id, mining_config, use_cache):
+        nonlocal running, peak
+        running += 1
+        peak = max(peak, running)
+        await asyncio.sleep(0.05)
+        running -= 1
+        return {}
+
+    for queue in queues:
+        queue.poll_interval = 0.01
+        await queue.start(runner)
+    try:
+        for _ in range(500):
+            if all(queues[0].get(h["mining_id"])["status"] == "completed" for h in handles):
+                break
+            await asyncio.sleep(0.01)
+    finally:
+        for queue in queues:
+            await queue.stop()
+
+    assert [queues[0].get(h["mining_id"])["status"] for h in handles] == ["completed"] * 6
+    assert peak == 2
+
+
+@pytest.mark.asyncio
+async def test_submit_and_wait_returns_the_result_or_raises(tmp_path):
+    queue = MiningQueue(db_path=str(tmp_path / "queue.sqlite"), max_size=10, concurrency=1)
+    started = asyncio.Event()
+
+    async def runner(job_id, mining_config, use_cache):
+        if job_id == "slow":
+            started.set()
+            await asyncio.sleep(60)
+        if job_id == "broken":
+            raise RuntimeError("miner exploded")
+        return {"job_id": job_id}
+
+    await queue.start(runner)
+    try:
+        assert await queue.submit_and_wait("job-a", {}) == {"job_id": "job-a"}
+        with pytest.raises(MiningFailedError, match="miner exploded"):
+            await queue.submit_and_wait("broken", {})
+
+        waiter = asyncio.ensure_future(queue.submit_and_wait("slow", {}))
+        await asyncio.wait_for(started.wait(), timeout=5)
+        await queue.cancel_job("slow")
+        with pytest.raises(JobCancelledError):
+            await waiter
+
+        # A caller that goes away takes its run with it
+        started.clear()
+        blocker = asyncio.ensure_future(queue.submit_and_wait("slow", {}))
+        await asyncio.wait_for(started.wait(), timeout=5)
+        waiter = asyncio.ensure_future(queue.submit_and_wait("gone", {}))
+        while queue.latest_for_job("gone") is None:
+            await asyncio.sleep(0.01)
+        waiter.cancel()
+        await asyncio.gather(waiter, return_exceptions=True)
+        assert queue.latest_for_job("gone")["status"] == "cancelled"
+        blocker.cancel()
+        await asyncio.gather(blocker, return_exceptions=True)
+    finally:
+        await queue.stop()
+
+
+def test_sharded_jobs_take_one_slot_per_shard(tmp_path):
+    queue = MiningQueue(db_path=str(tmp_path / "queue.sqlite"), max_size=10, concurrency=3)
+    single = queue.submit("job-a", {"n_neighborhoods": 100})
+    sharded = queue.submit("job-b", {"n_neighborhoods": 100, "n_shards": 3})
+    queue.submit("job-c", {})
+
+    assert queue._claim()["id"] == single["mining_id"]
+    # Two free slots are not enough for three shards, and job-c may not overtake it
+    assert queue._claim() is None
+    queue._finish(single["mining_id"], "completed", result={})
+    assert queue._claim()["id"] == sharded["mining_id"]
+    assert queue._claim() is None
+
+
+def test_only_jobs_with_expired_leases_are_requeued(tmp_path):
+    db_path = str(tmp_path / "queue.sqlite")
+    dead = MiningQueue(db_path=db_path, max_size=10, concurrency=2)
+    alive = MiningQueue(db_path=db_path, max_size=10, concurrency=2)
+    dead.lease_seconds = 0.01
+    stale = dead.submit("job-a", {})
+    fresh = alive.submit("job-b", {}, priority=-1)
+    assert dead._claim()["id"] == stale["mining_id"]
+    assert alive._claim()["id"] == fresh["mining_id"]
+    time.sleep(0.02)
+
+    # A third worker starting up must not steal the job that is still being renewed
+    assert MiningQueue(db_path=db_path, max_size=10, concurrency=1)._requeue_expired() == 1
+    assert alive.get(stale["mining_id"])["status"] == "queued"
+    assert alive.get(fresh["mining_id"])["status"] == "running"
+
+
+@pytest.mark.asyncio
+async def test_cancel_drops_queued_jobs_and_stops_running_ones(tmp_path):
+    queue = MiningQueue(db_path=str(tmp_path / "queue.sqlite"), max_size=10, concurrency=1)
+    started = asyncio.Event()
+    stopped = []
+
+    async def runner(job_id, mining_config, use_cache):
+        started.set()
+        try:
+            await asyncio.sleep(60)
+        except asyncio.CancelledError:
+            stopped.append(job_id)
+            raise
+
+    running = queue.submit("job-a", {})
+    waiting = queue.submit("job-b", {})
+    await queue.start(runner)
+    try:
+        await asyncio.wait_for(started.wait(), timeout=5)
+        assert await queue.cancel_job("job-b") == [waiting["mining_id"]]
+        entry = await queue.cancel(running["mining_id"])
+        for _ in range(100):
+            if stopped:
+                break
+            await asyncio.sleep(0.01)
+    finally:
+        await queue.stop()
+
+    assert entry["status"] == "cancelled" and stopped == ["job-a"]
+    assert queue.get(waiting["mining_id"])["status"] == "cancelled"
+    assert queue.stats()["queued"] == 0 and queue.stats()["running"] == 0
+    assert await queue.cancel("unknown") is None
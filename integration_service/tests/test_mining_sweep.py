@@ -0,0 +1,33 @@
+"""Tests for parameter sweep expansion and grouping."""
+import pytest
+from ..services.mining_sweep import expand_sweep, sampling_group
+
+
+def test_expand_sweep_combines_grid_and_configs():
+    base = {"min_pattern_size": 3, "n_neighborhoods": 500}
+    configs = expand_sweep(
+        base,
+        grid={"max_pattern_size": [4, 5], "n_trials": [50, 100]},
+        configs=[{"max_pattern_size": 4, "n_trials": 50}, {"radius": 2}]
+    )
+
+    assert len(configs) == 5  # the explicit duplicate of a grid point is dropped
+    assert configs[0] == {"min_pattern_size": 3, "n_neighborhoods": 500, "max_pattern_size": 4, "n_trials": 50}
+    assert configs[-1]["radius"] == 2
+
+
+@pytest.mark.parametrize("grid, configs", [
+    ({"unknown": [1]}, None),
+    ({"n_trials": []}, None),
+    ({"n_trials": list(range(5)), "radius": list(range(5))}, None),
+    (None, None),
+])
+def test_expand_sweep_rejects_invalid_sweeps(grid, configs):
+    with pytest.raises(ValueError):
+        expand_sweep({}, grid=grid, configs=configs, max_configs=20)
+
+
+def test_sampling_group_ignores_pattern_parameters():
+    base = {"n_neighborhoods": 500, "radius": 3, "seed": 1}
+    assert sampling_group({**base, "max_pattern_size": 4}) == sampling_group({**base, "max_pattern_size": 6})
+    assert sampling_group(base) != sampling_group({**base, "n_neighborhoods": 100})
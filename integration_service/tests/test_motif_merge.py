@@ -0,0 +1,52 @@
+"""Tests for merging sharded mining output."""
+import json
+import os
+from ..services.motif_merge import merge_motif_records, merge_shard_outputs
+
+
+def test_counts_are_summed_and_best_representative_kept():
+    shard_a = [{"canonical_hash": "m1", "count": 5, "rep": "a"}, {"canonical_hash": "m2", "count": 1}]
+    shard_b = [{"canonical_hash": "m1", "count": 7, "rep": "b"}, {"nodes": [1, 2], "edges": [[1, 2]], "count": 2}]
+    shard_c = [{"nodes": [1, 2], "edges": [[1, 2]], "count": 3}, {"label": "no identity"}]
+
+    merged = merge_motif_records([shard_a, shard_b, shard_c])
+
+    assert merged[0] == {"canonical_hash": "m1", "count": 12, "rep": "b", "shards": 2}
+    assert merged[1]["count"] == 5 and merged[1]["shards"] == 2
+    assert {"canonical_hash": "m2", "count": 1, "shards": 1} in merged
+    assert {"label": "no identity"} in merged
+
+
+def test_ratios_are_averaged_not_summed():
+    shard_a = [{"canonical_hash": "m1", "count": 5, "frequency": 0.2}, {"canonical_hash": "m2", "support": 0.5}]
+    shard_b = [{"canonical_hash": "m1", "count": 7, "frequency": 0.4}, {"canonical_hash": "m2", "support": 0.7}]
+
+    merged = merge_motif_records([shard_a, shard_b])
+
+    assert merged[0]["count"] == 12 and abs(merged[0]["frequency"] - 0.3) < 1e-9
+    assert merged[1]["canonical_hash"] == "m2" and abs(merged[1]["support"] - 0.6) < 1e-9
+    assert "count" not in merged[1]
+
+
+def test_merge_shard_outputs_writes_single_results_dir(tmp_path):
+    shard_dirs = []
+    for index, count in enumerate((3, 4)):
+        shard_dir = tmp_path / f"job_shard{index}"
+        (shard_dir / "results").mkdir(parents=True)
+        (shard_dir / "plots").mkdir()
+        (shard_dir / "results" / "patterns.json").write_text(json.dumps(
+            {"graph_type": "directed", "motifs": [{"pattern": "A->B", "count": count}]}
+        ))
+        (shard_dir / "results" / "out-patterns.p").write_bytes(b"pickle")
+        (shard_dir / "plots" / "motif_0.html").write_text("<html/>")
+        shard_dirs.append(str(shard_dir))
+
+    job_dir = tmp_path / "job"
+    summary = merge_shard_outputs(shard_dirs, str(job_dir))
+
+    merged = json.loads((job_dir / "results" / "patterns.json").read_text())
+    assert merged["graph_type"] == "directed"
+    assert merged["motifs"] == [{"pattern": "A->B", "count": 7, "shards": 2}]
+    assert summary == {"shards": 2, "merged_files": {"patterns.json": 1}}
+    assert os.path.exists(job_dir / "results" / "shards" / "1" / "out-patterns.p")
+    assert os.path.exists(job_dir / "plots" / "shard_0" / "motif_0.html")
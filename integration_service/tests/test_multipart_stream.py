@@ -0,0 +1,75 @@
+"""Tests for streaming multipart uploads."""
+import pytest
+import httpx
+from multipart.multipart import parse_options_header, MultipartParser
+from ..services.multipart_stream import AsyncMultipartStream
+from ..services.orchestration_service import OrchestrationService
+
+
+def _parse(body: bytes, content_type: str):
+    """Parse a multipart body into {name: bytes} using python-multipart."""
+    _, params = parse_options_header(content_type)
+    parts, current = {}, {}
+
+    def on_header_value(data, start, end):
+        current.setdefault('header', b'')
+        current['header'] += data[start:end]
+
+    def on_header_end():
+        header = current.pop('header', b'').decode()
+        if 'name="' in header:
+            current['name'] = header.split('name="')[1].split('"')[0]
+
+    def on_part_data(data, start, end):
+        parts[current['name']] = parts.get(current['name'], b'') + data[start:end]
+
+    parser = MultipartParser(params[b'boundary'], {
+        'on_header_value': on_header_value,
+        'on_header_end': on_header_end,
+        'on_part_data': on_part_data,
+    })
+    parser.write(body)
+    parser.finalize()
+    return parts
+
+
+@pytest.mark.asyncio
+async def test_stream_matches_content_length(tmp_path):
+    """Streamed body is well-formed and matches the advertised length."""
+    csv_path = tmp_path / "nodes.csv"
+    csv_path.write_bytes(b"id,name\n" + b"1,NodeA\n" * 5000)
+
+    stream = AsyncMultipartStream(
+        data={'writer_type': 'networkx', 'config': '{"a": 1}'},
+        files=[('files', str(csv_path), 'text/csv')],
+        chunk_size=1024
+    )
+    body = b"".join([chunk async for chunk in stream])
+
+    assert len(body) == await stream.content_length()
+    parts = _parse(body, stream.content_type)
+    assert parts['writer_type'] == b'networkx'
+    assert parts['config'] == b'{"a": 1}'
+    assert parts['files'] == csv_path.read_bytes()
+
+
+@pytest.mark.asyncio
+async def test_post_load_streams_files(tmp_path):
+    """The builder receives every CSV with a Content-Length header."""
+    csv_path = tmp_path / "edges.csv"
+    csv_path.write_text("source,target\n1,2\n")
+    seen = {}
+
+    async def handler(request: httpx.Request):
+        seen['length'] = request.headers.get('content-length')
+        seen['body'] = b"".join([chunk async for chunk in request.stream])
+        return httpx.Response(200, json={"job_id": "job-1"})
+
+    service = OrchestrationService()
+    async with httpx.AsyncClient(transport=httpx.MockTransport(handler)) as client:
+        response = await service._post_load(client, [str(csv_path)], {'writer_type': 'mork'})
+
+    assert response.json()['job_id'] == 'job-1'
+    assert int(seen['length']) == len(seen['body'])
+    assert b'filename="edges.csv"' in seen['body']
+    assert b"source,target\n1,2\n" in seen['body']
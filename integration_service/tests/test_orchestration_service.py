@@ -1,49 +1,488 @@
 """Tests for orchestration service."""  
 import pytest  
 import asyncio  
+import httpx
+import json
+import os
+import time
+import urllib.parse
 from unittest.mock import AsyncMock, patch  
 from ..services.orchestration_service import OrchestrationService  
+from ..services.http_clients import http_clients
+from ..services.csv_cache import CsvCache
+from ..services.miner_pool import MinerPool
+from ..services.job_registry import FINISHED_STATUSES, JobCancelledError
+from ..services import result_index
+from ..benchmarks.harness import write_dataset
+from ..benchmarks.stubs import create_builder_app, create_miner_app
+from ..config.settings import settings
   
-@pytest.mark.asyncio  
-async def test_execute_mining_pipeline():  
-    """Test complete pipeline execution."""  
-    service = OrchestrationService()  
-      
-    # Mock data  
-    csv_content = "id,name,type\n1,NodeA,Person\n2,NodeB,Organization"  
-    config = '{"name": "test", "description": "test config"}'  
-    schema_json = '{"nodes": [{"id": "id", "label": "name", "type": "type"}]}'  
-      
-    with tempfile.NamedTemporaryFile(mode='w', suffix='.csv', delete=False) as f:  
-        f.write(csv_content)  
-        csv_path = f.name  
-      
-    try:  
-        # Mock AtomSpace Builder response  
-        mock_atomspace_response = {  
-            "job_id": "test-job-123",  
-            "status": "success"  
-        }  
-          
-        # Mock miner response  
-        mock_miner_response = {  
-            "motifs": [{"id": 1, "pattern": "test"}],  
-            "statistics": {"total_motifs": 1}  
-        }  
-          
-        with patch('httpx.AsyncClient') as mock_client:  
-            mock_client.return_value.__aenter__.return_value.post.return_value.json.return_value = mock_atomspace_response  
-            mock_client.return_value.__aenter__.return_value.post.return_value.status_code = 200  
-              
-            with patch.object(service.miner_service, 'mine_motifs', return_value=mock_miner_response):  
-                result = await service.execute_mining_pipeline(  
-                    csv_path, config, schema_json, "tenant123", "session456"  
-                )  
-                  
-                assert result["status"] == "success"  
-                assert "job_id" in result  
-                assert "motifs" in result  
-                assert len(result["motifs"]) == 1  
-      
-    finally:  
-        os.unlink(csv_path)
\ No newline at end of file
+async def _route_to_stubs(builder, miner) -> httpx.MockTransport:
+    """One transport for both clients, dispatching on the host name."""
+    transports = {"builder": httpx.ASGITransport(app=builder), "miner": httpx.ASGITransport(app=miner)}
+
+    async def handler(request: httpx.Request) -> httpx.Response:
+        return await transports[request.url.host].handle_async_request(request)
+
+    return httpx.MockTransport(handler)
+
+
+@pytest.mark.asyncio
+async def test_generate_and_mine_pipeline(tmp_path):
+    """Upload CSVs, build the graph, mine it and serve the results, against the benchmark stubs."""
+    shared = tmp_path / "shared"
+    csv_paths = write_dataset(str(tmp_path / "upload"), nodes=30, edges=60, seed=3)
+    service = _service(tmp_path)
+    service.atomspace_url = "http://builder"
+    service.miner_service.pool = MinerPool(["http://miner"])
+    service.shared_output_dir = str(shared)
+    service.local_output_dir = str(tmp_path / "local")
+    service.result_cache.enabled = False
+    service.csv_cache = CsvCache(str(tmp_path / "cache"), enabled=False)
+    await http_clients.startup(transport=await _route_to_stubs(
+        create_builder_app(str(shared)), create_miner_app(str(shared), result_bytes=1024)
+    ))
+
+    try:
+        generated = await service.generate_networkx(
+            csv_files=csv_paths, config="{}", schema_json="{}", writer_type="networkx"
+        )
+        job_id = generated["job_id"]
+        mined = await service.mine_patterns(job_id, {"n_neighborhoods": 10}, use_cache=False)
+        for _ in range(100):
+            if service.job_registry.get_job(job_id)["status"] in FINISHED_STATUSES:
+                break
+            await asyncio.sleep(0.05)
+    finally:
+        await http_clients.shutdown()
+
+    assert generated["status"] == "success"
+    assert mined["status"] == "success" and mined["cached"] is False
+    result_file, _ = service.resolve_result_file(job_id, "results/patterns.json")
+    assert json.loads(open(result_file).read())
+    assert service.job_registry.get_job(job_id)["status"] == "completed"
+    assert (shared / job_id / "mork" / "data.metta").exists()
+    assert (shared / job_id / "graph_profile.json").exists()
+    assert (await service.ensure_result_index(job_id))["motifs"] > 0
+    page = result_index.query_motifs(str(shared / job_id), limit=5)
+    frequencies = [motif["frequency"] for motif in page["motifs"]]
+    assert len(frequencies) == 5 and frequencies == sorted(frequencies, reverse=True)
+
+class StubBuilder:
+    """In-process stand-in for the AtomSpace builder API."""
+
+    def __init__(self, staging: bool = True, delay: float = 0):
+        self.staging = staging
+        self.delay = delay
+        self.uploads = []
+        self.loads = []
+        self.mork_loaded = asyncio.Event()
+
+    async def handler(self, request: httpx.Request) -> httpx.Response:
+        body = b"".join([chunk async for chunk in request.stream])
+        if request.url.path == "/api/upload":
+            if not self.staging:
+                return httpx.Response(404, json={"detail": "Not Found"})
+            self.uploads.append(body)
+            return httpx.Response(200, json={"session_id": f"session-{len(self.uploads)}"})
+
+        writer = body.split(b'name="writer_type"\r\n\r\n')[1].split(b"\r\n")[0].decode()
+        await asyncio.sleep(self.delay)
+        self.loads.append({
+            "writer_type": writer,
+            "session": b'name="session_id"' in body,
+            "files": body.count(b"filename="),
+        })
+        if writer == "mork":
+            self.mork_loaded.set()
+        return httpx.Response(200, json={"job_id": f"{writer}-job"})
+
+
+async def _use_stub(builder: StubBuilder):
+    await http_clients.startup(transport=httpx.MockTransport(builder.handler))
+
+
+def _service(tmp_path) -> OrchestrationService:
+    """A service with its shared volume and local output in the test's directory.
+
+    Queues, registries and caches already live there (``isolated_state``).
+    """
+    service = OrchestrationService()
+    service.shared_output_dir = str(tmp_path / "shared")
+    service.local_output_dir = str(tmp_path / "local")
+    service.progress_hub.base_dir = service.shared_output_dir
+    return service
+
+
+async def _generate(service: OrchestrationService, tmp_path, **kwargs) -> dict:
+    tmp_path.mkdir(parents=True, exist_ok=True)
+    nodes = tmp_path / "nodes.csv"
+    edges = tmp_path / "edges.csv"
+    nodes.write_text("id,name\n1,A\n2,B\n")
+    edges.write_text("source,target\n1,2\n")
+    return await service.generate_networkx(
+        csv_files=[str(nodes), str(edges)],
+        config="{}",
+        schema_json="{}",
+        writer_type="networkx",
+        **kwargs
+    )
+
+
+@pytest.mark.asyncio
+async def test_generate_networkx_stages_csvs_once(tmp_path):
+    """NetworkX and Mork writers both load from a single staged upload."""
+    builder = StubBuilder()
+    await _use_stub(builder)
+    service = _service(tmp_path)
+    service.staged_uploads = True
+
+    try:
+        result = await _generate(service, tmp_path)
+        await asyncio.wait_for(builder.mork_loaded.wait(), timeout=5)
+    finally:
+        await http_clients.shutdown()
+
+    assert result["job_id"] == "networkx-job"
+    assert len(builder.uploads) == 1
+    assert builder.uploads[0].count(b"filename=") == 2
+    assert [load["writer_type"] for load in builder.loads] == ["networkx", "mork"]
+    assert all(load["session"] and load["files"] == 0 for load in builder.loads)
+
+
+@pytest.mark.asyncio
+async def test_generate_networkx_falls_back_without_staging(tmp_path):
+    """Builders without an upload endpoint receive the files with each load."""
+    builder = StubBuilder(staging=False)
+    await _use_stub(builder)
+    service = _service(tmp_path)
+    service.staged_uploads = True
+
+    try:
+        result = await _generate(service, tmp_path)
+        await asyncio.wait_for(builder.mork_loaded.wait(), timeout=5)
+    finally:
+        await http_clients.shutdown()
+
+    assert result["job_id"] == "networkx-job"
+    assert service.staged_uploads is False
+    assert all(not load["session"] and load["files"] == 2 for load in builder.loads)
+
+
+@pytest.mark.asyncio
+async def test_identical_generate_requests_share_one_builder_run(tmp_path):
+    """Concurrent uploads of the same files trigger a single builder run."""
+    builder = StubBuilder(delay=0.05)
+    await _use_stub(builder)
+    service = _service(tmp_path)
+    service.staged_uploads = False
+    service.csv_cache = CsvCache(str(tmp_path / "cache"), enabled=True)
+    digests = {"nodes.csv": "aaa", "edges.csv": "bbb"}
+
+    try:
+        results = await asyncio.gather(*[
+            _generate(service, tmp_path / f"upload-{i}", cleanup_dir=str(tmp_path / f"upload-{i}"), file_digests=digests)
+            for i in range(3)
+        ])
+        await asyncio.wait_for(builder.mork_loaded.wait(), timeout=5)
+    finally:
+        await http_clients.shutdown()
+
+    assert [load["writer_type"] for load in builder.loads] == ["networkx", "mork"]
+    assert {result["job_id"] for result in results} == {"networkx-job"}
+    assert sorted(result["coalesced"] for result in results) == [False, True, True]
+    assert service.graph_flight.stats()["duplicates_saved"] == 2
+
+
+@pytest.mark.asyncio
+async def test_resubmitted_dataset_returns_existing_graph(tmp_path):
+    """A dataset that was built before skips the builder while its graph exists."""
+    builder = StubBuilder()
+    await _use_stub(builder)
+    service = _service(tmp_path)
+    service.staged_uploads = False
+    service.shared_output_dir = str(tmp_path / "shared")
+    service.csv_cache = CsvCache(str(tmp_path / "cache"), enabled=True)
+    digests = {"nodes.csv": "aaa", "edges.csv": "bbb"}
+
+    try:
+        first = await _generate(service, tmp_path / "first", file_digests=digests)
+        await asyncio.wait_for(builder.mork_loaded.wait(), timeout=5)
+        (tmp_path / "shared" / "networkx-job").mkdir(parents=True)
+        (tmp_path / "shared" / "networkx-job" / "networkx_graph.pkl").write_bytes(b"graph")
+
+        upload = tmp_path / "second"
+        second = await _generate(service, upload, cleanup_dir=str(upload), file_digests=digests)
+        other_config = await _generate(service, tmp_path / "third", file_digests=digests, graph_type="undirected")
+    finally:
+        await http_clients.shutdown()
+
+    assert first["cached"] is False
+    assert second["cached"] is True
+    assert second["job_id"] == "networkx-job"
+    assert not upload.exists()
+    assert other_config["cached"] is False
+    assert [load["writer_type"] for load in builder.loads].count("networkx") == 2
+
+
+@pytest.mark.asyncio
+async def test_sharded_mining_splits_budget_and_merges_counts(tmp_path):
+    """Each shard mines part of the neighborhoods with its own seed; counts are merged."""
+    shared = tmp_path / "shared"
+    (shared / "job-1").mkdir(parents=True)
+    (shared / "job-1" / "networkx_graph.pkl").write_bytes(b"graph")
+    shard_forms = []
+
+    async def miner(request: httpx.Request) -> httpx.Response:
+        form = dict(urllib.parse.parse_qsl((await request.aread()).decode()))
+        shard_forms.append(form)
+        results = shared / form["job_id"] / "results"
+        results.mkdir(parents=True)
+        (results / "patterns.json").write_text(json.dumps([
+            {"canonical_hash": "common", "count": int(form["n_neighborhoods"])},
+            {"canonical_hash": f"only-{form['seed']}", "count": 1},
+        ]))
+        return httpx.Response(200, json={"status": "success", "results_path": str(results), "plots_path": ""})
+
+    service = _service(tmp_path)
+    service.shared_output_dir = str(shared)
+    service.local_output_dir = str(tmp_path / "local")
+    service.result_cache.enabled = False
+    service.miner_service.graph_by_reference = True
+    await http_clients.startup(transport=httpx.MockTransport(miner))
+    try:
+        result = await service.mine_patterns(
+            "job-1", {"n_neighborhoods": 10, "n_shards": 3, "seed": 100}, use_cache=False
+        )
+    finally:
+        await http_clients.shutdown()
+
+    assert result["status"] == "success"
+    assert sorted(int(form["n_neighborhoods"]) for form in shard_forms) == [3, 3, 4]
+    assert sorted(int(form["seed"]) for form in shard_forms) == [100, 101, 102]
+    merged = json.loads((shared / "job-1" / "results" / "patterns.json").read_text())
+    assert merged[0] == {"canonical_hash": "common", "count": 10, "shards": 3}
+    assert len(merged) == 4
+    assert not any(path.name.startswith("job-1_shard") for path in shared.iterdir())
+    assert json.loads((shared / "job-1" / "progress.json").read_text())["status"] == "completed"
+
+
+@pytest.mark.asyncio
+async def test_cancel_job_stops_mining_tells_the_miner_and_cleans_up(tmp_path):
+    """Both callers of a shared run see the cancel; the miner is told and partial output removed."""
+    shared = tmp_path / "shared"
+    (shared / "job-1").mkdir(parents=True)
+    (shared / "job-1" / "networkx_graph.pkl").write_bytes(b"graph")
+    upload = tmp_path / "upload"
+    upload.mkdir()
+    started = asyncio.Event()
+    miner_cancels = []
+
+    async def miner(request: httpx.Request) -> httpx.Response:
+        form = dict(urllib.parse.parse_qsl((await request.aread()).decode()))
+        if request.url.path == "/cancel":
+            miner_cancels.append(form["job_id"])
+            return httpx.Response(200, json={"status": "cancelled", "job_id": form["job_id"]})
+        results = shared / form["job_id"] / "results"
+        results.mkdir()
+        (results / "patterns.json").write_text("[")
+        started.set()
+        await asyncio.sleep(60)
+
+    service = _service(tmp_path)
+    service.result_cache.enabled = False
+    service.miner_service.graph_by_reference = True
+    registry = service.job_registry
+    # Cancelling writes to the registry, queue and retention stores: all of them must be the test's own
+    for db_path in (registry.db_path, service.mining_queue.db_path, service.retention.db_path):
+        assert db_path.startswith(str(tmp_path))
+    registry.create_job("job-1", "graph")
+    mork_id = registry.add_subtask("job-1", "mork", {})
+    registry.add_subtask("job-1", "merge", {"nx_job_id": "job-1", "cleanup_dir": str(upload)}, depends_on=mork_id)
+    await http_clients.startup(transport=httpx.MockTransport(miner))
+    try:
+        callers = [
+            asyncio.create_task(service.mine_patterns("job-1", {"n_neighborhoods": 10}, use_cache=False))
+            for _ in range(2)
+        ]
+        await asyncio.wait_for(started.wait(), timeout=5)
+        report = await service.cancel_job("job-1")
+        outcomes = await asyncio.gather(*callers, return_exceptions=True)
+    finally:
+        await http_clients.shutdown()
+
+    assert all(isinstance(outcome, JobCancelledError) for outcome in outcomes)
+    assert miner_cancels == ["job-1"]
+    assert report["mining_runs"] == 1
+    assert sorted(subtask["kind"] for subtask in report["subtasks"]) == ["merge", "mork"]
+    assert registry.get_job("job-1")["status"] == "cancelled"
+    assert not (shared / "job-1" / "results").exists() and not upload.exists()
+    assert (shared / "job-1" / "networkx_graph.pkl").exists()
+    assert json.loads((shared / "job-1" / "progress.json").read_text())["status"] == "cancelled"
+
+
+def test_resolve_result_file_prefers_local_and_rejects_traversal(tmp_path):
+    service = _service(tmp_path)
+    service.local_output_dir = str(tmp_path / "local")
+    service.shared_output_dir = str(tmp_path / "shared")
+    (tmp_path / "shared" / "job").mkdir(parents=True)
+    (tmp_path / "shared" / "job" / "networkx_graph.pkl").write_bytes(b"graph")
+    (tmp_path / "local" / "job" / "results").mkdir(parents=True)
+    (tmp_path / "local" / "job" / "results" / "patterns.json").write_text("[]")
+
+    path, stat_result = service.resolve_result_file("job", "networkx_graph.pkl")
+    assert path == str(tmp_path / "shared" / "job" / "networkx_graph.pkl")
+    assert stat_result.st_size == 5
+    assert service.get_result_file_path("job", "results/patterns.json").startswith(str(tmp_path / "local"))
+
+    with pytest.raises(PermissionError):
+        service.resolve_result_file("job", "../other/networkx_graph.pkl")
+    with pytest.raises(PermissionError):
+        service.resolve_result_file("..", "shared/job/networkx_graph.pkl")
+    with pytest.raises(FileNotFoundError):
+        service.resolve_result_file("job", "results")
+
+
+@pytest.mark.asyncio
+async def test_terminal_progress_of_an_earlier_run_does_not_end_a_new_one(tmp_path):
+    service = _service(tmp_path)
+    job_dir = tmp_path / "shared" / "job-1"
+    job_dir.mkdir(parents=True)
+    progress_path = job_dir / "progress.json"
+    progress_path.write_text(json.dumps({"status": "completed", "progress": 100}))
+    earlier = time.time() - 60
+    os.utime(progress_path, (earlier, earlier))
+    service.mining_queue.submit("job-1", {})
+    service.mining_queue._claim()
+
+    updates = service.progress_hub.updates("job-1")
+    try:
+        status = await asyncio.wait_for(updates.__anext__(), timeout=5)
+        assert status["status"] == "pending"
+        progress_path.write_text(json.dumps({"status": "completed", "progress": 100}))
+        status = await asyncio.wait_for(updates.__anext__(), timeout=5)
+        assert status["status"] == "completed"
+    finally:
+        await updates.aclose()
+        await service.progress_hub.close()
+
+
+@pytest.mark.asyncio
+@pytest.mark.parametrize("batch_supported", [True, False])
+async def test_sweep_mines_every_config_and_writes_summary(tmp_path, batch_supported):
+    """A sweep is sent as one batch, or as single runs to miners without /mine-batch.
+
+    Single runs go one at a time, as the sweep holds one mining queue slot.
+    """
+    shared = tmp_path / "shared"
+    (shared / "job-1").mkdir(parents=True)
+    (shared / "job-1" / "networkx_graph.pkl").write_bytes(b"graph")
+    requests = []
+    in_flight = []
+    peak = 0
+
+    def write_output(form):
+        results = shared / form["job_id"] / "results"
+        results.mkdir(parents=True)
+        (results / "patterns.json").write_text(json.dumps(
+            [{"canonical_hash": str(i), "count": 1} for i in range(int(form["max_pattern_size"]))]
+        ))
+        return {"status": "success", "results_path": str(results), "plots_path": ""}
+
+    async def miner(request: httpx.Request) -> httpx.Response:
+        form = dict(urllib.parse.parse_qsl((await request.aread()).decode()))
+        requests.append(request.url.path)
+        if request.url.path == "/mine-batch":
+            if not batch_supported:
+                return httpx.Response(404)
+            runs = json.loads(form["runs"])
+            assert len({run["sample_group"] for run in runs}) == 1
+            return httpx.Response(200, json={"results": [write_output(run) for run in runs]})
+        nonlocal peak
+        in_flight.append(form["job_id"])
+        peak = max(peak, len(in_flight))
+        await asyncio.sleep(0.01)
+        in_flight.remove(form["job_id"])
+        return httpx.Response(200, json=write_output(form))
+
+    service = _service(tmp_path)
+    service.shared_output_dir = str(shared)
+    service.result_cache.enabled = False
+    service.miner_service.graph_by_reference = True
+    configs = [{"max_pattern_size": size, "n_neighborhoods": 100} for size in (3, 4, 5)]
+    await http_clients.startup(transport=httpx.MockTransport(miner))
+    try:
+        result = await service.mine_sweep("job-1", configs, use_cache=False)
+    finally:
+        await http_clients.shutdown()
+
+    assert result["configs"] == 3 and result["failed"] == 0
+    assert result["batched"] == batch_supported
+    assert requests.count("/mine") == (0 if batch_supported else 3)
+    assert peak == (0 if batch_supported else 1)
+    summary = json.loads((shared / "job-1" / result["summary_path"]).read_text())
+    assert [entry["motif_counts"] for entry in summary["configs"]] == [
+        {"patterns.json": 3}, {"patterns.json": 4}, {"patterns.json": 5}
+    ]
+    assert len({entry["config"]["seed"] for entry in summary["configs"]}) == 1
+    assert not any("_sweep" in path.name for path in shared.iterdir())
+
+
+@pytest.mark.asyncio
+async def test_update_rejects_job_ids_outside_the_shared_volume(tmp_path):
+    service = _service(tmp_path)
+    (tmp_path / "shared").mkdir()
+    (tmp_path / "outside").mkdir()
+    (tmp_path / "outside" / "networkx_graph.pkl").write_bytes(b"graph")
+
+    for job_id in ("../outside", "job/../../outside", ".."):
+        with pytest.raises(ValueError, match="Invalid job_id"):
+            await service.update_networkx(job_id, ["added.csv"], [], "{}", "{}")
+
+
+@pytest.mark.asyncio
+async def test_update_merges_delta_graphs_when_builder_cannot(tmp_path):
+    """Without /api/update only the delta CSVs are loaded and merged into a new version."""
+    import pickle
+    import networkx as nx
+
+    shared = tmp_path / "shared"
+    (shared / "base").mkdir(parents=True)
+    base = nx.DiGraph([(1, 2), (2, 3)])
+    (shared / "base" / "networkx_graph.pkl").write_bytes(pickle.dumps(base))
+    (shared / "base" / "networkx_metadata.json").write_text(json.dumps({"graph_type": "directed", "num_nodes": 3}))
+    loads = []
+
+    async def builder(request: httpx.Request) -> httpx.Response:
+        body = await request.aread()
+        if request.url.path == "/api/update":
+            return httpx.Response(404)
+        delta = nx.DiGraph([(3, 4)]) if b"added.csv" in body else nx.DiGraph([(1, 2)])
+        delta_id = f"delta-{len(loads)}"
+        loads.append(body.count(b"filename="))
+        (shared / delta_id).mkdir()
+        (shared / delta_id / "networkx_graph.pkl").write_bytes(pickle.dumps(delta))
+        return httpx.Response(200, json={"job_id": delta_id})
+
+    (tmp_path / "added.csv").write_text("source,target\n3,4\n")
+    (tmp_path / "removed.csv").write_text("source,target\n1,2\n")
+    service = _service(tmp_path)
+    service.shared_output_dir = str(shared)
+    await http_clients.startup(transport=httpx.MockTransport(builder))
+    try:
+        with patch.object(settings, "graph_csr_enabled", False):
+            result = await service.update_networkx(
+                "base", [str(tmp_path / "added.csv")], [str(tmp_path / "removed.csv")], "{}", "{}"
+            )
+    finally:
+        await http_clients.shutdown()
+
+    assert result["method"] == "merged" and result["version"] == 2
+    assert loads == [1, 1]
+    updated = pickle.loads((shared / result["job_id"] / "networkx_graph.pkl").read_bytes())
+    assert sorted(updated.edges) == [(2, 3), (3, 4)]
+    lineage = json.loads((shared / result["job_id"] / "lineage.json").read_text())
+    assert lineage["parent_job_id"] == "base" and lineage["root_job_id"] == "base"
+    metadata = json.loads((shared / result["job_id"] / "networkx_metadata.json").read_text())
+    assert metadata == {"graph_type": "directed", "num_nodes": 4, "parent_job_id": "base"}
+    assert sorted(path.name for path in shared.iterdir()) == sorted(["base", result["job_id"]])
@@ -0,0 +1,48 @@
+"""Tests for the shared mining progress watchers."""
+import asyncio
+import json
+import pytest
+from ..services.progress_hub import ProgressHub
+
+
+async def _status(job_id, progress, updated_at):
+    return progress or {"status": "pending", "progress": 0}
+
+
+def _write(job_dir, payload):
+    tmp = job_dir / "progress.json.tmp"
+    tmp.write_text(json.dumps(payload))
+    tmp.replace(job_dir / "progress.json")
+
+
+async def _next(updates):
+    return await asyncio.wait_for(updates.__anext__(), timeout=5)
+
+
+@pytest.mark.asyncio
+@pytest.mark.parametrize("mode", ["poll", "auto"])
+async def test_subscribers_share_one_watcher_and_one_read_per_change(tmp_path, mode):
+    job_dir = tmp_path / "job"
+    job_dir.mkdir()
+    hub = ProgressHub(str(tmp_path), _status, interval=0.05, mode=mode)
+    first, second = hub.updates("job"), hub.updates("job")
+
+    assert (await _next(first))["status"] == "pending"
+    assert (await _next(second))["status"] == "pending"
+    assert hub.stats()["watched_jobs"] == 1
+    assert hub.stats()["subscribers"] == 2
+
+    _write(job_dir, {"status": "running", "progress": 40})
+    assert (await _next(first))["progress"] == 40
+    assert (await _next(second))["progress"] == 40
+    assert hub.reads == 1
+    assert hub.latest("job")["progress"] == 40
+
+    _write(job_dir, {"status": "completed", "progress": 100})
+    assert (await _next(first))["status"] == "completed"
+    with pytest.raises(StopAsyncIteration):
+        await _next(first)
+
+    await second.aclose()
+    assert hub.stats()["watched_jobs"] == 0
+    assert hub.latest("job") is None
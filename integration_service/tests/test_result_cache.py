@@ -0,0 +1,103 @@
+"""Tests for the mining result cache."""
+import os
+import shutil
+import threading
+from ..services import result_cache
+from ..services.result_cache import MiningResultCache
+
+
+def _write_results(job_dir, payload: bytes):
+    os.makedirs(os.path.join(job_dir, "results"), exist_ok=True)
+    os.makedirs(os.path.join(job_dir, "plots", "instances"), exist_ok=True)
+    with open(os.path.join(job_dir, "results", "patterns.json"), "wb") as f:
+        f.write(payload)
+    with open(os.path.join(job_dir, "plots", "instances", "motif_0.html"), "wb") as f:
+        f.write(b"<html></html>")
+
+
+def test_key_ignores_job_id_but_not_config(tmp_path):
+    cache = MiningResultCache(cache_dir=str(tmp_path / "cache"), max_bytes=1024, enabled=True)
+    base = {"job_id": "a", "n_trials": 100, "search_strategy": "greedy"}
+
+    assert cache.make_key("digest", base) == cache.make_key("digest", {**base, "job_id": "b"})
+    assert cache.make_key("digest", base) != cache.make_key("digest", {**base, "n_trials": 50})
+    assert cache.make_key("digest", base) != cache.make_key("other", base)
+
+
+def test_hit_materializes_results_and_plots(tmp_path):
+    cache = MiningResultCache(cache_dir=str(tmp_path / "cache"), max_bytes=1024 * 1024, enabled=True)
+    source_job = str(tmp_path / "job-a")
+    target_job = str(tmp_path / "job-b")
+    _write_results(source_job, b'[{"id": 1}]')
+
+    assert cache.materialize("key", target_job) is False
+    assert cache.store("key", source_job, job_id="job-a")
+    assert cache.materialize("key", target_job) is True
+
+    with open(os.path.join(target_job, "results", "patterns.json"), "rb") as f:
+        assert f.read() == b'[{"id": 1}]'
+    assert os.path.exists(os.path.join(target_job, "plots", "instances", "motif_0.html"))
+    stats = cache.stats()
+    assert (stats["hits"], stats["misses"], stats["entries"]) == (1, 1, 1)
+
+    # The index survives a restart
+    reloaded = MiningResultCache(cache_dir=str(tmp_path / "cache"), max_bytes=1024 * 1024, enabled=True)
+    assert reloaded.materialize("key", target_job) is True
+
+
+def test_entry_evicted_during_copy_is_a_miss(tmp_path, monkeypatch):
+    cache = MiningResultCache(cache_dir=str(tmp_path / "cache"), max_bytes=1024 * 1024, enabled=True)
+    _write_results(str(tmp_path / "job-a"), b"x")
+    cache.store("key", str(tmp_path / "job-a"))
+    target_job = tmp_path / "job-b"
+    copytree = shutil.copytree
+
+    def copy_then_evict(src, dst, **kwargs):
+        # Another worker evicts the entry once the copy has started
+        result = copytree(src, dst, **kwargs)
+        shutil.rmtree(os.path.join(cache.cache_dir, "key"), ignore_errors=True)
+        return result
+
+    monkeypatch.setattr(result_cache.shutil, "copytree", copy_then_evict)
+
+    assert cache.materialize("key", str(target_job)) is False
+    assert os.listdir(target_job) == []
+    assert (cache.stats()["hits"], cache.stats()["misses"]) == (0, 1)
+
+
+def test_lru_eviction_keeps_cache_under_limit(tmp_path):
+    cache = MiningResultCache(cache_dir=str(tmp_path / "cache"), max_bytes=2500, enabled=True)
+    for name in ("first", "second"):
+        job_dir = str(tmp_path / name)
+        _write_results(job_dir, b"x" * 1000)
+        cache.store(name, job_dir)
+
+    # Touch "first" so "second" becomes the least recently used entry
+    assert cache.materialize("first", str(tmp_path / "out"))
+    _write_results(str(tmp_path / "third"), b"x" * 1000)
+    cache.store("third", str(tmp_path / "third"))
+
+    assert cache.stats()["evictions"] == 1
+    assert cache.materialize("second", str(tmp_path / "out")) is False
+    assert cache.materialize("first", str(tmp_path / "out")) is True
+    assert cache.stats()["total_bytes"] <= 2500
+
+
+def test_workers_sharing_the_directory_do_not_lose_entries(tmp_path):
+    """Each instance stands in for a worker process; only the file lock orders their writes."""
+    cache_dir = str(tmp_path / "cache")
+    job_dir = str(tmp_path / "job")
+    _write_results(job_dir, b"x")
+    workers = [MiningResultCache(cache_dir=cache_dir, max_bytes=1024 * 1024, enabled=True) for _ in range(4)]
+
+    def store_many(index, cache):
+        for n in range(10):
+            cache.store(f"key-{index}-{n}", job_dir, job_id=f"job-{index}")
+
+    threads = [threading.Thread(target=store_many, args=(i, cache)) for i, cache in enumerate(workers)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    assert MiningResultCache(cache_dir=cache_dir, max_bytes=1024 * 1024, enabled=True).stats()["entries"] == 40
@@ -0,0 +1,68 @@
+"""Tests for the motif index over mining results."""
+import json
+import os
+import pytest
+from ..services.result_index import build_index, get_instances, get_motif, is_fresh, query_motifs
+
+
+def _write(job_dir, relative, payload):
+    path = os.path.join(str(job_dir), "results", relative)
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    with open(path, "w") as f:
+        json.dump(payload, f)
+
+
+def _results(job_dir):
+    _write(job_dir, "patterns.json", {"patterns": [
+        {"canonical_hash": "a", "count": 5, "node_labels": ["gene", "protein", "gene"], "edge_labels": ["encodes"]},
+        {"canonical_hash": "b", "count": 9, "nodes": [{"id": 1, "type": "gene"}, {"id": 2, "type": "gene"}],
+         "edges": [{"source": 1, "target": 2, "label": "regulates"}], "score": 2.5},
+        {"canonical_hash": "c", "frequency": 7, "size": 4, "score": 1.0,
+         "node_labels": {"0": "protein", "1": "protein"}, "instances": [[1, 2], [3, 4], [5, 6]]},
+    ]})
+    _write(job_dir, "run_config.json", {"n_trials": 10})
+
+
+def test_filters_sorts_and_pages_motifs(tmp_path):
+    _results(tmp_path)
+    meta = build_index(str(tmp_path))
+    assert meta["motifs"] == 3 and meta["files"] == {"patterns.json": 3}
+
+    page = query_motifs(str(tmp_path), limit=2)
+    assert [m["motif_id"] for m in page["motifs"]] == [2, 3]
+    assert (page["total"], page["next_offset"]) == (3, 2)
+    assert page["motifs"][0]["size"] == 2 and page["motifs"][0]["node_labels"] == ["gene", "gene"]
+    assert "instances" not in page["motifs"][1]["record"]
+    assert query_motifs(str(tmp_path), limit=2, offset=2)["next_offset"] is None
+
+    genes = query_motifs(str(tmp_path), node_labels=["gene"], sort="id", order="asc")
+    assert [m["motif_id"] for m in genes["motifs"]] == [1, 2]
+    assert query_motifs(str(tmp_path), node_labels=["gene", "protein"])["total"] == 1
+    assert query_motifs(str(tmp_path), edge_labels=["regulates"], min_frequency=8)["total"] == 1
+    assert [m["motif_id"] for m in query_motifs(str(tmp_path), sort="score")["motifs"]] == [2, 3, 1]
+    assert [m["motif_id"] for m in query_motifs(str(tmp_path), min_size=3)["motifs"]] == [3, 1]
+    with pytest.raises(ValueError):
+        query_motifs(str(tmp_path), sort="record")
+
+
+def test_instances_are_paged_per_motif(tmp_path):
+    _results(tmp_path)
+    build_index(str(tmp_path))
+
+    assert get_motif(str(tmp_path), 3)["instance_count"] == 3
+    page = get_instances(str(tmp_path), 3, limit=2, offset=1)
+    assert page["instances"] == [[3, 4], [5, 6]] and page["next_offset"] is None
+    assert get_instances(str(tmp_path), 1)["instances"] == []
+    assert get_motif(str(tmp_path), 99) is None and get_instances(str(tmp_path), 99) is None
+
+
+def test_index_goes_stale_when_results_change(tmp_path):
+    _results(tmp_path)
+    assert not is_fresh(str(tmp_path))
+    build_index(str(tmp_path))
+    assert is_fresh(str(tmp_path))
+
+    _write(tmp_path, "extra/patterns.json", [{"canonical_hash": "d", "count": 1}])
+    assert not is_fresh(str(tmp_path))
+    assert build_index(str(tmp_path))["motifs"] == 4
+    assert query_motifs(str(tmp_path), file="extra/patterns.json")["motifs"][0]["motif_id"] == 4
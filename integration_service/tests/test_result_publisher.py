@@ -0,0 +1,67 @@
+"""Tests for publishing mining results to the local output directory."""
+import errno
+import os
+import pytest
+from ..services import result_publisher
+from ..services.result_publisher import ResultPublisher
+
+
+def _make_job(shared_job_dir):
+    os.makedirs(os.path.join(shared_job_dir, "results"))
+    os.makedirs(os.path.join(shared_job_dir, "plots", "instances"))
+    with open(os.path.join(shared_job_dir, "results", "patterns.json"), "w") as f:
+        f.write("[]")
+    for i in range(3):
+        with open(os.path.join(shared_job_dir, "plots", "instances", f"motif_{i}.html"), "w") as f:
+            f.write("<html/>")
+
+
+def test_link_mode_hardlinks_and_replaces_stale_output(tmp_path):
+    shared, local = str(tmp_path / "shared" / "job"), str(tmp_path / "local" / "job")
+    _make_job(shared)
+    os.makedirs(os.path.join(local, "plots"))
+    with open(os.path.join(local, "plots", "stale.html"), "w") as f:
+        f.write("old")
+
+    counts = ResultPublisher(mode="link").publish(shared, local)
+
+    assert counts == {"linked": 4, "reflinked": 0, "copied": 0}
+    src = os.stat(os.path.join(shared, "results", "patterns.json"))
+    dst = os.stat(os.path.join(local, "results", "patterns.json"))
+    assert src.st_ino == dst.st_ino
+    assert not os.path.exists(os.path.join(local, "plots", "stale.html"))
+    assert sorted(os.listdir(os.path.dirname(local))) == ["job"]
+    assert sorted(os.listdir(local)) == ["plots", "results"]
+
+
+def test_cross_filesystem_falls_back_to_copy(tmp_path, monkeypatch):
+    shared, local = str(tmp_path / "shared" / "job"), str(tmp_path / "local" / "job")
+    _make_job(shared)
+
+    def cross_device(src, dst):
+        raise OSError(errno.EXDEV, "Invalid cross-device link")
+
+    monkeypatch.setattr(result_publisher.os, "link", cross_device)
+    monkeypatch.setattr(result_publisher, "_reflink", lambda src, dst: False)
+
+    counts = ResultPublisher(mode="link").publish(shared, local)
+
+    assert counts == {"linked": 0, "reflinked": 0, "copied": 4}
+    with open(os.path.join(local, "results", "patterns.json")) as f:
+        assert f.read() == "[]"
+
+
+def test_direct_mode_removes_local_copies(tmp_path):
+    shared, local = str(tmp_path / "shared" / "job"), str(tmp_path / "local" / "job")
+    _make_job(shared)
+    ResultPublisher(mode="copy").publish(shared, local)
+
+    ResultPublisher(mode="direct").publish(shared, local)
+
+    assert not os.path.exists(os.path.join(local, "results"))
+    assert os.path.exists(os.path.join(shared, "results", "patterns.json"))
+
+
+def test_unknown_mode_is_rejected():
+    with pytest.raises(ValueError):
+        ResultPublisher(mode="symlink")
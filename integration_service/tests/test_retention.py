@@ -0,0 +1,162 @@
+"""Tests for the retention engine."""
+import os
+import sqlite3
+import time
+import pytest
+from ..services.archive_service import ArchiveService
+from ..services.csv_cache import CsvCache
+from ..services.job_registry import JobRegistry
+from ..services.metrics import RETENTION_EVICTIONS
+from ..services.mining_queue import MiningQueue
+from ..services.retention import RetentionEngine
+
+NOW = time.time()
+HOUR = 3600
+
+
+def _engine(tmp_path, **limits) -> RetentionEngine:
+    shared, local = tmp_path / "shared", tmp_path / "local"
+    shared.mkdir()
+    local.mkdir()
+    engine = RetentionEngine(
+        str(shared),
+        str(local),
+        ArchiveService(str(local)),
+        JobRegistry(db_path=str(tmp_path / "jobs.sqlite")),
+        MiningQueue(db_path=str(tmp_path / "queue.sqlite"), max_size=10),
+        CsvCache(str(tmp_path / "cache"), enabled=True),
+        db_path=str(tmp_path / "retention.sqlite")
+    )
+    engine.job_ttl = 0
+    engine.max_bytes = {"shared": 0, "local": 0}
+    engine.min_free_bytes = 0
+    engine.min_age = 2 * HOUR
+    engine.archive_ttl = 24 * HOUR
+    engine.mork_grace = 24 * HOUR
+    for name, value in limits.items():
+        setattr(engine, name, value)
+    return engine
+
+
+def _job(root, job_id, size=1000, age=10 * HOUR, filename="networkx_graph.pkl"):
+    job_dir = os.path.join(str(root), job_id)
+    os.makedirs(job_dir, exist_ok=True)
+    path = os.path.join(job_dir, filename)
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    with open(path, "wb") as f:
+        f.write(b"x" * size)
+    for target in (path, job_dir):
+        os.utime(target, (NOW - age, NOW - age))
+    return job_dir
+
+
+def test_quota_evicts_least_recently_used_but_keeps_pinned_active_and_fresh_jobs(tmp_path):
+    engine = _engine(tmp_path, max_bytes={"shared": 4500, "local": 0})
+    shared = tmp_path / "shared"
+    for job_id in ("pinned", "busy", "older", "old", "kept"):
+        _job(shared, job_id)
+    _job(shared, "fresh", size=500, age=60)
+    _job(tmp_path / "local", "older", size=10)
+    _job(shared, ".integration", size=10 ** 6)
+    engine.pin("pinned", "paper figures")
+    engine.mining_queue.submit("busy", {})
+    engine.touch("old", now=NOW - 6 * HOUR)
+    engine.touch("kept", now=NOW - 5 * HOUR)
+    evictions_before = RETENTION_EVICTIONS.value(kind="job", reason="quota")
+
+    report = engine.sweep(now=NOW)
+
+    assert [(e["job_id"], e["reason"]) for e in report["evictions"]] == [("older", "quota"), ("old", "quota")]
+    assert report["bytes_freed"] == 2010
+    assert sorted(os.listdir(shared)) == [".integration", "busy", "fresh", "kept", "pinned"]
+    assert not os.path.exists(tmp_path / "local" / "older")
+    assert report["usage"]["shared"]["bytes"] == 3500
+    assert RETENTION_EVICTIONS.value(kind="job", reason="quota") == evictions_before + 2
+
+
+@pytest.mark.asyncio
+async def test_collects_merged_mork_dirs_stale_archives_and_partials(tmp_path):
+    engine = _engine(tmp_path)
+    shared, local = tmp_path / "shared", tmp_path / "local"
+
+    async def mork(params, dependency):
+        return {"mork_job_id": params["mork_job_id"]}
+
+    async def merge(params, dependency):
+        if params.get("fail"):
+            raise RuntimeError("nx directory missing")
+        return {"mork_job_id": dependency["result"]["mork_job_id"], "merged": params["merged"]}
+
+    engine.job_registry.register("mork", mork)
+    engine.job_registry.register("merge", merge)
+    for job_id, mork_job_id, merge_params, run_merge in (
+        ("graph", "mork-done", {"merged": True}, True),
+        ("graph-2", "mork-pending", {"merged": True}, False),
+        ("graph-3", "mork-failed", {"fail": True}, True),
+        ("graph-4", "mork-not-copied", {"merged": False}, True),
+    ):
+        engine.job_registry.create_job(job_id, "graph")
+        mork_id = engine.job_registry.add_subtask(job_id, "mork", {"mork_job_id": mork_job_id})
+        await engine.job_registry.run_job(job_id)
+        engine.job_registry.add_subtask(job_id, "merge", merge_params, depends_on=mork_id)
+        if run_merge:
+            await engine.job_registry.run_job(job_id)
+
+    _job(shared, "graph", filename="results/patterns.json")
+    # Unmerged Mork output is the only copy, so only the merged one goes
+    for mork_job_id in ("mork-done", "mork-pending", "mork-failed", "mork-not-copied"):
+        _job(shared, mork_job_id, age=30 * HOUR, filename="data.metta")
+    archive = engine.archive_service.archive_path("graph")
+    with open(archive, "w") as f:
+        f.write("zip")
+    os.utime(archive, (NOW - HOUR, NOW - HOUR))
+    partial = local / "graph.zip.0123.partial"
+    partial.write_bytes(b"z" * 10)
+    os.utime(partial, (NOW - 3 * HOUR, NOW - 3 * HOUR))
+
+    dry_run = engine.sweep(dry_run=True, now=NOW)
+    assert os.path.exists(archive) and dry_run["bytes_freed"] == 0
+
+    report = engine.sweep(now=NOW)
+
+    assert sorted((e["kind"], e["reason"]) for e in report["evictions"]) == [
+        ("archive", "partial_archive"), ("archive", "stale_archive"), ("mork", "orphan_mork")
+    ]
+    assert sorted(os.listdir(shared)) == ["graph", "mork-failed", "mork-not-copied", "mork-pending"]
+    assert os.listdir(local) == []
+
+
+def test_ttl_forgets_dataset_and_sweeps_are_claimed_once_per_interval(tmp_path):
+    engine = _engine(tmp_path, job_ttl=7 * 24 * HOUR, interval=600)
+    _job(tmp_path / "shared", "expired", age=8 * 24 * HOUR)
+    _job(tmp_path / "shared", "recent", age=6 * 24 * HOUR)
+    engine.csv_cache.record_dataset("dataset-key", "expired", {"nodes.csv": "abc"})
+
+    report = engine.sweep(now=NOW)
+
+    assert [(e["job_id"], e["reason"]) for e in report["evictions"]] == [("expired", "ttl")]
+    assert engine.csv_cache.lookup_dataset("dataset-key") is None
+    assert engine._claim_sweep(now=NOW) is True
+    assert engine._claim_sweep(now=NOW + 60) is False
+    assert engine._claim_sweep(now=NOW + 600) is True
+
+
+@pytest.mark.asyncio
+async def test_touch_stays_off_the_database_until_flushed(tmp_path):
+    engine = _engine(tmp_path)
+    engine.enabled = False
+    # Another worker holding the write lock must not stall requests that touch jobs
+    blocker = sqlite3.connect(engine.db_path, isolation_level=None)
+    engine._access_times()
+    blocker.execute("BEGIN IMMEDIATE")
+    started = time.monotonic()
+    engine.touch("job-a", now=NOW)
+    engine.touch("job-a", now=NOW + 1)
+    assert time.monotonic() - started < 0.1
+    blocker.execute("COMMIT")
+    blocker.close()
+    assert engine._access_times() == {}
+
+    await engine.start()
+    await engine.stop()
+    assert engine._access_times() == {"job-a": NOW}
@@ -0,0 +1,86 @@
+"""Tests for request coalescing."""
+import asyncio
+import pytest
+from ..services.single_flight import SingleFlight
+
+
+@pytest.mark.asyncio
+async def test_identical_concurrent_calls_share_one_run():
+    flight = SingleFlight("test")
+    runs = 0
+
+    async def operation():
+        nonlocal runs
+        runs += 1
+        await asyncio.sleep(0.01)
+        return {"value": 42}
+
+    results = await asyncio.gather(*[flight.do("same", operation) for _ in range(5)])
+    other, shared = await flight.do("other", operation)
+
+    assert runs == 2
+    assert [result for result, _ in results] == [{"value": 42}] * 5
+    assert sorted(shared for _, shared in results) == [False] + [True] * 4
+    assert shared is False
+    assert flight.stats() == {"executions": 2, "duplicates_saved": 4, "in_flight": 0}
+
+
+@pytest.mark.asyncio
+async def test_errors_reach_every_waiter_and_are_not_cached():
+    flight = SingleFlight("test")
+
+    async def failing():
+        await asyncio.sleep(0.01)
+        raise RuntimeError("boom")
+
+    results = await asyncio.gather(*[flight.do("key", failing) for _ in range(3)], return_exceptions=True)
+    assert all(isinstance(result, RuntimeError) for result in results)
+
+    async def succeeding():
+        return "ok"
+
+    assert await flight.do("key", succeeding) == ("ok", False)
+
+
+@pytest.mark.asyncio
+async def test_cancelled_waiter_does_not_cancel_shared_run():
+    flight = SingleFlight("test")
+    release = asyncio.Event()
+
+    async def operation():
+        await release.wait()
+        return "done"
+
+    leader = asyncio.create_task(flight.do("key", operation))
+    follower = asyncio.create_task(flight.do("key", operation))
+    await asyncio.sleep(0)
+    leader.cancel()
+    release.set()
+
+    assert await follower == ("done", True)
+
+
+@pytest.mark.asyncio
+async def test_run_is_cancelled_once_every_waiter_left():
+    flight = SingleFlight("test")
+    started = asyncio.Event()
+    cancelled = asyncio.Event()
+
+    async def operation():
+        started.set()
+        try:
+            await asyncio.sleep(10)
+        except asyncio.CancelledError:
+            cancelled.set()
+            raise
+
+    waiters = [asyncio.create_task(flight.do("key", operation)) for _ in range(2)]
+    await started.wait()
+    waiters[0].cancel()
+    await asyncio.sleep(0)
+    assert not cancelled.is_set()
+
+    waiters[1].cancel()
+    await asyncio.wait_for(cancelled.wait(), timeout=1)
+    await asyncio.gather(*waiters, return_exceptions=True)
+    assert flight.stats()["in_flight"] == 0